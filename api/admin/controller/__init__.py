@@ -62,8 +62,9 @@ from core.local_analytics_provider import LocalAnalyticsProvider
 from core.model import (Admin, AdminRole, CirculationEvent, Collection,
                         ConfigurationSetting, CustomList, CustomListEntry,
                         DataSource, ExternalIntegration, Hold, Identifier,
-                        Library, LicensePool, Loan, Patron, Timestamp, Work,
-                        create, get_one, get_one_or_create)
+                        CollectionStatistics, Library, LicensePool, Loan,
+                        Patron, Timestamp, Work, create, get_one,
+                        get_one_or_create)
 from core.model.configuration import ExternalIntegrationLink
 from core.opds import AcquisitionFeed
 from core.opds2_import import OPDS2Importer
@@ -1262,11 +1263,19 @@ class LanesController(AdminCirculationManagerController):
 class DashboardController(AdminCirculationManagerController):
     ##### Class Constants ####################################################  # noqa: E266
 
+    # Use the precomputed collection statistics if they were refreshed
+    # within this long. Otherwise, count the inventory on the spot.
+    STATS_MAX_AGE = timedelta(hours=1)
+
     ##### Public Interface / Magic Methods ###################################  # noqa: E266
 
     def stats(self):
         """Return an accounting of library statistics
 
+        Collection inventory comes from the CollectionStatistics summary
+        when it has been refreshed within STATS_MAX_AGE, and from a single
+        grouped query otherwise.
+
         Returns:
             dict: Stats total licenses, available licenses, and patrons for each library.
         """
@@ -1276,131 +1285,33 @@ class DashboardController(AdminCirculationManagerController):
         total_available_license_count = 0
         collection_counts = dict()
 
+        counts_by_collection_id = CollectionStatistics.counts(self._db, self.STATS_MAX_AGE)
+
         for collection in self._db.query(Collection):
             if not flask.request.admin or not flask.request.admin.can_see_collection(collection):
                 continue
 
-            licensed_title_count = self._db.query(
-                LicensePool
-            ).filter(
-                LicensePool.collection_id == collection.id
-            ).filter(
-                and_(
-                    LicensePool.licenses_owned > 0,
-                    LicensePool.open_access == False,       # noqa: E712
-                )
-            ).count()
-
-            open_title_count = self._db.query(
-                LicensePool
-            ).filter(
-                LicensePool.collection_id == collection.id
-            ).filter(
-                LicensePool.open_access == True             # noqa: E712
-            ).count()
+            counts = counts_by_collection_id.get(collection.id) or CollectionStatistics.empty_counts()
 
-            # The sum queries return None instead of 0 if there are no license pools in the db.
+            total_title_count += counts["licensed_titles"] + counts["open_access_titles"]
+            total_license_count += counts["licenses"]
+            total_available_license_count += counts["available_licenses"]
 
-            license_count = self._db.query(
-                func.sum(LicensePool.licenses_owned)
-            ).filter(
-                LicensePool.collection_id == collection.id
-            ).filter(
-                LicensePool.open_access == False,           # noqa: E712
-            ).all()[0][0] or 0
+            collection_counts[collection.name] = counts
 
-            available_license_count = self._db.query(
-                func.sum(LicensePool.licenses_available)
-            ).filter(
-                LicensePool.collection_id == collection.id
-            ).filter(
-                LicensePool.open_access == False,           # noqa: E712
-            ).all()[0][0] or 0
-
-            total_title_count += licensed_title_count + open_title_count
-            total_license_count += license_count
-            total_available_license_count += available_license_count
-
-            collection_counts[collection.name] = dict(
-                licensed_titles=licensed_title_count,
-                open_access_titles=open_title_count,
-                licenses=license_count,
-                available_licenses=available_license_count,
-            )
+        patron_counts = self._patron_counts_by_library()
 
         for library in self._db.query(Library):
             # Only include libraries this admin has librarian access to.
             if not flask.request.admin or not flask.request.admin.is_librarian(library):
                 continue
 
-            patron_count = self._db.query(Patron).filter(
-                Patron.library_id == library.id).count()
-
-            active_loans_patron_count = self._db.query(
-                distinct(Patron.id)
-            ).join(
-                Patron.loans
-            ).filter(
-                Loan.end >= datetime.now(),
-            ).filter(
-                Patron.library_id == library.id
-            ).count()
-
-            active_patrons = select(
-                [Patron.id]
-            ).select_from(
-                join(
-                    Loan,
-                    Patron,
-                    and_(
-                        Patron.id == Loan.patron_id,
-                        Patron.library_id == library.id,
-                        Loan.id != None,                        # noqa: E711
-                        Loan.end >= datetime.now()
-                    )
-                )
-            ).union(
-                select(
-                    [Patron.id]
-                ).select_from(
-                    join(
-                        Hold,
-                        Patron,
-                        and_(
-                            Patron.id == Hold.patron_id,
-                            Patron.library_id == library.id,
-                            Hold.id != None,
-                        )
-                    )
-                )
-            ).alias()
-
-            active_loans_or_holds_patron_count_query = select(
-                [func.count(distinct(active_patrons.c.id))]
-            ).select_from(
-                active_patrons
-            )
-
-            result = self._db.execute(active_loans_or_holds_patron_count_query)
-            active_loans_or_holds_patron_count = [r[0] for r in result][0]
-
-            loan_count = self._db.query(
-                Loan
-            ).join(
-                Loan.patron
-            ).filter(
-                Patron.library_id == library.id
-            ).filter(
-                Loan.end >= datetime.now()
-            ).count()
-
-            hold_count = self._db.query(
-                Hold
-            ).join(
-                Hold.patron
-            ).filter(
-                Patron.library_id == library.id
-            ).count()
+            library_patron_counts = patron_counts.get(library.id, {})
+            patron_count = library_patron_counts.get("total", 0)
+            active_loans_patron_count = library_patron_counts.get("with_active_loans", 0)
+            active_loans_or_holds_patron_count = library_patron_counts.get("with_active_loans_or_holds", 0)
+            loan_count = library_patron_counts.get("loans", 0)
+            hold_count = library_patron_counts.get("holds", 0)
 
             title_count = 0
             license_count = 0
@@ -1543,6 +1454,83 @@ class DashboardController(AdminCirculationManagerController):
 
     ##### Private Methods ####################################################  # noqa: E266
 
+    def _patron_counts_by_library(self):
+        """Count patrons, loans, and holds for every library, with one grouped
+        query per statistic rather than one per statistic per library.
+
+        Returns:
+            dict: Maps library ID to a dictionary of patron statistics.
+        """
+        now = datetime.now()
+        counts = {}
+
+        def add(key, query):
+            for library_id, count in query:
+                counts.setdefault(library_id, {})[key] = count
+
+        add("total", self._db.query(
+            Patron.library_id, func.count(Patron.id)
+        ).group_by(Patron.library_id))
+
+        add("with_active_loans", self._db.query(
+            Patron.library_id, func.count(distinct(Patron.id))
+        ).join(
+            Patron.loans
+        ).filter(
+            Loan.end >= now
+        ).group_by(Patron.library_id))
+
+        active_patrons = select(
+            [Patron.library_id, Patron.id]
+        ).select_from(
+            join(
+                Loan,
+                Patron,
+                and_(
+                    Patron.id == Loan.patron_id,
+                    Loan.id != None,                        # noqa: E711
+                    Loan.end >= now
+                )
+            )
+        ).union(
+            select(
+                [Patron.library_id, Patron.id]
+            ).select_from(
+                join(
+                    Hold,
+                    Patron,
+                    and_(
+                        Patron.id == Hold.patron_id,
+                        Hold.id != None,                    # noqa: E711
+                    )
+                )
+            )
+        ).alias()
+
+        add("with_active_loans_or_holds", self._db.execute(
+            select(
+                [active_patrons.c.library_id, func.count(distinct(active_patrons.c.id))]
+            ).select_from(
+                active_patrons
+            ).group_by(active_patrons.c.library_id)
+        ))
+
+        add("loans", self._db.query(
+            Patron.library_id, func.count(Loan.id)
+        ).join(
+            Loan.patron
+        ).filter(
+            Loan.end >= now
+        ).group_by(Patron.library_id))
+
+        add("holds", self._db.query(
+            Patron.library_id, func.count(Hold.id)
+        ).join(
+            Hold.patron
+        ).group_by(Patron.library_id))
+
+        return counts
+
     ##### Properties and Getters/Setters #####################################  # noqa: E266
 
     ##### Class Methods ######################################################  # noqa: E266
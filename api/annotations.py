@@ -2,6 +2,12 @@ from pyld import jsonld
 import json
 import os
 
+from sqlalchemy import (
+    desc,
+    func,
+)
+from sqlalchemy.orm.session import Session
+
 from core.model import (
     Annotation,
     Identifier,
@@ -11,10 +17,15 @@ from core.model import (
 from core.app_server import (
     url_for,
 )
+from core.lane import Pagination
 from core.util.datetime_helpers import utc_now
 
 from .problem_details import *
 
+# The bundled JSON-LD contexts, keyed by URL. Each file is read once
+# and then served from memory.
+_local_documents = dict()
+
 def load_document(url):
     """Retrieves JSON-LD for the given URL from a local
     file if available, and falls back to the network.
@@ -24,9 +35,13 @@ def load_document(url):
         AnnotationWriter.LDP_CONTEXT: "ldp.jsonld"
     }
     if url in files:
-        base_path = os.path.join(os.path.split(__file__)[0], 'jsonld')
-        jsonld_file = os.path.join(base_path, files[url])
-        data = open(jsonld_file).read()
+        data = _local_documents.get(url)
+        if data is None:
+            base_path = os.path.join(os.path.split(__file__)[0], 'jsonld')
+            jsonld_file = os.path.join(base_path, files[url])
+            with open(jsonld_file) as f:
+                data = f.read()
+            _local_documents[url] = data
         doc = {
             "contextUrl": None,
             "documentUrl": url,
@@ -45,61 +60,119 @@ class AnnotationWriter(object):
     JSONLD_CONTEXT = "http://www.w3.org/ns/anno.jsonld"
     LDP_CONTEXT = "http://www.w3.org/ns/ldp.jsonld"
 
+    # The number of annotations on a single AnnotationPage.
+    PAGE_SIZE = 100
+
     @classmethod
-    def annotations_for(cls, patron, identifier=None):
-        annotations = [annotation for annotation in patron.annotations if annotation.active]
+    def annotations_query(cls, patron, identifier=None):
+        """A query for the patron's active annotations, most recent first."""
+        _db = Session.object_session(patron)
+        qu = _db.query(Annotation).filter(
+            Annotation.patron_id==patron.id
+        ).filter(
+            Annotation.active==True
+        )
         if identifier:
-            annotations = [annotation for annotation in annotations if annotation.identifier == identifier]
-        return annotations
+            qu = qu.filter(Annotation.identifier_id==identifier.id)
+        return qu.order_by(
+            desc(Annotation.timestamp).nullslast(), desc(Annotation.id)
+        )
 
     @classmethod
-    def annotation_container_for(cls, patron, identifier=None):
+    def annotations_for(cls, patron, identifier=None):
+        return cls.annotations_query(patron, identifier=identifier).all()
+
+    @classmethod
+    def latest_timestamp(cls, patron, identifier=None):
+        """The timestamp of the patron's most recent active annotation."""
+        qu = cls.annotations_query(patron, identifier=identifier)
+        return qu.with_entities(func.max(Annotation.timestamp)).order_by(None).scalar()
+
+    @classmethod
+    def container_url(cls, patron, identifier=None, pagination=None):
+        kwargs = dict()
+        if pagination:
+            kwargs.update(pagination.items())
         if identifier:
-            url = url_for('annotations_for_work',
-                          identifier_type=identifier.type,
-                          identifier=identifier.identifier,
-                          library_short_name=patron.library.short_name,
-                          _external=True)
-        else:
-            url = url_for("annotations", library_short_name=patron.library.short_name, _external=True)
-        annotations = cls.annotations_for(patron, identifier=identifier)
+            return url_for('annotations_for_work',
+                           identifier_type=identifier.type,
+                           identifier=identifier.identifier,
+                           library_short_name=patron.library.short_name,
+                           _external=True, **kwargs)
+        return url_for("annotations", library_short_name=patron.library.short_name,
+                       _external=True, **kwargs)
 
+    @classmethod
+    def annotation_container_for(cls, patron, identifier=None, pagination=None):
+        pagination = pagination or Pagination(0, cls.PAGE_SIZE)
+        pagination = pagination.first_page
+
+        qu = cls.annotations_query(patron, identifier=identifier)
+        total = qu.order_by(None).count()
         latest_timestamp = None
-        if len(annotations) > 0:
-            # patron.annotations is already sorted by timestamp, so the first
-            # annotation is the most recent.
-            latest_timestamp = annotations[0].timestamp
+        if total > 0:
+            latest_timestamp = cls.latest_timestamp(patron, identifier=identifier)
 
         container = dict()
         container["@context"] = [cls.JSONLD_CONTEXT, cls.LDP_CONTEXT]
-        container["id"] = url
+        container["id"] = cls.container_url(patron, identifier)
         container["type"] = ["BasicContainer", "AnnotationCollection"]
-        container["total"] = len(annotations)
-        container["first"] = cls.annotation_page_for(patron, identifier=identifier, with_context=False)
+        container["total"] = total
+        container["first"] = cls.annotation_page_for(
+            patron, identifier=identifier, with_context=False,
+            pagination=pagination
+        )
+        if total > pagination.size:
+            last_offset = ((total - 1) // pagination.size) * pagination.size
+            container["last"] = cls.container_url(
+                patron, identifier, Pagination(last_offset, pagination.size)
+            )
         return container, latest_timestamp
 
-
     @classmethod
-    def annotation_page_for(cls, patron, identifier=None, with_context=True):
-        if identifier:
-            url = url_for('annotations_for_work',
-                          identifier_type=identifier.type,
-                          identifier=identifier.identifier,
-                          library_short_name=patron.library.short_name,
-                          _external=True)
-        else:
-            url = url_for("annotations", library_short_name=patron.library.short_name, _external=True)
-        annotations = cls.annotations_for(patron, identifier=identifier)
+    def annotation_page_for(cls, patron, identifier=None, with_context=True,
+                            pagination=None):
+        pagination = pagination or Pagination(0, cls.PAGE_SIZE)
+
+        # Ask for one extra annotation to find out whether there's a
+        # next page without counting all of them.
+        qu = cls.annotations_query(patron, identifier=identifier)
+        annotations = qu.offset(pagination.offset).limit(pagination.size + 1).all()
+        has_next_page = len(annotations) > pagination.size
+        annotations = annotations[:pagination.size]
+
         details = [cls.detail(annotation, with_context=with_context) for annotation in annotations]
 
         page = dict()
         if with_context:
             page["@context"] = cls.JSONLD_CONTEXT
-        page["id"] = url
+        page["id"] = cls.container_url(patron, identifier, pagination)
         page["type"] = "AnnotationPage"
+        page["partOf"] = cls.container_url(patron, identifier)
+        page["startIndex"] = pagination.offset
+        if has_next_page:
+            page["next"] = cls.container_url(
+                patron, identifier, pagination.next_page
+            )
+        previous_page = pagination.previous_page
+        if previous_page:
+            page["prev"] = cls.container_url(patron, identifier, previous_page)
         page["items"] = details
         return page
 
+    @classmethod
+    def compact(cls, value):
+        """Compact a JSON-LD document against the annotation context.
+
+        :param value: A JSON-encoded JSON-LD document.
+        :return: The JSON-encoded compacted document, without its context.
+        """
+        if not value:
+            return None
+        compacted = jsonld.compact(json.loads(value), cls.JSONLD_CONTEXT)
+        compacted.pop("@context", None)
+        return json.dumps(compacted)
+
     @classmethod
     def detail(cls, annotation, with_context=True):
         item = dict()
@@ -111,16 +184,18 @@ class AnnotationWriter(object):
         item["type"] = "Annotation"
         item["motivation"] = annotation.motivation
         item["body"] = annotation.content
+
+        # The compacted forms are stored when an annotation is
+        # written. Annotations written before that get them stored the
+        # first time they're looked at.
         if annotation.target:
-            target = json.loads(annotation.target)
-            compacted = jsonld.compact(target, cls.JSONLD_CONTEXT)
-            del compacted["@context"]
-            item["target"] = compacted
+            if not annotation.compacted_target:
+                annotation.compacted_target = cls.compact(annotation.target)
+            item["target"] = json.loads(annotation.compacted_target)
         if annotation.content:
-            body = json.loads(annotation.content)
-            compacted = jsonld.compact(body, cls.JSONLD_CONTEXT)
-            del compacted["@context"]
-            item["body"] = compacted
+            if not annotation.compacted_content:
+                annotation.compacted_content = cls.compact(annotation.content)
+            item["body"] = json.loads(annotation.compacted_content)
 
         return item
 
@@ -193,8 +268,12 @@ class AnnotationParser(object):
             **extra_kwargs
         )
         annotation.target = target
+        annotation.compacted_target = AnnotationWriter.compact(target)
         if content:
             annotation.content = json.dumps(content)
+            annotation.compacted_content = AnnotationWriter.compact(
+                annotation.content
+            )
         annotation.active = True
         annotation.timestamp = utc_now()
 
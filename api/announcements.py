@@ -46,6 +46,27 @@ class Announcements(object):
             if a.is_active:
                 yield a
 
+    def next_change(self, today=None):
+        """When will the set of active announcements next change?
+
+        :param today: The current local date. Defaults to today.
+        :return: The first date after `today` on which an announcement
+            starts or stops being published, or None if no such date
+            is scheduled.
+        """
+        today = today or datetime.date.today()
+        changes = []
+        for a in self.announcements:
+            if a.start > today:
+                changes.append(a.start)
+            if a.finish >= today:
+                # An announcement is published through its finish date
+                # and disappears the day after.
+                changes.append(a.finish + datetime.timedelta(days=1))
+        if not changes:
+            return None
+        return min(changes)
+
 
 class Announcement(object):
     """Data model class for a single library-wide announcement."""
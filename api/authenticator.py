@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import importlib
 import json
 import logging
@@ -1179,6 +1180,45 @@ class LibraryAuthenticator(object):
 
         return headers
 
+    def create_cached_authentication_document(self):
+        """Create the Authentication For OPDS document and wrap it in a
+        CachedAuthenticationDocument that knows when it goes stale.
+        """
+        document = self.create_authentication_document()
+        valid_until = Announcements.for_library(self.library).next_change()
+        return CachedAuthenticationDocument(document, valid_until)
+
+
+class CachedAuthenticationDocument(object):
+    """A library's Authentication For OPDS document, built once and
+    reused until something that affects it changes.
+
+    Changes to the site configuration rebuild the whole cache (see
+    CirculationManager.load_settings). The only thing that changes the
+    document without changing the configuration is the passage of time,
+    which can make announcements appear or disappear, so the document
+    is only good until the next such date.
+    """
+
+    def __init__(self, document, valid_until=None):
+        """Constructor.
+
+        :param document: The serialized document.
+        :param valid_until: The date on which the document must be
+            rebuilt, or None if it doesn't expire.
+        """
+        self.document = document
+        self.valid_until = valid_until
+        # A strong entity tag: any change to the document changes it.
+        self.etag = hashlib.sha256(document.encode("utf8")).hexdigest()
+
+    def is_current(self, today=None):
+        """Can this document still be served?"""
+        if self.valid_until is None:
+            return True
+        today = today or datetime.date.today()
+        return today < self.valid_until
+
 
 class AuthenticationProvider(OPDSAuthenticationFlow):
     """Handle a specific patron authentication scheme.
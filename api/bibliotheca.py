@@ -175,6 +175,7 @@ class BibliothecaAPI(BaseCirculationAPI, HasSelfTests):
         self.account_key = collection.external_integration.password
         self.library_id = collection.external_account_id
         self.base_url = collection.external_integration.url or self.DEFAULT_BASE_URL
+        HTTP.SESSIONS.configure(self.base_url, timeout=60)
 
         if not self.account_id or not self.account_key or not self.library_id:
             raise CannotLoadConfiguration(
@@ -261,7 +262,7 @@ class BibliothecaAPI(BaseCirculationAPI, HasSelfTests):
         else:
             return self._request_with_timeout(
                 method, url, data=body, headers=headers,
-                allow_redirects=False, timeout=60
+                allow_redirects=False
             )
 
     def get_bibliographic_info_for(self, editions, max_age=None):
@@ -39,10 +39,6 @@ class Configuration(CoreConfiguration):
     # The name of the setting that controls how long static files are cached.
     STATIC_FILE_CACHE_TIME = "static_file_cache_time"
 
-    # The name of the setting controlling how long authentication
-    # documents are cached.
-    AUTHENTICATION_DOCUMENT_CACHE_TIME = "authentication_document_cache_time"
-
     # The name of a setting that turns UWSGI debugging information on
     # or off.
     WSGI_DEBUG_KEY = "wsgi_debug"
@@ -217,13 +213,6 @@ class Configuration(CoreConfiguration):
             "required": True,
             "type": "number",
         },
-        {
-            "key": AUTHENTICATION_DOCUMENT_CACHE_TIME,
-            "label": _("Cache time for authentication documents (in seconds)"),
-            "required": True,
-            "type": "number",
-            "default": 0,
-        },
         {
             "key": CUSTOM_TOS_HREF,
             "label": _("Custom Terms of Service link"),
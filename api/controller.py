@@ -11,7 +11,6 @@ from time import mktime
 from wsgiref.handlers import format_date_time
 
 import flask
-from expiringdict import ExpiringDict
 from flask import (
     make_response,
     Response,
@@ -306,18 +305,27 @@ class CirculationManager(object):
         self.patron_web_domains = patron_web_domains
         self.admin_web_domains = admin_web_domains
         self.setup_configuration_dependent_controllers()
-        authentication_document_cache_time = int(
-            ConfigurationSetting.sitewide(
-                self._db, Configuration.AUTHENTICATION_DOCUMENT_CACHE_TIME
-            ).value_or_default(0)
-        )
-        self.authentication_for_opds_documents = ExpiringDict(
-            max_len=1000, max_age_seconds=authentication_document_cache_time
-        )
         self.wsgi_debug = ConfigurationSetting.sitewide(
             self._db, Configuration.WSGI_DEBUG_KEY
         ).bool_value or False
 
+        # Every Authentication For OPDS document depends on the
+        # configuration we just loaded, so throw away the old ones.
+        self.authentication_for_opds_documents = {}
+        if flask.has_request_context():
+            # We're reloading the configuration in the middle of a
+            # request, so we know what host the documents will be
+            # served from. Build them all now rather than on the first
+            # request for each library.
+            for short_name in self.auth.library_authenticators:
+                try:
+                    self.cached_authentication_document(short_name)
+                except Exception as e:
+                    logging.error(
+                        "Could not build the authentication document for %s",
+                        short_name, exc_info=e
+                    )
+
     @property
     def external_search(self):
         """Retrieve or create a connection to the search interface.
@@ -397,13 +405,17 @@ class CirculationManager(object):
                 return None
             return search
 
-    def setup_circulation(self, library, analytics):
-        """Set up the Circulation object."""
+    def setup_circulation(self, library, analytics, _db=None):
+        """Set up the Circulation object.
+
+        :param _db: Use this database session instead of the circulation
+            manager's own session.
+        """
         if self.testing:
             cls = MockCirculationAPI
         else:
             cls = CirculationAPI
-        return cls(self._db, library, analytics)
+        return cls(_db or self._db, library, analytics)
 
     def setup_shared_collection(self):
         if self.testing:
@@ -496,6 +508,8 @@ class CirculationManager(object):
         :param facets: A faceting object.
         :param annotator_class: Instantiate this annotator class if possible.
            Intended for use in unit tests.
+        :param circulation: Use this CirculationAPI instead of the one
+           created for the library when the app started.
         """
         library = None
         if lane and isinstance(lane, Lane):
@@ -521,20 +535,47 @@ class CirculationManager(object):
             authenticator is not None and authenticator.identifies_individuals
         )
         annotator_class = kwargs.pop('annotator_class', LibraryAnnotator)
+        circulation = (
+            kwargs.pop('circulation', None) or self.circulation_apis[library.id]
+        )
         return annotator_class(
-            self.circulation_apis[library.id], lane,
+            circulation, lane,
             library, top_level_title='All Books',
             library_identifies_patrons=library_identifies_patrons,
             facets=facets, *args, **kwargs
         )
 
+    def cached_authentication_document(self, short_name=None):
+        """Find or create the Authentication For OPDS document for a
+        library.
+
+        Documents are built once per library and kept until the site
+        configuration changes or one of the library's announcements
+        starts or stops, whichever comes first.
+
+        :param short_name: The short name of a library. Defaults to the
+            library of the current request.
+        :return: A CachedAuthenticationDocument.
+        """
+        if short_name is None:
+            short_name = flask.request.library.short_name
+
+        # The document contains absolute URLs, so a document built for
+        # one hostname can't be served on another.
+        key = (short_name, flask.request.host_url)
+        cached = self.authentication_for_opds_documents.get(key)
+        if cached is None or not cached.is_current():
+            cached = self.auth.library_authenticators[
+                short_name
+            ].create_cached_authentication_document()
+            self.authentication_for_opds_documents[key] = cached
+        return cached
+
     @property
     def authentication_for_opds_document(self):
         """Make sure the current request's library has an Authentication For
         OPDS document in the cache, then return the cached version.
 
-        If the cache is disabled, a fresh document is created every time.
-
         If the query argument `debug` is provided and the
         WSGI_DEBUG_KEY site-wide setting is set to True, the
         authentication document is annotated with a '_debug' section
@@ -543,30 +584,34 @@ class CirculationManager(object):
         diagnosing deployment problems.
         """
         name = flask.request.library.short_name
-        value = self.authentication_for_opds_documents.get(name, None)
-        if value is None:
-            # The document was not in the cache, either because it's
-            # expired or because the cache itself has been disabled.
-            # Create a new one and stick it in the cache for next
-            # time.
-            value = self.auth.create_authentication_document()
-            self.authentication_for_opds_documents[name] = value
-
-        if self.wsgi_debug and 'debug' in flask.request.args:
+        value = self.cached_authentication_document(name).document
+
+        if self.authentication_document_debug_requested:
             # Annotate with debugging information about the WSGI
             # environment and the authentication document cache
             # itself.
             value = json.loads(value)
+            cache = dict(
+                ("%s %s" % key, cached.etag)
+                for key, cached in self.authentication_for_opds_documents.items()
+            )
             value['_debug'] = dict(
                 url=self.url_for(
                     'authentication_document', library_short_name=name
                 ),
                 environ=str(dict(flask.request.environ)),
-                cache=str(self.authentication_for_opds_documents),
+                cache=str(cache),
             )
             value = json.dumps(value)
         return value
 
+    @property
+    def authentication_document_debug_requested(self):
+        """Should the authentication document for this request be
+        annotated with debugging information?
+        """
+        return bool(self.wsgi_debug and 'debug' in flask.request.args)
+
     @property
     def sitewide_key_pair(self):
         """Look up or create the sitewide public/private key pair."""
@@ -836,14 +881,28 @@ class IndexController(CirculationManagerController):
         return self.appropriate_index_for_patron_type()
 
     def authentication_document(self):
-        """Serve this library's Authentication For OPDS document."""
-        return Response(
-            self.manager.authentication_for_opds_document,
-            200,
-            {
-                "Content-Type": AuthenticationForOPDSDocument.MEDIA_TYPE
-            }
-        )
+        """Serve this library's Authentication For OPDS document.
+
+        The document has a strong ETag, so a client that already has the
+        current version gets a 304 response instead of a new copy.
+        """
+        headers = {
+            "Content-Type": AuthenticationForOPDSDocument.MEDIA_TYPE
+        }
+        if self.manager.authentication_document_debug_requested:
+            # The debugging information is different for every
+            # request, so there's no point in validating it.
+            return Response(
+                self.manager.authentication_for_opds_document, 200, headers
+            )
+
+        cached = self.manager.cached_authentication_document()
+        if flask.request.if_none_match.contains(cached.etag):
+            response = Response(status=304)
+        else:
+            response = Response(cached.document, 200, headers)
+        response.set_etag(cached.etag)
+        return response
 
     def has_root_lanes(self):
         """Does the active library feature root lanes for patrons of
@@ -1870,8 +1929,21 @@ class AnnotationController(CirculationManagerController):
                                '<http://www.w3.org/TR/annotation-protocol/>; rel="http://www.w3.org/ns/ldp#constrainedBy"']
             headers['Content-Type'] = AnnotationWriter.CONTENT_TYPE
 
-            container, timestamp = AnnotationWriter.annotation_container_for(
-                patron, identifier=identifier)
+            pagination = load_pagination_from_request(
+                default_size=AnnotationWriter.PAGE_SIZE
+            )
+            if isinstance(pagination, ProblemDetail):
+                return pagination
+
+            if 'after' in flask.request.args:
+                # A specific page of the container was requested.
+                container = AnnotationWriter.annotation_page_for(
+                    patron, identifier=identifier, pagination=pagination)
+                timestamp = AnnotationWriter.latest_timestamp(
+                    patron, identifier=identifier)
+            else:
+                container, timestamp = AnnotationWriter.annotation_container_for(
+                    patron, identifier=identifier, pagination=pagination)
             etag = 'W/""'
             if timestamp:
                 etag = 'W/"%s"' % timestamp
@@ -126,6 +126,9 @@ class EnkiAPI(BaseCirculationAPI, HasSelfTests):
         self.collection_id = collection.id
         self.base_url = collection.external_integration.url or self.PRODUCTION_BASE_URL
 
+        # Enki can be very slow to respond.
+        HTTP.SESSIONS.configure(self.base_url, timeout=90)
+
     def external_integration(self, _db):
         return self.collection.external_integration
 
@@ -220,7 +223,7 @@ class EnkiAPI(BaseCirculationAPI, HasSelfTests):
         """
         return HTTP.request_with_timeout(
             method, url, headers=headers, data=data,
-            params=params, timeout=90, disallowed_response_codes=None,
+            params=params, disallowed_response_codes=None,
             **kwargs
         )
 
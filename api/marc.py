@@ -17,11 +17,17 @@ class LibraryAnnotator(Annotator):
         self.library = library
         _db = Session.object_session(library)
         self.base_url = ConfigurationSetting.sitewide(_db, Configuration.BASE_URL_KEY).value
+        # An annotator is used for one MARC file, so there's no need to
+        # look up the same setting again for every record.
+        self._values = {}
 
     def value(self, key, integration):
-        _db = Session.object_session(integration)
-        return ConfigurationSetting.for_library_and_externalintegration(
-            _db, key, self.library, integration).value
+        cache_key = (key, integration.id)
+        if cache_key not in self._values:
+            _db = Session.object_session(integration)
+            self._values[cache_key] = ConfigurationSetting.for_library_and_externalintegration(
+                _db, key, self.library, integration).value
+        return self._values[cache_key]
 
 
     def annotate_work_record(self, work, active_license_pool, edition,
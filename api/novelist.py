@@ -1,3 +1,4 @@
+import datetime
 import json
 import logging
 import urllib.request
@@ -23,6 +24,7 @@ from core.metadata_layer import (
     SubjectData,
 )
 from core.model import (
+    ConfigurationSetting,
     DataSource,
     ExternalIntegration,
     Hyperlink,
@@ -38,8 +40,10 @@ from core.model import (
     Edition,
     Contributor,
     Contribution,
+    Work,
 )
 from core.util import TitleProcessor
+from core.util.datetime_helpers import to_utc
 from sqlalchemy.sql import (
     select,
     join,
@@ -79,6 +83,15 @@ class NoveListAPI(object):
 
     NO_ISBN_EQUIVALENCY = "No clear ISBN equivalency: %r"
 
+    # The number of records sent to NoveList in each request when
+    # uploading a snapshot in chunks.
+    SNAPSHOT_CHUNK_SIZE = 1000
+
+    # The ConfigurationSetting key recording when the last successful
+    # snapshot for a library started. Delta snapshots send everything
+    # that changed after this point.
+    LAST_SNAPSHOT_TIME = "novelist_last_snapshot_time"
+
     # While the NoveList API doesn't require parameters to be passed via URL,
     # the Representation object needs a unique URL to return the proper data
     # from the database.
@@ -468,16 +481,24 @@ class NoveListAPI(object):
                 metadata.recommendations += self._extract_isbns(book_info)
         return metadata
 
-    def get_items_from_query(self, library):
+    def get_items_from_query(self, library, since=None):
         """Gets identifiers and its related title, medium, and authors from the
         database.
-        Keeps track of the current 'ISBN' identifier and current item object that
-        is being processed. If the next ISBN being processed is new, the existing one
-        gets added to the list of items. If the ISBN is the same, then we append
-        the Author property since there are multiple contributors.
 
+        :param since: If provided, only items whose license pools or
+            works changed after this datetime are returned.
         :return: a list of Novelist objects to send
         """
+        return list(self.iterate_items(library, since=since))
+
+    def items_query(self, library, since=None):
+        """Build the query that finds every ISBN in the library's collections
+        along with its title, medium, publication date, and contributors.
+
+        :param since: If provided, only items whose license pools or
+            works changed after this datetime are included. Changes to an
+            edition show up here through the work's last_update_time.
+        """
         collectionList = []
         for c in library.collections:
             collectionList.append(c.id)
@@ -488,12 +509,7 @@ class NoveListAPI(object):
         roles = list(Contributor.AUTHOR_ROLES)
         roles.append(Contributor.NARRATOR_ROLE)
 
-        isbnQuery = select(
-            [i1.identifier, i1.type, i2.identifier,
-             Edition.title, Edition.medium, Edition.published,
-             Contribution.role, Contributor.sort_name,
-             DataSource.name],
-        ).select_from(
+        from_clause = (
             join(LicensePool, i1, i1.id == LicensePool.identifier_id)
             .join(Equivalency, i1.id == Equivalency.input_id, LEFT_OUTER_JOIN)
             .join(i2, Equivalency.output_id == i2.id, LEFT_OUTER_JOIN)
@@ -505,17 +521,51 @@ class NoveListAPI(object):
             .join(Contribution, Edition.id == Contribution.edition_id)
             .join(Contributor, Contribution.contributor_id == Contributor.id)
             .join(DataSource, DataSource.id == LicensePool.data_source_id)
-        ).where(
-            and_(
-                LicensePool.collection_id.in_(collectionList),
-                or_(i1.type == "ISBN", i2.type == "ISBN"),
-                or_(Contribution.role.in_(roles))
+        )
+        clauses = [
+            LicensePool.collection_id.in_(collectionList),
+            or_(i1.type == "ISBN", i2.type == "ISBN"),
+            or_(Contribution.role.in_(roles))
+        ]
+        if since:
+            from_clause = from_clause.join(
+                Work, Work.id == LicensePool.work_id, LEFT_OUTER_JOIN
+            )
+            clauses.append(
+                or_(
+                    LicensePool.last_checked > since,
+                    LicensePool.availability_time > since,
+                    Work.last_update_time > since,
+                )
             )
+
+        return select(
+            [i1.identifier, i1.type, i2.identifier,
+             Edition.title, Edition.medium, Edition.published,
+             Contribution.role, Contributor.sort_name,
+             DataSource.name],
+        ).select_from(
+            from_clause
+        ).where(
+            and_(*clauses)
         ).order_by(i1.identifier, i2.identifier)
 
-        result = self._db.execute(isbnQuery)
+    def iterate_items(self, library, since=None):
+        """Yield NoveList objects one at a time.
+
+        Rows are read through a server-side cursor, so the whole
+        library never has to be held in memory at once.
+
+        Keeps track of the current 'ISBN' identifier and current item object that
+        is being processed. If the next ISBN being processed is new, the existing one
+        gets yielded. If the ISBN is the same, then we append
+        the Author property since there are multiple contributors.
+        """
+        isbnQuery = self.items_query(library, since=since)
+        result = self._db.execute(
+            isbnQuery.execution_options(stream_results=True)
+        )
 
-        items = []
         newItem = None
         existingItem = None
         currentIdentifier = None
@@ -534,14 +584,12 @@ class NoveListAPI(object):
             if addItem and existingItem:
                 # The Role property isn't needed in the actual request.
                 del existingItem['role']
-                items.append(existingItem)
+                yield existingItem
 
         # For the case when there's only one item in `result`
         if newItem:
             del newItem['role']
-            items.append(newItem)
-
-        return items
+            yield newItem
 
     def create_item_object(self, object, currentIdentifier, existingItem):
         """Returns a new item if the current identifier that was processed
@@ -632,29 +680,99 @@ class NoveListAPI(object):
 
         content = None
         if items:
-            data = json.dumps(self.make_novelist_data_object(items))
-            response = self.put(
-                self.COLLECTION_DATA_API,
-                {
-                    "AuthorizedIdentifier": self.AUTHORIZED_IDENTIFIER,
-                    "Content-Type": "application/json; charset=utf-8"
-                },
-                data=data
-            )
-            if (response.status_code == 200):
-                content = json.loads(response.content)
-                logging.info(
-                    "Success from NoveList: %r", response.content
-                )
-            else:
-                logging.error("Data sent was: %r", data)
-                logging.error(
-                    "Error %s from NoveList: %r", response.status_code,
-                    response.content
-                )
+            content = self.put_records(items)
 
         return content
 
+    def put_items_novelist_in_chunks(self, library, since=None, chunk_size=None):
+        """Stream the library's items to NoveList in fixed-size chunks.
+
+        :param since: If provided, only send items that changed after
+            this datetime.
+        :param chunk_size: The number of records to send in each request.
+        :return: A list of NoveList responses, one per chunk, or None if
+            any chunk was rejected.
+        """
+        chunk_size = chunk_size or self.SNAPSHOT_CHUNK_SIZE
+        responses = []
+        chunk = []
+
+        for item in self.iterate_items(library, since=since):
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                content = self.put_records(chunk)
+                if content is None:
+                    return None
+                responses.append(content)
+                chunk = []
+
+        if chunk:
+            content = self.put_records(chunk)
+            if content is None:
+                return None
+            responses.append(content)
+
+        return responses
+
+    def put_records(self, items):
+        """Send a list of NoveList objects in a single request.
+
+        :return: The parsed NoveList response, or None if the request failed.
+        """
+        content = None
+        data = json.dumps(self.make_novelist_data_object(items))
+        response = self.put(
+            self.COLLECTION_DATA_API,
+            {
+                "AuthorizedIdentifier": self.AUTHORIZED_IDENTIFIER,
+                "Content-Type": "application/json; charset=utf-8"
+            },
+            data=data
+        )
+        if (response.status_code == 200):
+            content = json.loads(response.content)
+            logging.info(
+                "Success from NoveList: %r", response.content
+            )
+        else:
+            logging.error("Data sent was: %r", data)
+            logging.error(
+                "Error %s from NoveList: %r", response.status_code,
+                response.content
+            )
+        return content
+
+    @classmethod
+    def _snapshot_setting(cls, library):
+        _db = Session.object_session(library)
+        integration = ExternalIntegration.lookup(
+            _db, ExternalIntegration.NOVELIST,
+            ExternalIntegration.METADATA_GOAL, library=library
+        )
+        if not integration:
+            return None
+        return ConfigurationSetting.for_library_and_externalintegration(
+            _db, cls.LAST_SNAPSHOT_TIME, library, integration
+        )
+
+    @classmethod
+    def last_snapshot_time(cls, library):
+        """When did the last successful snapshot for this library start?
+
+        :return: A datetime, or None if no snapshot has succeeded yet.
+        """
+        setting = cls._snapshot_setting(library)
+        if not setting or not setting.value:
+            return None
+        return to_utc(datetime.datetime.fromisoformat(setting.value))
+
+    @classmethod
+    def set_last_snapshot_time(cls, library, value):
+        """Record the time a successful snapshot for this library started."""
+        setting = cls._snapshot_setting(library)
+        if setting:
+            setting.value = value.isoformat()
+
     def make_novelist_data_object(self, items):
         return {
             "customer": "%s:%s" % (self.profile, self.password),
@@ -397,6 +397,7 @@ class OdiloAPI(BaseCirculationAPI, HasSelfTests):
 
         if not self.client_key or not self.client_secret or not self.library_api_base_url:
             raise CannotLoadConfiguration("Odilo configuration is incomplete.")
+        HTTP.SESSIONS.configure(self.library_api_base_url, timeout=60)
 
         # Use utf8 instead of unicode encoding
         settings = [self.client_key, self.client_secret, self.library_api_base_url]
@@ -516,8 +517,7 @@ class OdiloAPI(BaseCirculationAPI, HasSelfTests):
 
         url = self._make_absolute_url(url)
         response = HTTP.request_with_timeout(
-            method, url, headers=headers, data=data,
-            timeout=60
+            method, url, headers=headers, data=data
         )
 
         # TODO: If Odilo doesn't recognize the patron it will send
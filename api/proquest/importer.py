@@ -9,7 +9,7 @@ from contextlib import contextmanager
 import core.util.webpub_manifest_parser.opds2.ast as opds2_ast
 from flask_babel import lazy_gettext as _
 from requests import HTTPError
-from sqlalchemy import or_
+from sqlalchemy import Column, MetaData, String, Table, exists, or_
 from core.util.webpub_manifest_parser.utils import encode
 
 from api.circulation import BaseCirculationAPI, FulfillmentInfo, LoanInfo
@@ -17,6 +17,10 @@ from api.circulation_exceptions import CannotFulfill, CannotLoan
 from api.proquest.client import ProQuestAPIClientConfiguration, ProQuestAPIClientFactory
 from api.proquest.credential import ProQuestCredentialManager
 from api.proquest.identifier import ProQuestIdentifierParser
+from api.proquest.model import (
+    ProQuestPublicationFingerprint,
+    calculate_publication_fingerprint,
+)
 from api.saml.metadata.model import SAMLAttributeType
 from core.classifier import Classifier
 from core.exceptions import BaseError
@@ -43,6 +47,8 @@ from core.model.configuration import (
 )
 from core.opds2_import import OPDS2Importer, OPDS2ImportMonitor, parse_feed
 from core.opds_import import OPDSImporter
+from core.util.datetime_helpers import utc_now
+from core.util.webpub_manifest_parser.core.ast import CollectionList
 
 MISSING_AFFILIATION_ID = BaseError(
     _(
@@ -760,6 +766,9 @@ class ProQuestOPDS2Importer(OPDS2Importer, BaseCirculationAPI, HasExternalIntegr
 class ProQuestOPDS2ImportMonitor(OPDS2ImportMonitor, HasExternalIntegration):
     PROTOCOL = ExternalIntegration.PROQUEST
 
+    # Number of feed identifiers inserted into the temporary table in one statement.
+    FEED_IDENTIFIERS_BATCH_SIZE = 1000
+
     def __init__(
         self,
         client_factory,
@@ -907,23 +916,135 @@ class ProQuestOPDS2ImportMonitor(OPDS2ImportMonitor, HasExternalIntegration):
 
         return feed
 
-    def _collect_feed_identifiers(self, feed, feed_identifiers):
-        """Keep track of all identifiers in the ProQuest feed and save them in a list.
+    def _calculate_fingerprints(self, feed):
+        """Calculate content fingerprints of all the publications in the feed.
 
         :param feed: ProQuest OPDS 2.0 feed
         :type feed: opds2_ast.OPDS2Feed
 
-        :param feed_identifiers: List of identifiers in the ProQuest feed
-        :type feed_identifiers: List[str]
+        :return: List of 3-tuples containing publication's identifier, the publication itself and its fingerprint
+        :rtype: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
         """
+        publication_fingerprints = []
+
         for publication in self._get_publications(feed):
             identifier = parse_identifier(self._db, publication.metadata.identifier)
+            fingerprint = calculate_publication_fingerprint(publication)
+
+            publication_fingerprints.append((identifier, publication, fingerprint))
+
+        return publication_fingerprints
+
+    def _find_changed_publications(self, publication_fingerprints):
+        """Filter out publications which haven't changed since the last successful import.
+
+        :param publication_fingerprints: List of 3-tuples containing publication's identifier,
+            the publication itself and its fingerprint
+        :type publication_fingerprints: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
+
+        :return: List of 3-tuples describing publications which are either new or have been changed
+        :rtype: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
+        """
+        if self.force_reimport or not publication_fingerprints:
+            return publication_fingerprints
+
+        identifier_ids = [
+            identifier.id for identifier, _, _ in publication_fingerprints
+        ]
+        stored_fingerprints = dict(
+            self._db.query(
+                ProQuestPublicationFingerprint.identifier_id,
+                ProQuestPublicationFingerprint.fingerprint,
+            )
+            .filter(ProQuestPublicationFingerprint.collection_id == self.collection_id)
+            .filter(ProQuestPublicationFingerprint.identifier_id.in_(identifier_ids))
+        )
+
+        return [
+            (identifier, publication, fingerprint)
+            for identifier, publication, fingerprint in publication_fingerprints
+            if stored_fingerprints.get(identifier.id) != fingerprint
+        ]
+
+    @staticmethod
+    def _filter_feed(feed, publication_fingerprints, changed_publication_fingerprints):
+        """Return a feed containing only new and changed publications.
+
+        :param feed: ProQuest OPDS 2.0 feed
+        :type feed: opds2_ast.OPDS2Feed
+
+        :param publication_fingerprints: List of 3-tuples describing all the publications in the feed
+        :type publication_fingerprints: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
+
+        :param changed_publication_fingerprints: List of 3-tuples describing new and changed publications
+        :type changed_publication_fingerprints: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
 
-            feed_identifiers.append(identifier.identifier)
+        :return: The original feed if all its publications have to be imported,
+            a new feed containing only new and changed publications,
+            or None if there is nothing to import
+        :rtype: Optional[opds2_ast.OPDS2Feed]
+        """
+        if len(changed_publication_fingerprints) == len(publication_fingerprints):
+            return feed
+
+        if not changed_publication_fingerprints:
+            return None
+
+        return opds2_ast.OPDS2Feed(
+            metadata=feed.metadata,
+            links=feed.links,
+            publications=CollectionList(
+                [publication for _, publication, _ in changed_publication_fingerprints]
+            ),
+        )
+
+    def _save_fingerprints(self, changed_publication_fingerprints, failures):
+        """Save fingerprints of the successfully imported publications.
+
+        :param changed_publication_fingerprints: List of 3-tuples describing imported publications
+        :type changed_publication_fingerprints: List[Tuple[Identifier, opds2_ast.OPDS2Publication, str]]
+
+        :param failures: Identifiers of the publications which failed to import
+        :type failures: Iterable[str]
+        """
+        imported_fingerprints = {
+            identifier.id: fingerprint
+            for identifier, _, fingerprint in changed_publication_fingerprints
+            if identifier.identifier not in failures
+        }
+
+        if not imported_fingerprints:
+            return
+
+        existing_fingerprints = (
+            self._db.query(ProQuestPublicationFingerprint)
+            .filter(ProQuestPublicationFingerprint.collection_id == self.collection_id)
+            .filter(
+                ProQuestPublicationFingerprint.identifier_id.in_(
+                    list(imported_fingerprints.keys())
+                )
+            )
+        )
+
+        for existing_fingerprint in existing_fingerprints:
+            existing_fingerprint.fingerprint = imported_fingerprints.pop(
+                existing_fingerprint.identifier_id
+            )
+            existing_fingerprint.updated_at = utc_now()
+
+        for identifier_id, fingerprint in imported_fingerprints.items():
+            self._db.add(
+                ProQuestPublicationFingerprint(
+                    self.collection_id, identifier_id, fingerprint
+                )
+            )
 
     def _clean_removed_items(self, feed_identifiers):
         """Make items that are no longer present in the ProQuest feed to be invisible in the CM's catalog.
 
+        Identifiers present in the feed are loaded into a temporary table
+        and the items to remove are found using an anti-join against it.
+
         :param feed_identifiers: List of identifiers present in the ProQuest feed
         :type feed_identifiers: List[str]
         """
@@ -931,19 +1052,64 @@ class ProQuestOPDS2ImportMonitor(OPDS2ImportMonitor, HasExternalIntegration):
             "Started removing identifiers that are no longer present in the ProQuest feed"
         )
 
+        connection = self._db.connection()
+        feed_identifiers_table = Table(
+            "proquest_feed_identifiers",
+            MetaData(),
+            Column("identifier", String, primary_key=True),
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP",
+        )
+        feed_identifiers_table.create(bind=connection)
+
+        unique_feed_identifiers = list(set(feed_identifiers))
+
+        for start in range(
+            0, len(unique_feed_identifiers), self.FEED_IDENTIFIERS_BATCH_SIZE
+        ):
+            batch = unique_feed_identifiers[
+                start : start + self.FEED_IDENTIFIERS_BATCH_SIZE
+            ]
+            connection.execute(
+                feed_identifiers_table.insert(),
+                [{"identifier": identifier} for identifier in batch],
+            )
+
         items_to_remove = (
             self._db.query(LicensePool)
             .join(Collection)
             .join(Identifier)
             .filter(Collection.id == self.collection_id)
-            .filter(~Identifier.identifier.in_(feed_identifiers))
+            .filter(
+                ~exists().where(
+                    feed_identifiers_table.c.identifier == Identifier.identifier
+                )
+            )
         )
 
+        removed_identifier_ids = []
+
         for item in items_to_remove:
             item.unlimited_access = False
+            removed_identifier_ids.append(item.identifier_id)
+
+        # Forget the fingerprints of removed items so that they are fully re-imported
+        # if they show up in the feed again.
+        if removed_identifier_ids:
+            self._db.query(ProQuestPublicationFingerprint).filter(
+                ProQuestPublicationFingerprint.collection_id == self.collection_id
+            ).filter(
+                ProQuestPublicationFingerprint.identifier_id.in_(removed_identifier_ids)
+            ).delete(
+                synchronize_session=False
+            )
+
+        feed_identifiers_table.drop(bind=connection)
 
         self._logger.info(
-            "Finished removing identifiers that are no longer present in the ProQuest feed"
+            "Finished removing {0} identifiers that are no longer present in the ProQuest feed".format(
+                len(removed_identifier_ids)
+            )
         )
 
     def _get_feeds(self):
@@ -1016,20 +1182,42 @@ class ProQuestOPDS2ImportMonitor(OPDS2ImportMonitor, HasExternalIntegration):
 
         feeds = self._get_feeds()
         total_imported = 0
+        total_unchanged = 0
         total_failures = 0
 
         for link, feed in feeds:
+            publication_fingerprints = self._calculate_fingerprints(feed)
+
             if self._process_removals:
-                self._collect_feed_identifiers(feed, feed_identifiers)
+                feed_identifiers.extend(
+                    identifier.identifier
+                    for identifier, _, _ in publication_fingerprints
+                )
+
+            changed_publication_fingerprints = self._find_changed_publications(
+                publication_fingerprints
+            )
+            total_unchanged += len(publication_fingerprints) - len(
+                changed_publication_fingerprints
+            )
+            feed = self._filter_feed(
+                feed, publication_fingerprints, changed_publication_fingerprints
+            )
+
+            if feed is None:
+                self.log.info("Skipping next feed: all publications are unchanged")
+                continue
 
             self.log.info("Importing next feed: %s", link)
             imported_editions, failures = self.import_one_feed(feed)
             total_imported += len(imported_editions)
             total_failures += len(failures)
+            self._save_fingerprints(changed_publication_fingerprints, failures)
             self._db.commit()
 
-        achievements = "Items imported: %d. Failures: %d." % (
+        achievements = "Items imported: %d. Items unchanged: %d. Failures: %d." % (
             total_imported,
+            total_unchanged,
             total_failures,
         )
 
@@ -0,0 +1,118 @@
+import datetime
+import hashlib
+import json
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+
+from core.model import Base
+from core.util.datetime_helpers import utc_now
+from core.util.webpub_manifest_parser.core.ast import Node
+from core.util.webpub_manifest_parser.core.properties import PropertiesGrouping
+from core.util.webpub_manifest_parser.core.registry import RegistryItem
+
+
+def normalize_publication(rwpm_item):
+    """Turn a RWPM AST node into a plain structure suitable for fingerprinting.
+
+    :param rwpm_item: RWPM AST node or one of its property values
+    :type rwpm_item: Any
+
+    :return: JSON-serializable structure describing the node
+    :rtype: Any
+    """
+    if isinstance(rwpm_item, list):
+        return [normalize_publication(item) for item in rwpm_item]
+
+    if isinstance(rwpm_item, Node):
+        result = {}
+
+        for property_name, property_object in PropertiesGrouping.get_class_properties(
+            rwpm_item.__class__
+        ):
+            property_value = getattr(rwpm_item, property_name, None)
+
+            if property_value is not None:
+                result[property_object.key] = normalize_publication(property_value)
+
+        return result
+
+    if isinstance(rwpm_item, RegistryItem):
+        return rwpm_item.key
+    if isinstance(rwpm_item, Enum):
+        return rwpm_item.value
+    if isinstance(rwpm_item, (datetime.datetime, datetime.date)):
+        return rwpm_item.isoformat()
+
+    return rwpm_item
+
+
+def calculate_publication_fingerprint(publication):
+    """Calculate a fingerprint of the publication's content.
+
+    The fingerprint is a SHA-256 digest of the normalized publication's JSON
+    so that two publications having exactly the same content have the same fingerprint.
+
+    :param publication: OPDS 2.0 publication
+    :type publication: core.util.webpub_manifest_parser.opds2.ast.OPDS2Publication
+
+    :return: Hex digest of the publication's content
+    :rtype: str
+    """
+    normalized_publication = json.dumps(
+        normalize_publication(publication),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=True,
+        default=str,
+    )
+
+    return hashlib.sha256(normalized_publication.encode("utf-8")).hexdigest()
+
+
+class ProQuestPublicationFingerprint(Base):
+    """Contains a fingerprint of the last successfully imported version of a ProQuest publication."""
+
+    __tablename__ = "proquestpublicationfingerprints"
+
+    id = Column(Integer, primary_key=True)
+    collection_id = Column(
+        Integer,
+        ForeignKey("collections.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    identifier_id = Column(
+        Integer, ForeignKey("identifiers.id"), index=True, nullable=False
+    )
+    fingerprint = Column(String(64), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (UniqueConstraint("collection_id", "identifier_id"),)
+
+    def __init__(self, collection_id, identifier_id, fingerprint):
+        """Initialize a new instance of ProQuestPublicationFingerprint class.
+
+        :param collection_id: ID of the ProQuest collection
+        :type collection_id: int
+
+        :param identifier_id: ID of the publication's identifier
+        :type identifier_id: int
+
+        :param fingerprint: Fingerprint of the publication's content
+        :type fingerprint: str
+        """
+        self.collection_id = collection_id
+        self.identifier_id = identifier_id
+        self.fingerprint = fingerprint
+        self.updated_at = utc_now()
+
+    def __repr__(self):
+        """Return a string representation.
+
+        :return: String representation
+        :rtype: str
+        """
+        return "<ProQuestPublicationFingerprint(collection_id={0}, identifier_id={1}, fingerprint={2}, updated_at={3})>".format(
+            self.collection_id, self.identifier_id, self.fingerprint, self.updated_at
+        )
@@ -24,7 +24,9 @@ from .config import Configuration
 from core.app_server import (
     ErrorHandler,
     compressible,
+    finish_request_metrics,
     returns_problem_detail,
+    start_request_metrics,
 )
 from core.model import ConfigurationSetting
 from core.util.problem_detail import ProblemDetail
@@ -62,6 +64,14 @@ def get_locale():
     languages = Configuration.localization_languages()
     return request.accept_languages.best_match(languages)
 
+@app.before_request
+def start_request_timing():
+    start_request_metrics(getattr(app, '_db', None))
+
+@app.after_request
+def report_request_timing(response):
+    return finish_request_metrics(response)
+
 @app.teardown_request
 def shutdown_session(exception):
     if (hasattr(app, 'manager')
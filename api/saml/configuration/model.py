@@ -13,7 +13,7 @@ from api.saml.metadata.federations.model import (
     SAMLFederation,
 )
 from api.saml.metadata.model import SAMLAttributeType, SAMLServiceProviderMetadata
-from api.saml.metadata.parser import SAMLMetadataParser
+from api.saml.metadata.parser import SAMLMetadataCache, SAMLMetadataParser
 from core.exceptions import BaseError
 from core.model.configuration import (
     ConfigurationAttributeType,
@@ -267,25 +267,23 @@ class SAMLConfiguration(ConfigurationGrouping):
         """
         identity_providers = []
 
+        # Parsed metadata is shared between requests: the same XML is only parsed once
         if self.non_federated_identity_provider_xml_metadata:
-            parsing_results = self._metadata_parser.parse(
-                self.non_federated_identity_provider_xml_metadata
+            identity_providers = SAMLMetadataCache.get_providers(
+                self._metadata_parser,
+                self.non_federated_identity_provider_xml_metadata,
             )
-            identity_providers = [
-                parsing_result.provider for parsing_result in parsing_results
-            ]
 
         if self.federated_identity_provider_entity_ids:
             for identity_provider_metadata in self._get_federated_identity_providers(
                 db
             ):
-                parsing_results = self._metadata_parser.parse(
-                    identity_provider_metadata.xml_metadata
+                identity_providers.extend(
+                    SAMLMetadataCache.get_providers(
+                        self._metadata_parser, identity_provider_metadata.xml_metadata
+                    )
                 )
 
-                for parsing_result in parsing_results:
-                    identity_providers.append(parsing_result.provider)
-
         return identity_providers
 
     def _load_service_provider(self, db):
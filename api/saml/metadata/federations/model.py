@@ -1,7 +1,8 @@
-from sqlalchemy import ARRAY, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import ARRAY, Column, DateTime, ForeignKey, Integer, String, Text, event
 from sqlalchemy.orm import relationship
 
 from core.model import Base
+from core.model.listeners import site_configuration_has_changed
 
 
 class SAMLFederation(Base):
@@ -145,3 +146,12 @@ class SAMLFederatedIdentityProvider(Base):
         return "<SAMLFederatedIdentityProvider(id={0}, federation={1}, entity_id={2}, display_name={3}".format(
             self.id, self.federation, self.entity_id, self.display_name
         )
+
+
+@event.listens_for(SAMLFederatedIdentityProvider, "after_insert")
+@event.listens_for(SAMLFederatedIdentityProvider, "after_delete")
+@event.listens_for(SAMLFederatedIdentityProvider, "after_update")
+def federated_identity_provider_lifecycle_event(mapper, connection, target):
+    # Federated IdPs are listed in the SAML authentication flow of
+    # Authentication For OPDS documents, so cached documents must be rebuilt.
+    site_configuration_has_changed(target)
@@ -2,6 +2,7 @@ import datetime
 import logging
 
 from api.saml.metadata.federations.model import SAMLFederation
+from api.saml.metadata.parser import SAMLMetadataCache
 from core.monitor import Monitor
 from core.util.datetime_helpers import utc_now
 
@@ -54,4 +55,7 @@ class SAMLMetadataMonitor(Monitor):
             for outdated_saml_federation in saml_federations:
                 self._update_saml_federation_idps_metadata(outdated_saml_federation)
 
+        # Metadata parsed before the refresh is no longer needed
+        SAMLMetadataCache.reset_cache()
+
         self._logger.info("Finished running the SAML metadata monitor")
@@ -1,4 +1,7 @@
+import hashlib
 import logging
+from collections import OrderedDict
+from threading import Lock
 
 from defusedxml.lxml import fromstring
 from flask_babel import lazy_gettext as _
@@ -618,6 +621,86 @@ class SAMLMetadataParser(object):
         return parsing_results
 
 
+class SAMLMetadataCache(object):
+    """Process-wide cache of SAML providers parsed from XML metadata.
+
+    Entries are keyed by a digest of the XML, so metadata that changes is
+    parsed again, and the number of entries is bounded.
+    """
+
+    DEFAULT_MAX_SIZE = 1000
+
+    _mutex = Lock()
+    _entries = OrderedDict()
+    max_size = DEFAULT_MAX_SIZE
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def digest(xml_metadata):
+        """Calculate a digest of the XML metadata.
+
+        :param xml_metadata: XML string containing SAML metadata
+        :type xml_metadata: str
+
+        :return: Hex digest of the XML metadata
+        :rtype: str
+        """
+        if isinstance(xml_metadata, str):
+            xml_metadata = xml_metadata.encode("utf-8")
+
+        return hashlib.sha256(xml_metadata).hexdigest()
+
+    @classmethod
+    def get_providers(cls, metadata_parser, xml_metadata):
+        """Return the providers declared in the XML metadata, parsing it only if it's not cached.
+
+        :param metadata_parser: SAML metadata parser
+        :type metadata_parser: SAMLMetadataParser
+
+        :param xml_metadata: XML string containing SAML metadata
+        :type xml_metadata: str
+
+        :return: List of IdentityProviderMetadata/ServiceProviderMetadata objects
+        :rtype: List[api.saml.metadata.model.SAMLProviderMetadata]
+
+        :raise: SAMLMetadataParsingError
+        """
+        key = (
+            getattr(metadata_parser, "_skip_incorrect_providers", False),
+            cls.digest(xml_metadata),
+        )
+
+        with cls._mutex:
+            providers = cls._entries.get(key)
+
+            if providers is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+
+                return list(providers)
+
+            cls.misses += 1
+
+        parsing_results = metadata_parser.parse(xml_metadata)
+        providers = [parsing_result.provider for parsing_result in parsing_results]
+
+        with cls._mutex:
+            cls._entries[key] = providers
+            cls._entries.move_to_end(key)
+
+            while len(cls._entries) > cls.max_size:
+                cls._entries.popitem(last=False)
+
+        return list(providers)
+
+    @classmethod
+    def reset_cache(cls):
+        """Forget all the parsed metadata."""
+        with cls._mutex:
+            cls._entries.clear()
+
+
 class SAMLSubjectParser(object):
     """Parses SAML response into Subject object"""
 
@@ -0,0 +1,103 @@
+"""Configuration for the offline benchmark suite.
+
+The benchmarks use the same test database and fixtures as the unit
+tests, so they can run anywhere the tests can:
+
+    pytest benchmarks --benchmark-size=500 \
+        --benchmark-output=benchmark-results.json \
+        --benchmark-baseline=previous-results.json
+
+When a baseline is given, every benchmark is compared with it. If any
+benchmark's median time got worse by more than the tolerance, the run
+fails.
+"""
+import pytest
+
+from .harness import (
+    Benchmark,
+    BenchmarkRecorder,
+)
+
+# Pull in the session_fixture defined in core/testing.py
+# which does the database setup and initialization
+pytest_plugins = ["core.testing"]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark-size", type=int, default=100,
+        help="Number of works in the synthetic catalog.",
+    )
+    group.addoption(
+        "--benchmark-repeat", type=int, default=5,
+        help="Number of times each benchmark is run.",
+    )
+    group.addoption(
+        "--benchmark-output", default="benchmark-results.json",
+        help="Write the results to this JSON file.",
+    )
+    group.addoption(
+        "--benchmark-baseline", default=None,
+        help="Compare the results with this JSON file from an earlier run.",
+    )
+    group.addoption(
+        "--benchmark-tolerance", type=float,
+        default=BenchmarkRecorder.DEFAULT_TOLERANCE,
+        help="Fraction by which a median time may grow before it counts as a regression.",
+    )
+
+
+def pytest_configure(config):
+    config._benchmark_recorder = BenchmarkRecorder(
+        config.getoption("--benchmark-size"),
+        config.getoption("--benchmark-repeat"),
+    )
+
+
+@pytest.fixture
+def benchmark(request):
+    return Benchmark(request.config._benchmark_recorder)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    recorder = config._benchmark_recorder
+    if not recorder.results:
+        return
+
+    baseline = None
+    baseline_path = config.getoption("--benchmark-baseline")
+    if baseline_path:
+        baseline = BenchmarkRecorder.load(baseline_path)
+    tolerance = config.getoption("--benchmark-tolerance")
+    report = recorder.report(baseline, tolerance)
+    BenchmarkRecorder.write(report, config.getoption("--benchmark-output"))
+
+    config._benchmark_report = report
+    if baseline is not None and BenchmarkRecorder.regressions(report['comparison']):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    report = getattr(config, "_benchmark_report", None)
+    if not report:
+        return
+    terminalreporter.section("benchmark results")
+    comparison = report.get('comparison', {})
+    for name, result in sorted(report['results'].items()):
+        line = "%-40s median %.4fs  min %.4fs  max %.4fs" % (
+            name, result['median'], result['min'], result['max']
+        )
+        if name in comparison:
+            compared = comparison[name]
+            if 'ratio' in compared:
+                line += "  %.2fx baseline (%s)" % (
+                    compared['ratio'], compared['status']
+                )
+            else:
+                line += "  (%s)" % compared['status']
+        terminalreporter.write_line(line)
+    terminalreporter.write_line(
+        "Results written to %s" % config.getoption("--benchmark-output")
+    )
@@ -0,0 +1,263 @@
+"""Timing, reporting, and synthetic data for the benchmark suite."""
+import datetime
+import json
+import platform
+import random
+import statistics
+import time
+
+from core.classifier import Classifier
+from core.model import (
+    DataSource,
+    Subject,
+)
+from core.util.datetime_helpers import utc_now
+
+
+class BenchmarkRecorder(object):
+    """Collects timings and turns them into a machine-readable report."""
+
+    # A benchmark whose median time grows by more than this fraction
+    # of the baseline median is reported as a regression.
+    DEFAULT_TOLERANCE = 0.2
+
+    def __init__(self, size, repeat):
+        self.size = size
+        self.repeat = repeat
+        self.results = {}
+
+    def record(self, name, timings, items=None):
+        """Record the timings (in seconds) of one benchmark.
+
+        :param name: A unique name for the benchmark.
+        :param timings: A list of elapsed times, one per repetition.
+        :param items: The number of items processed in each repetition,
+            used to calculate a per-item time.
+        """
+        result = dict(
+            repeat=len(timings),
+            min=min(timings),
+            max=max(timings),
+            mean=statistics.mean(timings),
+            median=statistics.median(timings),
+        )
+        if items:
+            result['items'] = items
+            result['median_per_item'] = result['median'] / items
+        self.results[name] = result
+        return result
+
+    def compare(self, baseline, tolerance=DEFAULT_TOLERANCE):
+        """Compare the recorded results with a previous report.
+
+        :param baseline: A report created by `report()`.
+        :return: A dictionary mapping benchmark names to comparisons.
+        """
+        comparison = {}
+        baseline_results = baseline.get('results', {})
+        for name, result in sorted(self.results.items()):
+            old = baseline_results.get(name)
+            if not old or not old.get('median'):
+                comparison[name] = dict(status="new")
+                continue
+            ratio = result['median'] / old['median']
+            if ratio > 1 + tolerance:
+                status = "regression"
+            elif ratio < 1 - tolerance:
+                status = "improvement"
+            else:
+                status = "unchanged"
+            comparison[name] = dict(
+                status=status, baseline_median=old['median'], ratio=ratio
+            )
+        return comparison
+
+    @classmethod
+    def regressions(cls, comparison):
+        return sorted(
+            name for name, value in comparison.items()
+            if value['status'] == "regression"
+        )
+
+    def report(self, baseline=None, tolerance=DEFAULT_TOLERANCE):
+        """Build the report that gets written to disk."""
+        report = dict(
+            created=utc_now().isoformat(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            size=self.size,
+            repeat=self.repeat,
+            results=self.results,
+        )
+        if baseline is not None:
+            report['baseline'] = dict(
+                created=baseline.get('created'), size=baseline.get('size'),
+            )
+            report['tolerance'] = tolerance
+            report['comparison'] = self.compare(baseline, tolerance)
+        return report
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return json.load(f)
+
+    @classmethod
+    def write(cls, report, path):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+class Benchmark(object):
+    """Time a callable a number of times and record the result."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    @property
+    def size(self):
+        return self.recorder.size
+
+    def __call__(self, name, function, setup=None, items=None, repeat=None):
+        """Run `function` repeatedly and record how long it took.
+
+        :param setup: Called before each repetition; its return value is
+            passed into `function` and its running time isn't counted.
+        :return: The value returned by the last call to `function`.
+        """
+        repeat = repeat or self.recorder.repeat
+        timings = []
+        result = None
+        for i in range(repeat):
+            args = []
+            if setup:
+                args.append(setup())
+            start = time.perf_counter()
+            result = function(*args)
+            timings.append(time.perf_counter() - start)
+        self.recorder.record(name, timings, items=items)
+        return result
+
+
+class SyntheticCatalog(object):
+    """Creates a reproducible catalog of works using DatabaseTest helpers."""
+
+    GENRES = [
+        "Mystery", "Science Fiction", "Romance", "Fantasy", "History",
+        "Biography & Memoir", "Cooking", "Poetry",
+    ]
+
+    WORDS = [
+        "river", "night", "garden", "empire", "secret", "winter", "stone",
+        "letters", "machine", "island", "daughter", "war", "kitchen",
+        "shadow", "journey", "city", "moon", "murder", "love", "history",
+    ]
+
+    SUBJECT_NAMES = [
+        "Detective and mystery stories", "Science fiction", "Love stories",
+        "Fantasy fiction", "World War, 1939-1945", "Cookery, American",
+        "Biography", "American poetry", "Ghost stories", "Space opera",
+        "Juvenile fiction", "Historical fiction", "Horror tales",
+    ]
+
+    def __init__(self, test, size, seed=None):
+        """Constructor.
+
+        :param test: A DatabaseTest whose helper methods create the data.
+        :param size: The number of works in the catalog.
+        :param seed: Seed for the random choices, so that two runs with
+            the same size create the same catalog.
+        """
+        self.test = test
+        self.size = size
+        self.random = random.Random(size if seed is None else seed)
+        self.works = []
+
+    def title(self):
+        words = self.random.sample(self.WORDS, 3)
+        return " ".join(words).title()
+
+    def subject_names(self, count):
+        names = []
+        for i in range(count):
+            names.append("%s -- %s" % (
+                self.random.choice(self.SUBJECT_NAMES),
+                self.random.choice(self.WORDS).title(),
+            ))
+        return names
+
+    def create(self):
+        """Create the works and return them."""
+        test = self.test
+        _db = test._db
+        source = DataSource.lookup(_db, DataSource.OCLC)
+        authors = [test._str for i in range(max(self.size // 5, 1))]
+        for i in range(self.size):
+            genre = self.random.choice(self.GENRES)
+            audience = self.random.choice([
+                Classifier.AUDIENCE_ADULT, Classifier.AUDIENCE_ADULT,
+                Classifier.AUDIENCE_YOUNG_ADULT, Classifier.AUDIENCE_CHILDREN,
+            ])
+            work = test._work(
+                title=self.title(), authors=[self.random.choice(authors)],
+                genre=genre, audience=audience,
+                fiction=genre not in ("History", "Biography & Memoir", "Cooking"),
+                with_open_access_download=True,
+                quality=self.random.random(),
+            )
+            edition = work.presentation_edition
+            edition.published = datetime.date(
+                self.random.randint(1850, 2020), 1, 1
+            )
+            edition.series = self.random.choice([None, None, self.title()])
+
+            # Give each work a few classifications for calculate_presentation
+            # and the search documents to chew on.
+            identifier = edition.primary_identifier
+            for name in self.subject_names(3):
+                identifier.classify(
+                    source, Subject.LCSH, name, name,
+                    weight=self.random.randint(1, 100)
+                )
+            self.works.append(work)
+        _db.commit()
+        return self.works
+
+    def opds_feed(self, size, identifiers):
+        """Generate an OPDS feed with an entry for each new identifier."""
+        updated = utc_now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        entries = []
+        for i in range(size):
+            identifier = next(identifiers)
+            categories = "".join(
+                '<category term="%s" scheme="http://purl.org/dc/terms/LCSH"/>' % name
+                for name in self.subject_names(2)
+            )
+            entries.append(self.ENTRY_TEMPLATE % dict(
+                id=identifier, title=self.title(),
+                sort_name="%s, %s" % (
+                    self.random.choice(self.WORDS).title(),
+                    self.random.choice(self.WORDS).title(),
+                ),
+                updated=updated, categories=categories,
+            ))
+        return self.FEED_TEMPLATE % dict(updated=updated, entries="".join(entries))
+
+    FEED_TEMPLATE = """<feed xmlns:simplified="http://librarysimplified.org/terms/" xmlns:dcterms="http://purl.org/dc/terms/" xmlns:schema="http://schema.org/" xmlns="http://www.w3.org/2005/Atom">
+  <id>http://localhost/benchmark/</id>
+  <title>Benchmark feed</title>
+  <updated>%(updated)s</updated>
+  <link href="http://localhost/benchmark/" rel="self"/>
+  %(entries)s
+</feed>"""
+
+    ENTRY_TEMPLATE = """<entry>
+    <id>%(id)s</id>
+    <title>%(title)s</title>
+    <author><name></name><simplified:sort_name>%(sort_name)s</simplified:sort_name></author>
+    <summary>A summary.</summary>
+    <updated>%(updated)s</updated>
+    %(categories)s
+    <dcterms:language>en</dcterms:language>
+    <link href="%(id)s.epub" type="application/epub+zip" rel="http://opds-spec.org/acquisition/open-access"/>
+  </entry>"""
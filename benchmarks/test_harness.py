@@ -0,0 +1,41 @@
+from .harness import BenchmarkRecorder
+
+
+class TestBenchmarkRecorder(object):
+
+    def test_record(self):
+        recorder = BenchmarkRecorder(size=10, repeat=3)
+        result = recorder.record("x", [3.0, 1.0, 2.0], items=4)
+        assert 1.0 == result['min']
+        assert 3.0 == result['max']
+        assert 2.0 == result['median']
+        assert 0.5 == result['median_per_item']
+        assert result == recorder.results["x"]
+
+    def test_compare(self):
+        recorder = BenchmarkRecorder(size=10, repeat=1)
+        recorder.record("slower", [2.0])
+        recorder.record("faster", [1.0])
+        recorder.record("same", [1.1])
+        recorder.record("new", [1.0])
+        baseline = dict(results=dict(
+            slower=dict(median=1.0),
+            faster=dict(median=2.0),
+            same=dict(median=1.0),
+            removed=dict(median=1.0),
+        ))
+
+        comparison = recorder.compare(baseline, tolerance=0.2)
+        assert "regression" == comparison["slower"]["status"]
+        assert 2.0 == comparison["slower"]["ratio"]
+        assert "improvement" == comparison["faster"]["status"]
+        assert "unchanged" == comparison["same"]["status"]
+        assert "new" == comparison["new"]["status"]
+        assert "removed" not in comparison
+        assert ["slower"] == BenchmarkRecorder.regressions(comparison)
+
+        # The comparison is included in the report.
+        report = recorder.report(baseline, tolerance=0.2)
+        assert comparison == report['comparison']
+        assert 10 == report['size']
+        assert 'comparison' not in recorder.report()
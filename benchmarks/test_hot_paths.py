@@ -0,0 +1,178 @@
+"""Benchmarks for the code paths that dominate catalog serving and import.
+
+Each benchmark builds a synthetic catalog with `--benchmark-size` works,
+so results are only comparable between runs of the same size.
+"""
+import itertools
+
+from core.classifier import KeywordBasedClassifier
+from core.external_search import MockExternalSearchIndex
+from core.lane import (
+    Pagination,
+    WorkList,
+)
+from core.marc import (
+    Annotator as MARCAnnotator,
+    MARCExporter,
+)
+from core.model import (
+    DataSource,
+    ExternalIntegration,
+    Work,
+)
+from core.opds import (
+    AcquisitionFeed,
+    Annotator,
+)
+from core.opds_import import OPDSImporter
+from core.s3 import MockS3Uploader
+from core.testing import DatabaseTest
+
+from .harness import SyntheticCatalog
+
+
+class BenchmarkTest(DatabaseTest):
+    """Creates a synthetic catalog and a search index containing it."""
+
+    def catalog(self, size):
+        self.synthetic_catalog = SyntheticCatalog(self, size)
+        works = self.synthetic_catalog.create()
+        self.search_engine = MockExternalSearchIndex()
+        self.search_engine.bulk_update(works)
+        return works
+
+    def genre_lane(self):
+        """A lane with one sublane per genre in the synthetic catalog."""
+        parent = self._lane("Everything")
+        for genre in SyntheticCatalog.GENRES:
+            self._lane(genre, parent=parent, genres=[genre])
+        return parent
+
+
+class TestFeeds(BenchmarkTest):
+
+    def test_acquisition_feed_page(self, benchmark):
+        self.catalog(benchmark.size)
+        worklist = WorkList()
+        worklist.initialize(self._default_library)
+
+        def page():
+            return AcquisitionFeed.page(
+                self._db, "Benchmark", "http://localhost/", worklist,
+                Annotator(), pagination=Pagination(0, Pagination.DEFAULT_SIZE),
+                max_age=0, search_engine=self.search_engine,
+            )
+        response = benchmark(
+            "AcquisitionFeed.page", page,
+            items=min(benchmark.size, Pagination.DEFAULT_SIZE),
+        )
+        assert 200 == response.status_code
+
+    def test_acquisition_feed_groups(self, benchmark):
+        self.catalog(benchmark.size)
+        lane = self.genre_lane()
+
+        def groups():
+            return AcquisitionFeed.groups(
+                self._db, "Benchmark", "http://localhost/", lane,
+                Annotator(), max_age=0, search_engine=self.search_engine,
+            )
+        response = benchmark(
+            "AcquisitionFeed.groups", groups, items=len(lane.sublanes)
+        )
+        assert 200 == response.status_code
+
+
+class TestWorks(BenchmarkTest):
+
+    def test_to_search_documents(self, benchmark):
+        works = self.catalog(benchmark.size)
+        documents = benchmark(
+            "Work.to_search_documents",
+            lambda: Work.to_search_documents(works), items=len(works),
+        )
+        assert len(works) == len(documents)
+
+    def test_calculate_presentation(self, benchmark):
+        works = self.catalog(benchmark.size)
+
+        def calculate_presentation():
+            for work in works:
+                work.calculate_presentation(exclude_search=True)
+        benchmark(
+            "Work.calculate_presentation", calculate_presentation,
+            items=len(works),
+        )
+
+
+class TestClassification(BenchmarkTest):
+
+    def test_keyword_classifier_genre(self, benchmark):
+        catalog = SyntheticCatalog(self, benchmark.size)
+        names = catalog.subject_names(benchmark.size * 3)
+
+        def classify():
+            return [
+                KeywordBasedClassifier.genre(None, name) for name in names
+            ]
+        genres = benchmark(
+            "KeywordBasedClassifier.genre", classify, items=len(names)
+        )
+        assert len(names) == len(genres)
+
+
+class TestImport(BenchmarkTest):
+
+    def test_opds_import_from_feed(self, benchmark):
+        collection = self._default_collection
+        collection.external_integration.setting('data_source').value = (
+            DataSource.OA_CONTENT_SERVER
+        )
+        catalog = SyntheticCatalog(self, benchmark.size)
+        identifiers = (
+            "http://localhost/benchmark/books/%d" % i
+            for i in itertools.count()
+        )
+
+        # Every repetition imports brand new books.
+        def feed():
+            return catalog.opds_feed(benchmark.size, identifiers)
+
+        def import_from_feed(feed):
+            importer = OPDSImporter(self._db, collection=collection)
+            return importer.import_from_feed(feed)
+
+        editions, pools, works, failures = benchmark(
+            "OPDSImporter.import_from_feed", import_from_feed, setup=feed,
+            items=benchmark.size,
+        )
+        assert benchmark.size == len(editions)
+        assert {} == failures
+
+
+class TestMARC(BenchmarkTest):
+
+    def test_marc_exporter_records(self, benchmark):
+        works = self.catalog(benchmark.size)
+        self._external_integration(
+            ExternalIntegration.MARC_EXPORT, ExternalIntegration.CATALOG_GOAL,
+            libraries=[self._default_library]
+        )
+        mirror_integration = self._external_integration(
+            ExternalIntegration.S3, ExternalIntegration.STORAGE_GOAL,
+            username="username", password="password",
+        )
+        exporter = MARCExporter.from_config(self._default_library)
+        lane = self._lane("Everything")
+
+        def records(mirror):
+            exporter.records(
+                lane, MARCAnnotator(), mirror_integration, mirror=mirror,
+                force_refresh=True, search_engine=self.search_engine,
+            )
+            return mirror
+        mirror = benchmark(
+            "MARCExporter.records", records, setup=MockS3Uploader,
+            items=len(works),
+        )
+        assert 1 == len(mirror.uploaded)
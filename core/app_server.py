@@ -22,6 +22,7 @@ from .opds import (
     LookupAcquisitionFeed,
 )
 from .util.flask_util import OPDSFeedResponse
+from .util.instrumentation import RequestMetrics
 from .util.opds_writer import (
     OPDSFeed,
     OPDSMessage,
@@ -35,6 +36,7 @@ from .log import LogConfiguration
 from .model import (
     get_one,
     Complaint,
+    ConfigurationSetting,
     Identifier,
     Patron,
 )
@@ -53,6 +55,40 @@ def cdn_url_for(*args, **kwargs):
     return cdnify(base_url)
 
 
+def start_request_metrics(_db):
+    """Decide whether to measure where the time goes while handling the
+    current request, based on the sitewide sample rate.
+
+    :return: A RequestMetrics, or None if this request isn't measured.
+    """
+    sample_rate = 0
+    if _db is not None:
+        setting = ConfigurationSetting.sitewide(
+            _db, LogConfiguration.REQUEST_TIMING_SAMPLE_RATE
+        )
+        try:
+            sample_rate = setting.float_value or 0
+        except ValueError:
+            sample_rate = 0
+    return RequestMetrics.start(sample_rate)
+
+
+def finish_request_metrics(response):
+    """Report the measurements for the current request, if there are any,
+    in a Server-Timing header and a log message.
+    """
+    metrics = RequestMetrics.finish()
+    if metrics is None:
+        return response
+    response.headers['Server-Timing'] = metrics.as_server_timing()
+    logging.getLogger("Request timing").info(
+        "%s %s %s %.1fms", flask.request.method, flask.request.path,
+        response.status_code, metrics.total * 1000,
+        extra=dict(request_timing=metrics.as_log_fields())
+    )
+    return response
+
+
 def load_facets_from_request(
         facet_config=None, worklist=None, base_class=Facets,
         base_class_constructor_kwargs=None, default_entrypoint=None
@@ -171,6 +171,7 @@ class Configuration(ConfigurationConstants):
     LOG_LEVEL = 'log_level'
     LOG_APP_NAME = 'log_app'
     DATABASE_LOG_LEVEL = 'database_log_level'
+    REQUEST_TIMING_SAMPLE_RATE = 'request_timing_sample_rate'
     LOG_LEVEL_UI = [
         { "key": DEBUG, "label": _("Debug") },
         { "key": INFO, "label": _("Info") },
@@ -203,6 +204,12 @@ class Configuration(ConfigurationConstants):
             "description": _("Database logs are extremely verbose, so unless you're diagnosing a database-related problem, it's a good idea to set a higher log level for database messages."),
             "default": WARN,
         },
+        {
+            "key": REQUEST_TIMING_SAMPLE_RATE,
+            "label": _("Request timing sample rate"),
+            "description": _("The fraction of requests, between 0 and 1, for which time spent in the database, the search index, other web services and feed generation is measured. The measurements are sent in a Server-Timing header and logged."),
+            "type": "number", "max": 1, "default": 0,
+        },
         {
             "key": EXCLUDED_AUDIO_DATA_SOURCES,
             "label": _("Excluded audiobook sources"),
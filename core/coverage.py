@@ -1,3 +1,4 @@
+import copy
 import logging
 import traceback
 
@@ -13,6 +14,7 @@ from .model import (
     CoverageRecord,
     DataSource,
     Edition,
+    EquivalentIdentifierCache,
     ExternalIntegration,
     Identifier,
     LicensePool,
@@ -191,6 +193,19 @@ class BaseCoverageProvider(object):
             self._log = logging.getLogger(self.service_name)
         return self._log
 
+    def for_session(self, _db):
+        """Create a copy of this CoverageProvider that does its work in
+        a different database session, e.g. in a worker thread.
+
+        The copy shares everything else with this CoverageProvider. A
+        subclass that keeps other objects tied to its database session
+        (such as an API object) must override this method to create
+        new ones.
+        """
+        provider = copy.copy(self)
+        provider._db = _db
+        return provider
+
     @property
     def collection(self):
         """Retrieve the Collection object associated with this
@@ -384,7 +399,11 @@ class BaseCoverageProvider(object):
         batch = list(batch)
 
         offset_increment = 0
-        results = self.process_batch(batch)
+
+        # Items in a batch often share equivalent identifiers, so
+        # resolve each identifier's equivalents at most once per batch.
+        with EquivalentIdentifierCache():
+            results = self.process_batch(batch)
         successes = 0
         transient_failures = 0
         persistent_failures = 0
@@ -1112,6 +1131,46 @@ class CollectionCoverageProvider(IdentifierCoverageProvider):
             *args, **kwargs
         )
 
+    def run_in_range(self, progress, start, end=None, count_as_covered=None):
+        """Try to grant coverage to every uncovered Identifier whose ID is
+        at least `start` and less than `end`.
+
+        Identifiers are processed in batches ordered by ID, and each
+        batch starts after the last Identifier in the previous one
+        rather than at an OFFSET, so a range takes the same time to
+        process no matter where it is, and several ranges can be
+        processed at once.
+
+        :param progress: A CoverageProviderProgress that will be
+            updated with the results of each batch.
+        :param end: If this is None, the range has no upper bound.
+        :return: `progress`
+        """
+        count_as_covered = count_as_covered or BaseCoverageRecord.DEFAULT_COUNT_AS_COVERED
+        qu = self.items_that_need_coverage(count_as_covered=count_as_covered)
+        qu = qu.filter(Identifier.id >= start)
+        if end is not None:
+            qu = qu.filter(Identifier.id < end)
+
+        last_id = None
+        while True:
+            batch = qu
+            if last_id is not None:
+                batch = batch.filter(Identifier.id > last_id)
+            batch = batch.order_by(Identifier.id).limit(self.batch_size).all()
+            if not batch:
+                break
+            (successes, transient_failures, persistent_failures), results = (
+                self.process_batch_and_handle_results(batch)
+            )
+            progress.successes += successes
+            progress.transient_failures += transient_failures
+            progress.persistent_failures += persistent_failures
+            last_id = batch[-1].id
+            self._db.commit()
+        progress.finish = utc_now()
+        return progress
+
     def items_that_need_coverage(self, identifiers=None, **kwargs):
         """Find all Identifiers associated with this Collection but lacking
         coverage through this CoverageProvider.
@@ -1312,18 +1371,75 @@ class CollectionCoverageProvider(IdentifierCoverageProvider):
 class CollectionCoverageProviderJob(DatabaseJob):
 
     def __init__(self, collection, provider_class, progress,
-        **provider_kwargs
+        id_range=None, **provider_kwargs
     ):
+        """Constructor.
+
+        :param id_range: A 2-tuple (start, end). If this is present,
+            the job covers the Identifiers in this range of IDs (see
+            CollectionCoverageProvider.run_in_range) and leaves the
+            provider's Timestamp alone. Otherwise it runs one batch
+            at `progress.offset` and updates the Timestamp.
+        """
         self.collection = collection
         self.progress = progress
         self.provider_class = provider_class
+        self.id_range = id_range
         self.provider_kwargs = provider_kwargs
 
     def run(self, _db, **kwargs):
         collection = _db.merge(self.collection)
         provider = self.provider_class(collection, **self.provider_kwargs)
-        provider.run_once(self.progress)
-        provider.finalize_timestampdata(self.progress)
+        if self.id_range:
+            start, end = self.id_range
+            provider.run_in_range(self.progress, start, end)
+        else:
+            provider.run_once(self.progress)
+            provider.finalize_timestampdata(self.progress)
+
+
+# The database session used by run_coverage_partition() in a worker
+# process.
+_partition_session = None
+
+def initialize_partition_worker():
+    """Give a worker process its own database session.
+
+    This is used as the initializer of the multiprocessing Pool whose
+    processes call run_coverage_partition().
+    """
+    global _partition_session
+    from .model import production_session
+    _partition_session = production_session(initialize_data=False)
+
+def run_coverage_partition(arguments):
+    """Run a CollectionCoverageProvider on one range of Identifier IDs
+    in a worker process.
+
+    :param arguments: A 5-tuple (provider class, collection ID, start,
+        end, provider keyword arguments).
+    :return: A 4-tuple (successes, transient failures, persistent
+        failures, exception). The exception is a string, or None if the
+        whole range was processed.
+    """
+    provider_class, collection_id, start, end, provider_kwargs = arguments
+    _db = _partition_session
+    progress = CoverageProviderProgress(start=utc_now())
+    exception = None
+    try:
+        collection = get_one(_db, Collection, id=collection_id)
+        provider = provider_class(collection, **provider_kwargs)
+        provider.run_in_range(progress, start, end)
+    except Exception as e:
+        _db.rollback()
+        logging.error(
+            "Error covering identifiers %s-%s", start, end, exc_info=e
+        )
+        exception = repr(e)
+    return (
+        progress.successes, progress.transient_failures,
+        progress.persistent_failures, exception
+    )
 
 
 class CatalogCoverageProvider(CollectionCoverageProvider):
@@ -1557,6 +1673,16 @@ class WorkPresentationEditionCoverageProvider(WorkPresentationProvider):
         update_search_index=True,
     )
 
+    def process_batch(self, batch):
+        """Recalculate presentation for a batch of Works, loading the
+        information that calculation needs for the whole batch up front.
+        """
+        prefetch = Work.prefetch_presentation(self._db, batch, self.POLICY)
+        with prefetch:
+            return super(
+                WorkPresentationEditionCoverageProvider, self
+            ).process_batch(batch)
+
     def process_item(self, work):
         """Recalculate the presentation for a Work."""
 
@@ -1586,7 +1712,9 @@ class WorkClassificationCoverageProvider(
     """
     SERVICE_NAME = "Work classification coverage provider"
 
-    DEFAULT_BATCH_SIZE = 20
+    # Everything needed to classify a batch of works is loaded at
+    # once, so the number of queries doesn't grow with the batch size.
+    DEFAULT_BATCH_SIZE = 200
 
     OPERATION = WorkCoverageRecord.CLASSIFY_OPERATION
 
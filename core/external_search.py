@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import contextlib
 import datetime
 
@@ -47,6 +47,7 @@ from .classifier import (
 from .facets import FacetConstants
 from .metadata_layer import IdentifierData
 from .model import (
+    configuration_generation,
     numericrange_to_tuple,
     Collection,
     Contributor,
@@ -59,7 +60,10 @@ from .model import (
     Work,
     WorkCoverageRecord,
 )
-from .lane import Pagination
+from .lane import (
+    Lane,
+    Pagination,
+)
 from .monitor import WorkSweepMonitor
 from .coverage import (
     CoverageFailure,
@@ -74,10 +78,12 @@ from .util.personal_names import display_name_to_sort_name
 from .util.problem_detail import ProblemDetail
 from .util.stopwords import ENGLISH_STOPWORDS
 from .util.datetime_helpers import from_timestamp
+from .util.instrumentation import RequestMetrics
 
 import os
 import logging
 import re
+from threading import RLock
 import time
 
 @contextlib.contextmanager
@@ -92,6 +98,214 @@ def mock_search_index(mock=None):
         ExternalSearchIndex.MOCK_IMPLEMENTATION = None
 
 
+class SearchResultCache(object):
+    """A bounded cache of search results which expire after a short time.
+
+    Entries are keyed by the normalized query string, the serialized
+    Filter and the page being requested, so an identical search can
+    be answered without building the Elasticsearch query or sending
+    it to the server.
+    """
+
+    # How many searches to keep results for.
+    DEFAULT_MAX_SIZE = 1000
+
+    # How long, in seconds, a search's results stay in the cache.
+    DEFAULT_TTL = 60
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or self.DEFAULT_MAX_SIZE
+        if ttl is None:
+            ttl = self.DEFAULT_TTL
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def normalize_query_string(cls, query_string):
+        """Ignore differences in whitespace between query strings."""
+        if not query_string:
+            return query_string
+        return " ".join(query_string.split())
+
+    @classmethod
+    def can_cache(cls, query_string, filter, pagination):
+        """Can the results of this search be cached?"""
+        return (
+            (query_string is None or isinstance(query_string, str))
+            and (filter is None or isinstance(filter, Filter))
+            and isinstance(pagination, Pagination)
+        )
+
+    @classmethod
+    def key(cls, query_string, filter, pagination, works_alias=None):
+        """Create a string that uniquely identifies the Elasticsearch
+        request that would be made for the given search.
+        """
+        parts = [works_alias, cls.normalize_query_string(query_string)]
+        if filter is not None:
+            built, nested_filters = filter.build()
+            parts.append(built.to_dict() if built is not None else None)
+            parts.append(
+                dict(
+                    (path, [x.to_dict() for x in filters])
+                    for path, filters in list(nested_filters.items())
+                )
+            )
+            parts.append(filter.sort_order)
+            parts.append(
+                [x.to_dict() for x in (filter.scoring_functions or [])]
+            )
+            parts.append(sorted(filter.script_fields.keys()))
+        if pagination is not None:
+            parts.append(pagination.__class__.__name__)
+            parts.append(list(pagination.items()))
+        return json.dumps(parts, sort_keys=True, default=str)
+
+    def get(self, key, now=None):
+        """Find the cached results of a search.
+
+        :return: A list of search results, or None if the search
+            isn't cached or its results have expired.
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, results = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return results
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, results, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        """Summarize how well the cache is working."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                size=len(self._entries), max_size=self.max_size,
+                ttl=self.ttl, hits=self.hits, misses=self.misses,
+                hit_rate=(float(self.hits) / lookups) if lookups else 0.0,
+            )
+
+
+class WorkListFilterCache(object):
+    """A bounded cache of the parts of a Lane's search Filter that
+    don't depend on the request.
+
+    Entries are keyed by the Lane, its Library, and this process's
+    view of the site configuration, so a change to the Lane or the
+    configuration makes the old entry unreachable. Entries also expire
+    after a while, to pick up changes that don't touch the site
+    configuration, such as a new CustomList from a Lane's list data
+    source being created by another process.
+    """
+
+    # How many Lanes to keep filter arguments for.
+    DEFAULT_MAX_SIZE = 5000
+
+    # How long, in seconds, a Lane's filter arguments stay in the cache.
+    DEFAULT_TTL = 300
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or self.DEFAULT_MAX_SIZE
+        if ttl is None:
+            ttl = self.DEFAULT_TTL
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def key(cls, worklist):
+        """Create a key for the given WorkList's filter arguments.
+
+        :return: A hashable key, or None if the WorkList isn't a Lane
+            and its filter arguments can't be cached.
+        """
+        if not isinstance(worklist, Lane) or worklist.id is None:
+            return None
+        return (
+            worklist.id, worklist.library_id, configuration_generation(),
+            Configuration._site_configuration_last_update(),
+        )
+
+    def get(self, key, now=None):
+        """Find the cached filter arguments for a Lane.
+
+        :return: A dictionary of keyword arguments to the Filter
+            constructor, or None if nothing is cached for this key.
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, arguments = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._copy(arguments)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, arguments, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, self._copy(arguments))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @classmethod
+    def _copy(cls, arguments):
+        # Every Filter gets its own lists, in case one is modified.
+        return dict(
+            (k, list(v) if isinstance(v, list) else v)
+            for k, v in list(arguments.items())
+        )
+
+    @property
+    def stats(self):
+        """Summarize how well the cache is working."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                size=len(self._entries), max_size=self.max_size,
+                ttl=self.ttl, hits=self.hits, misses=self.misses,
+                hit_rate=(float(self.hits) / lookups) if lookups else 0.0,
+            )
+
+
 class ExternalSearchIndex(HasSelfTests):
 
     NAME = ExternalIntegration.ELASTICSEARCH
@@ -101,6 +315,10 @@ class ExternalSearchIndex(HasSelfTests):
     # instantiating new ExternalSearchIndex objects.
     MOCK_IMPLEMENTATION = None
 
+    # Recent search results, shared by every ExternalSearchIndex in
+    # this process.
+    RESULT_CACHE = SearchResultCache()
+
     WORKS_INDEX_PREFIX_KEY = 'works_index_prefix'
     DEFAULT_WORKS_INDEX_PREFIX = 'circulation-works'
 
@@ -347,6 +565,7 @@ class ExternalSearchIndex(HasSelfTests):
         body = self.mapping.body()
         body.setdefault('settings', {}).update(index_settings)
         index = self.indices.create(index=index_name, body=body)
+        self.RESULT_CACHE.clear()
 
     def set_stored_scripts(self):
         for name, definition in self.mapping.stored_scripts():
@@ -380,6 +599,10 @@ class ExternalSearchIndex(HasSelfTests):
         self.works_index = self.__client.works_index = new_index
         alias_name = self.works_alias_name(_db)
 
+        # Whatever happens, searches will now run against a different
+        # index, so cached results can't be trusted.
+        self.RESULT_CACHE.clear()
+
         exists = self.indices.exists_alias(name=alias_name)
         if not exists:
             # The alias doesn't already exist. Set it.
@@ -475,8 +698,28 @@ class ExternalSearchIndex(HasSelfTests):
             return []
 
         pagination = pagination or Pagination.default()
+
+        # Unless we're debugging, an identical recent search can be
+        # answered from the cache.
+        cache = None
+        if not debug and SearchResultCache.can_cache(
+            query_string, filter, pagination
+        ):
+            cache = self.RESULT_CACHE
+        if cache is not None:
+            key = cache.key(
+                query_string, filter, pagination,
+                getattr(self, 'works_alias', None)
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                pagination.page_loaded(cached)
+                return cached
+
         query_data = (query_string, filter, pagination)
         [result] = self.query_works_multi([query_data], debug)
+        if cache is not None:
+            cache.set(key, result)
         return result
 
     def query_works_multi(self, queries, debug=False):
@@ -521,7 +764,8 @@ class ExternalSearchIndex(HasSelfTests):
         a = time.time()
         # NOTE: This is the code that actually executes the ElasticSearch
         # request.
-        resultset = [x for x in multi.execute()]
+        with RequestMetrics.timed(RequestMetrics.SEARCH):
+            resultset = [x for x in multi.execute()]
 
         if debug:
             b = time.time()
@@ -555,7 +799,8 @@ class ExternalSearchIndex(HasSelfTests):
         qu = self.create_search_doc(
             query_string=None, filter=filter, pagination=None, debug=False
         )
-        return qu.count()
+        with RequestMetrics.timed(RequestMetrics.SEARCH):
+            return qu.count()
 
     def bulk_update(self, works, retry_on_batch_failure=True):
         """Upload a batch of works to the search index at once."""
@@ -638,6 +883,10 @@ class ExternalSearchIndex(HasSelfTests):
 
         self.log.info("Successfully indexed %i documents, failed to index %i." % (success_count, len(failures)))
 
+        # Some cached search results may now be out of date.
+        if docs:
+            self.RESULT_CACHE.clear()
+
         return successes, failures
 
     def remove_work(self, work):
@@ -647,6 +896,38 @@ class ExternalSearchIndex(HasSelfTests):
                     id=work.id)
         if self.exists(**args):
             self.delete(**args)
+            self.RESULT_CACHE.clear()
+
+    def remove_works(self, work_ids):
+        """Remove the search documents for many works with a single
+        bulk request.
+
+        :param work_ids: The IDs of the works to remove. It's fine if
+            some of them were never indexed.
+        :return: The number of search documents removed.
+        """
+        actions = [
+            dict(_op_type='delete', _index=self.works_index,
+                 _type=self.work_document_type, _id=work_id)
+            for work_id in work_ids
+        ]
+        if not actions:
+            return 0
+        success_count, errors = self.bulk(
+            actions, raise_on_error=False, raise_on_exception=False,
+        )
+        for error in errors:
+            result = error.get('delete', {})
+            # A work that was never indexed can't be removed, and
+            # that's fine.
+            if result.get('status') != 404:
+                self.log.error(
+                    "Could not remove work %s from the search index: %r",
+                    result.get('_id'), result
+                )
+        if success_count:
+            self.RESULT_CACHE.clear()
+        return success_count
 
     def _run_self_tests(self, _db, in_testing=False):
         # Helper methods for setting up the self-tests:
@@ -729,6 +1010,116 @@ class ExternalSearchIndex(HasSelfTests):
             _collections
         )
 
+        def _result_cache():
+            return json.dumps(self.RESULT_CACHE.stats, indent=1)
+
+        yield self.run_test(
+            "Search result cache statistics:",
+            _result_cache
+        )
+
+
+class SharedSearchResults(object):
+    """Wrap an ExternalSearchIndex so that a search which has already
+    been run is answered from memory instead of being sent to
+    Elasticsearch again.
+
+    This is meant for short-lived, bulk operations (such as warming
+    the feed cache) in which many feeds run the same queries. Searches
+    can be run ahead of time, in bulk, with prefetch(). The object is
+    safe to share between threads.
+    """
+
+    # The number of searches to send to Elasticsearch in a single
+    # multi-search request.
+    PREFETCH_BATCH_SIZE = 50
+
+    def __init__(self, search_engine, batch_size=None):
+        self.search_engine = search_engine
+        self.batch_size = batch_size or self.PREFETCH_BATCH_SIZE
+        self._results = dict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # Anything other than searching is handled by the real index.
+        return getattr(self.search_engine, name)
+
+    @classmethod
+    def query_key(cls, query_string, filter, pagination):
+        """Create a string that uniquely identifies a search."""
+        return SearchResultCache.key(query_string, filter, pagination)
+
+    def prefetch(self, queries, debug=False):
+        """Run every search in `queries` that hasn't been run yet.
+
+        Duplicate searches are only run once, and the searches that
+        need to be run are sent to Elasticsearch in batches.
+
+        :param queries: A list of (query string, Filter, Pagination)
+            3-tuples, as for ExternalSearchIndex.query_works_multi.
+        :return: The number of searches actually sent to Elasticsearch.
+        """
+        todo = dict()
+        for query_string, filter, pagination in queries:
+            key = self.query_key(query_string, filter, pagination)
+            with self._lock:
+                if key in self._results or key in todo:
+                    continue
+            if isinstance(filter, Filter) and filter.match_nothing is True:
+                with self._lock:
+                    self._results[key] = []
+                continue
+            todo[key] = (query_string, filter, pagination)
+
+        keys = list(todo.keys())
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start+self.batch_size]
+            resultsets = self.search_engine.query_works_multi(
+                [todo[key] for key in batch], debug
+            )
+            for key, results in zip(batch, resultsets):
+                with self._lock:
+                    self._results[key] = list(results)
+        with self._lock:
+            self.misses += len(keys)
+        return len(keys)
+
+    def query_works(self, query_string, filter=None, pagination=None,
+                    debug=False):
+        """Run a search query, or find the results of an identical
+        query run earlier.
+        """
+        if isinstance(filter, Filter) and filter.match_nothing is True:
+            return []
+        pagination = pagination or Pagination.default()
+        [result] = self.query_works_multi(
+            [(query_string, filter, pagination)], debug
+        )
+        return result
+
+    def query_works_multi(self, queries, debug=False):
+        """Run several queries, reusing earlier results where possible.
+
+        :yield: A sequence of lists, one per item in `queries`.
+        """
+        queries = list(queries)
+        keys = [self.query_key(*query) for query in queries]
+        with self._lock:
+            known = len([key for key in keys if key in self._results])
+        self.prefetch(queries, debug)
+        with self._lock:
+            self.hits += known
+        for key, (query_string, filter, pagination) in zip(keys, queries):
+            with self._lock:
+                results = self._results[key]
+            if pagination is not None:
+                # Tell the Pagination object about the page, as
+                # ExternalSearchIndex would.
+                pagination.page_loaded(results)
+            yield results
+
 
 class MappingDocument(object):
     """This class knows a lot about how the 'properties' section of an
@@ -2125,6 +2516,10 @@ class Filter(SearchBase):
         Contributor.DIRECTOR_ROLE, Contributor.ACTOR_ROLE
     ]
 
+    # The request-independent arguments to the Filters created for
+    # Lanes, shared by every Filter in this process.
+    WORKLIST_CACHE = WorkListFilterCache()
+
     @classmethod
     def from_worklist(cls, _db, worklist, facets):
         """Create a Filter that finds only works that belong in the given
@@ -2133,6 +2528,28 @@ class Filter(SearchBase):
         :param worklist: A WorkList
         :param facets: A SearchFacets object.
         """
+        # Make sure any changes to the WorkList have gone through the
+        # listeners that invalidate cached filter arguments.
+        _db.flush()
+        key = WorkListFilterCache.key(worklist)
+        arguments = None
+        if key is not None:
+            arguments = cls.WORKLIST_CACHE.get(key)
+        if arguments is None:
+            arguments = cls.worklist_arguments(_db, worklist)
+            if key is not None:
+                cls.WORKLIST_CACHE.set(key, arguments)
+        return cls(facets=facets, **arguments)
+
+    @classmethod
+    def worklist_arguments(cls, _db, worklist):
+        """Find the arguments to the Filter constructor that are
+        determined by the given WorkList and the site configuration.
+
+        :return: A dictionary of keyword arguments. Database objects
+            are represented by their IDs, so the dictionary can be
+            reused in other database sessions.
+        """
         library = worklist.get_library(_db)
         # For most configuration settings there is a single value --
         # either defined on the WorkList or defined by its parent.
@@ -2143,6 +2560,8 @@ class Filter(SearchBase):
         audiences = inherit_one('audiences')
         target_age = inherit_one('target_age')
         collections = inherit_one('collection_ids') or library
+        if isinstance(collections, Library):
+            collections = collections.collections
 
         license_datasource_id = inherit_one('license_datasource_id')
 
@@ -2165,12 +2584,21 @@ class Filter(SearchBase):
             allow_holds = True
         else:
             allow_holds = library.allow_holds
-        return cls(
-            collections, media, languages, fiction, audiences,
-            target_age, genre_id_restrictions, customlist_id_restrictions,
-            facets,
-            excluded_audiobook_data_sources=excluded_audiobook_data_sources,
-            allow_holds=allow_holds, license_datasource=license_datasource_id
+        return dict(
+            collections=cls._filter_ids(collections),
+            media=media, languages=languages, fiction=fiction,
+            audiences=audiences, target_age=target_age,
+            genre_restriction_sets=[
+                cls._filter_ids(x) for x in genre_id_restrictions
+            ],
+            customlist_restriction_sets=[
+                cls._filter_ids(x) for x in customlist_id_restrictions
+            ],
+            excluded_audiobook_data_sources=cls._filter_ids(
+                excluded_audiobook_data_sources
+            ),
+            allow_holds=allow_holds,
+            license_datasource=license_datasource_id,
         )
 
     def __init__(self, collections=None, media=None, languages=None,
@@ -2997,6 +3425,11 @@ class SortKeyPagination(Pagination):
         self.last_item_on_this_page = None
         self.this_page_size = None
 
+        # A function that finds the sort key of an item on the
+        # page. By default the items are Elasticsearch hits, which
+        # know their own sort keys.
+        self.sort_key = None
+
     @classmethod
     def from_request(cls, get_arg, default_size=None):
         """Instantiate a SortKeyPagination object from a Flask request."""
@@ -3094,12 +3527,16 @@ class SortKeyPagination(Pagination):
         SortKeyPagination object capable of generating the subsequent
         page.
 
-        :param page: A list of elasticsearch-dsl Hit objects.
+        :param page: A list of elasticsearch-dsl Hit objects, or of
+            Works if the page was loaded from the database.
         """
         super(SortKeyPagination, self).page_loaded(page)
         if page:
             last_item = page[-1]
-            values = list(last_item.meta.sort)
+            if self.sort_key is not None:
+                values = self.sort_key(last_item)
+            else:
+                values = list(last_item.meta.sort)
         else:
             # There's nothing on this page, so there's no next page
             # either.
@@ -3213,9 +3650,21 @@ class MockExternalSearchIndex(ExternalSearchIndex):
         return len(self.docs)
 
     def bulk(self, docs, **kwargs):
+        success_count = 0
+        errors = []
         for doc in docs:
-            self.index(doc['_index'], doc['_type'], doc['_id'], doc)
-        return len(docs), []
+            if doc.get('_op_type') == 'delete':
+                args = (doc['_index'], doc['_type'], doc['_id'])
+                if not self.exists(*args):
+                    errors.append(
+                        dict(delete=dict(_id=doc['_id'], status=404))
+                    )
+                    continue
+                self.delete(*args)
+            else:
+                self.index(doc['_index'], doc['_type'], doc['_id'], doc)
+            success_count += 1
+        return success_count, errors
 
 class MockMeta(dict):
     """Mock the .meta object associated with an Elasticsearch search
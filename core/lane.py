@@ -60,6 +60,7 @@ from .entrypoint import (
     EverythingEntryPoint,
 )
 from .model import (
+    configuration_generation_has_changed,
     directly_modified,
     get_one_or_create,
     numericrange_to_tuple,
@@ -80,6 +81,7 @@ from .model import (
     LicensePoolDeliveryMechanism,
     Session,
     Work,
+    WorkAvailability,
     WorkGenre,
 )
 from .model.constants import EditionConstants
@@ -750,12 +752,13 @@ class DatabaseBackedFacets(Facets):
 
     # Of the sort orders in Facets, these are the only available ones
     # -- they map directly onto a field of one of the tables we're
-    # querying.
+    # querying. The sort keys are copied into WorkAvailability, whose
+    # indexes cover each sort order.
     ORDER_FACET_TO_DATABASE_FIELD = {
         FacetConstants.ORDER_WORK_ID : Work.id,
-        FacetConstants.ORDER_TITLE : Edition.sort_title,
-        FacetConstants.ORDER_AUTHOR : Edition.sort_author,
-        FacetConstants.ORDER_LAST_UPDATE : Work.last_update_time,
+        FacetConstants.ORDER_TITLE : WorkAvailability.sort_title,
+        FacetConstants.ORDER_AUTHOR : WorkAvailability.sort_author,
+        FacetConstants.ORDER_LAST_UPDATE : WorkAvailability.last_update_time,
     }
 
     @classmethod
@@ -794,7 +797,7 @@ class DatabaseBackedFacets(Facets):
         against WorkModelWithGenre.
         """
         default_sort_order = [
-            Edition.sort_author, Edition.sort_title, Work.id
+            WorkAvailability.sort_author, WorkAvailability.sort_title, Work.id
         ]
 
         primary_order_by = self.ORDER_FACET_TO_DATABASE_FIELD.get(self.order)
@@ -2174,19 +2177,64 @@ class DatabaseBackedWorkList(WorkList):
 
         # Allow the pagination object to modify the database query.
         if pagination is not None:
-            qu = pagination.modify_database_query(_db, qu)
+            from .external_search import SortKeyPagination
+            if isinstance(pagination, SortKeyPagination):
+                qu = self.paginate_by_sort_key(qu, facets, pagination)
+            else:
+                qu = pagination.modify_database_query(_db, qu)
 
         return qu
 
+    def paginate_by_sort_key(self, qu, facets, pagination):
+        """Restrict a query to the page of works that comes after the last
+        item on the previous page.
+
+        Unlike OFFSET, this lets the database use an index to find the
+        start of the page, no matter how deep into the list it is.
+
+        :param facets: The faceting object used to sort the query.
+        :param pagination: A SortKeyPagination. Its sort key will be
+            set to a function that finds the sort key of a Work on
+            this page.
+        """
+        if isinstance(facets, DatabaseBackedFacets):
+            order_by, fields = facets.order_by()
+            ascending = facets.order_ascending
+        else:
+            # The query was made distinct on Work.id, so that's the
+            # only order it can be in.
+            fields = [Work.id]
+            ascending = True
+            qu = qu.order_by(Work.id)
+
+        if pagination.last_item_on_previous_page:
+            qu = qu.filter(
+                WorkAvailability.after_sort_key_clause(
+                    fields, pagination.last_item_on_previous_page, ascending
+                )
+            )
+        pagination.sort_key = lambda work: WorkAvailability.sort_key(
+            work, fields
+        )
+        return qu.limit(pagination.size)
+
     @classmethod
     def base_query(cls, _db):
         """Return a query that contains the joins set up as necessary to
         create OPDS feeds.
+
+        Only works with a WorkAvailability row -- works that are
+        deliverable from at least one collection -- are included.
         """
         qu = _db.query(
             Work
         ).join(
             Work.license_pools
+        ).join(
+            WorkAvailability, and_(
+                WorkAvailability.work_id==LicensePool.work_id,
+                WorkAvailability.collection_id==LicensePool.collection_id,
+            )
         ).join(
             Work.presentation_edition
         ).filter(
@@ -2240,9 +2288,9 @@ class DatabaseBackedWorkList(WorkList):
         fulfill.
 
         Note that this assumes the query has an active join against
-        LicensePool.
+        LicensePool and WorkAvailability.
         """
-        return Collection.restrict_to_ready_deliverable_works(
+        return WorkAvailability.restrict_to_ready_deliverable_works(
             query, show_suppressed=show_suppressed,
             collection_ids=self.collection_ids
         )
@@ -3124,3 +3172,15 @@ def configuration_relevant_update(mapper, connection, target):
         # Remove this information whenever the Lane configuration
         # changes. This will force it to be recalculated.
         Library._has_root_lane_cache.clear()
+    else:
+        # One of the Lane's collections, such as its CustomLists,
+        # changed. That doesn't need to be recorded as a site
+        # configuration change, but it does change the Lane's search
+        # filter.
+        configuration_generation_has_changed()
+
+@event.listens_for(CustomList, 'after_insert')
+@event.listens_for(CustomList, 'after_delete')
+def customlist_lifecycle_event(mapper, connection, target):
+    # A Lane can contain every CustomList from a given DataSource.
+    configuration_generation_has_changed()
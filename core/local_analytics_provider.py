@@ -2,6 +2,7 @@ from flask_babel import lazy_gettext as _
 from .model import (
     Session,
     CirculationEvent,
+    CirculationEventBuffer,
     ExternalIntegration,
     get_one,
     create
@@ -25,6 +26,19 @@ class LocalAnalyticsProvider(object):
     # Analytics events have no 'location'.
     LOCATION_SOURCE_DISABLED = ""
 
+    # How to write analytics events to the database.
+    EVENT_WRITING = "event_writing"
+
+    # Each event is written as part of the transaction in which it
+    # happened.
+    EVENT_WRITING_IMMEDIATE = ""
+
+    # Events are collected in memory and written in batches.
+    EVENT_WRITING_BATCHED = "batched"
+
+    # All LocalAnalyticsProviders in a process share a buffer.
+    BUFFER = CirculationEventBuffer()
+
     SETTINGS = [
         {
             "key": LOCATION_SOURCE,
@@ -37,6 +51,17 @@ class LocalAnalyticsProvider(object):
                 { "key": LOCATION_SOURCE_NEIGHBORHOOD, "label": _("Use the patron's neighborhood as the event location.") },
             ],
         },
+        {
+            "key": EVENT_WRITING,
+            "label": _("Writing events to the database"),
+            "description": _("Writing events in batches takes database work out of circulation requests, but events that haven't been written yet will not show up for a few seconds, and may be lost if the server crashes."),
+            "default": EVENT_WRITING_IMMEDIATE,
+            "type": "select",
+            "options": [
+                { "key": EVENT_WRITING_IMMEDIATE, "label": _("Write each event as it happens.") },
+                { "key": EVENT_WRITING_BATCHED, "label": _("Write events in batches.") },
+            ],
+        },
     ]
 
     def __init__(self, integration, library=None):
@@ -44,6 +69,9 @@ class LocalAnalyticsProvider(object):
         self.location_source = integration.setting(
             self.LOCATION_SOURCE
         ).value or self.LOCATION_SOURCE_DISABLED
+        self.batched = integration.setting(
+            self.EVENT_WRITING
+        ).value == self.EVENT_WRITING_BATCHED
         if library:
             self.library_id = library.id
         else:
@@ -64,6 +92,11 @@ class LocalAnalyticsProvider(object):
         if self.location_source == self.LOCATION_SOURCE_NEIGHBORHOOD:
             neighborhood = kwargs.pop("neighborhood", None)
 
+        if self.batched:
+            return self.BUFFER.add(
+                _db, license_pool, event_type, old_value, new_value,
+                start=time, library=library, location=neighborhood
+            )
         return CirculationEvent.log(
             _db, license_pool, event_type, old_value, new_value, start=time,
             library=library, location=neighborhood
@@ -61,6 +61,9 @@ class JSONFormatter(logging.Formatter):
         )
         if record.exc_info:
             data['traceback'] = self.formatException(record.exc_info)
+        request_timing = getattr(record, 'request_timing', None)
+        if request_timing:
+            data['request_timing'] = request_timing
         return json.dumps(data)
 
 
@@ -390,6 +393,10 @@ class LogConfiguration(object):
     # Settings for the integration with protocol=INTERNAL_LOGGING
     LOG_LEVEL = 'log_level'
     DATABASE_LOG_LEVEL = 'database_log_level'
+
+    # The fraction of web requests whose timings are reported in a
+    # Server-Timing header and a log message.
+    REQUEST_TIMING_SAMPLE_RATE = 'request_timing_sample_rate'
     LOG_LEVEL_UI = [
         { "key": DEBUG, "value": _("Debug") },
         { "key": INFO, "value": _("Info") },
@@ -410,6 +417,11 @@ class LogConfiguration(object):
           "description": _("Database logs are extremely verbose, so unless you're diagnosing a database-related problem, it's a good idea to set a higher log level for database messages."),
           "default": WARN,
         },
+        { "key": REQUEST_TIMING_SAMPLE_RATE,
+          "label": _("Request timing sample rate"),
+          "description": _("The fraction of requests, between 0 and 1, for which time spent in the database, the search index, other web services and feed generation is measured. The measurements are sent in a Server-Timing header and logged."),
+          "type": "number", "max": 1, "default": 0,
+        },
     ]
 
     @classmethod
@@ -1,5 +1,8 @@
 
-from io import BytesIO
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    wait,
+)
 from flask_babel import lazy_gettext as _
 import re
 from pymarc import (
@@ -7,6 +10,11 @@ from pymarc import (
     Record,
     MARCWriter
 )
+from pymarc.constants import (
+    END_OF_FIELD,
+    END_OF_RECORD,
+    LEADER_LEN,
+)
 
 from .config import (
     Configuration,
@@ -30,6 +38,7 @@ from .model import (
     Representation,
     Session,
     Work,
+    WorkChange,
 )
 from .classifier import Classifier
 from .mirror import MirrorUploader
@@ -447,11 +456,13 @@ class Annotator(object):
 
 class MARCExporterFacets(BaseFacets):
     """A faceting object used to configure the search engine so that
-    it only works updated since a certain time.
+    it only works updated since a certain time, or only works with
+    certain identifiers.
     """
 
-    def __init__(self, start_time):
+    def __init__(self, start_time, identifiers=None):
         self.start_time = start_time
+        self.identifiers = identifiers
 
     def modify_search_filter(self, filter):
         filter.order = self.SORT_ORDER_TO_ELASTICSEARCH_FIELD_NAME[
@@ -459,6 +470,114 @@ class MARCExporterFacets(BaseFacets):
         ]
         filter.order_ascending = True
         filter.updated_after = self.start_time
+        if self.identifiers is not None:
+            if self.identifiers:
+                filter.identifiers = list(self.identifiers)
+            else:
+                filter.match_nothing = True
+
+
+class MARCChanges(object):
+    """The works in a library that changed since a certain time,
+    according to the WorkChange log.
+
+    A delta MARC file is created for each lane in a library. All of
+    those files are built from one MARCChanges, so the log is only read
+    once, and a record for a work that shows up in several lanes is
+    only created once.
+    """
+
+    def __init__(self, _db, library, start_time, end_time=None):
+        """Constructor.
+
+        :param start_time: Find changes made at or after this time.
+        :param end_time: Find changes made before this time. Defaults
+            to now.
+        """
+        self.start_time = start_time
+        self.end_time = end_time or utc_now()
+
+        # Created records, keyed by work ID, so that lanes can share them.
+        self.records = dict()
+
+        changes = WorkChange.changes(
+            _db, self.start_time, self.end_time
+        )
+        self.change_times = dict()
+        # The identifiers of changed works that should be in the file.
+        self.identifiers = dict()
+        # The identifier URNs of changed works that should be removed
+        # from the library's catalog.
+        self.deletions = dict()
+
+        collection_ids = set(x.id for x in library.all_collections)
+        works = dict()
+        if changes:
+            works = dict(
+                (work.id, work) for work in
+                _db.query(Work).filter(Work.id.in_(list(changes.keys())))
+            )
+        for work_id, (change_time, urn) in changes.items():
+            work = works.get(work_id)
+            if work is None:
+                # The work has been deleted. We don't know whether it
+                # was in this library, but a deletion record for a
+                # book the library never had does no harm.
+                if urn:
+                    self.deletions[work_id] = urn
+                    self.change_times[work_id] = change_time
+                continue
+            pools = [
+                pool for pool in work.license_pools
+                if pool.collection_id in collection_ids
+            ]
+            if not pools:
+                # This work has nothing to do with this library.
+                continue
+            self.change_times[work_id] = change_time
+            active = any(
+                pool.licenses_owned > 0 or pool.open_access
+                or pool.unlimited_access
+                for pool in pools if not pool.suppressed
+            )
+            if work.presentation_ready and active:
+                self.identifiers[work_id] = [pool.identifier for pool in pools]
+            else:
+                # The work has been withdrawn.
+                self.deletions[work_id] = pools[0].identifier.urn
+
+    def covers(self, start_time):
+        """Can this object answer questions about changes made since
+        `start_time`?
+        """
+        return start_time >= self.start_time
+
+    def since(self, start_time, batch_size):
+        """Find the works that changed at or after `start_time`.
+
+        :param batch_size: The maximum number of works to look for in
+            a single search.
+        :return: A 2-tuple (identifier batches, deletions).
+            `identifier batches` is a list of lists of Identifiers, and
+            `deletions` is a list of identifier URNs.
+        """
+        identifiers = []
+        batch = []
+        for work_id in sorted(self.identifiers):
+            if self.change_times[work_id] < start_time:
+                continue
+            batch.extend(self.identifiers[work_id])
+            if len(batch) >= batch_size:
+                identifiers.append(batch)
+                batch = []
+        if batch or not identifiers:
+            identifiers.append(batch)
+
+        deletions = [
+            urn for work_id, urn in sorted(self.deletions.items())
+            if self.change_times[work_id] >= start_time
+        ]
+        return identifiers, deletions
 
 
 class MARCExporter(object):
@@ -466,6 +585,12 @@ class MARCExporter(object):
 
     NAME = ExternalIntegration.MARC_EXPORT
 
+    # The default number of threads used to put together MARC records.
+    DEFAULT_WORKER_COUNT = 4
+
+    # The leader of a record that tells an ILS to delete a book.
+    DELETION_LEADER = "00000dam  2200000   4500"
+
     DESCRIPTION = _("Export metadata into MARC files that can be imported into an ILS manually.")
 
     # This setting (in days) controls how often MARC files should be
@@ -584,49 +709,149 @@ class MARCExporter(object):
         edition = pool.presentation_edition
         identifier = pool.identifier
 
-        _db = Session.object_session(work)
-
         record = None
         existing_record = getattr(work, annotator.marc_cache_field)
         if existing_record and not force_create:
             record = Record(data=existing_record.encode("utf-8"), force_utf8=True)
 
         if not record:
-            record = Record(leader=annotator.leader(work), force_utf8=True)
-            annotator.add_control_fields(record, identifier, pool, edition)
-            annotator.add_isbn(record, identifier)
-
-            # TODO: The 240 and 130 fields are for translated works, so they can be grouped even
-            # though they have different titles. We do not group editions of the same work in
-            # different languages, so we can't use those yet.
-
-            annotator.add_title(record, edition)
-            annotator.add_contributors(record, edition)
-            annotator.add_publisher(record, edition)
-            annotator.add_physical_description(record, edition)
-            annotator.add_audience(record, work)
-            annotator.add_series(record, edition)
-            annotator.add_system_details(record)
-            annotator.add_ebooks_subject(record)
-
-            data = record.as_marc()
-            setattr(work, annotator.marc_cache_field, data.decode("utf8"))
+            record = cls._create_cached_record(
+                work, annotator, pool, edition, identifier
+            )
 
         # Add additional fields that should not be cached.
         annotator.annotate_work_record(work, pool, edition, identifier, record, integration)
         return record
 
+    @classmethod
+    def _create_cached_record(cls, work, annotator, pool, edition, identifier):
+        """Build the part of a work's MARC record that doesn't depend on
+        the library, and cache it on the work.
+        """
+        record = Record(leader=annotator.leader(work), force_utf8=True)
+        annotator.add_control_fields(record, identifier, pool, edition)
+        annotator.add_isbn(record, identifier)
+
+        # TODO: The 240 and 130 fields are for translated works, so they can be grouped even
+        # though they have different titles. We do not group editions of the same work in
+        # different languages, so we can't use those yet.
+
+        annotator.add_title(record, edition)
+        annotator.add_contributors(record, edition)
+        annotator.add_publisher(record, edition)
+        annotator.add_physical_description(record, edition)
+        annotator.add_audience(record, work)
+        annotator.add_series(record, edition)
+        annotator.add_system_details(record)
+        annotator.add_ebooks_subject(record)
+
+        data = record.as_marc()
+        setattr(work, annotator.marc_cache_field, data.decode("utf8"))
+        return record
+
+    @classmethod
+    def record_parts(cls, work, annotator, force_create=False, integration=None):
+        """Gather everything needed to write a work's MARC record,
+        without parsing the cached part of the record.
+
+        This does all the database work for a record, so that the
+        record itself can be put together by append_fields() in
+        another thread.
+
+        :return: A 2-tuple (cached record, fields), where `cached
+            record` is the cached part of the record in MARC
+            transmission format and `fields` is a list of the
+            additional Fields that should not be cached. If the work
+            has no active license pool, None is returned instead.
+        """
+        if callable(annotator):
+            annotator = annotator()
+
+        pool = work.active_license_pool()
+        if not pool:
+            return None
+
+        edition = pool.presentation_edition
+        identifier = pool.identifier
+
+        if force_create or not getattr(work, annotator.marc_cache_field):
+            cls._create_cached_record(
+                work, annotator, pool, edition, identifier
+            )
+        data = getattr(work, annotator.marc_cache_field).encode("utf-8")
+
+        # The annotator only adds fields, so an empty Record is enough
+        # to collect them.
+        additional = Record(force_utf8=True)
+        annotator.annotate_work_record(
+            work, pool, edition, identifier, additional, integration
+        )
+        return data, additional.fields
+
+    @classmethod
+    def append_fields(cls, data, fields):
+        """Add fields to the end of a record in MARC transmission format.
+
+        This gives the same result as parsing the record, calling
+        add_field() and serializing it again, but only the new fields
+        need to be encoded.
+
+        :param data: A MARC record, as created by Record.as_marc().
+        :param fields: A list of Fields.
+        :return: The new record, as bytes.
+        """
+        if not fields:
+            return data
+        leader = data[:LEADER_LEN].decode("utf8")
+        base_address = int(leader[12:17])
+
+        # The directory and the field data each end with a terminator,
+        # which has to stay at the end.
+        directory = [data[LEADER_LEN:base_address - 1]]
+        field_data = [data[base_address:-1]]
+        offset = len(field_data[0])
+        for field in fields:
+            encoded = field.as_marc(encoding="utf-8")
+            if field.tag.isdigit():
+                tag = "%03d" % int(field.tag)
+            else:
+                tag = "%03s" % field.tag
+            directory.append(
+                ("%s%04d%05d" % (tag, len(encoded), offset)).encode("utf8")
+            )
+            field_data.append(encoded)
+            offset += len(encoded)
+        directory.append(END_OF_FIELD.encode("utf8"))
+        field_data.append(END_OF_RECORD.encode("utf8"))
+
+        directory = b"".join(directory)
+        field_data = b"".join(field_data)
+        base_address = LEADER_LEN + len(directory)
+        leader = "%05d%s%05d%s" % (
+            base_address + len(field_data), leader[5:12],
+            base_address, leader[17:]
+        )
+        return leader.encode("utf8") + directory + field_data
+
     def records(self, lane, annotator, mirror_integration, start_time=None,
                 force_refresh=False, mirror=None, search_engine=None,
                 query_batch_size=500, upload_batch_size=7500,
+                worker_count=None,
     ):
         """
         Create and export a MARC file for the books in a lane.
 
+        While one page of works is being turned into records, the next
+        page is retrieved from the search index, the records are put
+        together by a pool of worker threads, and completed parts of
+        the file are uploaded in the background.
+
         :param lane: The Lane to export books from.
         :param annotator: The Annotator to use when creating MARC records.
         :param mirror_integration: The mirror integration to use for MARC files.
         :param start_time: Only include records that were created or modified after this time.
+          The changed works are found in the WorkChange log, and works that were
+          deleted or withdrawn since this time are included as deletion records.
         :param force_refresh: Create new records even when cached records are available.
         :param mirror: Optional mirror to use instead of loading one from configuration.
         :param query_batch_size: Number of works to retrieve with a single Elasticsearch query.
@@ -634,6 +859,8 @@ class MARCExporter(object):
           from query_batch_size because S3 enforces a minimum size of 5MB for all parts
           of a multipart upload except the last, but 5MB of records would be too many
           works for a single query.
+        :param worker_count: Number of threads to use when putting
+          together MARC records.
         """
 
         # We mirror the content, if it's not empty. If it's empty, we create a CachedMARCFile
@@ -649,13 +876,28 @@ class MARCExporter(object):
 
         search_engine = search_engine or ExternalSearchIndex(self._db)
 
-        # End time is before we start the query, because if any records are changed
-        # during the processing we may not catch them, and they should be handled
-        # again on the next run.
-        end_time = utc_now()
-
-        facets = MARCExporterFacets(start_time=start_time)
-        pagination = SortKeyPagination(size=query_batch_size)
+        if start_time is None:
+            # End time is before we start the query, because if any records are changed
+            # during the processing we may not catch them, and they should be handled
+            # again on the next run.
+            end_time = utc_now()
+            searches = [MARCExporterFacets(start_time=None)]
+            deletions = []
+            records = None
+        else:
+            # The change log tells us which works changed. We only need
+            # to ask the search index which of those works are in this
+            # lane.
+            changes = self.changes(start_time)
+            end_time = changes.end_time
+            identifier_batches, deletions = changes.since(
+                start_time, query_batch_size
+            )
+            searches = [
+                MARCExporterFacets(start_time=None, identifiers=batch)
+                for batch in identifier_batches
+            ]
+            records = changes.records
 
         url = mirror.marc_file_url(self.library, lane, end_time, start_time)
         representation, ignore = get_one_or_create(
@@ -663,35 +905,57 @@ class MARCExporter(object):
             media_type=Representation.MARC_MEDIA_TYPE
         )
 
-        with mirror.multipart_upload(representation, url) as upload:
-            this_batch = BytesIO()
-            this_batch_size = 0
-            while pagination is not None:
-                # Retrieve one 'page' of works from the search index.
-                works = lane.works(
-                    self._db, pagination=pagination, facets=facets,
-                    search_engine=search_engine
-                )
-                for work in works:
-                    # Create a record for each work and add it to the
-                    # MARC file in progress.
-                    record = self.create_record(
-                        work, annotator, force_refresh, self.integration
-                    )
-                    if record:
-                        this_batch.write(record.as_marc())
-                this_batch_size += pagination.this_page_size
-                if this_batch_size >= upload_batch_size:
-                    # We've reached or exceeded the upload threshold.
-                    # Upload one part of the multi-part document.
-                    self._upload_batch(this_batch, upload)
-                    this_batch = BytesIO()
+        worker_count = worker_count or self.DEFAULT_WORKER_COUNT
+        with ThreadPoolExecutor(max_workers=worker_count) as workers, \
+             ThreadPoolExecutor(max_workers=2) as background:
+            with mirror.multipart_upload(representation, url) as upload:
+                last_part = None
+                try:
+                    this_batch = []
                     this_batch_size = 0
-                pagination = pagination.next_page
-
-            # Upload the final part of the multi-document, if
-            # necessary.
-            self._upload_batch(this_batch, upload)
+                    for works, page_size in self._search(
+                        lane, searches, query_batch_size, search_engine,
+                        background
+                    ):
+                        for work in works:
+                            record = self._record(
+                                work, annotator, force_refresh, workers,
+                                records
+                            )
+                            if record:
+                                this_batch.append(record)
+                        this_batch_size += page_size
+                        if this_batch_size >= upload_batch_size:
+                            # We've reached or exceeded the upload
+                            # threshold. Upload one part of the
+                            # multi-part document.
+                            last_part = background.submit(
+                                self._upload_batch, this_batch, upload,
+                                last_part
+                            )
+                            this_batch = []
+                            this_batch_size = 0
+
+                    # Books that left the catalog go at the end of
+                    # the file.
+                    for urn in deletions:
+                        this_batch.append(
+                            workers.submit(self.deletion_record, urn)
+                        )
+
+                    # Upload the final part of the multi-document, if
+                    # necessary.
+                    last_part = background.submit(
+                        self._upload_batch, this_batch, upload, last_part
+                    )
+                finally:
+                    # Don't let the upload finish until every part
+                    # has been sent.
+                    if last_part is not None:
+                        wait([last_part])
+                # If any part failed, this raises the exception so the
+                # upload is aborted.
+                last_part.result()
 
         representation.fetched_at = end_time
         if not representation.mirror_exception:
@@ -704,9 +968,112 @@ class MARCExporter(object):
                 cached.representation = representation
             cached.end_time = end_time
 
-    def _upload_batch(self, output, upload):
-        "Upload a batch of MARC records as one part of a multi-part upload."
-        content = output.getvalue()
+    def changes(self, start_time):
+        """Find the works in this library that changed since `start_time`.
+
+        The answer is kept, so that the delta files for every lane in
+        the library can share it.
+
+        :return: A MARCChanges.
+        """
+        changes = getattr(self, '_changes', None)
+        if changes is None or not changes.covers(start_time):
+            changes = MARCChanges(self._db, self.library, start_time)
+            self._changes = changes
+        return changes
+
+    @classmethod
+    def deletion_record(cls, urn):
+        """Build a MARC record telling an ILS to delete a book.
+
+        :param urn: The URN of the book's identifier, which is its
+            control number (field 001).
+        :return: The record in MARC transmission format.
+        """
+        record = Record(leader=cls.DELETION_LEADER, force_utf8=True)
+        record.add_field(Field(tag="001", data=urn))
+        record.add_field(
+            Field(tag="005", data=utc_now().strftime("%Y%m%d%H%M%S.0")))
+        return record.as_marc()
+
+    def _record(self, work, annotator, force_refresh, executor, records=None):
+        """Start creating the MARC record for a work.
+
+        The database work is done in this thread, and the rest is left
+        to `executor`.
+
+        :param records: A dictionary of records that were already
+            started, keyed by work ID. If the work is there, its record
+            is reused; otherwise the new record is added.
+        :return: A Future that returns the record as bytes, or None if
+            the work can't have a record.
+        """
+        if records is not None and work.id in records:
+            return records[work.id]
+        record = None
+        parts = self.record_parts(
+            work, annotator, force_refresh, self.integration
+        )
+        if parts:
+            record = executor.submit(self.append_fields, *parts)
+        if records is not None:
+            records[work.id] = record
+        return record
+
+    def _search(self, lane, searches, query_batch_size, search_engine,
+                executor):
+        """Run a series of searches against a lane, one page at a time.
+
+        :param searches: A list of MARCExporterFacets, one per search.
+        :yield: A 2-tuple (works, page size) for each page.
+        """
+        for facets in searches:
+            pagination = SortKeyPagination(size=query_batch_size)
+            for page in self._pages(
+                lane, facets, pagination, search_engine, executor
+            ):
+                yield page
+
+    def _pages(self, lane, facets, pagination, search_engine, executor):
+        """Find every work in a lane, one page at a time.
+
+        The search for each page is sent to `executor` as soon as the
+        previous page has come back, so the search index can work on
+        the next page while the caller is processing this one. Works
+        are loaded from the database in the calling thread.
+
+        :yield: A 2-tuple (works, page size) for each page.
+        """
+        filter = lane.filter(self._db, facets)
+        if filter.match_nothing:
+            return
+
+        def search(pagination):
+            return search_engine.query_works(
+                None, filter=filter, pagination=pagination
+            )
+
+        next_hits = executor.submit(search, pagination)
+        while next_hits is not None:
+            hits = next_hits.result()
+            page_size = pagination.this_page_size or 0
+            pagination = pagination.next_page
+            next_hits = None
+            if pagination is not None:
+                next_hits = executor.submit(search, pagination)
+            yield lane.works_for_hits(self._db, hits, facets=facets), page_size
+
+    def _upload_batch(self, records, upload, previous_part=None):
+        """Upload a batch of MARC records as one part of a multi-part upload.
+
+        :param records: A list of Futures, each of which returns a
+            MARC record as bytes.
+        :param previous_part: A Future for the upload of the previous
+            part. Parts must be uploaded in order, so this one waits
+            for it to finish.
+        """
+        if previous_part is not None:
+            previous_part.result()
+        content = b"".join(record.result() for record in records)
         if content:
             upload.upload_part(content)
-        output.close()
@@ -32,6 +32,7 @@ from .model import (
     Classification,
     Collection,
     Contributor,
+    ContributorResolver,
     CoverageRecord,
     DataSource,
     DeliveryMechanism,
@@ -412,6 +413,10 @@ class ContributorData(object):
         time an external list item is relevant), this will probably be
         easy.
         """
+        resolver = ContributorResolver.active()
+        if resolver is not None and resolver.knows_display_name(display_name):
+            return resolver.sort_name_for_display_name(display_name)
+
         contributors = _db.query(Contributor).filter(
             Contributor.display_name==display_name).filter(
                 Contributor.sort_name != None).all()
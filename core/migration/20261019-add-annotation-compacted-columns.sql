@@ -0,0 +1,18 @@
+DO $$
+  BEGIN
+  -- Add the 'compacted_target' column
+  BEGIN
+   ALTER TABLE annotations ADD COLUMN compacted_target varchar;
+  EXCEPTION
+   WHEN duplicate_column THEN RAISE NOTICE 'column annotations.compacted_target already exists, not creating it.';
+  END;
+
+  -- Add the 'compacted_content' column
+  BEGIN
+   ALTER TABLE annotations ADD COLUMN compacted_content varchar;
+  EXCEPTION
+   WHEN duplicate_column THEN RAISE NOTICE 'column annotations.compacted_content already exists, not creating it.';
+  END;
+
+ END;
+$$;
@@ -0,0 +1,15 @@
+DO $$
+    BEGIN
+        BEGIN
+            CREATE TABLE collectionstatistics (
+                collection_id INTEGER PRIMARY KEY REFERENCES collections(id) ON DELETE CASCADE,
+                licensed_titles INTEGER NOT NULL DEFAULT 0,
+                open_access_titles INTEGER NOT NULL DEFAULT 0,
+                licenses INTEGER NOT NULL DEFAULT 0,
+                available_licenses INTEGER NOT NULL DEFAULT 0
+            );
+        EXCEPTION
+            WHEN duplicate_table THEN RAISE NOTICE 'Warning: collectionstatistics already exists.';
+        END;
+    END;
+$$;
@@ -0,0 +1,58 @@
+-- Create a denormalized summary of each work's deliverable license
+-- pools in each collection, used to filter and paginate
+-- database-backed work lists.
+DO $$
+  BEGIN
+    CREATE TABLE workavailability (
+        work_id INTEGER NOT NULL REFERENCES works(id) ON DELETE CASCADE,
+        collection_id INTEGER NOT NULL REFERENCES collections(id) ON DELETE CASCADE,
+        suppressed BOOLEAN NOT NULL DEFAULT false,
+        licenses_owned INTEGER NOT NULL DEFAULT 0,
+        open_access BOOLEAN NOT NULL DEFAULT false,
+        self_hosted BOOLEAN NOT NULL DEFAULT false,
+        unlimited_access BOOLEAN NOT NULL DEFAULT false,
+        sort_title CHARACTER VARYING NOT NULL DEFAULT '',
+        sort_author CHARACTER VARYING NOT NULL DEFAULT '',
+        last_update_time TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (work_id, collection_id)
+    );
+  EXCEPTION
+    WHEN duplicate_table THEN RAISE NOTICE 'Warning: workavailability already exists.';
+  END;
+$$;
+
+CREATE INDEX if not exists ix_workavailability_collection_sort_author ON workavailability USING btree (collection_id, sort_author, sort_title, work_id);
+CREATE INDEX if not exists ix_workavailability_collection_sort_title ON workavailability USING btree (collection_id, sort_title, sort_author, work_id);
+CREATE INDEX if not exists ix_workavailability_collection_last_update_time ON workavailability USING btree (collection_id, last_update_time, sort_author, sort_title, work_id);
+
+-- Fill in the table for existing works. This matches
+-- WorkAvailability.calculate().
+INSERT INTO workavailability (
+    work_id, collection_id, suppressed, licenses_owned,
+    open_access, self_hosted, unlimited_access,
+    sort_title, sort_author, last_update_time
+)
+SELECT
+    lp.work_id,
+    lp.collection_id,
+    coalesce(bool_and(lp.suppressed), false),
+    coalesce(sum(lp.licenses_owned) FILTER (WHERE NOT lp.suppressed), 0),
+    coalesce(bool_or(lp.open_access) FILTER (WHERE NOT lp.suppressed), false),
+    coalesce(bool_or(lp.self_hosted) FILTER (WHERE NOT lp.suppressed), false),
+    coalesce(bool_or(lp.unlimited_access) FILTER (WHERE NOT lp.suppressed), false),
+    coalesce(e.sort_title, ''),
+    coalesce(e.sort_author, ''),
+    coalesce(w.last_update_time, '1970-01-01 00:00:00+00')
+FROM licensepools lp
+    JOIN works w ON lp.work_id = w.id
+    LEFT OUTER JOIN editions e ON w.presentation_edition_id = e.id
+WHERE w.presentation_ready = true
+    AND lp.superceded = false
+    AND (lp.licenses_owned > 0 OR lp.open_access OR lp.unlimited_access OR lp.self_hosted)
+    AND EXISTS (
+        SELECT 1 FROM licensepooldeliveries lpdm
+        WHERE lpdm.data_source_id = lp.data_source_id
+            AND lpdm.identifier_id = lp.identifier_id
+    )
+GROUP BY lp.work_id, lp.collection_id, e.sort_title, e.sort_author, w.last_update_time
+ON CONFLICT (work_id, collection_id) DO NOTHING;
@@ -0,0 +1,30 @@
+-- Create an append-only log of changes to works, used to find the
+-- works that belong in delta MARC files.
+DO $$
+  BEGIN
+    CREATE TYPE work_change_kind AS ENUM (
+        'presentation',
+        'availability',
+        'deletion'
+    );
+  EXCEPTION
+    WHEN duplicate_object THEN RAISE NOTICE 'work_change_kind already exists, not creating it.';
+  END;
+$$;
+
+DO $$
+  BEGIN
+    CREATE TABLE workchanges (
+        id BIGSERIAL PRIMARY KEY,
+        work_id INTEGER NOT NULL,
+        change_time TIMESTAMP WITH TIME ZONE NOT NULL,
+        change_kind work_change_kind NOT NULL,
+        identifier_urn CHARACTER VARYING
+    );
+  EXCEPTION
+    WHEN duplicate_table THEN RAISE NOTICE 'Warning: workchanges already exists.';
+  END;
+$$;
+
+CREATE INDEX if not exists ix_workchanges_work_id ON workchanges USING btree (work_id);
+CREATE INDEX if not exists ix_workchanges_change_time ON workchanges USING btree (change_time);
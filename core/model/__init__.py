@@ -489,7 +489,10 @@ from .cachedfeed import (
     WillNotGenerateExpensiveFeed,
     CachedMARCFile,
 )
-from .circulationevent import CirculationEvent
+from .circulationevent import (
+    CirculationEvent,
+    CirculationEventBuffer,
+)
 from .classification import (
     Classification,
     Genre,
@@ -499,6 +502,7 @@ from .collection import (
     Collection,
     CollectionIdentifier,
     CollectionMissing,
+    CollectionStatistics,
     collections_identifiers,
 )
 from .configuration import (
@@ -510,6 +514,7 @@ from .complaint import Complaint
 from .contributor import (
     Contribution,
     Contributor,
+    ContributorResolver,
 )
 from .credential import (
     Credential,
@@ -525,7 +530,9 @@ from .edition import Edition
 from .hasfulltablecache import HasFullTableCache
 from .identifier import (
     Equivalency,
+    EquivalentIdentifierCache,
     Identifier,
+    PresentationPrefetch,
 )
 from .integrationclient import IntegrationClient
 from .library import Library
@@ -555,5 +562,7 @@ from .resource import (
 )
 from .work import (
     Work,
+    WorkAvailability,
+    WorkChange,
     WorkGenre,
 )
@@ -1,8 +1,12 @@
 # encoding: utf-8
-# CirculationEvent
+# CirculationEvent, CirculationEventBuffer
 
 
+import atexit
 import logging
+import os
+import threading
+import time
 from sqlalchemy import (
     Column,
     DateTime,
@@ -11,7 +15,11 @@ from sqlalchemy import (
     Integer,
     String,
     Unicode,
+    tuple_,
 )
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.session import Session
 
 from . import (
     Base,
@@ -157,3 +165,225 @@ class CirculationEvent(Base):
         if was_new:
             logging.info("EVENT %s %s=>%s", event_name, old_value, new_value)
         return event, was_new
+
+    @classmethod
+    def row(cls, license_pool, event_name, old_value, new_value,
+            start=None, end=None, library=None, location=None):
+        """Represent a CirculationEvent as a dictionary that can be
+        passed into log_many().
+
+        The arguments are the same as for log().
+        """
+        if new_value is None or old_value is None:
+            delta = None
+        else:
+            delta = new_value - old_value
+        if not start:
+            start = utc_now()
+        if not end:
+            end = start
+        return dict(
+            license_pool_id=license_pool.id if license_pool else None,
+            library_id=library.id if library else None,
+            type=event_name, start=start, end=end,
+            old_value=old_value, new_value=new_value, delta=delta,
+            location=location,
+        )
+
+    @classmethod
+    def log_many(cls, _db, rows):
+        """Log a number of CirculationEvents to the database with a
+        single INSERT statement, skipping any that have already been
+        recorded.
+
+        :param rows: A list of dictionaries created by row().
+        :return: The number of events that were new.
+        """
+        # An event is the same as an earlier one if it has the same
+        # license pool, library, type and start time -- the fields
+        # log() looks it up by.
+        unique = {}
+        for row in rows:
+            key = (row['license_pool_id'], row['library_id'], row['type'],
+                   row['start'])
+            unique.setdefault(key, row)
+
+        # The unique indexes on this table don't stop duplicate events
+        # that have no license pool, so look those up ahead of time.
+        no_pool = [key[1:] for key in unique if key[0] is None]
+        if no_pool:
+            existing = _db.query(
+                cls.library_id, cls.type, cls.start
+            ).filter(
+                cls.license_pool_id==None
+            ).filter(
+                tuple_(cls.library_id, cls.type, cls.start).in_(no_pool)
+            )
+            for library_id, type, start in existing:
+                unique.pop((None, library_id, type, start), None)
+
+        if not unique:
+            return 0
+        insert_events = insert(cls).values(
+            list(unique.values())
+        ).on_conflict_do_nothing().returning(
+            cls.type, cls.old_value, cls.new_value
+        )
+        new_events = _db.execute(insert_events).fetchall()
+        for event_name, old_value, new_value in new_events:
+            logging.info("EVENT %s %s=>%s", event_name, old_value, new_value)
+        return len(new_events)
+
+
+class CirculationEventBuffer(object):
+    """Collects CirculationEvents in memory and writes them to the
+    database in batches, outside of the transaction in which they
+    happened.
+
+    A batch is written once `max_size` events are waiting, once the
+    oldest waiting event is `max_age` seconds old, and when the
+    process exits.
+    """
+
+    log = logging.getLogger("Circulation event buffer")
+
+    DEFAULT_MAX_SIZE = 100
+    DEFAULT_MAX_AGE = 5
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE,
+                 synchronous=False):
+        """Constructor.
+
+        :param synchronous: If this is True, events are written
+            immediately, in the session they came from. This is
+            useful in tests.
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.synchronous = synchronous
+        self.bind = None
+        self._lock = threading.Lock()
+        self._rows = []
+        self._oldest = None
+        self._pid = None
+        self._timer = None
+        self._registered = False
+
+    def add(self, _db, license_pool, event_name, old_value, new_value,
+            start=None, end=None, library=None, location=None):
+        """Add a CirculationEvent to the buffer.
+
+        The arguments are the same as for CirculationEvent.log().
+        """
+        unwritten = (
+            (license_pool and license_pool.id is None)
+            or (library and library.id is None)
+        )
+        if unwritten:
+            # The event refers to something that hasn't been written
+            # to the database yet. Write it now so the event can
+            # refer to it by ID.
+            _db.flush()
+        row = CirculationEvent.row(
+            license_pool, event_name, old_value, new_value, start, end,
+            library, location
+        )
+        if self.synchronous or unwritten:
+            # Either we've been asked to write the event right away,
+            # or it refers to something that won't be visible from any
+            # other session until this transaction is committed.
+            return CirculationEvent.log_many(_db, [row])
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # This is a new process. Anything in the buffer
+                # belongs to the process it was forked from.
+                self._pid = os.getpid()
+                self._rows = []
+                self._oldest = None
+                self._timer = None
+            if self.bind is None:
+                self.bind = _db.get_bind().engine
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_size
+            self._start_timer()
+        if full:
+            self.flush()
+
+    def _start_timer(self):
+        """Make sure a thread is flushing the buffer when it gets old."""
+        if self._timer is None:
+            self._timer = threading.Thread(
+                target=self._flush_when_old, name="circulation-event-buffer",
+                daemon=True
+            )
+            self._timer.start()
+        if not self._registered:
+            atexit.register(self.flush)
+            self._registered = True
+
+    def _flush_when_old(self):
+        while True:
+            with self._lock:
+                if self._oldest is None:
+                    wait = self.max_age
+                else:
+                    wait = self._oldest + self.max_age - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                self.flush()
+
+    @property
+    def pending(self):
+        """The number of events waiting to be written."""
+        return len(self._rows)
+
+    def flush(self, _db=None):
+        """Write every waiting event to the database.
+
+        :param _db: Write the events in this session, and leave it to
+            the caller to commit them. By default, the events are
+            written and committed in a new session.
+        :return: The number of events that were new.
+        """
+        with self._lock:
+            rows = self._rows
+            self._rows = []
+            self._oldest = None
+        if not rows:
+            return 0
+        if _db is not None:
+            return CirculationEvent.log_many(_db, rows)
+
+        _db = Session(bind=self.bind)
+        try:
+            try:
+                new = CirculationEvent.log_many(_db, rows)
+                _db.commit()
+            except IntegrityError:
+                # Some event in the batch refers to a license pool or
+                # library that no longer exists, possibly because the
+                # transaction that created it was rolled back. Write
+                # the events one at a time so only that one is lost.
+                _db.rollback()
+                new = 0
+                for row in rows:
+                    try:
+                        with _db.begin_nested():
+                            new += CirculationEvent.log_many(_db, [row])
+                    except IntegrityError as e:
+                        self.log.error(
+                            "Could not log circulation event %r: %s", row, e
+                        )
+                _db.commit()
+            return new
+        except Exception:
+            self.log.exception(
+                "Could not log %d circulation events", len(rows)
+            )
+            return 0
+        finally:
+            _db.close()
@@ -21,6 +21,7 @@ from ..classifier import (
     GenreData,
 )
 
+import functools
 import logging
 
 from sqlalchemy import (
@@ -242,9 +243,15 @@ class Subject(Base):
             func.count(Classification.id).desc())
         return q
 
+    # When subjects are assigned to genres in parallel, each worker
+    # processes several ranges of subject IDs, so that one range full
+    # of expensive subjects doesn't hold up the others.
+    PARTITIONS_PER_WORKER = 4
+
     @classmethod
     def assign_to_genres(cls, _db, type_restriction=None, force=False,
-                         batch_size=1000):
+                         batch_size=1000, workers=1, session_factory=None,
+                         reclassify_works=False):
         """Find subjects that have not been checked yet, assign each a
         genre/audience/fiction status if possible, and mark each as checked.
 
@@ -253,8 +260,48 @@ class Subject(Base):
             have been checked.
         :param batch_size: Perform a database commit every time this many
             subjects have been checked.
-
+        :param workers: Divide the subjects into ranges of IDs and check
+            this many ranges at once, each in its own database session.
+        :param session_factory: Creates the database sessions used when
+            there's more than one worker. By default the sessions use
+            the same database as `_db`.
+        :param reclassify_works: If this is True, every Work classified
+            under a subject whose classification changed will be
+            reclassified by the WorkClassificationCoverageProvider.
+        :return: A set containing the IDs of the subjects whose genre,
+            audience, target age or fiction status changed.
         """
+        changed = set()
+        if workers > 1:
+            # The workers need to see everything done in this session.
+            _db.commit()
+            lowest, highest = cls._assign_to_genres_query(
+                _db, type_restriction, force
+            ).with_entities(func.min(Subject.id), func.max(Subject.id)).one()
+            if lowest is not None:
+                changed.update(cls._assign_to_genres_in_parallel(
+                    _db, type_restriction, force, batch_size, workers,
+                    session_factory, lowest, highest
+                ))
+        else:
+            changed.update(cls._assign_to_genres_in_range(
+                _db, type_restriction, force, batch_size
+            ))
+
+        if reclassify_works and changed:
+            from .work import Work
+            count = Work.queue_classification_for_subjects(
+                _db, changed, batch_size
+            )
+            logging.getLogger("Subject-genre assignment").info(
+                "%d subject(s) changed; %d work(s) will be reclassified.",
+                len(changed), count
+            )
+        _db.commit()
+        return changed
+
+    @classmethod
+    def _assign_to_genres_query(cls, _db, type_restriction, force):
         q = _db.query(Subject).filter(Subject.locked==False)
 
         if type_restriction:
@@ -262,21 +309,74 @@ class Subject(Base):
 
         if not force:
             q = q.filter(Subject.checked==False)
+        return q
+
+    @classmethod
+    def _assign_to_genres_in_range(cls, _db, type_restriction, force,
+                                   batch_size, start=None, end=None):
+        """Check every subject with an ID in the range [start, end).
 
+        :return: A list of IDs of the subjects whose classification changed.
+        """
+        q = cls._assign_to_genres_query(_db, type_restriction, force)
+        if start is not None:
+            q = q.filter(Subject.id >= start).filter(Subject.id < end)
+            q = q.order_by(Subject.id)
+
+        changed = []
         counter = 0
         for subject in q:
-            subject.assign_to_genre()
+            if subject.assign_to_genre():
+                changed.append(subject.id)
             counter += 1
             if not counter % batch_size:
                 _db.commit()
         _db.commit()
+        return changed
+
+    @classmethod
+    def _assign_to_genres_in_parallel(cls, _db, type_restriction, force,
+                                      batch_size, workers, session_factory,
+                                      lowest, highest):
+        from . import SessionManager
+        from ..util.worker_pools import DatabasePool
+
+        session_factory = session_factory or SessionManager.sessionmaker(
+            session=_db
+        )
+        partitions = workers * cls.PARTITIONS_PER_WORKER
+        step = max(1, (highest - lowest + partitions) // partitions)
+
+        changed = []
+        def check_range(worker_db, start, end):
+            changed.extend(cls._assign_to_genres_in_range(
+                worker_db, type_restriction, force, batch_size, start, end
+            ))
+
+        with DatabasePool(workers, session_factory) as pool:
+            for start in range(lowest, highest + 1, step):
+                pool.put(functools.partial(
+                    check_range, start=start, end=start + step
+                ))
+        if pool.error_count:
+            logging.getLogger("Subject-genre assignment").error(
+                "%d of %d ranges of subjects could not be checked.",
+                pool.error_count, pool.job_total
+            )
+        return changed
 
     def assign_to_genre(self):
-        """Assign this subject to a genre."""
+        """Assign this subject to a genre.
+
+        :return: True if this changed the subject's genre, audience,
+            target age or fiction status; False otherwise.
+        """
         classifier = Classifier.classifiers.get(self.type, None)
         if not classifier:
-            return
+            return False
         self.checked = True
+        old = (self.genre, self.audience, self.fiction,
+               numericrange_to_tuple(self.target_age))
         log = logging.getLogger("Subject-genre assignment")
 
         genredata, audience, target_age, fiction = classifier.classify(self)
@@ -331,6 +431,9 @@ class Subject(Base):
             )
         self.target_age = tuple_to_numericrange(target_age)
 
+        return old != (self.genre, self.audience, self.fiction,
+                       numericrange_to_tuple(self.target_age))
+
 
 class Classification(Base):
     """The assignment of a Identifier to a Subject."""
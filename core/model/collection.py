@@ -1,8 +1,9 @@
 # encoding: utf-8
-# Collection, CollectionIdentifier, CollectionMissing
+# Collection, CollectionIdentifier, CollectionMissing, CollectionStatistics
 from abc import ABCMeta, abstractmethod
 
 from sqlalchemy import (
+    case,
     Column,
     exists,
     ForeignKey,
@@ -35,6 +36,7 @@ from .configuration import (
 from .constants import EditionConstants
 from .coverage import (
     CoverageRecord,
+    Timestamp,
     WorkCoverageRecord,
 )
 from .datasource import DataSource
@@ -54,6 +56,7 @@ from . import (
     get_one,
     get_one_or_create,
 )
+from ..util.datetime_helpers import utc_now
 from ..util.string_helpers import base64
 
 class Collection(Base, HasFullTableCache):
@@ -861,6 +864,118 @@ class Collection(Base, HasFullTableCache):
         _db.commit()
 
 
+class CollectionStatistics(Base):
+    """A periodically refreshed summary of the inventory in a Collection.
+
+    Counting a large collection's LicensePools is expensive, so the
+    admin dashboard reads these precomputed numbers when they're fresh
+    enough.
+    """
+    __tablename__ = 'collectionstatistics'
+
+    # The name of the Timestamp that records when the summary was
+    # last refreshed.
+    SERVICE_NAME = "Collection statistics refresh"
+
+    collection_id = Column(
+        Integer, ForeignKey('collections.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    licensed_titles = Column(Integer, nullable=False, default=0)
+    open_access_titles = Column(Integer, nullable=False, default=0)
+    licenses = Column(Integer, nullable=False, default=0)
+    available_licenses = Column(Integer, nullable=False, default=0)
+
+    COUNT_FIELDS = [
+        'licensed_titles', 'open_access_titles', 'licenses',
+        'available_licenses'
+    ]
+
+    @classmethod
+    def empty_counts(cls):
+        return dict((field, 0) for field in cls.COUNT_FIELDS)
+
+    @classmethod
+    def calculate(cls, _db):
+        """Count the inventory of every Collection in a single grouped query.
+
+        :return: A dictionary mapping collection ID to a dictionary of counts.
+            Collections with no LicensePools are not included.
+        """
+        not_open_access = LicensePool.open_access == False
+        licensed = and_(LicensePool.licenses_owned > 0, not_open_access)
+        qu = _db.query(
+            LicensePool.collection_id,
+            func.sum(case([(licensed, 1)], else_=0)),
+            func.sum(case([(LicensePool.open_access == True, 1)], else_=0)),
+            func.sum(
+                case([(not_open_access, LicensePool.licenses_owned)], else_=0)
+            ),
+            func.sum(
+                case([(not_open_access, LicensePool.licenses_available)], else_=0)
+            ),
+        ).group_by(LicensePool.collection_id)
+
+        counts = {}
+        for row in qu:
+            collection_id = row[0]
+            # The sums are None rather than 0 if every value is NULL.
+            counts[collection_id] = dict(
+                (field, int(value or 0))
+                for field, value in zip(cls.COUNT_FIELDS, row[1:])
+            )
+        return counts
+
+    @classmethod
+    def refresh(cls, _db):
+        """Replace the stored summary with up-to-date counts."""
+        start = utc_now()
+        counts = cls.calculate(_db)
+        _db.query(cls).delete(synchronize_session=False)
+        _db.bulk_insert_mappings(
+            cls, [
+                dict(collection_id=collection_id, **collection_counts)
+                for collection_id, collection_counts in list(counts.items())
+            ]
+        )
+        Timestamp.stamp(
+            _db, cls.SERVICE_NAME, Timestamp.SCRIPT_TYPE, start=start,
+            achievements="Collections summarized: %d" % len(counts)
+        )
+        return counts
+
+    @classmethod
+    def cached(cls, _db, max_age):
+        """Return the stored summary, if it was refreshed recently enough.
+
+        :param max_age: A timedelta. A summary older than this is
+            considered stale.
+        :return: A dictionary mapping collection ID to a dictionary of
+            counts, or None if there is no fresh summary.
+        """
+        last_refresh = Timestamp.value(
+            _db, cls.SERVICE_NAME, Timestamp.SCRIPT_TYPE, collection=None
+        )
+        if not last_refresh or last_refresh < utc_now() - max_age:
+            return None
+        counts = {}
+        for row in _db.query(cls):
+            counts[row.collection_id] = dict(
+                (field, getattr(row, field)) for field in cls.COUNT_FIELDS
+            )
+        return counts
+
+    @classmethod
+    def counts(cls, _db, max_age):
+        """Return the stored summary if it's fresh, otherwise calculate
+        the counts on the spot.
+        """
+        counts = cls.cached(_db, max_age)
+        if counts is None:
+            counts = cls.calculate(_db)
+        return counts
+
+
 collections_libraries = Table(
     'collections_libraries', Base.metadata,
      Column(
@@ -10,23 +10,28 @@ from . import (
 
 import logging
 import re
+import threading
+from collections import defaultdict
 from sqlalchemy import (
     Column,
     ForeignKey,
     Integer,
     Unicode,
     UniqueConstraint,
+    or_,
 )
 from sqlalchemy.dialects.postgresql import (
     ARRAY,
     JSON,
 )
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import MultipleResultsFound
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import (
     relationship,
     synonym,
 )
+from sqlalchemy.orm.attributes import instance_state
 from sqlalchemy.orm.session import Session
 from ..util.personal_names import display_name_to_sort_name
 
@@ -199,6 +204,12 @@ class Contributor(Base):
                 "Cannot look up a Contributor without any identifying "
                 "information whatsoever!")
 
+        resolver = ContributorResolver.active()
+        if resolver is not None:
+            found = resolver.lookup(sort_name, lc, viaf, create_new)
+            if found is not None:
+                return found, new
+
         if sort_name and not lc and not viaf:
             # We will not create a Contributor based solely on a name
             # unless there is no existing Contributor with that name.
@@ -266,21 +277,26 @@ class Contributor(Base):
         that might have contributions by this Contributor.
         """
 
-        if not new_sort_name:
-            self._sort_name = None
-            return
+        self._sort_name = self.normalize_sort_name(new_sort_name)
+
+    # tell SQLAlchemy to use the sort_name setter for ort_name, not _sort_name, after all.
+    sort_name = synonym('_sort_name', descriptor=sort_name)
+
+    @classmethod
+    def normalize_sort_name(cls, sort_name):
+        """The value that will actually be stored when a Contributor's
+        sort_name is set to `sort_name`.
+        """
+        if not sort_name:
+            return None
 
         # simplistic test of format, but catches the most frequent problem
         # where display-style names are put into sort name metadata by third parties.
-        if new_sort_name.find(",") == -1:
+        if sort_name.find(",") == -1:
             # auto-magically fix syntax
-            self._sort_name = display_name_to_sort_name(new_sort_name)
-            return
+            return display_name_to_sort_name(sort_name)
 
-        self._sort_name = new_sort_name
-
-    # tell SQLAlchemy to use the sort_name setter for ort_name, not _sort_name, after all.
-    sort_name = synonym('_sort_name', descriptor=sort_name)
+        return sort_name
 
 
     def merge_into(self, destination):
@@ -464,3 +480,269 @@ class Contribution(Base):
         UniqueConstraint('edition_id', 'contributor_id', 'role'),
     )
 
+
+
+class ContributorResolver(object):
+    """Resolves the names and identifiers used in a batch of imports
+    to Contributors, without going to the database for every one.
+
+    All the Contributors with any of the given sort names, display
+    names, LC or VIAF identifiers are loaded with a single query. While
+    the resolver is active (i.e. inside a `with` block), calls to
+    Contributor.lookup and
+    ContributorData.display_name_to_sort_name_from_existing_contributor
+    made in the same thread are answered from memory, with the same
+    results the database would give. Lookups the resolver can't
+    answer, including any that would create a new Contributor, go to
+    the database as usual.
+
+    The resolver sees every change to a Contributor's names and
+    identifiers made in this thread, as well as every new Contributor,
+    so its answers stay correct as the batch is imported. See
+    `contributor_changed` in listeners.py.
+    """
+
+    FIELDS = ['sort_name', 'display_name', 'lc', 'viaf']
+
+    _local = threading.local()
+
+    def __init__(self, _db, sort_names=None, display_names=None, lcs=None,
+                 viafs=None):
+        self._db = _db
+        self._previous = None
+
+        # The values for which the resolver knows every matching
+        # Contributor.
+        self.complete = dict(
+            sort_name=set(x for x in sort_names or [] if x),
+            display_name=set(x for x in display_names or [] if x),
+            lc=set(x for x in lcs or [] if x),
+            viaf=set(x for x in viafs or [] if x),
+        )
+
+        # Maps each field to a dictionary mapping values of that field
+        # to the Contributors that have them.
+        self._index = dict(
+            (field, defaultdict(list)) for field in self.FIELDS
+        )
+        self._indexed = dict()
+
+        clauses = []
+        for field in self.FIELDS:
+            if self.complete[field]:
+                clauses.append(
+                    getattr(Contributor, field).in_(self.complete[field])
+                )
+        if clauses:
+            qu = _db.query(Contributor).filter(or_(*clauses)).order_by(
+                Contributor.id
+            )
+            for contributor in qu:
+                self.add(contributor)
+
+    @classmethod
+    def from_contributors(cls, _db, contributors):
+        """Create a ContributorResolver for every name and identifier
+        mentioned by the given ContributorData objects.
+        """
+        contributors = list(contributors)
+        # Edition.add_contributor looks up a contributor's LC
+        # identifier as a VIAF identifier and vice versa (see
+        # create_missing), so either kind of identifier may be looked
+        # up as either.
+        identifiers = [x.lc for x in contributors] + [
+            x.viaf for x in contributors
+        ]
+        return cls(
+            _db,
+            sort_names=[x.sort_name for x in contributors],
+            display_names=[x.display_name for x in contributors],
+            lcs=identifiers,
+            viafs=identifiers,
+        )
+
+    @classmethod
+    def active(cls):
+        """The resolver currently active in this thread, if any."""
+        return getattr(cls._local, 'resolver', None)
+
+    def __enter__(self):
+        self._previous = self.active()
+        self._local.resolver = self
+        return self
+
+    def __exit__(self, *args):
+        self._local.resolver = self._previous
+        self._previous = None
+        return False
+
+    def add(self, contributor):
+        """Start keeping track of a Contributor."""
+        key = id(contributor)
+        if key in self._indexed:
+            return
+        self._indexed[key] = contributor
+        for field in self.FIELDS:
+            value = getattr(contributor, field)
+            if value:
+                self._index[field][value].append(contributor)
+
+    def changed(self, contributor, field, value, old_value):
+        """A Contributor's `field` is about to be changed from
+        `old_value` to `value`.
+        """
+        if id(contributor) not in self._indexed:
+            # add() will index the old value, which is replaced below.
+            self.add(contributor)
+            old_value = getattr(contributor, field)
+        index = self._index[field]
+        if old_value and contributor in index.get(old_value, []):
+            index[old_value].remove(contributor)
+        if value:
+            index[value].append(contributor)
+
+    def _live(self, field, value):
+        """The Contributors in this resolver's session that currently
+        have the given value for `field`, oldest first.
+        """
+        contributors = []
+        for contributor in self._index[field].get(value, []):
+            state = instance_state(contributor)
+            if (state.session_id != self._db.hash_key or state.deleted
+                or state.was_deleted):
+                continue
+            contributors.append(contributor)
+        return contributors
+
+    def lookup(self, sort_name=None, lc=None, viaf=None, create_new=True):
+        """Find Contributors the way Contributor.lookup does.
+
+        :return: A list of Contributors, or None if the resolver can't
+            answer the question and the database must be consulted.
+        """
+        if sort_name and not lc and not viaf:
+            if sort_name not in self.complete['sort_name']:
+                return None
+            contributors = self._live('sort_name', sort_name)
+            if not contributors:
+                # A new Contributor will be created.
+                return None
+            return contributors
+
+        if (lc and lc not in self.complete['lc']) or (
+            viaf and viaf not in self.complete['viaf']
+        ):
+            return None
+        if lc:
+            contributors = self._live('lc', lc)
+            if viaf:
+                contributors = [x for x in contributors if x.viaf == viaf]
+        else:
+            contributors = self._live('viaf', viaf)
+
+        if not contributors:
+            if create_new:
+                return None
+            return []
+        if len(contributors) > 1 and not create_new:
+            raise MultipleResultsFound(
+                "Multiple rows were found for one()"
+            )
+        # Otherwise the Contributors are interchangeable.
+        return contributors[:1]
+
+    def knows_display_name(self, display_name):
+        return display_name in self.complete['display_name']
+
+    def sort_name_for_display_name(self, display_name):
+        """Find the sort name of the first Contributor with the given
+        display name that has a sort name.
+        """
+        for contributor in self._live('display_name', display_name):
+            if contributor.sort_name is not None:
+                return contributor.sort_name
+        return None
+
+    def create_missing(self, contributors):
+        """Create, with a single INSERT, every Contributor that
+        Edition.add_contributor would create for the given
+        ContributorData objects, in order.
+
+        ContributorData objects with no sort name, LC or VIAF
+        identifier are ignored, since their sort name can't be known
+        until they're imported. So are ones known only by a sort name
+        that isn't stored as given (e.g. "Jane Doe", which is stored
+        as "Doe, Jane"), since Contributor.lookup would never find
+        the Contributor created for them.
+
+        :return: A list of the new Contributors.
+        """
+        rows = []
+        pending = dict((field, defaultdict(list)) for field in self.FIELDS)
+
+        def exists(field, value, viaf=None):
+            # Is there a Contributor, or a row about to be inserted,
+            # with this value (and VIAF identifier, if given)? Rows
+            # are indexed by the values that will be stored, which
+            # are the values Contributor.lookup queries.
+            existing = [x.viaf for x in self._live(field, value)]
+            existing += [x['viaf'] for x in pending[field].get(value, [])]
+            return any(not viaf or x == viaf for x in existing)
+
+        for data in contributors:
+            # Edition.add_contributor passes the LC identifier to
+            # Contributor.lookup as the VIAF identifier and vice
+            # versa, so that's how the lookup is simulated here.
+            # Metadata.apply sets the identifiers correctly once the
+            # Contributor has been found.
+            sort_name, lc, viaf = data.sort_name, data.viaf, data.lc
+            if not (sort_name or lc or viaf):
+                continue
+            if sort_name and not lc and not viaf:
+                if sort_name not in self.complete['sort_name']:
+                    continue
+                if Contributor.normalize_sort_name(sort_name) != sort_name:
+                    continue
+                if exists('sort_name', sort_name):
+                    continue
+                row = dict(sort_name=sort_name, lc=None, viaf=None)
+            else:
+                if (lc and lc not in self.complete['lc']) or (
+                    viaf and viaf not in self.complete['viaf']
+                ):
+                    continue
+                if lc:
+                    found = exists('lc', lc, viaf)
+                else:
+                    found = exists('viaf', viaf)
+                if found:
+                    continue
+                row = dict(sort_name=sort_name, lc=lc or None,
+                           viaf=viaf or None)
+
+            row['sort_name'] = Contributor.normalize_sort_name(
+                row['sort_name']
+            )
+            rows.append(row)
+            for field in ('sort_name', 'lc', 'viaf'):
+                if row[field]:
+                    pending[field][row[field]].append(row)
+
+        if not rows:
+            return []
+
+        # Write any pending changes first, since the INSERT won't
+        # trigger an autoflush.
+        flush(self._db)
+        table = Contributor.__table__
+        insert = table.insert().values(
+            [dict(sort_name=row['sort_name'], lc=row['lc'], viaf=row['viaf'],
+                  aliases=None, extra={}) for row in rows]
+        ).returning(table.c.id)
+        ids = [contributor_id for [contributor_id] in self._db.execute(insert)]
+        created = self._db.query(Contributor).filter(
+            Contributor.id.in_(ids)
+        ).order_by(Contributor.id).all()
+        for contributor in created:
+            self.add(contributor)
+        return created
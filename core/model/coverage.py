@@ -579,14 +579,28 @@ class WorkCoverageRecord(Base, BaseCoverageRecord):
         """Create and update WorkCoverageRecords so that every Work in
         `works` has an identical record.
         """
-        from .work import Work
-
         if not works:
             # Nothing to do.
-            return
+            return 0
         _db = Session.object_session(works[0])
+        return self.bulk_add_for_work_ids(
+            _db, [w.id for w in works], operation, timestamp, status,
+            exception
+        )
+
+    @classmethod
+    def bulk_add_for_work_ids(self, _db, work_ids, operation, timestamp=None,
+                              status=CoverageRecord.SUCCESS, exception=None):
+        """Create and update WorkCoverageRecords so that every Work with
+        one of the given IDs has an identical record.
+
+        :param work_ids: A list of Work IDs, or a query that finds them.
+            With a query, the IDs never have to leave the database.
+        :return: The number of Works that now have the record.
+        """
+        from .work import Work
+
         timestamp = timestamp or utc_now()
-        work_ids = [w.id for w in works]
 
         # Make sure that works that previously had a
         # WorkCoverageRecord for this operation have their timestamp
@@ -595,7 +609,7 @@ class WorkCoverageRecord(Base, BaseCoverageRecord):
             and_(WorkCoverageRecord.work_id.in_(work_ids),
                  WorkCoverageRecord.operation==operation)
         ).values(dict(timestamp=timestamp, status=status, exception=exception))
-        _db.execute(update)
+        updated = _db.execute(update).rowcount
 
         # Make sure that any works that are missing a
         # WorkCoverageRecord for this operation get one.
@@ -634,6 +648,6 @@ class WorkCoverageRecord(Base, BaseCoverageRecord):
             ],
             new_records
         )
-        _db.execute(insert)
+        return updated + _db.execute(insert).rowcount
 
 Index("ix_workcoveragerecords_operation_work_id", WorkCoverageRecord.operation, WorkCoverageRecord.work_id)
@@ -1,10 +1,11 @@
 # encoding: utf-8
-# Identifier, Equivalency
+# Identifier, Equivalency, EquivalentIdentifierCache, PresentationPrefetch
 import logging
 import random
+import threading
 from urllib.parse import quote, unquote
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from functools import total_ordering
 import isbnlib
 from sqlalchemy import (
@@ -16,6 +17,7 @@ from sqlalchemy import (
     String,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.orm import joinedload, relationship
 from sqlalchemy.orm.exc import MultipleResultsFound, NoResultFound
@@ -453,6 +455,7 @@ class Identifier(Base, IdentifierConstants):
             on_multiple='interchangeable'
         )
         eq.strength=strength
+        EquivalentIdentifierCache.invalidate()
         if new:
             logging.info(
                 "Identifier equivalency: %r==%r p=%.2f", self, identifier,
@@ -488,30 +491,88 @@ class Identifier(Base, IdentifierConstants):
             identifier_id_column, levels, threshold, cutoff
         )
 
+    # Resolves the equivalents of many Identifiers in a single round
+    # trip. This is the same traversal as fn_recursive_equivalents
+    # (files/recursive_equivalents.sql), except that every row carries
+    # the ID it started from, so the recursion for all the roots runs
+    # side by side and the row cutoff applies to each root separately.
+    BATCH_RECURSIVE_EQUIVALENTS_SQL = """
+        WITH RECURSIVE
+            find_equivs(root, n, strength, input_id, output_id, r) AS
+            (
+            SELECT id, 1, 1::DOUBLE PRECISION, id, id, 0::BIGINT
+            FROM identifiers
+            WHERE id = ANY(CAST(:identifier_ids AS INT[]))
+            UNION
+            SELECT fe.root, fe.n + 1, fe.strength * e.strength,
+                   e.input_id, e.output_id,
+                   row_number() over (partition by fe.root order by null)
+            FROM equivalents e, find_equivs fe
+            WHERE fe.n <= :levels
+                AND fe.strength * e.strength > :threshold
+                AND (
+                e.input_id = fe.input_id
+                OR e.input_id = fe.output_id
+                OR e.output_id = fe.input_id
+                OR e.output_id = fe.output_id
+                )
+                AND e.enabled = true
+                AND (CAST(:cutoff AS INT) is null or fe.r < :cutoff)
+            )
+        SELECT root, input_id FROM find_equivs
+        UNION
+        SELECT root, output_id FROM find_equivs
+    """
+
     @classmethod
     def recursively_equivalent_identifier_ids(
             cls, _db, identifier_ids, policy=None):
         """All Identifier IDs equivalent to the given set of Identifier
         IDs at the given confidence threshold.
-        This uses the function defined in files/recursive_equivalents.sql.
         Four levels is enough to go from a Gutenberg text to an ISBN.
         Gutenberg ID -> OCLC Work IS -> OCLC Number -> ISBN
         Returns a dictionary mapping each ID in the original to a
         list of equivalent IDs.
 
+        All of the IDs are resolved with a single recursive query. If
+        an EquivalentIdentifierCache is active in this thread, only
+        the IDs it doesn't already know about are sent to the database.
+
         :param policy: A PresentationCalculationPolicy that explains
            how you've chosen to make the tradeoff between performance,
            data quality, and sheer number of equivalent identifiers.
         """
-        fn = cls._recursively_equivalent_identifier_ids_query(
-            Identifier.id, policy
+        policy = policy or PresentationCalculationPolicy()
+        cache = EquivalentIdentifierCache.active()
+        if cache is not None:
+            return cache.resolve(_db, identifier_ids, policy)
+        return cls._batch_recursively_equivalent_identifier_ids(
+            _db, identifier_ids, policy
         )
-        query = select([Identifier.id, fn], Identifier.id.in_(identifier_ids))
-        results = _db.execute(query)
+
+    @classmethod
+    def _batch_recursively_equivalent_identifier_ids(
+            cls, _db, identifier_ids, policy):
+        """Run BATCH_RECURSIVE_EQUIVALENTS_SQL for the given IDs.
+
+        :return: A dictionary mapping each ID that exists to a list
+            of equivalent IDs.
+        """
         equivalents = defaultdict(list)
-        for r in results:
-            original = r[0]
-            equivalent = r[1]
+        identifier_ids = list(set(identifier_ids))
+        if not identifier_ids:
+            return equivalents
+
+        results = _db.execute(
+            text(cls.BATCH_RECURSIVE_EQUIVALENTS_SQL),
+            dict(
+                identifier_ids=identifier_ids,
+                levels=policy.equivalent_identifier_levels,
+                threshold=policy.equivalent_identifier_threshold,
+                cutoff=policy.equivalent_identifier_cutoff,
+            )
+        )
+        for original, equivalent in results:
             equivalents[original].append(equivalent)
         return equivalents
 
@@ -690,10 +751,17 @@ class Identifier(Base, IdentifierConstants):
         # these identifiers.
         from .resource import Hyperlink, Resource
         rel = rel or Hyperlink.IMAGE
-        images = cls.resources_for_identifier_ids(
-            _db, identifier_ids, rel)
-        images = images.join(Resource.representation)
-        images = images.all()
+        prefetch = PresentationPrefetch.active()
+        images = None
+        if prefetch and rel == Hyperlink.IMAGE:
+            images = prefetch.resources(identifier_ids, [rel])
+        if images is not None:
+            images = [x for x in images if x.representation]
+        else:
+            images = cls.resources_for_identifier_ids(
+                _db, identifier_ids, rel)
+            images = images.join(Resource.representation)
+            images = images.all()
 
         champions = Resource.best_covers_among(images)
         if not champions:
@@ -731,8 +799,18 @@ class Identifier(Base, IdentifierConstants):
         # Find all rel="description" resources associated with any of
         # these records.
         rels = [LinkRelations.DESCRIPTION, LinkRelations.SHORT_DESCRIPTION]
-        descriptions = cls.resources_for_identifier_ids(
-            _db, identifier_ids, rels, privileged_data_source).all()
+        prefetch = PresentationPrefetch.active()
+        descriptions = None
+        if prefetch:
+            data_sources = privileged_data_source
+            if isinstance(data_sources, DataSource):
+                data_sources = [data_sources]
+            descriptions = prefetch.resources(
+                identifier_ids, rels, data_sources or None
+            )
+        if descriptions is None:
+            descriptions = cls.resources_for_identifier_ids(
+                _db, identifier_ids, rels, privileged_data_source).all()
 
         champion = None
         # Add each resource's content to the evaluator's corpus.
@@ -863,6 +941,265 @@ class Identifier(Base, IdentifierConstants):
         return (self.type, self.identifier) < (other.type, other.identifier)
 
 
+class EquivalentIdentifierCache(object):
+    """A bounded, per-thread cache of recursively equivalent Identifier IDs.
+
+    While a cache is active (i.e. inside a `with` block), calls to
+    Identifier.recursively_equivalent_identifier_ids made in the same
+    thread are answered from the cache where possible. Equivalents
+    depend on the PresentationCalculationPolicy, so entries are keyed
+    by the policy's equivalency settings as well as the Identifier ID.
+
+    Any change to an Equivalency invalidates every cache, in every
+    thread.
+    """
+
+    DEFAULT_MAX_SIZE = 10000
+
+    _local = threading.local()
+
+    # Bumped whenever the equivalents table changes; a cache that
+    # notices a new generation throws away everything it knows.
+    _generation = 0
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or self.DEFAULT_MAX_SIZE
+        self._entries = OrderedDict()
+        self._cache_generation = self._generation
+        self._previous = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def active(cls):
+        """The cache currently active in this thread, if any."""
+        return getattr(cls._local, 'cache', None)
+
+    @classmethod
+    def invalidate(cls):
+        """Make every cache forget what it knows."""
+        EquivalentIdentifierCache._generation += 1
+
+    def __enter__(self):
+        self._previous = self.active()
+        self._local.cache = self
+        return self
+
+    def __exit__(self, *args):
+        self._local.cache = self._previous
+        self._previous = None
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def policy_key(cls, policy):
+        return (
+            policy.equivalent_identifier_levels,
+            policy.equivalent_identifier_threshold,
+            policy.equivalent_identifier_cutoff,
+        )
+
+    def clear(self):
+        self._entries.clear()
+        self._cache_generation = self._generation
+
+    def get(self, policy, identifier_id):
+        """Look up the cached equivalents of one Identifier ID.
+
+        :return: A list of IDs, or None if the ID isn't cached.
+        """
+        if self._cache_generation != self._generation:
+            self.clear()
+        key = (self.policy_key(policy), identifier_id)
+        equivalents = self._entries.get(key)
+        if equivalents is not None:
+            self._entries.move_to_end(key)
+        return equivalents
+
+    def set(self, policy, identifier_id, equivalents):
+        if self._cache_generation != self._generation:
+            self.clear()
+        key = (self.policy_key(policy), identifier_id)
+        self._entries[key] = list(equivalents)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def resolve(self, _db, identifier_ids, policy):
+        """Find the equivalents of the given Identifier IDs, going to
+        the database only for IDs that aren't in the cache.
+
+        :return: A dictionary like the one returned by
+            Identifier.recursively_equivalent_identifier_ids.
+        """
+        equivalents = defaultdict(list)
+        missing = []
+        for identifier_id in set(identifier_ids):
+            cached = self.get(policy, identifier_id)
+            if cached is None:
+                missing.append(identifier_id)
+                continue
+            self.hits += 1
+            if cached:
+                equivalents[identifier_id] = list(cached)
+
+        if missing:
+            self.misses += len(missing)
+            found = Identifier._batch_recursively_equivalent_identifier_ids(
+                _db, missing, policy
+            )
+            for identifier_id in missing:
+                # An ID that doesn't exist is cached as having no
+                # equivalents, so we don't keep asking about it.
+                ids = found.get(identifier_id, [])
+                self.set(policy, identifier_id, ids)
+                if ids:
+                    equivalents[identifier_id] = list(ids)
+        return equivalents
+
+
+class PresentationPrefetch(object):
+    """The classifications, measurements, descriptions and cover images
+    associated with a set of Identifiers, loaded in a few queries so
+    that presentation can be calculated for a batch of Works without
+    going back to the database for each one.
+
+    While a prefetch is active (i.e. inside a `with` block), the
+    methods that look up this information for a group of Identifier IDs
+    use it instead of querying the database, so long as every ID they
+    ask about was prefetched.
+
+    See Work.prefetch_presentation, which also loads the Works'
+    LicensePools, Editions and Contributors.
+    """
+
+    _local = threading.local()
+
+    # The Measurements that affect a Work's quality.
+    QUALITY_QUANTITIES = set([
+        Measurement.POPULARITY, Measurement.QUALITY, Measurement.RATING
+    ]).union(Measurement.PERCENTILE_SCALES.keys())
+
+    def __init__(self, _db, identifier_ids, equivalents_cache=None):
+        """Constructor.
+
+        :param identifier_ids: Load information for these Identifiers.
+        :param equivalents_cache: An EquivalentIdentifierCache to make
+            active along with this prefetch.
+        """
+        from .resource import Hyperlink, Resource
+        self.identifier_ids = set(identifier_ids)
+        self.equivalents_cache = equivalents_cache
+        self._previous = None
+        ids = sorted(self.identifier_ids)
+
+        self._classifications = defaultdict(list)
+        classifications = Identifier.classifications_for_identifier_ids(
+            _db, ids
+        ).order_by(Classification.id)
+        for classification in classifications:
+            self._classifications[classification.identifier_id].append(
+                classification
+            )
+
+        self._measurements = defaultdict(list)
+        measurements = _db.query(Measurement).filter(
+            Measurement.identifier_id.in_(ids)
+        ).filter(
+            Measurement.is_most_recent==True
+        ).filter(
+            Measurement.quantity_measured.in_(self.QUALITY_QUANTITIES)
+        ).order_by(Measurement.id)
+        for measurement in measurements:
+            self._measurements[measurement.identifier_id].append(measurement)
+
+        # Each Resource appears once for every Hyperlink to it, the
+        # same as in the result of resources_for_identifier_ids().
+        self._links = defaultdict(list)
+        rels = [
+            LinkRelations.DESCRIPTION, LinkRelations.SHORT_DESCRIPTION,
+            Hyperlink.IMAGE
+        ]
+        links = _db.query(
+            Hyperlink.identifier_id, Hyperlink.rel, Hyperlink.data_source_id,
+            Resource
+        ).join(
+            Resource, Hyperlink.resource_id==Resource.id
+        ).filter(
+            Hyperlink.identifier_id.in_(ids)
+        ).filter(
+            Hyperlink.rel.in_(rels)
+        ).options(
+            joinedload(Resource.representation)
+        ).order_by(Hyperlink.id)
+        for identifier_id, rel, data_source_id, resource in links:
+            self._links[identifier_id].append((rel, data_source_id, resource))
+
+    @classmethod
+    def active(cls):
+        """The prefetch currently active in this thread, if any."""
+        return getattr(cls._local, 'prefetch', None)
+
+    def __enter__(self):
+        if self.equivalents_cache is not None:
+            self.equivalents_cache.__enter__()
+        self._previous = self.active()
+        self._local.prefetch = self
+        return self
+
+    def __exit__(self, *args):
+        self._local.prefetch = self._previous
+        self._previous = None
+        if self.equivalents_cache is not None:
+            self.equivalents_cache.__exit__(*args)
+        return False
+
+    def covers(self, identifier_ids):
+        """Was information loaded for all of these Identifier IDs?"""
+        return self.identifier_ids.issuperset(identifier_ids)
+
+    def _gather(self, by_identifier, identifier_ids):
+        if not self.covers(identifier_ids):
+            return None
+        items = []
+        for identifier_id in set(identifier_ids):
+            items.extend(by_identifier.get(identifier_id, []))
+        return items
+
+    def classifications(self, identifier_ids):
+        """The Classifications of the given Identifiers, or None if
+        they weren't all prefetched.
+        """
+        return self._gather(self._classifications, identifier_ids)
+
+    def measurements(self, identifier_ids):
+        """The most recent quality-related Measurements of the given
+        Identifiers, or None if they weren't all prefetched.
+        """
+        return self._gather(self._measurements, identifier_ids)
+
+    def resources(self, identifier_ids, rels, data_sources=None):
+        """Resources linked to the given Identifiers, like
+        Identifier.resources_for_identifier_ids.
+
+        :return: A list of Resources, or None if the Identifiers weren't
+            all prefetched.
+        """
+        links = self._gather(self._links, identifier_ids)
+        if links is None:
+            return None
+        if data_sources is not None:
+            data_source_ids = set(x.id for x in data_sources)
+        return [
+            resource for rel, data_source_id, resource in links
+            if rel in rels and (
+                data_sources is None or data_source_id in data_source_ids
+            )
+        ]
+
+
 class Equivalency(Base):
     """An assertion that two Identifiers identify the same work.
     This assertion comes with a 'strength' which represents how confident
@@ -608,6 +608,14 @@ class LicensePool(Base):
             if self.work:
                 self.work.last_update_time = as_of
 
+        if (self.work and new_licenses_owned is not None
+            and new_licenses_owned != old_licenses_owned):
+            # Gaining or losing licenses can make the book appear in
+            # or disappear from catalogs. (Routine changes to the
+            # number of available licenses aren't worth logging.)
+            from .work import WorkChange
+            self.work.record_change(WorkChange.AVAILABILITY, as_of)
+
         if changes_made:
             message, args = self.circulation_changelog(
                 old_licenses_owned, old_licenses_available,
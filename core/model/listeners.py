@@ -3,6 +3,7 @@
 import datetime
 from sqlalchemy import (
     event,
+    inspect,
     text,
 )
 from pdb import set_trace
@@ -20,6 +21,15 @@ from .admin import (
 from .datasource import DataSource
 from .classification import Genre
 from .collection import Collection
+from .contributor import (
+    Contributor,
+    ContributorResolver,
+)
+from .edition import Edition
+from .identifier import (
+    Equivalency,
+    EquivalentIdentifierCache,
+)
 from ..config import Configuration
 from .configuration import (
     ConfigurationSetting,
@@ -29,11 +39,34 @@ from .library import Library
 from .licensing import (
     DeliveryMechanism,
     LicensePool,
+    LicensePoolDeliveryMechanism,
+)
+from .work import (
+    Work,
+    WorkAvailability,
+    WorkChange,
 )
-from .work import Work
 from ..util.datetime_helpers import to_utc, utc_now
 
 
+# Incremented whenever this process changes something that might be
+# part of the site configuration. Unlike the site configuration
+# Timestamp this has no cooldown, so an in-process cache of values
+# derived from the configuration can use it to notice every change.
+_configuration_generation = 0
+
+def configuration_generation():
+    """How many times has this process changed the site configuration?"""
+    return _configuration_generation
+
+def configuration_generation_has_changed():
+    """Invalidate in-process caches of values derived from the site
+    configuration, without recording a site configuration change in
+    the database.
+    """
+    global _configuration_generation
+    _configuration_generation += 1
+
 site_configuration_has_changed_lock = RLock()
 def site_configuration_has_changed(_db, cooldown=1):
     """Call this whenever you want to indicate that the site configuration
@@ -50,6 +83,8 @@ def site_configuration_has_changed(_db, cooldown=1):
         number of seconds since the last site configuration change was
         recorded.
     """
+    configuration_generation_has_changed()
+
     has_lock = site_configuration_has_changed_lock.acquire(blocking=False)
     if not has_lock:
         # Another thread is updating site configuration right now.
@@ -200,6 +235,26 @@ def refresh_datasource_cache(mapper, connection, target):
     # the cache will be repopulated.
     ExternalIntegration.reset_cache()
 
+@event.listens_for(Contributor._sort_name, 'set')
+@event.listens_for(Contributor.display_name, 'set')
+@event.listens_for(Contributor.lc, 'set')
+@event.listens_for(Contributor.viaf, 'set')
+def contributor_changed(target, value, oldvalue, initiator):
+    # A ContributorResolver active in this thread must know about the
+    # change, or it will give different answers than the database.
+    resolver = ContributorResolver.active()
+    if resolver is not None:
+        field = initiator.key.lstrip('_')
+        resolver.changed(target, field, value, oldvalue)
+
+@event.listens_for(Equivalency, 'after_insert')
+@event.listens_for(Equivalency, 'after_delete')
+@event.listens_for(Equivalency, 'after_update')
+def refresh_equivalent_identifier_cache(mapper, connection, target):
+    # Cached equivalents may have been calculated using the old
+    # version of this Equivalency.
+    EquivalentIdentifierCache.invalidate()
+
 @event.listens_for(Genre, 'after_insert')
 @event.listens_for(Genre, 'after_delete')
 @event.listens_for(Genre, 'after_update')
@@ -258,6 +313,8 @@ def licensepool_removed_from_work(target, value, initiator):
     """
     if target:
         target.external_index_needs_updating()
+        if target.id is not None:
+            target.record_change(WorkChange.AVAILABILITY)
 
 @event.listens_for(LicensePool, 'after_delete')
 def licensepool_deleted(mapper, connection, target):
@@ -304,3 +361,58 @@ def last_update_time_change(target, value, oldvalue, initator):
     information changes.
     """
     target.external_index_needs_updating()
+
+# Keep the WorkAvailability table in sync with the objects it
+# summarizes. This happens after each flush, so the changes are
+# visible to queries made later in the same transaction. Only changes
+# to these fields can change a WorkAvailability row -- in particular,
+# a loan or return that only changes LicensePool.licenses_available
+# doesn't trigger a refresh. Changes made with Core-level statements
+# aren't seen here; see the WorkAvailability docstring.
+
+WORK_AVAILABILITY_FIELDS = {
+    LicensePool: (
+        'work_id', 'collection_id', 'superceded', 'suppressed',
+        'licenses_owned', 'open_access', 'self_hosted', 'unlimited_access',
+    ),
+    Work: ('presentation_ready', 'presentation_edition_id', 'last_update_time'),
+    Edition: ('sort_title', 'sort_author'),
+}
+
+def _changed_fields(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+@event.listens_for(Session, 'after_flush')
+def refresh_work_availability(session, flush_context):
+    work_ids = set()
+    edition_ids = set()
+    identifier_ids = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, LicensePoolDeliveryMechanism):
+            if obj in session.new or obj in session.deleted:
+                identifier_ids.add(obj.identifier_id)
+            continue
+        fields = WORK_AVAILABILITY_FIELDS.get(type(obj))
+        if fields is None:
+            continue
+        if obj in session.dirty and not _changed_fields(obj, fields):
+            continue
+        if isinstance(obj, LicensePool):
+            work_ids.add(obj.work_id)
+            # The LicensePool may have moved away from another work.
+            work_ids.update(inspect(obj).attrs.work_id.history.deleted)
+        elif isinstance(obj, Work):
+            if obj not in session.deleted:
+                work_ids.add(obj.id)
+        elif obj not in session.new:
+            edition_ids.add(obj.id)
+
+    work_ids.discard(None)
+    edition_ids.discard(None)
+    identifier_ids.discard(None)
+    affected = WorkAvailability.affected_work_ids(
+        work_ids, edition_ids, identifier_ids
+    )
+    if affected is not None:
+        WorkAvailability.refresh(session.connection(), affected)
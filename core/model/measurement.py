@@ -145,29 +145,46 @@ class Measurement(Base):
     def overall_quality(cls, measurements, popularity_weight=0.3,
                         rating_weight=0.7, default_value=0):
         """Turn a bunch of measurements into an overall measure of quality."""
+        popularities = []
+        ratings = []
+        qualities = []
+        for m in measurements:
+            l = cls._quality_component(m.quantity_measured, popularities,
+                                       ratings, qualities)
+            l.append((m.normalized_value, m.weight))
+        return cls.combine_quality(
+            cls._average_normalized_value(popularities),
+            cls._average_normalized_value(ratings),
+            cls._average_normalized_value(qualities),
+            popularity_weight, rating_weight, default_value
+        )
+
+    @classmethod
+    def _quality_component(cls, quantity_measured, popularities, ratings,
+                           qualities):
+        """Decide which part of the overall quality a measurement
+        contributes to.
+        """
+        if quantity_measured == cls.RATING:
+            return ratings
+        elif quantity_measured == cls.QUALITY:
+            return qualities
+        # NOTE: This is assuming that everything in PERCENTILE_SCALES
+        # is an opaque measure of 'popularity'.
+        return popularities
+
+    @classmethod
+    def combine_quality(cls, popularity, rating, quality,
+                        popularity_weight=0.3, rating_weight=0.7,
+                        default_value=0):
+        """Combine average popularity, rating and quality scores (any
+        of which may be None) into an overall measure of quality.
+        """
         if popularity_weight + rating_weight != 1.0:
             raise ValueError(
                 "Popularity weight and rating weight must sum to 1! (%.2f + %.2f)" % (
                     popularity_weight, rating_weight)
         )
-        popularities = []
-        ratings = []
-        qualities = []
-        for m in measurements:
-            l = None
-            if m.quantity_measured == cls.RATING:
-                l = ratings
-            elif m.quantity_measured == cls.QUALITY:
-                l = qualities
-            else:
-                # NOTE: This is assuming that everything in PERCENTILE_SCALES
-                # is an opaque measure of 'popularity'.
-                l = popularities
-            if l is not None:
-                l.append(m)
-        popularity = cls._average_normalized_value(popularities)
-        rating = cls._average_normalized_value(ratings)
-        quality = cls._average_normalized_value(qualities)
         if popularity is None and rating is None and quality is None:
             # We have absolutely no idea about the quality of this work.
             return default_value
@@ -202,20 +219,55 @@ class Measurement(Base):
         return final
 
     @classmethod
-    def _average_normalized_value(cls, measurements):
+    def _average_normalized_value(cls, values):
+        """Find the weighted average of a list of (normalized value,
+        weight) 2-tuples, ignoring values that are None.
+        """
         num_measurements = 0
         measurement_total = 0
-        for m in measurements:
-            v = m.normalized_value
+        for v, weight in values:
             if v is None:
                 continue
-            num_measurements += m.weight
-            measurement_total += (v * m.weight)
+            num_measurements += weight
+            measurement_total += (v * weight)
         if num_measurements:
             return measurement_total / num_measurements
         else:
             return None
 
+    @classmethod
+    def normalize(cls, quantity_measured, data_source_name, value):
+        """Scale a measurement to the 0..1 range.
+
+        :return: The normalized value, or None if there's no way to
+            normalize this kind of measurement from this data source.
+        """
+        if value is None:
+            return None
+        elif data_source_name == DataSourceConstants.METADATA_WRANGLER:
+            # Data from the metadata wrangler comes in pre-normalized.
+            return value
+        elif (quantity_measured == cls.RATING
+              and data_source_name in cls.RATING_SCALES):
+            # Ratings need to be normalized from a scale that depends
+            # on the data source (e.g. Amazon's 1-5 stars) to a 0..1 scale.
+            scale_min, scale_max = cls.RATING_SCALES[data_source_name]
+            width = float(scale_max-scale_min)
+            value = value-scale_min
+            return value / width
+        elif quantity_measured in cls.PERCENTILE_SCALES:
+            # Other measured quantities need to be normalized using
+            # a percentile scale determined emperically.
+            by_data_source = cls.PERCENTILE_SCALES[quantity_measured]
+            if not data_source_name in by_data_source:
+                # We don't know how to normalize measurements from
+                # this data source. Ignore this data.
+                return None
+            percentiles = by_data_source[data_source_name]
+            position = bisect.bisect_left(percentiles, value)
+            return position * 0.01
+        return None
+
     @property
     def normalized_value(self):
         """Normalize a measured value, possibly using the rating scales in
@@ -226,29 +278,15 @@ class Measurement(Base):
             pass
         elif self.value is None:
             return None
-        elif self.data_source.name == DataSourceConstants.METADATA_WRANGLER:
-            # Data from the metadata wrangler comes in pre-normalized.
-            self._normalized_value = self.value
-        elif (self.quantity_measured == self.RATING
-              and self.data_source.name in self.RATING_SCALES):
-            # Ratings need to be normalized from a scale that depends
-            # on the data source (e.g. Amazon's 1-5 stars) to a 0..1 scale.
-            scale_min, scale_max = self.RATING_SCALES[self.data_source.name]
-            width = float(scale_max-scale_min)
-            value = self.value-scale_min
-            self._normalized_value = value / width
-        elif self.quantity_measured in self.PERCENTILE_SCALES:
-            # Other measured quantities need to be normalized using
-            # a percentile scale determined emperically.
-            by_data_source = self.PERCENTILE_SCALES[
-                self.quantity_measured
-            ]
-            if not self.data_source.name in by_data_source:
+        else:
+            normalized = self.normalize(
+                self.quantity_measured, self.data_source.name, self.value
+            )
+            if normalized is not None:
+                self._normalized_value = normalized
+            elif self.quantity_measured in self.PERCENTILE_SCALES:
                 # We don't know how to normalize measurements from
                 # this data source. Ignore this data.
                 return None
-            percentiles = by_data_source[self.data_source.name]
-            position = bisect.bisect_left(percentiles, self.value)
-            self._normalized_value = position * 0.01
 
         return self._normalized_value
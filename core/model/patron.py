@@ -671,6 +671,11 @@ class Annotation(Base):
     content = Column(Unicode)
     target = Column(Unicode)
 
+    # The target and content, compacted against the annotation JSON-LD
+    # context, so they don't have to be compacted on every request.
+    compacted_target = Column(Unicode)
+    compacted_content = Column(Unicode)
+
     @classmethod
     def get_one_or_create(self, _db, patron, *args, **kwargs):
         """Find or create an Annotation, but only if the patron has
@@ -688,6 +693,7 @@ class Annotation(Base):
     def set_inactive(self):
         self.active = False
         self.content = None
+        self.compacted_content = None
         self.timestamp = utc_now()
 
 class PatronProfileStorage(ProfileStorage):
@@ -1,25 +1,38 @@
 # encoding: utf-8
-# WorkGenre, Work
+# WorkGenre, Work, WorkChange, WorkAvailability
 
+import datetime
 import logging
-from collections import Counter
+from collections import (
+    Counter,
+    defaultdict,
+)
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Unicode,
+    column,
+    values,
+)
+from sqlalchemy.dialects.postgresql import (
+    INT4RANGE,
+    insert,
 )
-from sqlalchemy.dialects.postgresql import INT4RANGE
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import (
     contains_eager,
+    joinedload,
     relationship,
+    selectinload,
 )
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import (
@@ -29,6 +42,8 @@ from sqlalchemy.sql.expression import (
     join,
     literal_column,
     case,
+    exists,
+    tuple_,
 )
 from sqlalchemy.sql.functions import func
 
@@ -45,7 +60,11 @@ from .coverage import (
 )
 from .datasource import DataSource
 from .edition import Edition
-from .identifier import Identifier
+from .identifier import (
+    EquivalentIdentifierCache,
+    Identifier,
+    PresentationPrefetch,
+)
 from .measurement import Measurement
 from . import (
     Base,
@@ -363,6 +382,58 @@ class Work(Base):
                     Classification.subject)
         return qu.filter(Subject.checked==False).order_by(Subject.id)
 
+    @classmethod
+    def for_subjects(cls, _db, subject_ids, policy=None):
+        """Find all Works whose LicensePools have an Identifier that is
+        classified under one of the given Subjects, either directly or
+        through an equivalent Identifier.
+
+        :param policy: A PresentationCalculationPolicy explaining how
+            far to follow equivalencies. This should be the policy used
+            to classify the Works, so that every Work whose
+            classification might use one of the Subjects is found.
+        """
+        from .classification import Classification
+        from .licensing import LicensePool
+
+        policy = policy or PresentationCalculationPolicy()
+
+        # The classified identifiers and everything equivalent to them
+        # (including themselves), found in the database.
+        identifier_ids = Identifier.recursively_equivalent_identifier_ids_query(
+            Classification.identifier_id, policy=policy
+        ).where(Classification.subject_id.in_(subject_ids))
+        qu = _db.query(Work).join(Work.license_pools).filter(
+            LicensePool.identifier_id.in_(identifier_ids)
+        )
+        return qu.distinct()
+
+    @classmethod
+    def queue_classification_for_subjects(cls, _db, subject_ids,
+                                          batch_size=1000, policy=None):
+        """Register every Work classified under one of the given Subjects
+        with the WorkClassificationCoverageProvider.
+
+        The Works are found and registered by the database, `batch_size`
+        Subjects at a time.
+
+        :param policy: The PresentationCalculationPolicy the Works will
+            be classified with. See `for_subjects`.
+        :return: The number of registrations. A Work classified under
+            Subjects in more than one batch is counted once per batch.
+        """
+        subject_ids = list(subject_ids)
+        registered = 0
+        for start in range(0, len(subject_ids), batch_size):
+            work_ids = cls.for_subjects(
+                _db, subject_ids[start:start+batch_size], policy=policy
+            ).with_entities(Work.id)
+            registered += WorkCoverageRecord.bulk_add_for_work_ids(
+                _db, work_ids, WorkCoverageRecord.CLASSIFY_OPERATION,
+                status=CoverageRecord.REGISTERED
+            )
+        return registered
+
     @classmethod
     def _potential_open_access_works_for_permanent_work_id(
             cls, _db, pwid, medium, language
@@ -871,6 +942,95 @@ class Work(Base):
         )
         return changed
 
+    @classmethod
+    def prefetch_presentation(cls, _db, works, policy=None):
+        """Load everything calculate_presentation() will need for a
+        batch of Works, using a handful of queries instead of several
+        for each Work.
+
+        :param policy: The PresentationCalculationPolicy that will be
+            used to calculate presentation.
+        :return: A PresentationPrefetch. Presentation should be
+            calculated inside a `with` block that uses it.
+        """
+        from .licensing import LicensePool
+        policy = policy or PresentationCalculationPolicy()
+        work_ids = [work.id for work in works]
+        if not work_ids:
+            return PresentationPrefetch(_db, [])
+
+        # Load the LicensePools, and the Editions and Contributors
+        # that might become presentation Editions, for every Work.
+        pools = selectinload(cls.license_pools)
+        contributors = selectinload(Edition.contributions).joinedload(
+            Contribution.contributor
+        )
+        works = _db.query(Work).filter(Work.id.in_(work_ids)).options(
+            pools.joinedload(LicensePool.data_source),
+            pools.joinedload(LicensePool.collection),
+            pools.joinedload(LicensePool.identifier).selectinload(
+                Identifier.primarily_identifies
+            ).options(
+                joinedload(Edition.primary_identifier),
+                joinedload(Edition.data_source),
+                contributors,
+            ),
+            pools.joinedload(LicensePool.presentation_edition).options(
+                joinedload(Edition.primary_identifier), contributors,
+            ),
+            joinedload(cls.presentation_edition).options(
+                joinedload(Edition.primary_identifier), contributors,
+            ),
+        ).all()
+
+        # Resolve all the equivalent identifiers at once, and keep
+        # the results where calculate_presentation() will find them.
+        cache = EquivalentIdentifierCache.active()
+        new_cache = None
+        if cache is None:
+            cache = new_cache = EquivalentIdentifierCache()
+
+        identifier_ids = set()
+        if policy.classify or policy.choose_summary or policy.calculate_quality:
+            direct_identifier_ids = set()
+            for work in works:
+                direct_identifier_ids.update(work._direct_identifier_ids)
+            identifier_ids.update(direct_identifier_ids)
+            for equivalents in cache.resolve(
+                _db, direct_identifier_ids, policy
+            ).values():
+                identifier_ids.update(equivalents)
+
+        if policy.choose_cover:
+            # Covers are chosen from identifiers up to five levels
+            # away from each potential presentation Edition's primary
+            # identifier; see Edition.best_cover_within_distance.
+            cover_policy = PresentationCalculationPolicy(
+                equivalent_identifier_levels=5,
+                equivalent_identifier_cutoff=policy.equivalent_identifier_cutoff,
+                equivalent_identifier_threshold=policy.equivalent_identifier_threshold,
+            )
+            edition_identifier_ids = set()
+            for work in works:
+                editions = [work.presentation_edition]
+                for pool in work.license_pools:
+                    # A new presentation Edition for a LicensePool
+                    # gets the LicensePool's identifier.
+                    edition_identifier_ids.add(pool.identifier_id)
+                    editions.append(pool.presentation_edition)
+                edition_identifier_ids.update(
+                    e.primary_identifier_id for e in editions if e
+                )
+            identifier_ids.update(edition_identifier_ids)
+            for equivalents in cache.resolve(
+                _db, edition_identifier_ids, cover_policy
+            ).values():
+                identifier_ids.update(equivalents)
+
+        return PresentationPrefetch(
+            _db, identifier_ids, equivalents_cache=new_cache
+        )
+
     def _get_default_audience(self):
         """Return the default audience.
 
@@ -967,20 +1127,9 @@ class Work(Base):
             # license source. Commercial data sources have higher
             # default quality, because it's presumed that a librarian
             # put some work into deciding which books to buy.
-            default_quality = None
-            for source in licensed_data_sources:
-                q = self.default_quality_by_data_source.get(
-                    source.name, None
-                )
-                if q is None:
-                    continue
-                if default_quality is None or q > default_quality:
-                    default_quality = q
-
-            if not default_quality:
-                # if we still haven't found anything of a quality measurement,
-                # then at least make it an integer zero, not none.
-                default_quality = 0
+            default_quality = self.default_quality(
+                [source.name for source in licensed_data_sources]
+            )
             self.calculate_quality(
                 all_identifier_ids, default_quality
             )
@@ -1006,6 +1155,7 @@ class Work(Base):
             # changed, not the last time we checked whether or not to
             # change it.
             self.last_update_time = utc_now()
+            self.record_change(WorkChange.PRESENTATION, self.last_update_time)
 
         if changed or policy.regenerate_opds_entries:
             self.calculate_opds_entries()
@@ -1217,6 +1367,14 @@ class Work(Base):
             WorkCoverageRecord.UPDATE_SEARCH_INDEX_OPERATION
         )
 
+    def record_change(self, kind, as_of=None):
+        """Add an entry for this work to the WorkChange log.
+
+        :param kind: One of the WorkChange.KINDS.
+        :param as_of: The time the change happened. Defaults to now.
+        """
+        return WorkChange.record(self, kind, as_of)
+
     def update_external_index(self, client, add_coverage_record=True):
         """Create a WorkCoverageRecord so that this work's
         entry in the search index can be modified or deleted.
@@ -1258,6 +1416,8 @@ class Work(Base):
         instead, which runs those checks.
         """
         as_of = as_of or utc_now()
+        if not self.presentation_ready:
+            self.record_change(WorkChange.PRESENTATION, as_of)
         self.presentation_ready = True
         self.presentation_ready_exception = None
         self.presentation_ready_attempt = as_of
@@ -1284,6 +1444,9 @@ class Work(Base):
             or not self.language
             or not self.presentation_edition.medium
         ):
+            if self.presentation_ready:
+                # The work is being withdrawn.
+                self.record_change(WorkChange.PRESENTATION)
             self.presentation_ready = False
             # The next time the search index WorkCoverageRecords are
             # processed, this work will be removed from the search
@@ -1293,6 +1456,25 @@ class Work(Base):
         else:
             self.set_presentation_ready(search_index_client=search_index_client)
 
+    @classmethod
+    def default_quality(cls, data_source_names):
+        """The quality of a work in the absence of any measurements,
+        given the names of the data sources that license it.
+        """
+        default_quality = None
+        for name in data_source_names:
+            q = cls.default_quality_by_data_source.get(name, None)
+            if q is None:
+                continue
+            if default_quality is None or q > default_quality:
+                default_quality = q
+
+        if not default_quality:
+            # if we still haven't found anything of a quality measurement,
+            # then at least make it an integer zero, not none.
+            default_quality = 0
+        return default_quality
+
     def calculate_quality(self, identifier_ids, default_quality=0):
         _db = Session.object_session(self)
         # Relevant Measurements are direct measurements of popularity
@@ -1303,10 +1485,15 @@ class Work(Base):
             Measurement.POPULARITY, Measurement.QUALITY, Measurement.RATING
         ])
         quantities = quantities.union(list(Measurement.PERCENTILE_SCALES.keys()))
-        measurements = _db.query(Measurement).filter(
-            Measurement.identifier_id.in_(identifier_ids)).filter(
-                Measurement.is_most_recent==True).filter(
-                    Measurement.quantity_measured.in_(quantities)).all()
+        measurements = None
+        prefetch = PresentationPrefetch.active()
+        if prefetch:
+            measurements = prefetch.measurements(identifier_ids)
+        if measurements is None:
+            measurements = _db.query(Measurement).filter(
+                Measurement.identifier_id.in_(identifier_ids)).filter(
+                    Measurement.is_most_recent==True).filter(
+                        Measurement.quantity_measured.in_(quantities)).all()
 
         self.quality = Measurement.overall_quality(
             measurements, default_value=default_quality)
@@ -1314,6 +1501,158 @@ class Work(Base):
             self, operation=WorkCoverageRecord.QUALITY_OPERATION
         )
 
+    @classmethod
+    def bulk_calculate_quality(cls, _db, collection=None, batch_size=1000,
+                               policy=None):
+        """Recalculate the quality of every Work, or every Work in a
+        Collection, without loading the Works themselves.
+
+        This gives the same result as calculate_quality() does during
+        presentation calculation. Measurements are loaded for a batch
+        of works at a time, and each batch's new qualities are written
+        with a single UPDATE. Like calculate_quality(), this records
+        that every Work's quality was calculated. Works whose quality
+        changed are flagged for reindexing.
+
+        :param policy: A PresentationCalculationPolicy explaining how
+            to find a Work's equivalent identifiers.
+        :return: The number of Works whose quality changed.
+        """
+        from .licensing import LicensePool
+        policy = policy or PresentationCalculationPolicy()
+        quantities = PresentationPrefetch.QUALITY_QUANTITIES
+
+        works = select(Work.id, Work.quality).order_by(Work.id).limit(
+            batch_size
+        )
+        if collection is not None:
+            works = works.where(Work.id.in_(
+                select(LicensePool.work_id).where(
+                    LicensePool.collection_id==collection.id
+                )
+            ))
+
+        changed = 0
+        last_id = 0
+        while True:
+            batch = _db.execute(works.where(Work.id > last_id)).fetchall()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            work_ids = [work_id for work_id, quality in batch]
+
+            # Find each work's identifiers and licensing data sources.
+            direct_identifier_ids = defaultdict(set)
+            data_source_names = defaultdict(set)
+            pools = _db.execute(
+                select(
+                    LicensePool.work_id, LicensePool.identifier_id,
+                    DataSource.name
+                ).select_from(
+                    join(LicensePool, DataSource,
+                         LicensePool.data_source_id==DataSource.id)
+                ).where(LicensePool.work_id.in_(work_ids))
+            )
+            for work_id, identifier_id, data_source_name in pools:
+                if identifier_id is not None:
+                    direct_identifier_ids[work_id].add(identifier_id)
+                if data_source_name != DataSourceConstants.GUTENBERG:
+                    data_source_names[work_id].add(data_source_name)
+
+            equivalents = Identifier.recursively_equivalent_identifier_ids(
+                _db, set().union(*direct_identifier_ids.values()),
+                policy=policy
+            )
+            identifier_ids = {}
+            for work_id, ids in direct_identifier_ids.items():
+                identifier_ids[work_id] = set(ids)
+                for identifier_id in ids:
+                    identifier_ids[work_id].update(
+                        equivalents.get(identifier_id, [])
+                    )
+
+            # Load the relevant measurements of all those identifiers,
+            # normalized the way Measurement.normalized_value does it.
+            measurements = defaultdict(list)
+            rows = _db.execute(
+                select(
+                    Measurement.identifier_id, Measurement.quantity_measured,
+                    DataSource.name, Measurement.value,
+                    Measurement._normalized_value, Measurement.weight,
+                ).select_from(
+                    join(Measurement, DataSource,
+                         Measurement.data_source_id==DataSource.id)
+                ).where(
+                    Measurement.identifier_id.in_(
+                        set().union(*identifier_ids.values())
+                    )
+                ).where(
+                    Measurement.is_most_recent==True
+                ).where(
+                    Measurement.quantity_measured.in_(quantities)
+                )
+            )
+            for (identifier_id, quantity, data_source_name, value,
+                 normalized, weight) in rows:
+                if not normalized and value is not None:
+                    calculated = Measurement.normalize(
+                        quantity, data_source_name, value
+                    )
+                    if calculated is not None:
+                        normalized = calculated
+                    elif quantity in Measurement.PERCENTILE_SCALES:
+                        normalized = None
+                elif value is None and not normalized:
+                    normalized = None
+                measurements[identifier_id].append(
+                    (quantity, normalized, weight)
+                )
+
+            new_qualities = []
+            for work_id, old_quality in batch:
+                popularities = []
+                ratings = []
+                qualities = []
+                for identifier_id in identifier_ids.get(work_id, []):
+                    for quantity, normalized, weight in measurements[identifier_id]:
+                        l = Measurement._quality_component(
+                            quantity, popularities, ratings, qualities
+                        )
+                        l.append((normalized, weight))
+                quality = Measurement.combine_quality(
+                    Measurement._average_normalized_value(popularities),
+                    Measurement._average_normalized_value(ratings),
+                    Measurement._average_normalized_value(qualities),
+                    default_value=cls.default_quality(
+                        data_source_names[work_id]
+                    )
+                )
+                # Work.quality is only stored to three decimal places.
+                quality = round(quality, 3)
+                if old_quality is None or float(old_quality) != quality:
+                    new_qualities.append((work_id, quality))
+
+            if new_qualities:
+                new_quality = values(
+                    column('work_id', Integer), column('quality', Float),
+                    name='new_quality'
+                ).data(new_qualities)
+                _db.execute(
+                    Work.__table__.update().values(
+                        quality=new_quality.c.quality
+                    ).where(Work.id==new_quality.c.work_id)
+                )
+                WorkCoverageRecord.bulk_add_for_work_ids(
+                    _db, [work_id for work_id, q in new_qualities],
+                    WorkCoverageRecord.UPDATE_SEARCH_INDEX_OPERATION,
+                    status=CoverageRecord.REGISTERED
+                )
+                changed += len(new_qualities)
+            WorkCoverageRecord.bulk_add_for_work_ids(
+                _db, work_ids, WorkCoverageRecord.QUALITY_OPERATION
+            )
+        return changed
+
     def assign_genres(self, identifier_ids, default_fiction=False, default_audience=Classifier.AUDIENCE_ADULT):
         """Set classification information for this work based on the
         subquery to get equivalent identifiers.
@@ -1327,9 +1666,14 @@ class Work(Base):
         old_target_age = self.target_age
 
         _db = Session.object_session(self)
-        classifications = Identifier.classifications_for_identifier_ids(
-            _db, identifier_ids
-        )
+        classifications = None
+        prefetch = PresentationPrefetch.active()
+        if prefetch:
+            classifications = prefetch.classifications(identifier_ids)
+        if classifications is None:
+            classifications = Identifier.classifications_for_identifier_ids(
+                _db, identifier_ids
+            )
         for classification in classifications:
             classifier.add(classification)
 
@@ -1885,4 +2229,394 @@ class Work(Base):
                 pass
         if search_index is not None:
             search_index.remove_work(self)
+        self.record_change(WorkChange.DELETION)
         _db.delete(self)
+
+
+class WorkChange(Base):
+    """An append-only log of changes to Works.
+
+    Processes that need to find out which works have changed since
+    they last ran, such as the creation of delta MARC files, can read
+    this log instead of searching for recently updated works.
+
+    The log doesn't refer to a work through a foreign key, so the
+    deletion of a work can be recorded.
+    """
+    __tablename__ = 'workchanges'
+
+    PRESENTATION = 'presentation'
+    AVAILABILITY = 'availability'
+    DELETION = 'deletion'
+    KINDS = [PRESENTATION, AVAILABILITY, DELETION]
+
+    id = Column(BigInteger, primary_key=True)
+    work_id = Column(Integer, nullable=False, index=True)
+    change_time = Column(DateTime(timezone=True), nullable=False, index=True)
+    change_kind = Column(
+        Enum(*KINDS, name='work_change_kind'), nullable=False
+    )
+
+    # Once a work is deleted there's no way to find out which book it
+    # was, so deletions also record the URN of the work's identifier.
+    identifier_urn = Column(Unicode)
+
+    def __repr__(self):
+        return '<WorkChange: work_id=%s change_kind=%s change_time=%s>' % (
+            self.work_id, self.change_kind, self.change_time
+        )
+
+    @classmethod
+    def record(cls, work, kind, as_of=None):
+        """Add an entry for `work` to the log.
+
+        :param work: A Work.
+        :param kind: One of the KINDS.
+        :param as_of: The time the change happened. Defaults to now.
+        :return: A WorkChange.
+        """
+        _db = Session.object_session(work)
+        if work.id is None:
+            flush(_db)
+        identifier_urn = None
+        if kind == cls.DELETION:
+            identifier = None
+            if work.presentation_edition:
+                identifier = work.presentation_edition.primary_identifier
+            if not identifier and work.license_pools:
+                identifier = work.license_pools[0].identifier
+            if identifier:
+                identifier_urn = identifier.urn
+        change = cls(
+            work_id=work.id, change_time=as_of or utc_now(),
+            change_kind=kind, identifier_urn=identifier_urn
+        )
+        _db.add(change)
+        return change
+
+    @classmethod
+    def changes(cls, _db, start_time, end_time=None):
+        """Summarize the changes made to works during a time range.
+
+        :param start_time: Only consider changes made at or after this time.
+        :param end_time: Only consider changes made before this time.
+        :return: A dictionary mapping the ID of each work that changed
+            to a 2-tuple (time of the latest change, identifier URN).
+            The URN is only known if the work was deleted.
+        """
+        qu = _db.query(
+            cls.work_id, func.max(cls.change_time),
+            func.max(cls.identifier_urn)
+        ).filter(cls.change_time >= start_time)
+        if end_time is not None:
+            qu = qu.filter(cls.change_time < end_time)
+        qu = qu.group_by(cls.work_id)
+        return dict(
+            (work_id, (change_time, urn))
+            for work_id, change_time, urn in qu
+        )
+
+
+class WorkAvailability(Base):
+    """A denormalized summary of a Work's deliverable LicensePools in
+    one Collection.
+
+    There is a row for every (work, collection) pair where the work is
+    presentation-ready and the collection has an unsuperseded
+    LicensePool for it that has a delivery mechanism and some kind of
+    license. Database-backed work lists filter and sort on this table
+    instead of checking every LicensePool's delivery mechanisms, and
+    can paginate through it using its indexes.
+
+    Rows are kept up to date as LicensePools, delivery mechanisms,
+    Works and presentation Editions change through the ORM; see
+    `refresh_work_availability` in listeners.py. Code that changes
+    those rows with Core-level INSERT, UPDATE or DELETE statements
+    bypasses the listener, and must call `WorkAvailability.refresh`
+    for the affected works itself. This includes changes to
+    LicensePool's work, collection, superceded, suppressed,
+    licenses_owned, open_access, self_hosted or unlimited_access
+    fields; to Work's presentation_ready, presentation_edition or
+    last_update_time; to an Edition's sort_title or sort_author; and
+    adding or removing a LicensePoolDeliveryMechanism. Data migrations
+    that do this should finish with a full `WorkAvailability.refresh`.
+
+    The number of licenses available is deliberately not stored here:
+    it changes on every loan and return, and the availability facets
+    check it on the LicensePool.
+    """
+    __tablename__ = 'workavailability'
+
+    # Sort keys are never NULL, so that a page can be found by
+    # comparing them to the last item on the previous page.
+    NO_SORT_VALUE = ''
+    NO_UPDATE_TIME = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+    work_id = Column(
+        Integer, ForeignKey('works.id', ondelete='CASCADE'), primary_key=True
+    )
+    collection_id = Column(
+        Integer, ForeignKey('collections.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+
+    # True if every one of the LicensePools is suppressed. The other
+    # fields only take unsuppressed LicensePools into account.
+    suppressed = Column(Boolean, nullable=False, default=False)
+    licenses_owned = Column(Integer, nullable=False, default=0)
+    open_access = Column(Boolean, nullable=False, default=False)
+    self_hosted = Column(Boolean, nullable=False, default=False)
+    unlimited_access = Column(Boolean, nullable=False, default=False)
+
+    # Copied from the Work and its presentation Edition.
+    sort_title = Column(Unicode, nullable=False, default=NO_SORT_VALUE)
+    sort_author = Column(Unicode, nullable=False, default=NO_SORT_VALUE)
+    last_update_time = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(
+            'ix_workavailability_collection_sort_author',
+            collection_id, sort_author, sort_title, work_id
+        ),
+        Index(
+            'ix_workavailability_collection_sort_title',
+            collection_id, sort_title, sort_author, work_id
+        ),
+        Index(
+            'ix_workavailability_collection_last_update_time',
+            collection_id, last_update_time, sort_author, sort_title, work_id
+        ),
+    )
+
+    def __repr__(self):
+        return '<WorkAvailability: work_id=%s collection_id=%s>' % (
+            self.work_id, self.collection_id
+        )
+
+    @classmethod
+    def calculate(cls, work_ids=None):
+        """Build a SELECT statement that calculates rows of this table.
+
+        :param work_ids: Only calculate rows for these works. This may
+            be a list or a SELECT statement. By default, every work is
+            included.
+        """
+        from .licensing import (
+            LicensePool,
+            LicensePoolDeliveryMechanism,
+        )
+        LPDM = LicensePoolDeliveryMechanism
+        has_delivery_mechanism = exists().where(
+            and_(LPDM.data_source_id==LicensePool.data_source_id,
+                 LPDM.identifier_id==LicensePool.identifier_id)
+        )
+        clauses = [
+            Work.presentation_ready == True,
+            LicensePool.superceded == False,
+            or_(
+                LicensePool.licenses_owned > 0,
+                LicensePool.open_access,
+                LicensePool.unlimited_access,
+                LicensePool.self_hosted
+            ),
+            has_delivery_mechanism,
+        ]
+        if work_ids is not None:
+            clauses.append(LicensePool.work_id.in_(work_ids))
+        unsuppressed = LicensePool.suppressed == False
+
+        return select(
+            LicensePool.work_id,
+            LicensePool.collection_id,
+            func.coalesce(func.bool_and(LicensePool.suppressed), False),
+            func.coalesce(
+                func.sum(LicensePool.licenses_owned).filter(unsuppressed), 0
+            ),
+            func.coalesce(
+                func.bool_or(LicensePool.open_access).filter(unsuppressed),
+                False
+            ),
+            func.coalesce(
+                func.bool_or(LicensePool.self_hosted).filter(unsuppressed),
+                False
+            ),
+            func.coalesce(
+                func.bool_or(LicensePool.unlimited_access).filter(unsuppressed),
+                False
+            ),
+            func.coalesce(Edition.sort_title, cls.NO_SORT_VALUE),
+            func.coalesce(Edition.sort_author, cls.NO_SORT_VALUE),
+            func.coalesce(Work.last_update_time, cls.NO_UPDATE_TIME),
+        ).select_from(
+            join(
+                LicensePool, Work, LicensePool.work_id==Work.id
+            ).outerjoin(
+                Edition, Work.presentation_edition_id==Edition.id
+            )
+        ).where(
+            and_(*clauses)
+        ).group_by(
+            LicensePool.work_id, LicensePool.collection_id,
+            Edition.sort_title, Edition.sort_author, Work.last_update_time
+        )
+
+    @classmethod
+    def affected_work_ids(cls, work_ids=None, edition_ids=None,
+                          identifier_ids=None):
+        """Build a SELECT statement that finds the works whose rows may
+        have changed.
+
+        :param work_ids: Works that changed, or whose LicensePools changed.
+        :param edition_ids: Editions whose sort keys changed.
+        :param identifier_ids: Identifiers that gained or lost a
+            delivery mechanism.
+        :return: A SELECT statement, or None if nothing could have changed.
+        """
+        from .licensing import LicensePool
+        clauses = []
+        if work_ids:
+            clauses.append(Work.id.in_(work_ids))
+        if edition_ids:
+            clauses.append(Work.presentation_edition_id.in_(edition_ids))
+        if identifier_ids:
+            clauses.append(Work.id.in_(
+                select(LicensePool.work_id).where(
+                    LicensePool.identifier_id.in_(identifier_ids)
+                )
+            ))
+        if not clauses:
+            return None
+        return select(Work.id).where(or_(*clauses))
+
+    @classmethod
+    def refresh(cls, connection, work_ids=None):
+        """Recalculate the rows for some works.
+
+        :param connection: A database Connection or Session.
+        :param work_ids: A list of work IDs or a SELECT statement
+            yielding work IDs. By default, the whole table is rebuilt.
+        """
+        table = cls.__table__
+        delete = table.delete()
+        if work_ids is not None:
+            delete = delete.where(cls.work_id.in_(work_ids))
+        connection.execute(delete)
+
+        columns = [
+            'work_id', 'collection_id', 'suppressed', 'licenses_owned',
+            'open_access', 'self_hosted', 'unlimited_access', 'sort_title',
+            'sort_author', 'last_update_time',
+        ]
+        upsert = insert(table).from_select(columns, cls.calculate(work_ids))
+
+        # Another transaction may be refreshing the same work; its rows
+        # won't have been visible to our DELETE.
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['work_id', 'collection_id'],
+            set_=dict(
+                (column, getattr(upsert.excluded, column))
+                for column in columns[2:]
+            )
+        )
+        connection.execute(upsert)
+
+    @classmethod
+    def restrict_to_ready_deliverable_works(
+        cls, query, collection_ids=None, show_suppressed=False
+    ):
+        """Restrict a query to show only presentation-ready works present in
+        an appropriate collection which the default client can fulfill.
+
+        This has the same effect as
+        Collection.restrict_to_ready_deliverable_works, but most of the
+        work has already been done. The query must have an active join
+        against LicensePool, Edition and this table; see
+        DatabaseBackedWorkList.base_query.
+
+        :param show_suppressed: Include titles that have nothing but
+            suppressed LicensePools.
+        """
+        from .configuration import ConfigurationSetting
+        from .licensing import LicensePool
+
+        # The WorkAvailability row says the work is deliverable from
+        # the collection. Only the LicensePools that make it so
+        # should be loaded along with the Work.
+        query = query.filter(
+            or_(
+                LicensePool.licenses_owned > 0,
+                LicensePool.open_access,
+                LicensePool.unlimited_access,
+                LicensePool.self_hosted
+            )
+        )
+        if not show_suppressed:
+            query = query.filter(
+                cls.suppressed==False, LicensePool.suppressed==False
+            )
+
+        # Some sources of audiobooks may be excluded because the
+        # server can't fulfill them or the expected client can't play
+        # them.
+        _db = query.session
+        excluded = ConfigurationSetting.excluded_audio_data_sources(_db)
+        if excluded:
+            audio_excluded_ids = [
+                DataSource.lookup(_db, x).id for x in excluded
+            ]
+            query = query.filter(
+                or_(Edition.medium != Edition.AUDIO_MEDIUM,
+                    ~LicensePool.data_source_id.in_(audio_excluded_ids))
+            )
+
+        if collection_ids is not None:
+            query = query.filter(cls.collection_id.in_(collection_ids))
+        return query
+
+    @classmethod
+    def sort_key(cls, work, fields):
+        """Find the values that place `work` in a list sorted by `fields`.
+
+        :param fields: A list of columns from this table, or Work.id.
+        :return: A list of JSON-serializable values.
+        """
+        edition = work.presentation_edition
+        values = []
+        for field in fields:
+            key = field.key
+            if key in ('id', 'work_id'):
+                value = work.id
+            elif key == 'last_update_time':
+                value = (work.last_update_time or cls.NO_UPDATE_TIME).isoformat()
+            else:
+                value = (
+                    getattr(edition, key, None) if edition else None
+                ) or cls.NO_SORT_VALUE
+            values.append(value)
+        return values
+
+    @classmethod
+    def after_sort_key_clause(cls, fields, values, first_ascending=True):
+        """Build a clause that finds the items that come after `values` in
+        a list sorted by `fields`.
+
+        Only the first field may be sorted in descending order, which
+        matches DatabaseBackedFacets.order_by().
+        """
+        values = [
+            datetime.datetime.fromisoformat(value)
+            if field.key == 'last_update_time' and isinstance(value, str)
+            else value
+            for field, value in zip(fields, values)
+        ]
+        if first_ascending:
+            return tuple_(*fields) > tuple_(*values)
+        first, rest = fields[0], fields[1:]
+        first_value, rest_values = values[0], values[1:]
+        clause = first < first_value
+        if rest:
+            clause = or_(
+                clause,
+                and_(first == first_value, tuple_(*rest) > tuple_(*rest_values))
+            )
+        return clause
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import logging
 import traceback
 from sqlalchemy.orm import defer
@@ -18,20 +19,26 @@ from .model import (
     CoverageRecord,
     Credential,
     CustomListEntry,
+    DRMDeviceIdentifier,
     Edition,
     Identifier,
     LicensePool,
     Measurement,
     Patron,
     PresentationCalculationPolicy,
+    SessionManager,
     Subject,
     Timestamp,
     Work,
+    WorkChange,
+    WorkCoverageRecord,
+    WorkGenre,
     get_one,
     get_one_or_create,
 )
 from .model.configuration import ConfigurationSetting
 from .util.datetime_helpers import utc_now
+from .util.worker_pools import DatabasePool
 
 
 class CollectionMonitorLogger(logging.LoggerAdapter):
@@ -687,21 +694,73 @@ class MakePresentationReadyMonitor(NotPresentationReadyWorkSweepMonitor):
     ensure_coverage() for each of a list of CoverageProviders. If all
     the ensure_coverage() calls succeed, presentation of the work is
     calculated and the work is marked presentation ready.
+
+    If the monitor has more than one worker, each batch of works is
+    covered by all of the CoverageProviders at once, each in its own
+    database session, so a work waits for its slowest CoverageProvider
+    rather than for all of them in turn.
     """
     SERVICE_NAME = "Make Works Presentation Ready"
 
-    def __init__(self, _db, coverage_providers, collection=None):
+    def __init__(self, _db, coverage_providers, collection=None,
+                 worker_size=None, session_factory=None):
+        """Constructor.
+
+        :param worker_size: Run this many ensure_coverage() calls at
+            once. By default, the CoverageProviders are run one after
+            another, in this monitor's database session.
+        :param session_factory: Creates the database sessions used by
+            the workers. By default the sessions use the same database
+            as `_db`.
+        """
         super(MakePresentationReadyMonitor, self).__init__(_db, collection)
         self.coverage_providers = coverage_providers
         self.policy = PresentationCalculationPolicy(
             choose_edition=False
         )
+        self.worker_size = worker_size or 1
+        if self.worker_size > 1 and not session_factory:
+            session_factory = SessionManager.sessionmaker(session=_db)
+        self.session_factory = session_factory
 
     def run(self):
         """Before doing anything, consolidate works."""
         LicensePool.consolidate_works(self._db)
         return super(MakePresentationReadyMonitor, self).run()
 
+    def process_items(self, works):
+        """Make a batch of Works presentation-ready."""
+        if self.worker_size <= 1:
+            return super(MakePresentationReadyMonitor, self).process_items(
+                works
+            )
+
+        exceptions = dict()
+        identifiers = dict()
+        for work in works:
+            try:
+                identifiers[work] = self.identifier_for(work)
+            except Exception as e:
+                exceptions[work] = self.exception_message(work, e)
+
+        results = self.ensure_coverage_concurrently(
+            list(identifiers.values())
+        )
+
+        # The CoverageProviders may have created LicensePools that
+        # need Works.
+        LicensePool.consolidate_works(self._db)
+
+        for work in works:
+            exception = exceptions.get(work)
+            if work in identifiers:
+                try:
+                    self.check_results(identifiers[work], results)
+                except Exception as e:
+                    exception = self.exception_message(work, e)
+            self.finish(work, exception)
+            self.log.log(self.COMPLETION_LOG_LEVEL, "Completed %r", work)
+
     def process_item(self, work):
         """Do the work necessary to make one Work presentation-ready,
         and handle exceptions.
@@ -710,14 +769,25 @@ class MakePresentationReadyMonitor(NotPresentationReadyWorkSweepMonitor):
 
         try:
             self.prepare(work)
-        except CoverageProvidersFailed as e:
-            exception = "Provider(s) failed: %s" % e
         except Exception as e:
-            self.log.error(
-                "Exception processing work %r", work, exc_info=e
-            )
-            exception = str(e)
+            exception = self.exception_message(work, e)
+        self.finish(work, exception)
 
+    def exception_message(self, work, e):
+        """Describe the exception that kept a Work from becoming
+        presentation-ready.
+        """
+        if isinstance(e, CoverageProvidersFailed):
+            return "Provider(s) failed: %s" % e
+        self.log.error(
+            "Exception processing work %r", work, exc_info=e
+        )
+        return str(e)
+
+    def finish(self, work, exception):
+        """Either note why a Work couldn't be made presentation-ready, or
+        make it presentation-ready.
+        """
         if exception:
             # Unlike with most Monitors, an exception is not a good
             # reason to stop doing our job. Note it inside the Work
@@ -735,21 +805,95 @@ class MakePresentationReadyMonitor(NotPresentationReadyWorkSweepMonitor):
             presentation-ready because one or more CoverageProviders
             failed.
         """
+        identifier = self.identifier_for(work)
+        failures = []
+        for provider in self.providers_for(identifier):
+            coverage_record = provider.ensure_coverage(identifier)
+            if self.coverage_failed(coverage_record):
+                # This provider has failed.
+                failures.append(provider)
+        if failures:
+            raise CoverageProvidersFailed(failures)
+        return failures
+
+    def identifier_for(self, work):
+        """Find the Identifier that needs coverage for a Work."""
         edition = work.presentation_edition
         if not edition:
             work = work.calculate_presentation()
-        identifier = edition.primary_identifier
-        overall_success = True
-        failures = []
+        return edition.primary_identifier
+
+    def providers_for(self, identifier):
+        """Find the CoverageProviders that can cover an Identifier."""
         for provider in self.coverage_providers:
             covered_types = provider.input_identifier_types
             if covered_types and identifier.type in covered_types:
-                coverage_record = provider.ensure_coverage(identifier)
-                if (not isinstance(coverage_record, CoverageRecord)
-                    or coverage_record.status != CoverageRecord.SUCCESS
-                    or coverage_record.exception is not None):
-                    # This provider has failed.
-                    failures.append(provider)
+                yield provider
+
+    @classmethod
+    def coverage_failed(cls, coverage_record):
+        """Does the result of ensure_coverage() mean the CoverageProvider
+        failed?
+        """
+        return (not isinstance(coverage_record, CoverageRecord)
+                or coverage_record.status != CoverageRecord.SUCCESS
+                or coverage_record.exception is not None)
+
+    def ensure_coverage_concurrently(self, identifiers):
+        """Run every relevant CoverageProvider on every Identifier, each
+        ensure_coverage() call in a worker's own database session.
+
+        :return: A dictionary mapping (CoverageProvider, Identifier ID)
+            to True if the CoverageProvider failed, False if it
+            succeeded, or the exception it raised.
+        """
+        jobs = []
+        for identifier in identifiers:
+            for provider in self.providers_for(identifier):
+                jobs.append((provider, identifier.id))
+
+        # The workers need to see everything done in this session.
+        self._db.commit()
+
+        results = dict()
+        def ensure_coverage(_db, provider, identifier_id):
+            try:
+                identifier = get_one(_db, Identifier, id=identifier_id)
+                coverage_record = provider.for_session(_db).ensure_coverage(
+                    identifier
+                )
+                failed = self.coverage_failed(coverage_record)
+                _db.commit()
+                results[(provider, identifier_id)] = failed
+            except Exception as e:
+                _db.rollback()
+                results[(provider, identifier_id)] = e
+
+        with DatabasePool(self.worker_size, self.session_factory) as pool:
+            for provider, identifier_id in jobs:
+                pool.put(functools.partial(
+                    ensure_coverage, provider=provider,
+                    identifier_id=identifier_id
+                ))
+
+        # Pick up the changes made by the workers.
+        self._db.expire_all()
+        return results
+
+    def check_results(self, identifier, results):
+        """Interpret the results of ensure_coverage_concurrently() for one
+        Identifier the same way prepare() would.
+
+        :raise CoverageProvidersFailed: If one or more CoverageProviders
+            failed.
+        """
+        failures = []
+        for provider in self.providers_for(identifier):
+            result = results[(provider, identifier.id)]
+            if isinstance(result, Exception):
+                raise result
+            if result:
+                failures.append(provider)
         if failures:
             raise CoverageProvidersFailed(failures)
         return failures
@@ -793,6 +937,11 @@ class ReaperMonitor(Monitor):
     A subclass of ReaperMonitor MAY define values for the following constants:
     * BATCH_SIZE - The number of rows to fetch for deletion in a single
     batch. The default is 1000.
+    * DELETE_ROW_BY_ROW - Normally each batch of rows is deleted with a
+    single DELETE statement. If deleting a row has side effects that
+    such a statement would skip, such as ORM-level cascades or
+    cleanup done in delete(), set this to True and the rows will be
+    loaded and passed into delete() one at a time.
 
     If your model class has fields that might contain a lot of data
     and aren't important to the reaping process, put their field names
@@ -803,6 +952,7 @@ class ReaperMonitor(Monitor):
     TIMESTAMP_FIELD = None
     MAX_AGE = None
     BATCH_SIZE = 1000
+    DELETE_ROW_BY_ROW = False
 
     REGISTRY = []
 
@@ -834,28 +984,83 @@ class ReaperMonitor(Monitor):
         return self.timestamp_field < self.cutoff
 
     def run_once(self, *args, **kwargs):
+        # Rows are reaped in order of ID, and each batch picks up
+        # after the highest ID seen in the previous batch, so a row
+        # that can't be deleted is never seen twice.
+        self._db.flush()
+        if self.DELETE_ROW_BY_ROW:
+            rows_deleted = self.delete_row_by_row()
+        else:
+            rows_deleted = self.delete_in_batches()
+        return TimestampData(achievements="Items deleted: %d" % rows_deleted)
+
+    def delete_in_batches(self):
+        """Find the IDs of the rows to be reaped, BATCH_SIZE at a time,
+        and delete each batch with delete_batch().
+
+        :return: The number of rows deleted.
+        """
+        id_field = self.MODEL_CLASS.id
+        qu = self.query().with_entities(id_field).order_by(id_field)
         rows_deleted = 0
-        qu = self.query()
+        last_id = None
+        while True:
+            batch = qu
+            if last_id is not None:
+                batch = batch.filter(id_field > last_id)
+            ids = [row_id for [row_id] in batch.limit(self.BATCH_SIZE)]
+            if not ids:
+                break
+            last_id = ids[-1]
+            deleted = self.delete_batch(ids)
+            self._db.commit()
+            self.log.info("Deleted %d row(s)", len(deleted))
+            rows_deleted += len(deleted)
+        return rows_deleted
+
+    def delete_batch(self, ids):
+        """Delete the rows with the given IDs in a single DELETE statement.
+
+        :return: A list of the IDs of the rows that were deleted.
+        """
+        table = self.MODEL_CLASS.__table__
+        delete = table.delete().where(
+            table.c.id.in_(ids)
+        ).returning(table.c.id)
+        return [row_id for [row_id] in self._db.execute(delete)]
+
+    def delete_row_by_row(self):
+        """Load the rows to be reaped, BATCH_SIZE at a time, and
+        delete each one with delete().
+
+        :return: The number of rows deleted.
+        """
+        id_field = self.MODEL_CLASS.id
+        qu = self.query().order_by(id_field)
         to_defer = getattr(self.MODEL_CLASS, 'LARGE_FIELDS', [])
         for x in to_defer:
             qu = qu.options(defer(x))
-        count = qu.count()
-        self.log.info("Deleting %d row(s)", count)
-        while count > 0:
-            for i in qu.limit(self.BATCH_SIZE):
+        rows_deleted = 0
+        last_id = None
+        while True:
+            batch = qu
+            if last_id is not None:
+                batch = batch.filter(id_field > last_id)
+            rows = batch.limit(self.BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for i in rows:
                 self.log.info("Deleting %r", i)
                 self.delete(i)
                 rows_deleted += 1
             self._db.commit()
-            count = qu.count()
-        return TimestampData(achievements="Items deleted: %d" % rows_deleted)
+        return rows_deleted
 
     def delete(self, row):
         """Delete a row from the database.
 
-        CAUTION: If you override this method such that it doesn't
-        actually delete the database row, then run_once() may enter an
-        infinite loop.
+        This is only called if DELETE_ROW_BY_ROW is set.
         """
         self._db.delete(row)
 
@@ -877,14 +1082,39 @@ class CredentialReaper(ReaperMonitor):
     MODEL_CLASS = Credential
     TIMESTAMP_FIELD = 'expires'
     MAX_AGE = 1
+
+    def delete_batch(self, ids):
+        """Detach any DRMDeviceIdentifiers from the doomed Credentials,
+        as the ORM would, before deleting them.
+        """
+        self._db.query(DRMDeviceIdentifier).filter(
+            DRMDeviceIdentifier.credential_id.in_(ids)
+        ).update(
+            {DRMDeviceIdentifier.credential_id: None},
+            synchronize_session=False
+        )
+        return super(CredentialReaper, self).delete_batch(ids)
 ReaperMonitor.REGISTRY.append(CredentialReaper)
 
+
+class WorkChangeReaper(ReaperMonitor):
+    """Remove WorkChange log entries that are too old to matter to any
+    delta MARC file."""
+    MODEL_CLASS = WorkChange
+    TIMESTAMP_FIELD = 'change_time'
+    MAX_AGE = 180
+ReaperMonitor.REGISTRY.append(WorkChangeReaper)
+
 class PatronRecordReaper(ReaperMonitor):
     """Remove patron records that expired more than 60 days ago"""
     MODEL_CLASS = Patron
     TIMESTAMP_FIELD = 'authorization_expires'
     MAX_AGE = 60
 
+    # A Patron's loans, holds, annotations and credentials are
+    # deleted along with it through ORM cascades.
+    DELETE_ROW_BY_ROW = True
+
 # NOTE: This reaper does not correlate to our current policy and is being paused
 #       It may be renabled at any time by un-commenting the line below
 # ReaperMonitor.REGISTRY.append(PatronRecordReaper)
@@ -911,9 +1141,45 @@ class WorkReaper(ReaperMonitor):
             LicensePool.id==None
         )
 
-    def delete(self, work):
-        """Delete work from elasticsearch and database."""
-        work.delete(self.search_index_client)
+    def delete_batch(self, ids):
+        """Delete a batch of works from the database and the search index.
+
+        This does in bulk what Work.delete() does for a single work:
+        a deletion is recorded in the WorkChange log for each work, and
+        the rows that the ORM would have deleted or detached along with
+        a Work are taken care of before the works themselves are deleted.
+        """
+        now = utc_now()
+        urns = dict(
+            (work_id, identifier.urn) for work_id, identifier in
+            self._db.query(Work.id, Identifier).join(
+                Work.presentation_edition
+            ).join(
+                Edition.primary_identifier
+            ).filter(Work.id.in_(ids))
+        )
+
+        for model in (WorkGenre, WorkCoverageRecord, CachedFeed):
+            self._db.query(model).filter(
+                model.work_id.in_(ids)
+            ).delete(synchronize_session=False)
+        self._db.query(CustomListEntry).filter(
+            CustomListEntry.work_id.in_(ids)
+        ).update(
+            {CustomListEntry.work_id: None}, synchronize_session=False
+        )
+
+        deleted = super(WorkReaper, self).delete_batch(ids)
+        if deleted:
+            self._db.execute(
+                WorkChange.__table__.insert(),
+                [dict(work_id=work_id, change_time=now,
+                      change_kind=WorkChange.DELETION,
+                      identifier_urn=urns.get(work_id))
+                 for work_id in deleted]
+            )
+            self.search_index_client.remove_works(deleted)
+        return deleted
 
 ReaperMonitor.REGISTRY.append(WorkReaper)
 
@@ -928,6 +1194,9 @@ class CollectionReaper(ReaperMonitor):
         """
         return Collection.marked_for_deletion == True
 
+    # Collections are deleted incrementally by Collection.delete().
+    DELETE_ROW_BY_ROW = True
+
     def delete(self, collection):
         """Delete a Collection from the database.
 
@@ -44,6 +44,7 @@ from .util.opds_writer import (
     OPDSMessage,
 )
 from .util.datetime_helpers import utc_now
+from .util.instrumentation import RequestMetrics
 
 
 class UnfulfillableWork(Exception):
@@ -1154,8 +1155,9 @@ class AcquisitionFeed(OPDSFeed):
 
         super(AcquisitionFeed, self).__init__(title, url)
 
-        for work in works:
-            self.add_entry(work)
+        with RequestMetrics.timed(RequestMetrics.SERIALIZE):
+            for work in works:
+                self.add_entry(work)
 
         # Add the precomposed entries and the messages.
         for entry in precomposed_entries:
@@ -27,6 +27,7 @@ from .metadata_layer import (
 from .mirror import MirrorUploader
 from .model import (
     Collection,
+    ContributorResolver,
     CoverageRecord,
     DataSource,
     Edition,
@@ -774,44 +775,57 @@ class OPDSImporter(object):
         # If parsing the overall feed throws an exception, we should address that before
         # moving on. Let the exception propagate.
         metadata_objs, failures = self.extract_feed_data(feed, feed_url)
+
+        # Look up the contributors to every book in the feed at once,
+        # and create the missing ones with a single INSERT.
+        contributors = [
+            contributor for key, metadata in list(metadata_objs.items())
+            if key not in failures for contributor in metadata.contributors
+        ]
+        resolver = ContributorResolver.from_contributors(
+            self._db, contributors
+        )
+        resolver.create_missing(contributors)
+
         # make editions.  if have problem, make sure associated pool and work aren't created.
-        for key, metadata in metadata_objs.items():
-            # key is identifier.urn here
+        with resolver:
+            for key, metadata in metadata_objs.items():
+                # key is identifier.urn here
 
-            # If there's a status message about this item, don't try to import it.
-            if key in list(failures.keys()):
-                continue
+                # If there's a status message about this item, don't try to import it.
+                if key in list(failures.keys()):
+                    continue
 
-            try:
-                # Create an edition. This will also create a pool if there's circulation data.
-                edition = self.import_edition_from_metadata(metadata)
-                if edition:
-                    imported_editions[key] = edition
-            except Exception as e:
-                # Rather than scratch the whole import, treat this as a failure that only applies
-                # to this item.
-                self.log.error("Error importing an OPDS item", exc_info=e)
-                identifier, ignore = Identifier.parse_urn(self._db, key)
-                data_source = self.data_source
-                failure = CoverageFailure(identifier, traceback.format_exc(), data_source=data_source, transient=False)
-                failures[key] = failure
-                # clean up any edition might have created
-                if key in imported_editions:
-                    del imported_editions[key]
-                # Move on to the next item, don't create a work.
-                continue
+                try:
+                    # Create an edition. This will also create a pool if there's circulation data.
+                    edition = self.import_edition_from_metadata(metadata)
+                    if edition:
+                        imported_editions[key] = edition
+                except Exception as e:
+                    # Rather than scratch the whole import, treat this as a failure that only applies
+                    # to this item.
+                    self.log.error("Error importing an OPDS item", exc_info=e)
+                    identifier, ignore = Identifier.parse_urn(self._db, key)
+                    data_source = self.data_source
+                    failure = CoverageFailure(identifier, traceback.format_exc(), data_source=data_source, transient=False)
+                    failures[key] = failure
+                    # clean up any edition might have created
+                    if key in imported_editions:
+                        del imported_editions[key]
+                    # Move on to the next item, don't create a work.
+                    continue
 
-            try:
-                pool, work = self.update_work_for_edition(edition)
-                if pool:
-                    pools[key] = pool
-                if work:
-                    works[key] = work
-            except Exception as e:
-                identifier, ignore = Identifier.parse_urn(self._db, key)
-                data_source = self.data_source
-                failure = CoverageFailure(identifier, traceback.format_exc(), data_source=data_source, transient=False)
-                failures[key] = failure
+                try:
+                    pool, work = self.update_work_for_edition(edition)
+                    if pool:
+                        pools[key] = pool
+                    if work:
+                        works[key] = work
+                except Exception as e:
+                    identifier, ignore = Identifier.parse_urn(self._db, key)
+                    data_source = self.data_source
+                    failure = CoverageFailure(identifier, traceback.format_exc(), data_source=data_source, transient=False)
+                    failures[key] = failure
 
         return list(imported_editions.values()), list(pools.values()), list(works.values()), failures
 
@@ -1,5 +1,7 @@
 import argparse
+import functools
 import logging
+import multiprocessing
 import os
 import random
 import re
@@ -16,6 +18,7 @@ from enum import Enum
 from sqlalchemy import (
     exists,
     and_,
+    func,
     text,
 )
 from sqlalchemy.exc import ProgrammingError
@@ -29,6 +32,8 @@ from .config import Configuration, CannotLoadConfiguration
 from .coverage import (
     CollectionCoverageProviderJob,
     CoverageProviderProgress,
+    initialize_partition_worker,
+    run_coverage_partition,
 )
 from .external_search import (
     ExternalSearchIndex,
@@ -51,6 +56,7 @@ from .model import (
     BaseCoverageRecord,
     CachedFeed,
     Collection,
+    CollectionStatistics,
     Complaint,
     ConfigurationSetting,
     Contributor,
@@ -82,7 +88,6 @@ from .opds_import import (
     OPDSImportMonitor,
     OPDSImporter,
 )
-from .util import fast_query_count
 from .util.personal_names import contributor_name_match_ratio, display_name_to_sort_name
 from .util.worker_pools import (
     DatabasePool,
@@ -356,14 +361,33 @@ class RunCollectionCoverageProviderScript(RunCoverageProvidersScript):
 
 
 class RunThreadedCollectionCoverageProviderScript(Script):
-    """Run coverage providers in multiple threads."""
+    """Run coverage providers in multiple threads or processes.
+
+    The IDs of the Identifiers that need coverage are split into ranges
+    of roughly equal size, and each worker claims the next range from
+    a shared queue as soon as it finishes the previous one.
+    """
 
     DEFAULT_WORKER_SIZE = 5
 
-    def __init__(self, provider_class, worker_size=None, _db=None, **provider_kwargs):
+    # Each range of Identifier IDs contains about this many of the
+    # provider's batches. Smaller ranges balance the work between the
+    # workers better; larger ranges mean fewer queries.
+    BATCHES_PER_PARTITION = 10
+
+    def __init__(self, provider_class, worker_size=None, _db=None,
+                 use_processes=False, **provider_kwargs):
+        """Constructor.
+
+        :param use_processes: Run each worker in its own process
+            instead of its own thread, so the Python side of coverage
+            isn't limited to one CPU. The provider class and its
+            keyword arguments must then be picklable.
+        """
         super(RunThreadedCollectionCoverageProviderScript, self).__init__(_db)
 
         self.worker_size = worker_size or self.DEFAULT_WORKER_SIZE
+        self.use_processes = use_processes
         self.session_factory = SessionManager.sessionmaker(session=self._db)
 
         # Use a database from the factory.
@@ -375,12 +399,15 @@ class RunThreadedCollectionCoverageProviderScript(Script):
         self.provider_class = provider_class
         self.provider_kwargs = provider_kwargs
 
+        # Maps each Collection's name to a summary of the last run.
+        self.metrics = dict()
+
     def run(self, pool=None):
-        """Runs a CollectionCoverageProvider with multiple threads and
+        """Runs a CollectionCoverageProvider with multiple workers and
         updates the timestamp accordingly.
 
-        :param pool: A DatabasePool (or other) object for use in testing
-            environments.
+        :param pool: A DatabasePool (or, if `use_processes` is set, a
+            multiprocessing Pool) for use in testing environments.
         """
         collections = self.provider_class.collections(self._db)
         if not collections:
@@ -388,39 +415,125 @@ class RunThreadedCollectionCoverageProviderScript(Script):
 
         for collection in collections:
             provider = self.provider_class(collection, **self.provider_kwargs)
-            with pool or DatabasePool(
-                self.worker_size, self.session_factory
-            ) as job_queue:
-                query_size, batch_size = self.get_query_and_batch_sizes(provider)
-                # Without a commit, the query to count which items need
-                # coverage hangs in the database, blocking the threads.
-                self._db.commit()
+            partitions = self.partitions(provider)
+            # Without a commit, the query that finds the partitions
+            # stays open in the database, blocking the workers.
+            self._db.commit()
 
-                offset = 0
-                # TODO: We create a separate 'progress' object
-                # for each job, and each will overwrite the timestamp
-                # value as its complets. It woudl be better if all the
-                # jobs could share a single 'progress' object.
-                while offset < query_size:
-                    progress = CoverageProviderProgress(start=utc_now())
-                    progress.offset = offset
-                    job = CollectionCoverageProviderJob(
-                        collection,
-                        self.provider_class,
-                        progress,
-                        **self.provider_kwargs,
-                    )
-                    job_queue.put(job)
-                    offset += batch_size
+            progress = CoverageProviderProgress(start=utc_now())
+            if self.use_processes:
+                failed = self.run_in_processes(
+                    collection, partitions, progress, pool
+                )
+            else:
+                failed = self.run_in_threads(
+                    collection, partitions, progress, pool
+                )
+            progress.finish = utc_now()
+            self.report(provider, collection, progress, len(partitions), failed)
 
         # Close existing database session and associated connection objects
         self._db.close()
 
-    def get_query_and_batch_sizes(self, provider):
+    def partitions(self, provider):
+        """Split the IDs of the Identifiers that need coverage from the
+        given provider into ranges.
+
+        :return: A list of 2-tuples (start, end). Each range includes
+            `start` and excludes `end`; the last range has no end.
+        """
+        size = provider.batch_size * self.BATCHES_PER_PARTITION
         qu = provider.items_that_need_coverage(
             count_as_covered=BaseCoverageRecord.DEFAULT_COUNT_AS_COVERED
         )
-        return fast_query_count(qu), provider.batch_size
+        numbered = qu.with_entities(
+            Identifier.id.label('id'),
+            func.row_number().over(order_by=Identifier.id).label('row')
+        ).subquery()
+        starts = [
+            id for [id] in self._db.query(numbered.c.id).filter(
+                (numbered.c.row - 1) % size == 0
+            ).order_by(numbered.c.id)
+        ]
+        return list(zip(starts, starts[1:] + [None]))
+
+    def run_in_threads(self, collection, partitions, progress, pool=None):
+        """Cover every range of IDs on a DatabasePool.
+
+        :return: The number of ranges that could not be covered.
+        """
+        partition_progress = []
+        with pool or DatabasePool(
+            self.worker_size, self.session_factory
+        ) as job_queue:
+            errors_before = job_queue.error_count
+            for id_range in partitions:
+                this_progress = CoverageProviderProgress(start=utc_now())
+                partition_progress.append(this_progress)
+                job_queue.put(CollectionCoverageProviderJob(
+                    collection, self.provider_class, this_progress,
+                    id_range=id_range, **self.provider_kwargs
+                ))
+        for this_progress in partition_progress:
+            progress.successes += this_progress.successes
+            progress.transient_failures += this_progress.transient_failures
+            progress.persistent_failures += this_progress.persistent_failures
+        return job_queue.error_count - errors_before
+
+    def run_in_processes(self, collection, partitions, progress, pool=None):
+        """Cover every range of IDs on a multiprocessing Pool.
+
+        :return: The number of ranges that could not be covered.
+        """
+        arguments = [
+            (self.provider_class, collection.id, start, end,
+             self.provider_kwargs)
+            for start, end in partitions
+        ]
+        # Worker processes must not share this process's database
+        # connections, so they're started fresh rather than forked.
+        pool = pool or multiprocessing.get_context("spawn").Pool(
+            self.worker_size, initializer=initialize_partition_worker
+        )
+        failed = 0
+        with pool:
+            for successes, transient, persistent, exception in (
+                pool.imap_unordered(run_coverage_partition, arguments)
+            ):
+                progress.successes += successes
+                progress.transient_failures += transient
+                progress.persistent_failures += persistent
+                if exception:
+                    failed += 1
+        return failed
+
+    def report(self, provider, collection, progress, partitions, failed):
+        """Log the combined results of every worker, and record them in
+        the provider's Timestamp.
+        """
+        total = (progress.successes + progress.transient_failures
+                 + progress.persistent_failures)
+        seconds = (progress.finish - progress.start).total_seconds()
+        metrics = dict(
+            partitions=partitions, failed_partitions=failed,
+            items=total, successes=progress.successes,
+            transient_failures=progress.transient_failures,
+            persistent_failures=progress.persistent_failures,
+            seconds=seconds,
+            items_per_second=(total / seconds) if seconds else 0.0,
+        )
+        self.metrics[collection.name] = metrics
+        self.log.info(
+            "%s: covered %d ranges (%d failed) with %d workers. %s. "
+            "%.2f items/sec.", collection.name, partitions, failed,
+            self.worker_size, progress.achievements,
+            metrics['items_per_second']
+        )
+        if failed:
+            progress.exception = "%d of %d ranges failed." % (
+                failed, partitions
+            )
+        provider.finalize_timestampdata(progress)
 
 
 class RunWorkCoverageProviderScript(RunCollectionCoverageProviderScript):
@@ -749,6 +862,15 @@ class LaneSweeperScript(LibraryInputScript):
     """Do something to each lane in a library."""
 
     def process_library(self, library):
+        for l in self.lanes(library):
+            if self.should_process_lane(l):
+                self.process_lane(l)
+                self._db.commit()
+
+    def lanes(self, library):
+        """Yield every lane in the library, starting with the top-level
+        WorkList and working down the hierarchy one level at a time.
+        """
         from .lane import WorkList
 
         top_level = WorkList.top_level_for_library(self._db, library)
@@ -758,9 +880,7 @@ class LaneSweeperScript(LibraryInputScript):
             for l in queue:
                 if isinstance(l, Lane):
                     l = self._db.merge(l)
-                if self.should_process_lane(l):
-                    self.process_lane(l)
-                    self._db.commit()
+                yield l
                 for sublane in l.children:
                     new_queue.append(sublane)
             queue = new_queue
@@ -1691,6 +1811,42 @@ class ReclassifyWorksForUncheckedSubjectsScript(WorkClassificationScript):
         self.query = Work.for_unchecked_subjects(self._db)
 
 
+class AssignSubjectsToGenresScript(Script):
+    """Assign unchecked Subjects to genres, several ranges of Subjects
+    at a time, and register the Works classified under any Subject
+    whose classification changed with the
+    WorkClassificationCoverageProvider.
+    """
+
+    DEFAULT_WORKER_SIZE = 4
+
+    @classmethod
+    def arg_parser(cls):
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--subject-type", help="Only process subjects of this type"
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Process every subject, even the ones that have been checked"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=cls.DEFAULT_WORKER_SIZE,
+            help="Process this many ranges of subjects at once"
+        )
+        return parser
+
+    def do_run(self, cmd_args=None, session_factory=None):
+        parsed = self.arg_parser().parse_args(cmd_args)
+        changed = Subject.assign_to_genres(
+            self._db, type_restriction=parsed.subject_type,
+            force=parsed.force, workers=parsed.workers,
+            session_factory=session_factory, reclassify_works=True,
+        )
+        self.log.info("Classification changed for %d subjects.", len(changed))
+        return changed
+
+
 class WorkOPDSScript(WorkPresentationScript):
     """Recalculate the OPDS entries, MARC record, and search index entries
     for Work objects.
@@ -2729,56 +2885,188 @@ class DatabaseMigrationInitializationScript(DatabaseMigrationScript):
         self._db.close()
 
 
+class TableStatistics(object):
+    """The number of live and dead tuples in a database table."""
+
+    def __init__(self, live, dead):
+        self.live = live or 0
+        self.dead = dead or 0
+
+    @property
+    def dead_ratio(self):
+        """The proportion of the table's tuples that are dead."""
+        total = self.live + self.dead
+        if not total:
+            return 0
+        return self.dead / float(total)
+
+    def __repr__(self):
+        return "%d live, %d dead (%.1f%% dead)" % (
+            self.live, self.dead, self.dead_ratio * 100
+        )
+
+
 class DatabaseVacuum(Script):
-    """Script to vacuum all database tables
+    """Vacuum the database tables that need it most.
 
-    Args:
-        Script (_type_): _description_
+    Tables are ranked by the number of dead tuples that
+    pg_stat_user_tables says they contain. Tables with too few dead
+    tuples, or too small a proportion of dead tuples, are skipped.
+    The rest are vacuumed in parallel, each worker using its own
+    database connection.
     """
 
-    def __init__(self):
-        super(Script, self).__init__()
-
-    def do_run(self, subcommand=""):
-        """Run the database vacuum
-
-        Args:
-            subcommand (str, optional):
-                Can be any of these
-                FULL [ boolean ]
-                FREEZE [ boolean ]
-                VERBOSE [ boolean ]
-                ANALYZE [ boolean ]
-                DISABLE_PAGE_SKIPPING [ boolean ]
-                SKIP_LOCKED [ boolean ]
-                INDEX_CLEANUP { AUTO | ON | OFF }
-                PROCESS_TOAST [ boolean ]
-                TRUNCATE [ boolean ]
+    DEFAULT_MIN_DEAD_TUPLES = 1000
+    DEFAULT_MIN_DEAD_RATIO = 0.02
+    DEFAULT_WORKER_SIZE = 3
+
+    # Boolean VACUUM options that can be passed in on the command line.
+    OPTIONS = [
+        'FULL', 'FREEZE', 'VERBOSE', 'ANALYZE', 'DISABLE_PAGE_SKIPPING',
+        'SKIP_LOCKED',
+    ]
+
+    @classmethod
+    def arg_parser(cls):
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            '--min-dead-tuples', type=int,
+            default=cls.DEFAULT_MIN_DEAD_TUPLES,
+            help='Skip tables with fewer dead tuples than this.'
+        )
+        parser.add_argument(
+            '--min-dead-ratio', type=float,
+            default=cls.DEFAULT_MIN_DEAD_RATIO,
+            help='Skip tables where a smaller proportion of the tuples '
+            'than this (between 0 and 1) are dead.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=cls.DEFAULT_WORKER_SIZE,
+            help='The number of tables to vacuum at once.'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Vacuum every table, no matter how many dead tuples it has.'
+        )
+        parser.add_argument(
+            '--option', action='append', dest='options', default=[],
+            choices=[x.lower() for x in cls.OPTIONS],
+            help='Pass an option such as "analyze" or "full" to VACUUM. '
+            'May be repeated.'
+        )
+        return parser
+
+    @classmethod
+    def table_statistics(cls, _db):
+        """Find out how many live and dead tuples each table contains.
+
+        :return: A dictionary mapping table names to TableStatistics.
+        """
+        qu = text(
+            "SELECT relname, n_live_tup, n_dead_tup FROM pg_stat_user_tables"
+            " WHERE schemaname = current_schema()"
+        )
+        return dict(
+            (name, TableStatistics(live, dead))
+            for name, live, dead in _db.execute(qu)
+        )
+
+    @classmethod
+    def tables_to_vacuum(cls, statistics, min_dead_tuples, min_dead_ratio):
+        """Decide which tables need to be vacuumed.
+
+        :param statistics: A dictionary mapping table names to
+            TableStatistics.
+        :return: A list of table names, the table with the most dead
+            tuples first.
+        """
+        tables = [
+            name for name, stats in list(statistics.items())
+            if stats.dead >= min_dead_tuples
+            and stats.dead_ratio >= min_dead_ratio
+        ]
+        return sorted(
+            tables, key=lambda name: (
+                -statistics[name].dead, -statistics[name].dead_ratio, name
+            )
+        )
+
+    def do_run(self, cmd_args=None, pool=None):
+        """Vacuum the tables that need it.
+
+        :param pool: A DatabasePool (or other) object for use in testing
+            environments.
         """
+        parsed = self.parse_command_line(self._db, cmd_args=cmd_args)
         today = datetime.now().strftime("%m/%d/%Y, %H:%M:%S")
         start = time.time()
         self.log.info("Database vacuum starting %s" % today)
-        # Go back up to engine-level.
-        connection = self._db.get_bind()
-        # Get table names
-        all_db_tables = connection.table_names()
-        with self._db as session:
-            session.connection().connection.set_isolation_level(0)
-            for table in all_db_tables:
-                table_start = time.time()
-                session.execute("VACUUM %s %s" % (subcommand, table))
-                table_end = time.time()
-                table_vac_duration = table_end - table_start
-                self.log.info(
-                    "Vacuuming of table %s took %d seconds"
-                    % (table, table_vac_duration)
-                )
-        end = time.time()
-        duration = end - start
+
+        before = self.table_statistics(self._db)
+        if parsed.all:
+            tables = self.tables_to_vacuum(before, 0, 0)
+        else:
+            tables = self.tables_to_vacuum(
+                before, parsed.min_dead_tuples, parsed.min_dead_ratio
+            )
+        self.log.info(
+            "Vacuuming %d table(s), skipping %d table(s) with few dead tuples.",
+            len(tables), len(before) - len(tables)
+        )
+        # Don't keep a transaction open while the tables are vacuumed.
+        self._db.commit()
+
+        options = [x.upper() for x in parsed.options]
+        self.results = []
+        if tables:
+            workers = max(1, min(parsed.workers, len(tables)))
+            with pool or DatabasePool(
+                workers, SessionManager.sessionmaker(session=self._db)
+            ) as job_queue:
+                for table in tables:
+                    job_queue.put(functools.partial(
+                        self.vacuum_table, table=table, options=options
+                    ))
+
+        after = self.table_statistics(self._db)
+        self._db.commit()
+        elapsed = dict(self.results)
+        for table in tables:
+            if table not in elapsed:
+                self.log.error("Table %s was not vacuumed.", table)
+                continue
+            self.log.info(
+                "Vacuuming of table %s took %.2f seconds. Before: %r. After: %r.",
+                table, elapsed[table], before[table],
+                after.get(table, before[table])
+            )
+
+        duration = time.time() - start
         self.log.info(
             "Database vacuum completed on %s and took %d seconds" % (today, duration)
         )
 
+    def vacuum_table(self, _db, table, options):
+        """Vacuum a single table and note how long it took."""
+        start = time.time()
+        self.execute_vacuum(_db, table, options)
+        self.results.append((table, time.time() - start))
+
+    def execute_vacuum(self, _db, table, options):
+        # VACUUM can't run inside a transaction.
+        connection = _db.connection(
+            execution_options=dict(isolation_level="AUTOCOMMIT")
+        )
+        try:
+            table = connection.dialect.identifier_preparer.quote(table)
+            if options:
+                sql = "VACUUM (%s) %s" % (", ".join(options), table)
+            else:
+                sql = "VACUUM %s" % table
+            connection.execute(text(sql))
+        finally:
+            _db.close()
+
 
 class CheckContributorNamesInDB(IdentifierInputScript):
     """Checks that contributor sort_names are display_names in
@@ -3423,6 +3711,31 @@ class UpdateCustomListSizeScript(CustomListSweeperScript):
         custom_list.update_size()
 
 
+class UpdateCollectionStatisticsScript(Script):
+    """Refresh the inventory summary shown on the admin dashboard."""
+
+    def do_run(self):
+        counts = CollectionStatistics.refresh(self._db)
+        self._db.commit()
+        self.log.info("Refreshed statistics for %d collections.", len(counts))
+
+
+class RecalculateWorkQualityScript(CollectionArgumentsScript):
+    """Recalculate the quality of every work, or every work in the
+    named collections, from the latest measurements.
+    """
+
+    def do_run(self, cmd_args=None):
+        parsed = self.parse_command_line(self._db, cmd_args=cmd_args)
+        for collection in parsed.collections or [None]:
+            changed = Work.bulk_calculate_quality(self._db, collection)
+            self._db.commit()
+            self.log.info(
+                "Quality changed for %d works%s.", changed,
+                " in %s" % collection.name if collection else ""
+            )
+
+
 class RemovesSearchCoverage(object):
     """Mix-in class for a script that might remove all coverage records
     for the search engine.
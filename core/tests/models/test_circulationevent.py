@@ -8,7 +8,10 @@ from ...model import (
     create,
     get_one_or_create
 )
-from ...model.circulationevent import CirculationEvent
+from ...model.circulationevent import (
+    CirculationEvent,
+    CirculationEventBuffer,
+)
 from ...model.datasource import DataSource
 from ...model.identifier import Identifier
 from ...model.licensing import LicensePool
@@ -183,6 +186,66 @@ class TestCirculationEvent:
         assert end == event.end
         assert location == event.location
 
+    def test_log_many(self, db_session, create_edition, create_library, create_licensepool):
+        """
+        GIVEN: Rows representing CirculationEvents, some of them duplicates
+        WHEN:  Logging them with CirculationEvent.log_many
+        THEN:  Only the events that weren't already recorded are created
+        """
+        edition = create_edition(db_session)
+        pool = create_licensepool(db_session, edition=edition)
+        library = create_library(db_session)
+        start = datetime_utc(2019, 1, 1)
+        row = CirculationEvent.row
+        checkout = row(
+            pool, CirculationEvent.DISTRIBUTOR_CHECKOUT, 10, 8, start=start,
+            library=library, location="Westgate Branch"
+        )
+        assert dict(
+            license_pool_id=pool.id, library_id=library.id,
+            type=CirculationEvent.DISTRIBUTOR_CHECKOUT, start=start,
+            end=start, old_value=10, new_value=8, delta=-2,
+            location="Westgate Branch",
+        ) == checkout
+
+        # This event was already logged through log().
+        CirculationEvent.log(
+            db_session, pool, CirculationEvent.DISTRIBUTOR_CHECKIN, 8, 10,
+            start=start
+        )
+        checkin = row(
+            pool, CirculationEvent.DISTRIBUTOR_CHECKIN, 500, 200, start=start
+        )
+
+        # This event has no license pool, and appears twice.
+        new_patron = row(
+            None, CirculationEvent.NEW_PATRON, None, None, start=start,
+            library=library
+        )
+
+        rows = [checkout, checkin, new_patron, dict(new_patron, location="x")]
+        assert 2 == CirculationEvent.log_many(db_session, rows)
+        events = db_session.query(CirculationEvent).all()
+        by_type = dict((x.type, x) for x in events)
+        assert 3 == len(events)
+
+        # The event that was already logged is unchanged.
+        assert 2 == by_type[CirculationEvent.DISTRIBUTOR_CHECKIN].delta
+
+        # The new events were created with the values given.
+        event = by_type[CirculationEvent.DISTRIBUTOR_CHECKOUT]
+        assert pool == event.license_pool
+        assert library == event.library
+        assert -2 == event.delta
+        assert "Westgate Branch" == event.location
+        event = by_type[CirculationEvent.NEW_PATRON]
+        assert None == event.license_pool
+        assert None == event.location
+
+        # Logging the same events again does nothing.
+        assert 0 == CirculationEvent.log_many(db_session, rows)
+        assert 3 == db_session.query(CirculationEvent).count()
+
     def test_uniqueness_constraints_no_library(self, db_session, create_edition, create_licensepool):
         """
         GIVEN: An Edition and LicensePool
@@ -241,3 +304,97 @@ class TestCirculationEvent:
             IntegrityError, create, db_session, CirculationEvent, start=now,
             **kwargs
         )
+
+
+class TestCirculationEventBuffer:
+
+    def test_synchronous(self, db_session, create_edition, create_licensepool):
+        """
+        GIVEN: A synchronous CirculationEventBuffer
+        WHEN:  Adding a CirculationEvent to it
+        THEN:  The event is written right away, in the same session
+        """
+        pool = create_licensepool(db_session, edition=create_edition(db_session))
+        buffer = CirculationEventBuffer(synchronous=True)
+        start = utc_now()
+        for i in range(2):
+            buffer.add(
+                db_session, pool, CirculationEvent.CM_CHECKOUT, None, None,
+                start=start
+            )
+        assert 0 == buffer.pending
+        [event] = db_session.query(CirculationEvent).all()
+        assert pool == event.license_pool
+        assert start == event.start
+
+    def test_unflushed_license_pool(self, db_session, create_collection, create_identifier):
+        """
+        GIVEN: A LicensePool that hasn't been written to the database
+        WHEN:  Adding a CirculationEvent for it to a CirculationEventBuffer
+        THEN:  The LicensePool is written, and the event is written
+               right away and refers to it
+        """
+        pool = LicensePool(
+            data_source=DataSource.lookup(db_session, DataSource.GUTENBERG),
+            identifier=create_identifier(db_session),
+            collection=create_collection(db_session),
+        )
+        db_session.add(pool)
+        assert None == pool.id
+
+        buffer = CirculationEventBuffer(max_size=100, max_age=3600)
+        buffer.add(
+            db_session, pool, CirculationEvent.DISTRIBUTOR_TITLE_ADD, None, 1
+        )
+        assert pool.id is not None
+        assert 0 == buffer.pending
+        [event] = db_session.query(CirculationEvent).all()
+        assert pool == event.license_pool
+
+    def test_buffered(self, db_session, create_edition, create_library, create_licensepool):
+        """
+        GIVEN: A CirculationEventBuffer
+        WHEN:  Adding CirculationEvents to it
+        THEN:  The events are written in a batch once enough of them are waiting
+        """
+        class Mock(CirculationEventBuffer):
+            flushed = 0
+            def flush(self, _db=None):
+                if _db is None:
+                    self.flushed += 1
+                    _db = db_session
+                return super(Mock, self).flush(_db)
+
+        pool = create_licensepool(db_session, edition=create_edition(db_session))
+        library = create_library(db_session)
+        buffer = Mock(max_size=3, max_age=3600)
+
+        def add(event_name, **kwargs):
+            return buffer.add(
+                db_session, pool, event_name, None, None, library=library,
+                **kwargs
+            )
+
+        start = utc_now()
+        add(CirculationEvent.CM_CHECKOUT, start=start)
+        add(CirculationEvent.CM_CHECKOUT, start=start)
+        assert 2 == buffer.pending
+        assert 0 == buffer.flushed
+        assert 0 == db_session.query(CirculationEvent).count()
+
+        # When the buffer is full, it's flushed. Duplicate events are
+        # only written once.
+        add(CirculationEvent.CM_FULFILL)
+        assert 0 == buffer.pending
+        assert 1 == buffer.flushed
+        assert (
+            set([CirculationEvent.CM_CHECKOUT, CirculationEvent.CM_FULFILL]) ==
+            set(x.type for x in db_session.query(CirculationEvent))
+        )
+
+        # Waiting events can be written at any time.
+        add(CirculationEvent.CM_CHECKIN)
+        assert 1 == buffer.flush(db_session)
+        assert 0 == buffer.pending
+        assert 3 == db_session.query(CirculationEvent).count()
+        assert 0 == buffer.flush(db_session)
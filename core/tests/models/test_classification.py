@@ -101,6 +101,50 @@ class TestSubject:
         assert None == subject.genre
         assert None == subject.fiction
 
+    def test_assign_to_genre_reports_changes(self, db_session, create_subject):
+        """
+        GIVEN: A Subject
+        WHEN:  Calling assign_to_genre()
+        THEN:  The return value says whether the subject's classification changed
+        """
+        subject = create_subject(db_session, Subject.TAG, "Science Fiction")
+        assert True == subject.assign_to_genre()
+        assert "Science Fiction" == subject.genre.name
+
+        # Doing it again changes nothing.
+        assert False == subject.assign_to_genre()
+
+        # A subject of an unknown type isn't changed at all.
+        unknown = create_subject(db_session, "no such type", "Science Fiction")
+        assert False == unknown.assign_to_genre()
+        assert False == unknown.checked
+
+    def test_assign_to_genres(self, db_session, create_subject):
+        """
+        GIVEN: Checked and unchecked Subjects
+        WHEN:  Calling Subject.assign_to_genres()
+        THEN:  The unchecked subjects are checked, and the ones whose
+               classification changed are returned
+        """
+        sf = create_subject(db_session, Subject.TAG, "Science Fiction")
+        boring = create_subject(db_session, Subject.TAG, "Books")
+        checked = create_subject(db_session, Subject.TAG, "Fantasy")
+        checked.checked = True
+        ddc = create_subject(db_session, Subject.DDC, "616")
+
+        changed = Subject.assign_to_genres(db_session, type_restriction=Subject.TAG)
+        assert set([sf.id]) == changed
+        assert True == boring.checked
+        assert None == checked.genre
+        assert False == ddc.checked
+
+        # Forcing a recheck finds the checked subject.
+        changed = Subject.assign_to_genres(
+            db_session, type_restriction=Subject.TAG, force=True
+        )
+        assert set([checked.id]) == changed
+        assert "Fantasy" == checked.genre.name
+
 
 class TestGenre:
 
@@ -11,10 +11,16 @@ from ...model import (
 )
 from ...model.coverage import (
     CoverageRecord,
+    Timestamp,
     WorkCoverageRecord,
 )
 from ...model.circulationevent import CirculationEvent
-from ...model.collection import Collection, HasExternalIntegrationPerCollection, CollectionConfigurationStorage
+from ...model.collection import (
+    Collection,
+    CollectionConfigurationStorage,
+    CollectionStatistics,
+    HasExternalIntegrationPerCollection,
+)
 from ...model.complaint import Complaint
 from ...model.configuration import (
     ConfigurationSetting,
@@ -1059,6 +1065,62 @@ class TestCollection:
         assert [] == work2.license_pools
 
 
+class TestCollectionStatistics:
+
+    def test_calculate_and_refresh(self, db_session, create_collection, create_edition, create_licensepool):
+        """
+        GIVEN: A Collection with open-access and licensed LicensePools
+        WHEN:  Calculating, refreshing, and reading the CollectionStatistics summary
+        THEN:  The grouped counts match the LicensePools, and the stored summary
+               is only used while it is fresh
+        """
+        collection = create_collection(db_session)
+        empty_collection = create_collection(db_session)
+
+        open_access = create_licensepool(
+            db_session, create_edition(db_session), open_access=True, collection=collection
+        )
+        licensed = create_licensepool(
+            db_session, create_edition(db_session), open_access=False, collection=collection
+        )
+        licensed.licenses_owned = 5
+        licensed.licenses_available = 2
+        unowned = create_licensepool(
+            db_session, create_edition(db_session), open_access=False, collection=collection
+        )
+        unowned.licenses_owned = 0
+        unowned.licenses_available = 0
+
+        expect = dict(
+            licensed_titles=1, open_access_titles=1, licenses=5, available_licenses=2
+        )
+        counts = CollectionStatistics.calculate(db_session)
+        assert expect == counts[collection.id]
+        assert empty_collection.id not in counts
+
+        # Until the summary has been refreshed, there's nothing cached
+        # and counts() calculates everything on the spot.
+        max_age = datetime.timedelta(hours=1)
+        assert None == CollectionStatistics.cached(db_session, max_age)
+        assert expect == CollectionStatistics.counts(db_session, max_age)[collection.id]
+
+        CollectionStatistics.refresh(db_session)
+        assert expect == CollectionStatistics.cached(db_session, max_age)[collection.id]
+
+        # The stored summary doesn't notice new LicensePools until it's
+        # refreshed again.
+        licensed.licenses_owned = 10
+        assert 5 == CollectionStatistics.counts(db_session, max_age)[collection.id]["licenses"]
+
+        # A stale summary is ignored.
+        timestamp = Timestamp.lookup(
+            db_session, CollectionStatistics.SERVICE_NAME, Timestamp.SCRIPT_TYPE, None
+        )
+        timestamp.finish = utc_now() - datetime.timedelta(hours=2)
+        assert None == CollectionStatistics.cached(db_session, max_age)
+        assert 10 == CollectionStatistics.counts(db_session, max_age)[collection.id]["licenses"]
+
+
 class TestCollectionForMetadataWrangler:
 
     """Tests that requirements to the metadata wrangler's use of Collection
@@ -1,6 +1,16 @@
 # encoding: utf-8
 import pytest
-from ...model.contributor import Contributor
+from sqlalchemy import event
+from sqlalchemy.orm.exc import MultipleResultsFound
+from ...metadata_layer import (
+    ContributorData,
+    IdentifierData,
+    Metadata,
+)
+from ...model.contributor import (
+    Contributor,
+    ContributorResolver,
+)
 from ...model.datasource import DataSource
 from ...model.edition import Edition
 from ...model.identifier import Identifier
@@ -209,3 +219,223 @@ class TestContributor:
         # test that human name parser doesn't die badly on foreign names
         bob= create_contributor(db_session, sort_name="Боб  Битшифтер")
         assert "Битшифтер, Боб" == bob.sort_name
+
+
+class TestContributorResolver:
+
+    @pytest.fixture
+    def statements(self, db_session):
+        """Keep track of the SQL statements sent to the database."""
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        connection = db_session.get_bind()
+        event.listen(connection, "before_cursor_execute", before_cursor_execute)
+        yield statements
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    def test_lookup(self, db_session, statements):
+        """
+        GIVEN: Contributors in the database and a ContributorResolver
+               that knows about their names and identifiers
+        WHEN:  Looking up Contributors while the resolver is active
+        THEN:  The same Contributors are found as without the resolver,
+               without any queries
+        """
+        def contributor(**kwargs):
+            contributor = Contributor(**kwargs)
+            db_session.add(contributor)
+            db_session.flush()
+            return contributor
+
+        jones1 = contributor(sort_name="Jones, Bob")
+        jones2 = contributor(sort_name="Jones, Bob")
+        viaf1 = contributor(sort_name="Smith, Al", viaf="1")
+        viaf2 = contributor(sort_name="Smith, Al", viaf="1")
+        lc = contributor(
+            sort_name="Doe, Jo", lc="n1", viaf="2", display_name="Jo Doe"
+        )
+
+        resolver = ContributorResolver(
+            db_session, sort_names=["Jones, Bob", "Nobody, A."],
+            display_names=["Jo Doe", "Nobody"], lcs=["n1"], viafs=["1", "2"]
+        )
+        del statements[:]
+        with resolver:
+            assert resolver == ContributorResolver.active()
+            assert (
+                ([jones1, jones2], False)
+                == Contributor.lookup(db_session, "Jones, Bob")
+            )
+            assert ([lc], False) == Contributor.lookup(db_session, lc="n1")
+            assert (
+                ([lc], False)
+                == Contributor.lookup(db_session, lc="n1", viaf="2")
+            )
+            assert (
+                ([], False)
+                == Contributor.lookup(db_session, lc="n1", viaf="1",
+                                      create_new=False)
+            )
+            [found], new = Contributor.lookup(db_session, viaf="1")
+            assert found in (viaf1, viaf2)
+            assert False == new
+
+            # Just as with get_one(), multiple Contributors with the
+            # same identifier are an error if nothing would be created.
+            with pytest.raises(MultipleResultsFound):
+                Contributor.lookup(db_session, viaf="1", create_new=False)
+
+            m = ContributorData.display_name_to_sort_name_from_existing_contributor
+            assert "Doe, Jo" == m(db_session, "Jo Doe")
+            assert None == m(db_session, "Nobody")
+        assert [] == statements
+        assert None == ContributorResolver.active()
+
+        with resolver:
+            # Lookups the resolver can't answer go to the database.
+            [al], new = Contributor.lookup(db_session, "Smith, Al")
+            assert [] != statements
+
+            # That includes lookups that create a new Contributor.
+            [nobody], new = Contributor.lookup(db_session, "Nobody, A.")
+            assert True == new
+
+            # The resolver knows about the new Contributor.
+            assert (
+                ([nobody], False)
+                == Contributor.lookup(db_session, "Nobody, A.")
+            )
+
+    def test_changes_are_seen(self, db_session, create_contributor):
+        """
+        GIVEN: An active ContributorResolver
+        WHEN:  Contributors' names and identifiers change
+        THEN:  The resolver's answers change to match
+        """
+        bob = create_contributor(db_session, sort_name="Jones, Bob")
+        resolver = ContributorResolver(
+            db_session, sort_names=["Jones, Bob", "Jones, Robert"],
+            display_names=["Bob Jones"], viafs=["1"]
+        )
+        with resolver:
+            assert [bob] == resolver.lookup("Jones, Bob")
+            assert None == resolver.lookup("Jones, Robert")
+            assert None == resolver.sort_name_for_display_name("Bob Jones")
+
+            bob.sort_name = "Jones, Robert"
+            bob.display_name = "Bob Jones"
+            bob.viaf = "1"
+            assert None == resolver.lookup("Jones, Bob")
+            assert [bob] == resolver.lookup("Jones, Robert")
+            assert [bob] == resolver.lookup(viaf="1")
+            assert (
+                "Jones, Robert"
+                == resolver.sort_name_for_display_name("Bob Jones")
+            )
+
+            # Deleted Contributors are no longer found.
+            db_session.delete(bob)
+            db_session.flush()
+            assert None == resolver.lookup("Jones, Robert")
+
+    def test_create_missing(self, db_session, create_contributor):
+        """
+        GIVEN: ContributorData for a batch of books
+        WHEN:  Creating the missing Contributors ahead of time
+        THEN:  The Contributors that lookup() would have created are
+               created, and later lookups find them
+        """
+        existing = create_contributor(db_session, sort_name="Jones, Bob")
+        contributors = [
+            ContributorData(sort_name="Jones, Bob"),
+            ContributorData(sort_name="Al Smith"),
+            ContributorData(sort_name="Smith, Al"),
+            ContributorData(sort_name="Doe, Jo", viaf="1"),
+            ContributorData(sort_name="Doe, Jo", viaf="1"),
+            ContributorData(sort_name="Doe, Jo", lc="n1", viaf="1"),
+            ContributorData(display_name="Someone"),
+        ]
+        resolver = ContributorResolver.from_contributors(
+            db_session, contributors
+        )
+        created = resolver.create_missing(contributors)
+
+        # No Contributor is created ahead of time for "Al Smith",
+        # since it would be stored as "Smith, Al" and the lookup for
+        # "Al Smith" would never find it. Only one Contributor is
+        # created for each set of identifiers.
+        #
+        # Edition.add_contributor looks up the LC identifier as a VIAF
+        # identifier and vice versa, so that's how the Contributors
+        # are created.
+        assert (
+            [("Smith, Al", None, None), ("Doe, Jo", "1", None),
+             ("Doe, Jo", "1", "n1")]
+            == [(x.sort_name, x.lc, x.viaf) for x in created]
+        )
+        assert None == created[0].aliases
+        assert {} == created[0].extra
+
+        with resolver:
+            assert ([existing], False) == Contributor.lookup(
+                db_session, "Jones, Bob"
+            )
+            assert ([created[0]], False) == Contributor.lookup(
+                db_session, "Smith, Al"
+            )
+            # These are the lookups Edition.add_contributor makes.
+            assert ([created[1]], False) == Contributor.lookup(
+                db_session, "Doe, Jo", None, "1"
+            )
+            assert ([created[2]], False) == Contributor.lookup(
+                db_session, "Doe, Jo", "n1", "1"
+            )
+
+        # Nothing is created if nothing is missing.
+        assert [] == resolver.create_missing(contributors)
+
+    def test_create_missing_then_import(self, db_session):
+        """
+        GIVEN: Metadata for a book with several contributors
+        WHEN:  Creating the missing Contributors ahead of time and
+               then applying the Metadata
+        THEN:  The import uses the Contributors created ahead of time,
+               and creates no duplicates
+        """
+        data_source = DataSource.lookup(db_session, DataSource.GUTENBERG)
+        contributors = [
+            ContributorData(sort_name="Jane Doe"),
+            ContributorData(sort_name="Smith, Al"),
+            ContributorData(sort_name="Jones, Bob", lc="n1", viaf="1"),
+            ContributorData(sort_name="Brown, Cy", viaf="2"),
+        ]
+        metadata = Metadata(
+            data_source=data_source,
+            primary_identifier=IdentifierData(Identifier.GUTENBERG_ID, "1"),
+            title="A Book",
+            contributors=contributors,
+        )
+        before = db_session.query(Contributor).count()
+
+        resolver = ContributorResolver.from_contributors(
+            db_session, contributors
+        )
+        created = resolver.create_missing(contributors)
+        assert 3 == len(created)
+
+        with resolver:
+            edition, ignore = metadata.edition(db_session)
+            metadata.apply(edition, collection=None)
+
+        # One Contributor was created for each ContributorData, and
+        # each one is credited on the Edition.
+        assert before + 4 == db_session.query(Contributor).count()
+        assert (
+            set(created)
+            < set(x.contributor for x in edition.contributions)
+        )
+        # Once the Contributors are found, their identifiers are set
+        # correctly.
+        jones = [x for x in created if x.sort_name == "Jones, Bob"][0]
+        assert ("n1", "1") == (jones.lc, jones.viaf)
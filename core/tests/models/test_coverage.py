@@ -10,6 +10,7 @@ from ...model.coverage import (
 )
 from ...model.datasource import DataSource
 from ...model.identifier import Identifier
+from ...model.work import Work
 from ...util.datetime_helpers import datetime_utc, utc_now
 
 
@@ -609,3 +610,39 @@ class TestWorkCoverageRecord:
         # a different operation.
         assert WorkCoverageRecord.SUCCESS == irrelevant_record.status
         assert irrelevant_record.timestamp < new_timestamp
+
+    def test_bulk_add_for_work_ids(self, db_session, create_work):
+        """
+        GIVEN: Works identified by a query rather than loaded
+        WHEN:  Bulk adding WorkCoverageRecords for their IDs
+        THEN:  A WorkCoverageRecord is created or updated for each
+               Work the query finds, and no others
+        """
+        operation = "relevant"
+        covered = create_work(db_session)
+        record, _ = WorkCoverageRecord.add_for(
+            covered, operation, status=WorkCoverageRecord.TRANSIENT_FAILURE
+        )
+        uncovered = create_work(db_session)
+        ignored = create_work(db_session)
+
+        work_ids = db_session.query(Work.id).filter(
+            Work.id.in_([covered.id, uncovered.id])
+        )
+        assert 2 == WorkCoverageRecord.bulk_add_for_work_ids(
+            db_session, work_ids, operation,
+            status=WorkCoverageRecord.REGISTERED
+        )
+        db_session.expire_all()
+
+        def statuses(work):
+            return [x.status for x in work.coverage_records
+                    if x.operation == operation]
+        assert [WorkCoverageRecord.REGISTERED] == statuses(covered)
+        assert [WorkCoverageRecord.REGISTERED] == statuses(uncovered)
+        assert [] == statuses(ignored)
+
+        # A list of IDs works too.
+        assert 1 == WorkCoverageRecord.bulk_add_for_work_ids(
+            db_session, [ignored.id], operation
+        )
@@ -8,7 +8,13 @@ from mock import PropertyMock, create_autospec
 from ...model import PresentationCalculationPolicy
 from ...model.datasource import DataSource
 from ...model.edition import Edition
-from ...model.identifier import Identifier
+from ...model.classification import Subject
+from ...model.identifier import (
+    EquivalentIdentifierCache,
+    Identifier,
+    PresentationPrefetch,
+)
+from ...model.measurement import Measurement
 from ...model.resource import Hyperlink, Representation
 from ...util.datetime_helpers import utc_now
 from ...util.opds_writer import AtomFeed
@@ -540,6 +546,59 @@ class TestIdentifier:
         ])
         assert (identifiers == set(equivalent_ids))
 
+    def test_recursively_equivalent_identifier_ids_uses_active_cache(self, db_session, create_identifier):
+        """
+        GIVEN: Identifiers with equivalencies and an active EquivalentIdentifierCache
+        WHEN:  Querying for equivalent Identifiers more than once
+        THEN:  Only Identifiers the cache doesn't know about are looked up,
+               and changing an equivalency invalidates the cache
+        """
+        data_source = DataSource.lookup(db_session, DataSource.MANUAL)
+        identifier = create_identifier(db_session)
+        equivalent = create_identifier(db_session)
+        identifier.equivalent_to(data_source, equivalent, 0.9)
+        unrelated = create_identifier(db_session)
+        policy = PresentationCalculationPolicy()
+
+        with EquivalentIdentifierCache() as cache:
+            assert cache == EquivalentIdentifierCache.active()
+
+            equivs = Identifier.recursively_equivalent_identifier_ids(
+                db_session, [identifier.id], policy=policy
+            )
+            assert set([identifier.id, equivalent.id]) == set(equivs[identifier.id])
+            assert (0, 1) == (cache.hits, cache.misses)
+
+            # The second time around, only the new ID is looked up.
+            equivs = Identifier.recursively_equivalent_identifier_ids(
+                db_session, [identifier.id, unrelated.id], policy=policy
+            )
+            assert set([identifier.id, equivalent.id]) == set(equivs[identifier.id])
+            assert [unrelated.id] == equivs[unrelated.id]
+            assert (1, 2) == (cache.hits, cache.misses)
+
+            # A different policy is cached separately.
+            Identifier.recursively_equivalent_identifier_ids(
+                db_session, [identifier.id],
+                policy=PresentationCalculationPolicy(equivalent_identifier_levels=1)
+            )
+            assert (1, 3) == (cache.hits, cache.misses)
+
+            # A new equivalency clears the cache, so the change is
+            # picked up.
+            identifier.equivalent_to(data_source, unrelated, 0.9)
+            equivs = Identifier.recursively_equivalent_identifier_ids(
+                db_session, [identifier.id], policy=policy
+            )
+            assert (
+                set([identifier.id, equivalent.id, unrelated.id])
+                ==
+                set(equivs[identifier.id])
+            )
+            assert (1, 4) == (cache.hits, cache.misses)
+
+        assert None == EquivalentIdentifierCache.active()
+
     def test_licensed_through_collection(self, db_session, create_collection, create_edition, create_licensepool):
         """
         GIVEN: A LicensePool with an Edition and Collection
@@ -805,3 +864,105 @@ class TestIdentifier:
         # NOTE: we are not interested in the result returned by repr,
         # we just want to make sure that repr doesn't throw any unexpected exceptions
         _ = repr(identifier)
+
+
+class TestEquivalentIdentifierCache:
+
+    def test_bounded_size(self):
+        """
+        GIVEN: An EquivalentIdentifierCache with a maximum size
+        WHEN:  More Identifier IDs are cached than it can hold
+        THEN:  The least recently used entries are evicted
+        """
+        policy = PresentationCalculationPolicy()
+        cache = EquivalentIdentifierCache(max_size=2)
+        cache.set(policy, 1, [1, 10])
+        cache.set(policy, 2, [2])
+        assert [1, 10] == cache.get(policy, 1)
+
+        cache.set(policy, 3, [3])
+        assert 2 == len(cache)
+        assert None == cache.get(policy, 2)
+        assert [1, 10] == cache.get(policy, 1)
+        assert [3] == cache.get(policy, 3)
+
+    def test_invalidate(self):
+        """
+        GIVEN: An EquivalentIdentifierCache with entries
+        WHEN:  The caches are invalidated
+        THEN:  The entries are discarded
+        """
+        policy = PresentationCalculationPolicy()
+        cache = EquivalentIdentifierCache()
+        cache.set(policy, 1, [1, 10])
+        EquivalentIdentifierCache.invalidate()
+        assert None == cache.get(policy, 1)
+        assert 0 == len(cache)
+
+    def test_nesting(self):
+        """
+        GIVEN: Nested EquivalentIdentifierCaches
+        WHEN:  The inner one is exited
+        THEN:  The outer one becomes active again
+        """
+        with EquivalentIdentifierCache() as outer:
+            with EquivalentIdentifierCache() as inner:
+                assert inner == EquivalentIdentifierCache.active()
+            assert outer == EquivalentIdentifierCache.active()
+        assert None == EquivalentIdentifierCache.active()
+
+
+class TestPresentationPrefetch:
+
+    def test_lookups(self, db_session, create_identifier):
+        """
+        GIVEN: A PresentationPrefetch for some Identifiers
+        WHEN:  Looking up their classifications, measurements and resources
+        THEN:  The prefetched information is returned, unless an Identifier wasn't prefetched
+        """
+        source = DataSource.lookup(db_session, DataSource.OVERDRIVE)
+        staff = DataSource.lookup(db_session, DataSource.LIBRARY_STAFF)
+        i1 = create_identifier(db_session, foreign_id="1")
+        i2 = create_identifier(db_session, foreign_id="2")
+        i3 = create_identifier(db_session, foreign_id="3")
+        classification = i1.classify(source, Subject.TAG, "Cats")
+        measurement, ignore = i2.add_measurement(
+            source, Measurement.RATING, 5
+        )
+        i2.add_measurement(source, Measurement.PAGE_COUNT, 100)
+        description, ignore = i1.add_link(
+            Hyperlink.DESCRIPTION, None, source, content="About cats"
+        )
+        staff_description, ignore = i2.add_link(
+            Hyperlink.DESCRIPTION, None, staff, content="Also about cats"
+        )
+        i3.classify(source, Subject.TAG, "Dogs")
+
+        prefetch = PresentationPrefetch(db_session, [i1.id, i2.id])
+        ids = [i1.id, i2.id]
+        assert [classification] == prefetch.classifications(ids)
+        assert [measurement] == prefetch.measurements(ids)
+        assert (
+            set([description.resource, staff_description.resource]) ==
+            set(prefetch.resources(ids, [Hyperlink.DESCRIPTION]))
+        )
+        assert (
+            [staff_description.resource] ==
+            prefetch.resources(ids, [Hyperlink.DESCRIPTION], [staff])
+        )
+        assert [] == prefetch.resources(ids, [Hyperlink.IMAGE])
+
+        # i3 wasn't prefetched, so nothing can be said about it.
+        assert None == prefetch.classifications([i1.id, i3.id])
+        assert None == prefetch.measurements([i3.id])
+        assert None == prefetch.resources([i3.id], [Hyperlink.DESCRIPTION])
+
+        # While the prefetch is active, Identifier methods use it.
+        with prefetch:
+            assert prefetch == PresentationPrefetch.active()
+            champion, descriptions = Identifier.evaluate_summary_quality(
+                db_session, ids, [staff]
+            )
+            assert staff_description.resource == champion
+            assert [staff_description.resource] == descriptions
+        assert None == PresentationPrefetch.active()
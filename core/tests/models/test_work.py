@@ -28,6 +28,7 @@ from ...model.datasource import DataSource
 from ...model.edition import Edition
 from ...model.identifier import Identifier
 from ...model.licensing import LicensePool
+from ...model.measurement import Measurement
 from ...model.resource import (
     Hyperlink,
     Representation,
@@ -35,6 +36,8 @@ from ...model.resource import (
 )
 from ...model.work import (
     Work,
+    WorkAvailability,
+    WorkChange,
     WorkGenre,
 )
 from ...util.datetime_helpers import from_timestamp
@@ -1584,6 +1587,83 @@ class TestWork:
         # WorkCoverageRecord is processed.
         assert list(index.docs.values()) == []
 
+    def test_bulk_calculate_quality(self, db_session, create_collection, create_identifier, create_work):
+        """
+        GIVEN: Works with measurements of their popularity and rating
+        WHEN:  Recalculating their quality in bulk
+        THEN:  Quality is the same as when it's calculated for each Work, its calculation is recorded,
+               and changed Works are reindexed
+        """
+        WCR = WorkCoverageRecord
+        overdrive = DataSource.lookup(db_session, DataSource.OVERDRIVE)
+        collection = create_collection(db_session)
+        rated = create_work(
+            db_session, with_license_pool=True, collection=collection,
+            data_source_name=DataSource.OVERDRIVE
+        )
+        [pool] = rated.license_pools
+        pool.identifier.add_measurement(overdrive, Measurement.RATING, 4)
+        equivalent = create_identifier(db_session, foreign_id="equivalent")
+        pool.identifier.equivalent_to(overdrive, equivalent, 1)
+        equivalent.add_measurement(overdrive, Measurement.POPULARITY, 100)
+
+        # This work has no measurements, so it gets the default quality
+        # for its data source.
+        unmeasured = create_work(
+            db_session, with_license_pool=True, collection=collection,
+            data_source_name=DataSource.OVERDRIVE
+        )
+
+        # This work is in a different collection.
+        elsewhere = create_work(db_session, with_license_pool=True)
+        elsewhere.quality = 0.123
+
+        def quality(work):
+            default = Work.default_quality(
+                [p.data_source.name for p in work.license_pools]
+            )
+            work.calculate_quality(work.all_identifier_ids(), default)
+            return float(round(work.quality, 3))
+        expect = [quality(rated), quality(unmeasured)]
+        assert 0.4 == expect[1]
+        for work in (rated, unmeasured):
+            work.quality = 0
+        for work in (rated, unmeasured, elsewhere):
+            for record in list(work.coverage_records):
+                db_session.delete(record)
+        db_session.flush()
+
+        assert 2 == Work.bulk_calculate_quality(
+            db_session, collection, batch_size=1
+        )
+        db_session.expire_all()
+        assert expect == [float(rated.quality), float(unmeasured.quality)]
+        assert 0.123 == float(elsewhere.quality)
+        for work in (rated, unmeasured):
+            [record] = [
+                x for x in work.coverage_records
+                if x.operation == WCR.UPDATE_SEARCH_INDEX_OPERATION
+            ]
+            assert WCR.REGISTERED == record.status
+            [record] = [
+                x for x in work.coverage_records
+                if x.operation == WCR.QUALITY_OPERATION
+            ]
+            assert WCR.SUCCESS == record.status
+        assert [] == elsewhere.coverage_records
+
+        # Nothing changes the second time.
+        assert 0 == Work.bulk_calculate_quality(db_session, collection)
+
+        # Without a collection, every work is recalculated.
+        assert 1 == Work.bulk_calculate_quality(db_session)
+        db_session.expire_all()
+        assert 0 == float(elsewhere.quality)
+        assert (
+            set([WCR.QUALITY_OPERATION, WCR.UPDATE_SEARCH_INDEX_OPERATION]) ==
+            set(x.operation for x in elsewhere.coverage_records)
+        )
+
     def test_for_unchecked_subjects(self, db_session, create_work):
         """
         GIVEN: A Work with a LicensePool with an Identifier that has unchecked Subjects
@@ -1736,12 +1816,103 @@ class TestWork:
 
         s = MockSearchIndex()
         work = create_work(db_session, with_license_pool=True)
+        urn = work.presentation_edition.primary_identifier.urn
         work.delete(search_index=s)
 
         assert db_session.query(Work).filter(Work.id == work.id).all() == []
         assert len(s.removed) == 1
         assert s.removed == [work]
 
+        # The deletion was logged, along with the identifier of the
+        # deleted work.
+        [change] = db_session.query(WorkChange).filter(
+            WorkChange.change_kind == WorkChange.DELETION
+        ).all()
+        assert change.work_id == work.id
+        assert change.identifier_urn == urn
+
+    def test_record_change(self, db_session, create_work):
+        """
+        GIVEN: A Work
+        WHEN:  Its presentation or availability changes
+        THEN:  The change is added to the WorkChange log
+        """
+        work = create_work(db_session, with_license_pool=True)
+        [pool] = work.license_pools
+        db_session.query(WorkChange).delete()
+
+        def logged():
+            return [
+                (x.work_id, x.change_kind, x.identifier_urn)
+                for x in db_session.query(WorkChange).order_by(WorkChange.id)
+            ]
+
+        # Withdrawing a work is a change in presentation.
+        work.presentation_edition.title = None
+        work.set_presentation_ready_based_on_content()
+        assert [(work.id, WorkChange.PRESENTATION, None)] == logged()
+
+        # So is making it presentation ready again.
+        work.presentation_edition.title = "A title"
+        work.set_presentation_ready_based_on_content()
+        assert 2 == len(logged())
+
+        # Making a work presentation ready when it's already
+        # presentation ready isn't a change.
+        work.set_presentation_ready()
+        assert 2 == len(logged())
+
+        # Changing the number of licenses owned is a change in
+        # availability; changing the number of licenses available isn't.
+        pool.update_availability(
+            pool.licenses_owned, pool.licenses_available + 1,
+            pool.licenses_reserved, pool.patrons_in_hold_queue
+        )
+        assert 2 == len(logged())
+        pool.update_availability(
+            pool.licenses_owned + 1, pool.licenses_available,
+            pool.licenses_reserved, pool.patrons_in_hold_queue
+        )
+        assert (work.id, WorkChange.AVAILABILITY, None) == logged()[-1]
+
+        # So is losing a license pool.
+        work.license_pools.remove(pool)
+        assert 4 == len(logged())
+        assert (work.id, WorkChange.AVAILABILITY, None) == logged()[-1]
+
+    def test_work_changes(self, db_session, create_work):
+        """
+        GIVEN: A WorkChange log
+        WHEN:  Summarizing the changes in a time range
+        THEN:  Each work that changed is listed once, with its latest change
+        """
+        work1 = create_work(db_session, with_license_pool=True)
+        work2 = create_work(db_session, with_license_pool=True)
+        db_session.query(WorkChange).delete()
+
+        now = utc_now()
+        an_hour_ago = now - datetime.timedelta(hours=1)
+        yesterday = now - datetime.timedelta(days=1)
+        last_week = now - datetime.timedelta(days=7)
+        WorkChange.record(work1, WorkChange.PRESENTATION, last_week)
+        WorkChange.record(work1, WorkChange.AVAILABILITY, yesterday)
+        WorkChange.record(work1, WorkChange.PRESENTATION, an_hour_ago)
+        WorkChange.record(work2, WorkChange.DELETION, yesterday)
+        urn = work2.presentation_edition.primary_identifier.urn
+
+        assert {
+            work1.id: (an_hour_ago, None),
+            work2.id: (yesterday, urn),
+        } == WorkChange.changes(db_session, yesterday)
+
+        # The end of the range is exclusive.
+        assert {
+            work1.id: (yesterday, None),
+            work2.id: (yesterday, urn),
+        } == WorkChange.changes(db_session, last_week, an_hour_ago)
+
+        assert {} == WorkChange.changes(db_session, now)
+
 
 class TestWorkConsolidation:
 
@@ -2845,3 +3016,130 @@ class TestWorkConsolidation:
         # Even if the LicensePool had a work before, it gets removed.
         assert lp.calculate_work() == (None, False)
         assert lp.work is None
+
+
+class TestWorkAvailability:
+
+    @staticmethod
+    def rows(db_session, work):
+        """Look up a work's WorkAvailability rows without going through
+        the identity map, which doesn't know when they change.
+        """
+        WA = WorkAvailability
+        return db_session.query(
+            WA.collection_id, WA.suppressed, WA.licenses_owned,
+            WA.open_access, WA.sort_title,
+        ).filter(WA.work_id==work.id).all()
+
+    def test_maintained_on_flush(self, db_session, create_work):
+        """
+        GIVEN: A presentation-ready work with a licensed LicensePool
+        WHEN:  The work, its LicensePool or its presentation edition changes
+        THEN:  The work's WorkAvailability row is kept up to date
+        """
+        work = create_work(db_session, with_license_pool=True)
+        [pool] = work.license_pools
+        pool.open_access = False
+        pool.licenses_owned = 3
+        pool.licenses_available = 2
+        work.presentation_edition.sort_title = "Title, The"
+
+        [(collection_id, suppressed, owned, open_access,
+          sort_title)] = self.rows(db_session, work)
+        assert pool.collection_id == collection_id
+        assert (False, 3, False) == (suppressed, owned, open_access)
+        assert "Title, The" == sort_title
+
+        # A work whose only LicensePool is suppressed is still in the
+        # table, but marked as suppressed.
+        pool.suppressed = True
+        [row] = self.rows(db_session, work)
+        assert True == row.suppressed
+        pool.suppressed = False
+
+        # A work with no licenses has no row.
+        pool.licenses_owned = 0
+        assert [] == self.rows(db_session, work)
+        pool.licenses_owned = 1
+        assert 1 == len(self.rows(db_session, work))
+
+        # Neither does a work that isn't presentation-ready.
+        work.presentation_ready = False
+        assert [] == self.rows(db_session, work)
+        work.presentation_ready = True
+        assert 1 == len(self.rows(db_session, work))
+
+        # Or one whose LicensePool has no delivery mechanisms.
+        for lpdm in pool.delivery_mechanisms:
+            db_session.delete(lpdm)
+        assert [] == self.rows(db_session, work)
+
+    def test_not_refreshed_for_loans(self, db_session, create_work):
+        """
+        GIVEN: A work with a WorkAvailability row
+        WHEN:  Only the number of licenses available changes
+        THEN:  The row is not recalculated
+        """
+        work = create_work(db_session, with_license_pool=True)
+        [pool] = work.license_pools
+        pool.licenses_owned = 3
+        pool.licenses_available = 3
+        db_session.flush()
+
+        # Remove the row, so we can tell whether it's recalculated.
+        db_session.query(WorkAvailability).delete()
+
+        pool.licenses_available = 2
+        db_session.flush()
+        assert [] == self.rows(db_session, work)
+
+        # A change that might affect the row does recalculate it.
+        pool.licenses_owned = 4
+        db_session.flush()
+        assert 1 == len(self.rows(db_session, work))
+
+    def test_refresh(self, db_session, create_work):
+        """
+        GIVEN: A WorkAvailability table that has gotten out of sync
+        WHEN:  Refreshing the table
+        THEN:  It's rebuilt from the LicensePools
+        """
+        work1 = create_work(db_session, with_license_pool=True)
+        work2 = create_work(db_session, with_open_access_download=True)
+        db_session.flush()
+        db_session.query(WorkAvailability).delete()
+        assert [] == self.rows(db_session, work1)
+
+        WorkAvailability.refresh(db_session, [work1.id])
+        assert 1 == len(self.rows(db_session, work1))
+        assert [] == self.rows(db_session, work2)
+
+        WorkAvailability.refresh(db_session)
+        [row] = self.rows(db_session, work2)
+        assert True == row.open_access
+
+    def test_sort_key(self, db_session, create_work):
+        """
+        GIVEN: A work
+        WHEN:  Finding its sort key for a list of WorkAvailability fields
+        THEN:  The values match what's stored in the WorkAvailability table
+        """
+        work = create_work(db_session, with_license_pool=True)
+        work.presentation_edition.sort_title = "Sort Title"
+        work.presentation_edition.sort_author = None
+        work.last_update_time = None
+        fields = [
+            WorkAvailability.last_update_time, WorkAvailability.sort_author,
+            WorkAvailability.sort_title, Work.id
+        ]
+        assert [
+            WorkAvailability.NO_UPDATE_TIME.isoformat(),
+            WorkAvailability.NO_SORT_VALUE,
+            "Sort Title", work.id,
+        ] == WorkAvailability.sort_key(work, fields)
+
+        [stored] = db_session.query(*fields[:-1]).filter(
+            WorkAvailability.work_id==work.id
+        ).all()
+        assert WorkAvailability.NO_UPDATE_TIME == stored[0]
+        assert WorkAvailability.NO_SORT_VALUE == stored[1]
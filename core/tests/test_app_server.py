@@ -35,8 +35,10 @@ from ..app_server import (
     ErrorHandler,
     ComplaintController,
     compressible,
+    finish_request_metrics,
     load_facets_from_request,
     load_pagination_from_request,
+    start_request_metrics,
 )
 
 from ..config import Configuration
@@ -54,6 +56,7 @@ from ..problem_details import (
     INVALID_URN,
 )
 
+from ..util.instrumentation import RequestMetrics
 from ..util.opds_writer import (
     OPDSFeed,
     OPDSMessage,
@@ -410,6 +413,48 @@ class TestLoadMethods(DatabaseTest):
         # pagination classes.
 
 
+class TestRequestMetricsHooks(DatabaseTest):
+
+    def setup_method(self):
+        super(TestRequestMetricsHooks, self).setup_method()
+        self.app = Flask(__name__)
+
+    def teardown_method(self):
+        RequestMetrics.finish()
+        super(TestRequestMetricsHooks, self).teardown_method()
+
+    def test_start_request_metrics(self):
+        setting = ConfigurationSetting.sitewide(
+            self._db, LogConfiguration.REQUEST_TIMING_SAMPLE_RATE
+        )
+
+        # By default no requests are measured.
+        assert None == start_request_metrics(self._db)
+        assert None == start_request_metrics(None)
+
+        setting.value = "1"
+        assert isinstance(start_request_metrics(self._db), RequestMetrics)
+
+        # A bad setting is treated as zero.
+        setting.value = "often"
+        assert None == start_request_metrics(self._db)
+
+    def test_finish_request_metrics(self):
+        with self.app.test_request_context("/feed"):
+            # If the request wasn't measured, the response is unchanged.
+            response = flask.Response("ok")
+            assert response == finish_request_metrics(response)
+            assert 'Server-Timing' not in response.headers
+
+            metrics = RequestMetrics.start()
+            metrics.add(RequestMetrics.DATABASE, 0.01)
+            response = finish_request_metrics(flask.Response("ok"))
+            assert response.headers['Server-Timing'].startswith(
+                'db;dur=10.0;desc="1", total;dur='
+            )
+            assert None == RequestMetrics.current()
+
+
 class CanBeProblemDetailDocument(Exception):
     """A fake exception that can be represented as a problem
     detail document.
@@ -27,7 +27,9 @@ from ..model import (
     ExternalIntegration,
     Hyperlink,
     Identifier,
+    Measurement,
     PresentationCalculationPolicy,
+    PresentationPrefetch,
     Representation,
     RightsStatus,
     Subject,
@@ -187,6 +189,20 @@ class TestBaseCoverageProvider(CoverageProviderTest):
         provider = ValidMock(self._db, batch_size=-10)
         assert 50 == provider.batch_size
 
+    def test_for_session(self):
+        class ValidMock(BaseCoverageProvider):
+            SERVICE_NAME = "A Service"
+
+        provider = ValidMock(self._db, batch_size=50)
+        other_session = object()
+        copy = provider.for_session(other_session)
+        assert copy is not provider
+        assert other_session == copy._db
+        assert 50 == copy.batch_size
+
+        # The original CoverageProvider is unchanged.
+        assert self._db == provider._db
+
     def test_subclass_must_define_service_name(self):
         class NoServiceName(BaseCoverageProvider):
             pass
@@ -2207,6 +2223,75 @@ class TestWorkClassificationCoverageProvider(DatabaseTest):
         )
 
 
+    def test_process_batch(self):
+        # Presentation for a batch of works is calculated with
+        # information loaded for the whole batch, and comes out the
+        # same as it does when each work is handled on its own.
+        source = DataSource.lookup(self._db, DataSource.OVERDRIVE)
+        works = []
+        for i, (genre, rating) in enumerate(
+            [("Science Fiction", 5), ("Romance", 2), ("History", 4)]
+        ):
+            work = self._work(with_license_pool=True)
+            [pool] = work.license_pools
+            identifier = pool.identifier
+            identifier.classify(source, Subject.TAG, genre, weight=100)
+            identifier.add_measurement(source, Measurement.RATING, rating)
+            identifier.add_link(
+                Hyperlink.DESCRIPTION, None, source,
+                content="A book about %s." % genre
+            )
+
+            # This work also has an equivalent identifier with a
+            # description of its own.
+            equivalent = self._identifier()
+            identifier.equivalent_to(source, equivalent, 1)
+            equivalent.add_measurement(source, Measurement.POPULARITY, 1)
+            equivalent.add_link(
+                Hyperlink.SHORT_DESCRIPTION, None, source,
+                content="Short description %d" % i
+            )
+            works.append(work)
+
+        def presentation(work):
+            return (
+                work.quality, work.summary_text, work.fiction, work.audience,
+                sorted(g.name for g in work.genres),
+                work.presentation_edition.sort_author,
+            )
+
+        def reset(work):
+            work.quality = 0
+            work.set_summary(None)
+            work.work_genres = []
+            self._db.flush()
+
+        provider = WorkClassificationCoverageProvider(self._db)
+        for work in works:
+            provider.process_item(work)
+        expect = [presentation(work) for work in works]
+        assert len(set(x[0] for x in expect)) == 3
+
+        class Mock(WorkClassificationCoverageProvider):
+            prefetches = []
+            def process_item(self, work):
+                self.prefetches.append(PresentationPrefetch.active())
+                return super(Mock, self).process_item(work)
+
+        for work in works:
+            reset(work)
+        provider = Mock(self._db)
+        results = provider.process_batch(works)
+        assert works == results
+        assert expect == [presentation(work) for work in works]
+
+        # The same prefetch was used for every work, and it was
+        # deactivated afterwards.
+        [prefetch] = set(provider.prefetches)
+        assert isinstance(prefetch, PresentationPrefetch)
+        assert None == PresentationPrefetch.active()
+
+
 class TestOPDSEntryWorkCoverageProvider(DatabaseTest):
 
     def test_run(self):
@@ -71,7 +71,10 @@ from ..external_search import (
     QueryParser,
     SearchBase,
     SearchIndexCoverageProvider,
+    SearchResultCache,
+    SharedSearchResults,
     SortKeyPagination,
+    WorkListFilterCache,
     WorkSearchResult,
     mock_search_index,
 )
@@ -4473,6 +4476,238 @@ class TestWorkSearchResult(DatabaseTest):
         assert work.sort_title == result.sort_title
 
 
+class TestWorkListFilterCache(DatabaseTest):
+
+    def test_get_and_set(self):
+        cache = WorkListFilterCache(max_size=1, ttl=10)
+        arguments = dict(media=["Book"], fiction=True)
+        cache.set("a", arguments, now=100)
+
+        # Every caller gets its own copy of the arguments.
+        cached = cache.get("a", now=105)
+        assert arguments == cached
+        cached['media'].append("Audio")
+        assert ["Book"] == cache.get("a", now=105)['media']
+
+        # Arguments expire after the TTL.
+        assert None == cache.get("a", now=111)
+
+        # The least recently used arguments are evicted to keep the
+        # cache within its maximum size.
+        cache.set("a", arguments, now=100)
+        cache.set("b", arguments, now=100)
+        assert None == cache.get("a", now=100)
+        assert 1 == len(cache)
+
+        stats = cache.stats
+        assert 2 == stats['hits']
+        assert 2 == stats['misses']
+
+    def test_key(self):
+        # Only a Lane's filter arguments can be cached.
+        worklist = WorkList()
+        worklist.initialize(self._default_library)
+        assert None == WorkListFilterCache.key(worklist)
+
+        lane = self._lane()
+        key = WorkListFilterCache.key(lane)
+        assert (lane.id, self._default_library.id) == key[:2]
+        assert key == WorkListFilterCache.key(lane)
+
+        # Changing the lane's configuration changes the key.
+        lane.fiction = True
+        self._db.flush()
+        assert key != WorkListFilterCache.key(lane)
+
+        # So does adding a CustomList to the lane.
+        key = WorkListFilterCache.key(lane)
+        customlist, ignore = self._customlist(num_entries=0)
+        assert key != WorkListFilterCache.key(lane)
+        key = WorkListFilterCache.key(lane)
+        lane.customlists.append(customlist)
+        self._db.flush()
+        assert key != WorkListFilterCache.key(lane)
+
+    def test_from_worklist_uses_cache(self):
+        old_cache = Filter.WORKLIST_CACHE
+        cache = Filter.WORKLIST_CACHE = WorkListFilterCache()
+        try:
+            lane = self._lane()
+            lane.media = [Edition.BOOK_MEDIUM]
+            filter = Filter.from_worklist(self._db, lane, None)
+            assert (0, 1) == (cache.hits, cache.misses)
+
+            # The second time, the lane's filter arguments come from
+            # the cache.
+            filter2 = Filter.from_worklist(self._db, lane, None)
+            assert (1, 1) == (cache.hits, cache.misses)
+            assert filter.media == filter2.media
+            assert filter.media is not filter2.media
+            assert filter.collection_ids == filter2.collection_ids
+
+            # Facets are applied to every Filter.
+            class Mock(object):
+                def modify_search_filter(self, filter):
+                    filter.fiction = "modified"
+                def scoring_functions(self, filter):
+                    return []
+            filter3 = Filter.from_worklist(self._db, lane, Mock())
+            assert "modified" == filter3.fiction
+            assert (2, 1) == (cache.hits, cache.misses)
+
+            # Once the lane changes, its filter arguments are recalculated.
+            lane.media = [Edition.AUDIO_MEDIUM]
+            filter = Filter.from_worklist(self._db, lane, None)
+            assert [Edition.AUDIO_MEDIUM] == filter.media
+            assert (2, 2) == (cache.hits, cache.misses)
+
+            # A WorkList that's not a Lane is never cached.
+            worklist = WorkList()
+            worklist.initialize(self._default_library)
+            Filter.from_worklist(self._db, worklist, None)
+            Filter.from_worklist(self._db, worklist, None)
+            assert (2, 2) == (cache.hits, cache.misses)
+        finally:
+            Filter.WORKLIST_CACHE = old_cache
+
+
+class TestSearchResultCache(object):
+
+    def test_get_and_set(self):
+        cache = SearchResultCache(max_size=2, ttl=10)
+        cache.set("a", ["result 1"], now=100)
+        assert ["result 1"] == cache.get("a", now=105)
+
+        # Results expire after the TTL.
+        assert None == cache.get("a", now=111)
+        assert 0 == len(cache)
+
+        # The least recently used results are evicted to keep the
+        # cache within its maximum size.
+        cache.set("a", ["a"], now=100)
+        cache.set("b", ["b"], now=100)
+        cache.get("a", now=100)
+        cache.set("c", ["c"], now=100)
+        assert ["a"] == cache.get("a", now=100)
+        assert None == cache.get("b", now=100)
+        assert ["c"] == cache.get("c", now=100)
+
+        stats = cache.stats
+        assert 4 == stats['hits']
+        assert 2 == stats['misses']
+        assert 2 == stats['size']
+        assert 4/6.0 == stats['hit_rate']
+
+        cache.clear()
+        assert 0 == len(cache)
+
+    def test_key(self):
+        pagination = Pagination(0, 10)
+        key = SearchResultCache.key("a  query ", Filter(fiction=True), pagination)
+
+        # Differences in whitespace are ignored.
+        assert key == SearchResultCache.key(
+            "a query", Filter(fiction=True), pagination
+        )
+
+        # Any other difference makes a different search.
+        assert key != SearchResultCache.key(
+            "another query", Filter(fiction=True), pagination
+        )
+        assert key != SearchResultCache.key(
+            "a query", Filter(fiction=False), pagination
+        )
+        assert key != SearchResultCache.key(
+            "a query", Filter(fiction=True), Pagination(10, 10)
+        )
+        assert key != SearchResultCache.key(
+            "a query", Filter(fiction=True), pagination, "works-alias"
+        )
+
+    def test_query_works_uses_cache(self):
+        class Mock(ExternalSearchIndex):
+            RESULT_CACHE = SearchResultCache()
+
+            def __init__(self):
+                self.works_alias = "works-current"
+                self.query_works_multi_calls = []
+
+            def query_works_multi(self, queries, debug=False):
+                self.query_works_multi_calls.append(queries)
+                return [["r1", "r2"]]
+
+        search = Mock()
+        assert ["r1", "r2"] == search.query_works(
+            "query", Filter(), Pagination(0, 10)
+        )
+        assert 1 == len(search.query_works_multi_calls)
+
+        # The second time, the results come from the cache, and the
+        # Pagination object is told about them.
+        pagination = Pagination(0, 10)
+        assert ["r1", "r2"] == search.query_works("query", Filter(), pagination)
+        assert 1 == len(search.query_works_multi_calls)
+        assert 2 == pagination.this_page_size
+        assert 1 == search.RESULT_CACHE.hits
+
+        # The cache is bypassed when debugging.
+        search.query_works("query", Filter(), Pagination(0, 10), debug=True)
+        assert 2 == len(search.query_works_multi_calls)
+
+
+class TestSharedSearchResults(DatabaseTest):
+
+    def test_identical_searches_run_once(self):
+        search = MockExternalSearchIndex()
+        work = self._work(with_license_pool=True)
+        search.bulk_update([work])
+        shared = SharedSearchResults(search, batch_size=1)
+
+        def collection_filter():
+            return Filter(collections=[self._default_collection])
+
+        # Two of these three searches are identical, so only two
+        # searches are actually run.
+        queries = [
+            (None, collection_filter(), Pagination(0, 10)),
+            (None, collection_filter(), Pagination(0, 10)),
+            (None, Filter(fiction=True), Pagination(0, 10)),
+        ]
+        assert 2 == shared.prefetch(queries)
+        assert 2 == len(search.queries)
+        assert 2 == shared.misses
+
+        # Running one of those searches again uses the earlier results,
+        # and the Pagination object is told about the page of results.
+        pagination = Pagination(0, 10)
+        [results] = shared.query_works_multi(
+            [(None, collection_filter(), pagination)]
+        )
+        assert 1 == len(results)
+        assert 2 == len(search.queries)
+        assert 1 == shared.hits
+        assert True == pagination.page_has_loaded
+        assert 1 == pagination.this_page_size
+
+        # Asking for a different page is a different search.
+        shared.query_works(None, collection_filter(), Pagination(10, 10))
+        assert 3 == len(search.queries)
+        assert 3 == shared.misses
+
+        # Anything other than searching is handled by the real index.
+        assert search.docs == shared.docs
+
+    def test_match_nothing(self):
+        # A search that's known to match nothing is never run.
+        search = MockExternalSearchIndex()
+        shared = SharedSearchResults(search)
+        assert [] == shared.query_works(None, Filter(match_nothing=True))
+        assert 0 == shared.prefetch(
+            [(None, Filter(match_nothing=True), Pagination(0, 10))]
+        )
+        assert [] == search.queries
+
+
 class TestSearchIndexCoverageProvider(DatabaseTest):
 
     def test_operation(self):
@@ -29,6 +29,7 @@ from ..entrypoint import (
 from ..external_search import (
     Filter,
     MockExternalSearchIndex,
+    SortKeyPagination,
     WorkSearchResult,
     mock_search_index,
 )
@@ -60,6 +61,7 @@ from ..model import (
     LicensePool,
     SessionManager,
     Work,
+    WorkAvailability,
     WorkGenre,
 )
 from ..problem_details import INVALID_INPUT
@@ -971,7 +973,9 @@ class TestDatabaseBackedFacets(DatabaseTest):
             f2.default_facet(config, f2.ORDER_FACET_GROUP_NAME))
 
     def test_order_by(self):
-        E = Edition
+        # The sort keys come from the WorkAvailability table, where
+        # they're indexed.
+        E = WorkAvailability
         W = Work
         def order(facet, ascending=None):
             f = DatabaseBackedFacets(
@@ -2680,6 +2684,65 @@ class TestDatabaseBackedWorkList(DatabaseTest):
         facets.availability = Facets.AVAILABLE_OPEN_ACCESS
         assert 0 == wl.works_from_database(self._db, facets).count()
 
+    def test_works_from_database_with_sort_key_pagination(self):
+        # A SortKeyPagination makes works_from_database() pick up
+        # where the previous page left off, rather than using OFFSET.
+        works = [
+            self._work(title=title, with_license_pool=True)
+            for title in ("Bleak House", "Armadale", "Cranford", "Dombey")
+        ]
+        armadale, bleak_house, cranford, dombey = sorted(
+            works, key=lambda x: x.title
+        )
+        wl = DatabaseBackedWorkList()
+        wl.initialize(self._default_library)
+        facets = DatabaseBackedFacets(
+            self._default_library,
+            collection=Facets.COLLECTION_FULL,
+            availability=Facets.AVAILABLE_ALL,
+            order=Facets.ORDER_TITLE
+        )
+
+        def pages(facets, pagination):
+            while pagination:
+                page = wl.works_from_database(
+                    self._db, facets, pagination
+                ).all()
+                pagination.page_loaded(page)
+                yield page
+                pagination = pagination.next_page
+
+        assert (
+            [[armadale, bleak_house], [cranford, dombey], []] ==
+            list(pages(facets, SortKeyPagination(size=2)))
+        )
+
+        # The pagination key is based on the last item on the page.
+        pagination = SortKeyPagination(size=3)
+        wl.works_from_database(self._db, facets, pagination).all()
+        pagination.page_loaded([armadale, bleak_house, cranford])
+        assert (
+            WorkAvailability.sort_key(
+                cranford, [WorkAvailability.sort_title,
+                           WorkAvailability.sort_author, Work.id]
+            ) == pagination.next_page.last_item_on_previous_page
+        )
+
+        # The first sort field can be in descending order.
+        facets.order_ascending = False
+        assert (
+            [[dombey, cranford, bleak_house], [armadale]] ==
+            list(pages(facets, SortKeyPagination(size=3)))[:2]
+        )
+
+        # Without a database-backed faceting object, works are
+        # ordered by ID.
+        by_id = sorted(works, key=lambda x: x.id)
+        assert (
+            [by_id[:3], by_id[3:]] ==
+            list(pages(None, SortKeyPagination(size=3)))[:2]
+        )
+
     def test_base_query(self):
         # Verify that base_query makes the query we expect and then
         # calls some optimization methods (not tested).
@@ -2697,6 +2760,11 @@ class TestDatabaseBackedWorkList(DatabaseTest):
         [base_query, m, d] = result
         expect = self._db.query(Work).join(
             Work.license_pools
+        ).join(
+            WorkAvailability, and_(
+                WorkAvailability.work_id==LicensePool.work_id,
+                WorkAvailability.collection_id==LicensePool.collection_id,
+            )
         ).join(
             Work.presentation_edition
         ).filter(
@@ -4,6 +4,7 @@ from ..testing import DatabaseTest
 from ..local_analytics_provider import LocalAnalyticsProvider
 from ..model import (
     CirculationEvent,
+    CirculationEventBuffer,
     ExternalIntegration,
     create,
 )
@@ -118,3 +119,39 @@ class TestLocalAnalyticsProvider(DatabaseTest):
         assert event2 != event
         assert True == is_new
         assert None == event2.location
+
+    def test_batched_events(self):
+        # If the integration is configured to write events in batches,
+        # events are put into a buffer shared by every
+        # LocalAnalyticsProvider.
+        assert False == self.la.batched
+        p = LocalAnalyticsProvider
+        assert isinstance(p.BUFFER, CirculationEventBuffer)
+
+        self.integration.setting(p.EVENT_WRITING).value = (
+            p.EVENT_WRITING_BATCHED
+        )
+        self.integration.setting(p.LOCATION_SOURCE).value = (
+            p.LOCATION_SOURCE_NEIGHBORHOOD
+        )
+        la = p(self.integration, self._default_library)
+        assert True == la.batched
+        la.BUFFER = CirculationEventBuffer(max_age=3600)
+
+        pool = self._licensepool(None)
+        now = utc_now()
+        la.collect_event(
+            self._default_library, pool, CirculationEvent.CM_CHECKOUT, now,
+            neighborhood="Gormenghast"
+        )
+        assert 1 == la.BUFFER.pending
+        qu = self._db.query(CirculationEvent)
+        assert 0 == qu.count()
+
+        # Once the buffer is flushed, the event is in the database.
+        la.BUFFER.flush(self._db)
+        [event] = qu.all()
+        assert pool == event.license_pool
+        assert self._default_library == event.library
+        assert now == event.start
+        assert "Gormenghast" == event.location
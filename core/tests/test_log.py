@@ -49,6 +49,20 @@ class TestJSONFormatter(object):
         assert "pathname" == data['filename']
         assert 'ValueError: fake exception' in data['traceback']
 
+    def test_format_with_request_timing(self):
+        # Request timings passed in as `extra` become a field of the
+        # JSON document.
+        formatter = JSONFormatter("some app")
+        record = logging.LogRecord(
+            "some logger", logging.INFO, "pathname",
+            104, "A message", {}, None, None
+        )
+        assert 'request_timing' not in json.loads(formatter.format(record))
+
+        record.request_timing = dict(db=dict(ms=1.5, count=2))
+        data = json.loads(formatter.format(record))
+        assert dict(db=dict(ms=1.5, count=2)) == data['request_timing']
+
     def test_format_with_different_types_of_strings(self):
         # As long as all data is either Unicode or UTF-8, any combination
         # of Unicode and bytestrings can be combined in log messages.
@@ -1,6 +1,6 @@
 import datetime
 import pytest
-from pymarc import Record, MARCReader
+from pymarc import Field, Record, MARCReader
 from io import StringIO
 from urllib.parse import quote
 from sqlalchemy.orm.session import Session
@@ -19,6 +19,7 @@ from ..model import (
     Representation,
     RightsStatus,
     Work,
+    WorkChange,
     get_one,
 )
 from ..config import CannotLoadConfiguration
@@ -28,9 +29,11 @@ from ..external_search import (
 )
 from ..marc import (
   Annotator,
+  MARCChanges,
   MARCExporter,
   MARCExporterFacets,
 )
+from ..metadata_layer import IdentifierData
 from ..s3 import (
     MockS3Uploader,
     S3Uploader,
@@ -488,6 +491,63 @@ class TestMARCExporter(DatabaseTest):
         new_record = MARCExporter.create_record(new_work, annotator)
         assert record.as_marc() == new_record.as_marc()
 
+    def test_record_parts(self):
+        work = self._work(with_license_pool=True, title="A title",
+                          data_source_name=DataSource.OVERDRIVE)
+        annotator = Annotator()
+
+        # The cacheable part of the record is created and cached, and
+        # the fields that aren't cached are returned separately.
+        assert None == work.marc_record
+        data, fields = MARCExporter.record_parts(work, annotator)
+        assert work.marc_record.encode("utf8") == data
+        assert DataSource.OVERDRIVE not in work.marc_record
+        [distributor] = [field for field in fields if field.tag == "264"]
+        assert DataSource.OVERDRIVE == distributor.get_subfields("b")[0]
+
+        # Putting the parts together gives the same record as
+        # create_record.
+        record = MARCExporter.create_record(work, annotator)
+        assert record.as_marc() == MARCExporter.append_fields(data, fields)
+
+        # Once it's cached, the record isn't created again unless
+        # that's forced.
+        work.presentation_edition.title = "A new title"
+        data, fields = MARCExporter.record_parts(work, annotator)
+        assert b"A title" in data
+        data, fields = MARCExporter.record_parts(
+            work, annotator, force_create=True
+        )
+        assert b"A new title" in data
+
+        # A work with no active license pool has no record.
+        assert None == MARCExporter.record_parts(self._work(), annotator)
+
+    def test_append_fields(self):
+        record = Record(leader=Annotator.leader(self._work()), force_utf8=True)
+        record.add_field(Field(tag="001", data="an identifier"))
+        record.add_field(Field(
+            tag="245", indicators=["0", "0"],
+            subfields=["a", "Little Mimi\u2019s First Counting Lesson"]
+        ))
+        data = record.as_marc()
+        assert data == MARCExporter.append_fields(data, [])
+
+        # Appending fields to the serialized record is the same as
+        # adding them to the record and serializing it again.
+        fields = [
+            Field(tag="264", indicators=[" ", "2"],
+                  subfields=["b", "Lagerlo\xf6f"]),
+            Field(tag="856", indicators=["4", "0"],
+                  subfields=["u", "http://example.com/"]),
+        ]
+        appended = MARCExporter.append_fields(data, fields)
+        record.add_field(*fields)
+        assert record.as_marc() == appended
+
+        [parsed] = list(MARCReader(appended, force_utf8=True))
+        assert ["001", "245", "264", "856"] == [f.tag for f in parsed.fields]
+
     def test_records(self):
         integration = self._integration()
         now = utc_now()
@@ -542,6 +602,10 @@ class TestMARCExporter(DatabaseTest):
         assert w1.title in w1.marc_record
         assert w2.title in w2.marc_record
 
+        # The records are in the order the search engine returned the
+        # works, even though they were put together by several threads.
+        assert [w1.title, w2.title] == titles
+
         self._db.delete(cache)
 
         # It also works with a WorkList instead of a Lane, in which case
@@ -623,6 +687,77 @@ class TestMARCExporter(DatabaseTest):
         self._db.delete(cache)
 
 
+class TestMARCChanges(DatabaseTest):
+
+    def test_changes(self):
+        now = utc_now()
+        yesterday = now - datetime.timedelta(days=1)
+        last_week = now - datetime.timedelta(days=7)
+
+        changed = self._work(with_license_pool=True)
+        old_change = self._work(with_license_pool=True)
+        withdrawn = self._work(with_license_pool=True)
+        withdrawn.presentation_ready = False
+        elsewhere = self._work(
+            with_license_pool=True, collection=self._collection()
+        )
+        # This work is still available, but not in this library.
+        suppressed_here = self._work(with_license_pool=True)
+        [suppressed_pool] = suppressed_here.license_pools
+        suppressed_pool.suppressed = True
+        other_pool = self._licensepool(
+            suppressed_here.presentation_edition, collection=self._collection()
+        )
+        other_pool.work = suppressed_here
+        deleted = self._work(with_license_pool=True)
+        deleted_urn = deleted.presentation_edition.primary_identifier.urn
+        self._db.query(WorkChange).delete()
+
+        for work in (changed, withdrawn, elsewhere, suppressed_here, deleted):
+            work.record_change(WorkChange.PRESENTATION, yesterday)
+        old_change.record_change(WorkChange.PRESENTATION, last_week)
+        deleted.delete(search_index=MockExternalSearchIndex())
+        self._db.commit()
+
+        changes = MARCChanges(
+            self._db, self._default_library, last_week - datetime.timedelta(days=1)
+        )
+        assert changes.end_time > now
+        assert True == changes.covers(yesterday)
+        assert False == changes.covers(last_week - datetime.timedelta(days=2))
+
+        # The work in another library's collection is ignored.
+        [changed_pool] = changed.license_pools
+        [old_pool] = old_change.license_pools
+        assert {
+            changed.id: [changed_pool.identifier],
+            old_change.id: [old_pool.identifier],
+        } == changes.identifiers
+
+        # Withdrawn and deleted works become deletions, as do works
+        # that are only available to this library through a
+        # suppressed LicensePool.
+        assert {
+            withdrawn.id: withdrawn.license_pools[0].identifier.urn,
+            suppressed_here.id: suppressed_pool.identifier.urn,
+            deleted.id: deleted_urn,
+        } == changes.deletions
+
+        # since() only finds changes made after a given time.
+        identifiers, deletions = changes.since(yesterday, 10)
+        assert [[changed_pool.identifier]] == identifiers
+        assert set([
+            withdrawn.license_pools[0].identifier.urn,
+            suppressed_pool.identifier.urn, deleted_urn
+        ]) == set(deletions)
+
+        identifiers, deletions = changes.since(last_week, 1)
+        assert [[changed_pool.identifier], [old_pool.identifier]] == identifiers
+
+        # If nothing changed, there's one empty batch of identifiers.
+        assert ([[]], []) == changes.since(now, 10)
+
+
 class TestMARCExporterFacets(object):
     def test_modify_search_filter(self):
         # A facet object.
@@ -640,6 +775,21 @@ class TestMARCExporterFacets(object):
         assert True == filter.order_ascending
         assert "some start time" == filter.updated_after
 
+    def test_modify_search_filter_with_identifiers(self):
+        identifier = IdentifierData(Identifier.ISBN, "9781453219539")
+        facets = MARCExporterFacets(None, identifiers=[identifier])
+        filter = Filter()
+        facets.modify_search_filter(filter)
+        assert [identifier] == filter.identifiers
+        assert None == filter.updated_after
+        assert False == filter.match_nothing
+
+        # An empty list of identifiers means nothing can match.
+        facets = MARCExporterFacets(None, identifiers=[])
+        filter = Filter()
+        facets.modify_search_filter(filter)
+        assert True == filter.match_nothing
+
     def test_scoring_functions(self):
         # A no-op.
         facets = MARCExporterFacets("some start time")
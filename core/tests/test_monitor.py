@@ -3,6 +3,7 @@ import pytest
 
 from ..testing import DatabaseTest
 from ..config import Configuration
+from ..external_search import MockExternalSearchIndex
 from ..metadata_layer import TimestampData
 from ..model import (
     CachedFeed,
@@ -11,6 +12,7 @@ from ..model import (
     CollectionMissing,
     ConfigurationSetting,
     Credential,
+    DRMDeviceIdentifier,
     DataSource,
     Edition,
     ExternalIntegration,
@@ -18,9 +20,11 @@ from ..model import (
     Identifier,
     Measurement,
     Patron,
+    SessionManager,
     Subject,
     Timestamp,
     Work,
+    WorkChange,
     WorkCoverageRecord,
     create,
     get_one,
@@ -50,6 +54,7 @@ from ..monitor import (
     SubjectSweepMonitor,
     SweepMonitor,
     TimelineMonitor,
+    WorkChangeReaper,
     WorkReaper,
     WorkSweepMonitor,
 )
@@ -899,6 +904,49 @@ class TestMakePresentationReadyMonitor(DatabaseTest):
         # handled in process_item().
         assert False == self.work.presentation_ready
 
+    def test_process_items_concurrently(self):
+        class MockProvider3(AlwaysSuccessfulCoverageProvider):
+            SERVICE_NAME = "Provider 3"
+            INPUT_IDENTIFIER_TYPES = Identifier.GUTENBERG_ID
+            DATA_SOURCE_NAME = DataSource.AMAZON
+
+            def ensure_coverage(self, identifier):
+                raise Exception("Can't even")
+        broken = MockProvider3(self._db)
+
+        session_factory = SessionManager.sessionmaker(session=self._db)
+        def monitor(providers):
+            return MakePresentationReadyMonitor(
+                self._db, providers, worker_size=2,
+                session_factory=session_factory
+            )
+        work2 = self._work(DataSource.GUTENBERG, with_license_pool=True)
+        work2.presentation_ready = False
+
+        # When every provider succeeds, the works become
+        # presentation-ready.
+        monitor([self.success]).process_items([self.work, work2])
+        for work in (self.work, work2):
+            assert None == work.presentation_ready_exception
+            assert True == work.presentation_ready
+        assert (
+            set([w.presentation_edition.primary_identifier
+                 for w in (self.work, work2)]) == set(self.success.attempts)
+        )
+
+        # Failures are recorded exactly as they would be if the
+        # providers were run one at a time.
+        self.work.presentation_ready = False
+        monitor([self.success, self.failure]).process_items([self.work])
+        assert (
+            "Provider(s) failed: %s" % self.failure.SERVICE_NAME ==
+            self.work.presentation_ready_exception)
+        assert False == self.work.presentation_ready
+
+        monitor([self.failure, broken]).process_items([self.work])
+        assert "Can't even" == self.work.presentation_ready_exception
+        assert False == self.work.presentation_ready
+
 
 class TestCustomListEntryWorkUpdateMonitor(DatabaseTest):
 
@@ -950,6 +998,8 @@ class TestReaperMonitor(DatabaseTest):
         assert 1 == CredentialReaper.MAX_AGE
         assert Patron.authorization_expires == PatronRecordReaper(self._db).timestamp_field
         assert 60 == PatronRecordReaper.MAX_AGE
+        assert WorkChange.change_time == WorkChangeReaper(self._db).timestamp_field
+        assert 180 == WorkChangeReaper.MAX_AGE
 
     def test_where_clause(self):
         m = CachedFeedReaper(self._db)
@@ -988,6 +1038,60 @@ class TestReaperMonitor(DatabaseTest):
         remaining = set(self._db.query(Credential).all())
         assert set([active, eternal]) == remaining
 
+    def test_run_once_deletes_in_batches(self):
+        # Normally rows are deleted in batches, with one DELETE
+        # statement per batch, and never passed into delete().
+        expired = [self._credential() for i in range(3)]
+        for credential in expired:
+            credential.expires = utc_now() - datetime.timedelta(days=2)
+        device, ignore = expired[0].register_drm_device_identifier("device")
+
+        class Mock(CredentialReaper):
+            BATCH_SIZE = 2
+            batches = []
+
+            def delete(self, row):
+                raise Exception("I should not be called!")
+
+            def delete_batch(self, ids):
+                deleted = super(Mock, self).delete_batch(ids)
+                self.batches.append(deleted)
+                return deleted
+
+        ids = [x.id for x in expired]
+        m = Mock(self._db)
+        assert "Items deleted: 3" == m.run_once().achievements
+        assert [ids[:2], ids[2:]] == m.batches
+        assert [] == self._db.query(Credential).all()
+
+        # The DRMDeviceIdentifier was detached from its Credential,
+        # just as it would have been if the Credential had been
+        # deleted through the ORM.
+        self._db.expire_all()
+        assert None == device.credential_id
+
+    def test_run_once_row_by_row(self):
+        # If DELETE_ROW_BY_ROW is set, every row is passed into delete().
+        expired = [self._credential() for i in range(3)]
+        for credential in expired:
+            credential.expires = utc_now() - datetime.timedelta(days=2)
+
+        class Mock(CredentialReaper):
+            DELETE_ROW_BY_ROW = True
+            BATCH_SIZE = 2
+            deleted = []
+
+            def delete(self, row):
+                # This delete() doesn't actually delete anything, but
+                # the reaper still finishes, because it never looks
+                # at the same row twice.
+                self.deleted.append(row)
+
+        m = Mock(self._db)
+        assert "Items deleted: 3" == m.run_once().achievements
+        assert expired == m.deleted
+        assert 3 == self._db.query(Credential).count()
+
     def test_reap_patrons(self):
         m = PatronRecordReaper(self._db)
         expired = self._patron()
@@ -1015,8 +1119,8 @@ class TestWorkReaper(DatabaseTest):
         class MockSearchIndex():
             removed = []
 
-            def remove_work(self, work):
-                self.removed.append(work)
+            def remove_works(self, work_ids):
+                self.removed.append(sorted(work_ids))
 
         # First, create three works.
 
@@ -1076,14 +1180,26 @@ class TestWorkReaper(DatabaseTest):
         # Run the reaper.
         s = MockSearchIndex()
         m = WorkReaper(self._db, search_index_client=s)
-        print(m.search_index_client)
-        m.run_once()
+        reaped_ids = sorted([had_license_pool.id, never_had_license_pool.id])
+        reaped_urns = dict(
+            (work.id, work.presentation_edition.primary_identifier.urn)
+            for work in [had_license_pool, never_had_license_pool]
+        )
+        result = m.run_once()
+        assert "Items deleted: 2" == result.achievements
 
-        # Search index was updated
-        assert 2 == len(s.removed)
-        assert has_license_pool not in s.removed
-        assert had_license_pool in s.removed
-        assert never_had_license_pool in s.removed
+        # Both works were removed from the search index in a single
+        # request.
+        assert [reaped_ids] == s.removed
+
+        # Each deletion was recorded in the WorkChange log, along with
+        # the URN of the work's identifier.
+        changes = self._db.query(WorkChange).filter(
+            WorkChange.change_kind==WorkChange.DELETION
+        )
+        assert reaped_urns == dict(
+            (x.work_id, x.identifier_urn) for x in changes
+        )
 
         # Only the work with a license pool remains.
         assert [has_license_pool] == [x for x in works]
@@ -1114,6 +1230,20 @@ class TestWorkReaper(DatabaseTest):
         assert [workless_feed] == [x for x in feeds if not x.work]
         assert [has_license_pool] == [x.work for x in feeds if x.work]
 
+    def test_search_documents_removed(self):
+        # The works are removed from a real search index with a bulk
+        # request. Works that were never indexed are ignored.
+        indexed = self._work(with_license_pool=False)
+        unindexed = self._work(with_license_pool=False)
+        search = MockExternalSearchIndex()
+        search.bulk_update([indexed])
+        assert 1 == len(search.docs)
+
+        m = WorkReaper(self._db, search_index_client=search)
+        m.run_once()
+        assert {} == search.docs
+        assert [] == self._db.query(Work).all()
+
 
 class TestCollectionReaper(DatabaseTest):
 
@@ -40,6 +40,8 @@ from ..model import (
     Identifier,
     Library,
     RightsStatus,
+    SessionManager,
+    Subject,
     Timestamp,
     Work,
     WorkCoverageRecord,
@@ -53,6 +55,7 @@ from ..monitor import (
 from ..s3 import S3Uploader, MinIOUploader, MinIOUploaderConfiguration
 from ..scripts import (
     AddClassificationScript,
+    AssignSubjectsToGenresScript,
     CheckContributorNamesInDB,
     CollectionArgumentsScript,
     CollectionInputScript,
@@ -62,6 +65,7 @@ from ..scripts import (
     ConfigureLibraryScript,
     ConfigureSiteScript,
     DatabaseMigrationInitializationScript,
+    DatabaseVacuum,
     DatabaseMigrationScript,
     Explain,
     IdentifierInputScript,
@@ -73,6 +77,7 @@ from ..scripts import (
     OPDSImportScript,
     PatronInputScript,
     RebuildSearchIndexScript,
+    RecalculateWorkQualityScript,
     ReclassifyWorksForUncheckedSubjectsScript,
     RunCollectionMonitorScript,
     RunCoverageProviderScript,
@@ -87,6 +92,7 @@ from ..scripts import (
     ShowIntegrationsScript,
     ShowLanesScript,
     ShowLibrariesScript,
+    TableStatistics,
     TimestampScript,
     UpdateCustomListSizeScript,
     UpdateLaneSizeScript,
@@ -101,6 +107,7 @@ from ..testing import (
 from ..util.worker_pools import (
     DatabasePool,
 )
+from ..coverage import run_coverage_partition
 from ..util.datetime_helpers import (
     datetime_utc,
     strptime_utc,
@@ -777,6 +784,120 @@ class TestRunThreadedCollectionCoverageProviderScript(DatabaseTest):
         assert new_timestamp != original_timestamp
         assert new_timestamp > original_timestamp
 
+        # The results of every worker were combined.
+        metrics = script.metrics[collection.name]
+        assert 1 == metrics['partitions']
+        assert 0 == metrics['failed_partitions']
+        assert 2 == metrics['successes']
+        assert 2 == metrics['items']
+
+    def test_run_in_several_partitions(self):
+        provider = AlwaysSuccessfulCollectionCoverageProvider
+        script = RunThreadedCollectionCoverageProviderScript(
+            provider, worker_size=2, _db=self._db, batch_size=1
+        )
+        script.BATCHES_PER_PARTITION = 2
+
+        collection = self._collection()
+        identifiers = []
+        for i in range(5):
+            edition, pool = self._edition(
+                collection=collection, with_license_pool=True
+            )
+            identifiers.append(edition.primary_identifier)
+        self._db.commit()
+
+        pool = DatabasePool(2, script.session_factory)
+        script.run(pool=pool)
+        self._db.commit()
+
+        # The five identifiers were split into three ranges, each of
+        # which was claimed by a worker.
+        assert 3 == pool.job_total
+        metrics = script.metrics[collection.name]
+        assert 3 == metrics['partitions']
+        assert 5 == metrics['successes']
+        for identifier in identifiers:
+            record, is_new = provider.register(identifier)
+            assert CoverageRecord.SUCCESS == record.status
+
+    def test_partitions(self):
+        collection = self._collection()
+        identifiers = []
+        for i in range(5):
+            edition, pool = self._edition(
+                collection=collection, with_license_pool=True
+            )
+            identifiers.append(edition.primary_identifier)
+        ids = sorted(x.id for x in identifiers)
+
+        script = RunThreadedCollectionCoverageProviderScript(
+            AlwaysSuccessfulCollectionCoverageProvider, _db=self._db
+        )
+        script.BATCHES_PER_PARTITION = 1
+        provider = AlwaysSuccessfulCollectionCoverageProvider(
+            collection, batch_size=2
+        )
+        assert ([(ids[0], ids[2]), (ids[2], ids[4]), (ids[4], None)] ==
+                script.partitions(provider))
+
+        # Identifiers that are already covered aren't counted.
+        for identifier in identifiers[:2]:
+            provider.add_coverage_record_for(identifier)
+        assert [(ids[2], ids[4]), (ids[4], None)] == script.partitions(provider)
+
+    def test_run_in_processes(self):
+        collection = self._collection()
+        edition, pool = self._edition(
+            collection=collection, with_license_pool=True
+        )
+        script = RunThreadedCollectionCoverageProviderScript(
+            AlwaysSuccessfulCollectionCoverageProvider, _db=self._db,
+            use_processes=True, batch_size=7
+        )
+
+        class MockPool(object):
+            """Pretend to run every range in a separate process."""
+            def __enter__(self):
+                return self
+            def __exit__(self, *args):
+                pass
+            def imap_unordered(self, function, arguments):
+                arguments = list(arguments)
+                if not arguments:
+                    # This is some other collection with nothing to do.
+                    return []
+                self.function = function
+                self.arguments = arguments
+                return [(3, 1, 0, None), (1, 0, 1, "ValueError()")]
+        pool = MockPool()
+        script.run(pool=pool)
+
+        # Each range was sent to the pool with everything the worker
+        # process needs to create its own CoverageProvider.
+        assert run_coverage_partition == pool.function
+        [(provider_class, collection_id, start, end, kwargs)] = pool.arguments
+        assert AlwaysSuccessfulCollectionCoverageProvider == provider_class
+        assert collection.id == collection_id
+        assert (edition.primary_identifier.id, None) == (start, end)
+        assert dict(batch_size=7) == kwargs
+
+        # The results from every process were combined.
+        metrics = script.metrics[collection.name]
+        assert 1 == metrics['failed_partitions']
+        assert 4 == metrics['successes']
+        assert 1 == metrics['transient_failures']
+        assert 1 == metrics['persistent_failures']
+        assert 6 == metrics['items']
+
+        # The failure was recorded in the provider's Timestamp.
+        timestamp = get_one(
+            self._db, Timestamp,
+            service=AlwaysSuccessfulCollectionCoverageProvider.SERVICE_NAME,
+            collection=collection
+        )
+        assert "1 of 1 ranges failed." == timestamp.exception
+
 
 class TestRunWorkCoverageProviderScript(DatabaseTest):
 
@@ -2139,6 +2260,28 @@ class TestCollectionInputScript(DatabaseTest):
         assert expect == actual
 
 
+class TestRecalculateWorkQualityScript(DatabaseTest):
+
+    def test_do_run(self, monkeypatch):
+        calls = []
+        def bulk_calculate_quality(_db, collection):
+            calls.append(collection)
+            return 0
+        monkeypatch.setattr(
+            Work, "bulk_calculate_quality", bulk_calculate_quality
+        )
+        script = RecalculateWorkQualityScript(self._db)
+
+        # With no collections named, every work is recalculated.
+        script.do_run(cmd_args=[])
+        assert [None] == calls
+
+        # Otherwise the works in each named collection are.
+        c2 = self._collection()
+        script.do_run(cmd_args=[self._default_collection.name, c2.name])
+        assert [None, self._default_collection, c2] == calls
+
+
 class TestCollectionArgumentsScript(DatabaseTest):
     """Test the ability to take collection arguments on the command line."""
 
@@ -2526,6 +2669,73 @@ class TestReclassifyWorksForUncheckedSubjectsScript(DatabaseTest):
                 dump_query(script.query))
 
 
+class TestAssignSubjectsToGenresScript(DatabaseTest):
+
+    def test_do_run(self):
+        source = DataSource.lookup(self._db, DataSource.OVERDRIVE)
+
+        # This subject's audience will change.
+        children = self._subject(Subject.TAG, "Children's books")
+        # This subject doesn't mean anything, so its classification
+        # won't change.
+        boring = self._subject(Subject.TAG, "Books")
+        # This subject's genre will change.
+        sf = self._subject(Subject.TAG, "Science Fiction")
+
+        # Each work is classified under one of the subjects. The third
+        # is classified through an identifier two equivalencies away,
+        # which classification will also consider.
+        work1 = self._work(with_license_pool=True)
+        work2 = self._work(with_license_pool=True)
+        work3 = self._work(with_license_pool=True)
+        self._classification(
+            work1.license_pools[0].identifier, children, source
+        )
+        self._classification(
+            work2.license_pools[0].identifier, boring, source
+        )
+        intermediate = self._identifier()
+        equivalent = self._identifier()
+        work3.license_pools[0].identifier.equivalent_to(
+            source, intermediate, 1
+        )
+        intermediate.equivalent_to(source, equivalent, 1)
+        self._classification(equivalent, sf, source)
+
+        # This subject has already been checked, so it's left alone.
+        checked = self._subject(Subject.TAG, "Fantasy")
+        checked.checked = True
+
+        self._db.query(WorkCoverageRecord).filter(
+            WorkCoverageRecord.operation==WorkCoverageRecord.CLASSIFY_OPERATION
+        ).delete()
+
+        script = AssignSubjectsToGenresScript(self._db)
+        changed = script.do_run(
+            cmd_args=["--workers=2"],
+            session_factory=SessionManager.sessionmaker(session=self._db)
+        )
+
+        # Every unchecked subject was checked, and the ones whose
+        # classification changed are reported.
+        assert set([children.id, sf.id]) == changed
+        for subject in (children, boring, sf):
+            self._db.refresh(subject)
+            assert True == subject.checked
+        assert Classifier.AUDIENCE_CHILDREN == children.audience
+        assert "Science Fiction" == sf.genre.name
+        assert None == checked.genre
+
+        # Only the works classified under the changed subjects will
+        # be reclassified.
+        records = self._db.query(WorkCoverageRecord).filter(
+            WorkCoverageRecord.operation==WorkCoverageRecord.CLASSIFY_OPERATION
+        ).all()
+        assert set([work1, work3]) == set(r.work for r in records)
+        for record in records:
+            assert WorkCoverageRecord.REGISTERED == record.status
+
+
 class TestListCollectionMetadataIdentifiersScript(DatabaseTest):
 
     def test_do_run(self):
@@ -3017,6 +3227,62 @@ class TestCustomListManagementScript(object):
     pass
 
 
+class TestDatabaseVacuum(DatabaseTest):
+
+    def test_table_statistics(self):
+        # Statistics are found for the tables in the database.
+        statistics = DatabaseVacuum.table_statistics(self._db)
+        assert 'works' in statistics
+        assert isinstance(statistics['works'], TableStatistics)
+
+    def test_tables_to_vacuum(self):
+        statistics = dict(
+            static=TableStatistics(1000000, 0),
+            hardly_dead=TableStatistics(1000000, 5000),
+            tiny=TableStatistics(10, 10),
+            hot=TableStatistics(50000, 50000),
+            hotter=TableStatistics(1000, 60000),
+        )
+        assert 0.5 == statistics['hot'].dead_ratio
+        assert 0 == TableStatistics(None, None).dead_ratio
+
+        # Tables with too few dead tuples, or too small a proportion
+        # of dead tuples, are skipped. The rest are ranked by the
+        # number of dead tuples.
+        m = DatabaseVacuum.tables_to_vacuum
+        assert ['hotter', 'hot'] == m(statistics, 1000, 0.01)
+        assert ['hotter', 'hot', 'hardly_dead'] == m(statistics, 1000, 0)
+        assert (
+            ['hotter', 'hot', 'hardly_dead', 'tiny', 'static']
+            == m(statistics, 0, 0)
+        )
+
+    def test_do_run(self):
+        class Mock(DatabaseVacuum):
+            vacuumed = []
+            statistics = [
+                dict(a=TableStatistics(10, 2000), b=TableStatistics(10, 0),
+                     c=TableStatistics(10, 5000)),
+                dict(a=TableStatistics(10, 0), b=TableStatistics(10, 0),
+                     c=TableStatistics(10, 0)),
+            ]
+
+            def table_statistics(self, _db):
+                return self.statistics.pop(0)
+
+            def execute_vacuum(self, _db, table, options):
+                self.vacuumed.append((table, options))
+
+        # Only the tables with enough dead tuples are vacuumed, and
+        # the options are passed through to VACUUM.
+        script = Mock(self._db)
+        pool = DatabasePool(1, SessionManager.sessionmaker(session=self._db))
+        script.do_run(cmd_args=["--option=analyze"], pool=pool)
+        assert [('c', ['ANALYZE']), ('a', ['ANALYZE'])] == script.vacuumed
+        assert ['c', 'a'] == [table for table, elapsed in script.results]
+        assert 2 == pool.job_total
+
+
 class TestNYTBestSellerListsScript(object):
     """TODO"""
     pass
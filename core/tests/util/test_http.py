@@ -1,15 +1,18 @@
 import pytest
 import requests
 import json
+from http.client import HTTPMessage
 from ...util.http import (
     HTTP,
     BadResponseException,
     RemoteIntegrationException,
     RequestNetworkException,
     RequestTimedOut,
+    SessionPool,
     INTEGRATION_ERROR,
 )
 from ...testing import MockRequestsResponse
+from ...util.instrumentation import RequestMetrics
 from ...util.problem_detail import ProblemDetail
 from ...problem_details import INVALID_INPUT
 
@@ -44,6 +47,53 @@ class TestHTTP(object):
         assert 200 == response.status_code
         assert b"Success!" == response.content
 
+    def test_request_with_timeout_uses_host_policy(self):
+        # If no timeout is passed in, the timeout configured for the
+        # remote host is used.
+        class MockSessions(SessionPool):
+            def request(self, *args, **kwargs):
+                self.called_with = (args, kwargs)
+                return MockRequestsResponse(200, content="Success!")
+
+        class Mock(HTTP):
+            SESSIONS = MockSessions()
+        Mock.SESSIONS.configure("https://slow.vendor.com/", timeout=90)
+
+        Mock.request_with_timeout("GET", "https://slow.vendor.com/api")
+        args, kwargs = Mock.SESSIONS.called_with
+        assert ("GET", "https://slow.vendor.com/api") == args
+        assert 90 == kwargs['timeout']
+
+        Mock.request_with_timeout("GET", "https://other.vendor.com/api")
+        args, kwargs = Mock.SESSIONS.called_with
+        assert 20 == kwargs['timeout']
+
+        # A timeout passed in explicitly takes precedence.
+        Mock.get_with_timeout("https://slow.vendor.com/api", timeout=5)
+        args, kwargs = Mock.SESSIONS.called_with
+        assert 5 == kwargs['timeout']
+
+        # The pool is also used by default for debuggable requests.
+        Mock.debuggable_get("https://slow.vendor.com/debug")
+        args, kwargs = Mock.SESSIONS.called_with
+        assert ("GET", "https://slow.vendor.com/debug") == args
+
+    def test_request_with_timeout_is_timed(self):
+        # When the current request is being measured, time spent
+        # waiting on another server is recorded under that server's
+        # host name.
+        def fake_200_response(*args, **kwargs):
+            return MockRequestsResponse(200, content="Success!")
+
+        metrics = RequestMetrics.start()
+        try:
+            HTTP._request_with_timeout(
+                "http://vendor.com:8080/api", fake_200_response, "GET"
+            )
+        finally:
+            RequestMetrics.finish()
+        assert 1 == metrics.timings["http.vendor.com_8080"][1]
+
     def test_request_with_timeout_failure(self):
 
         def immediately_timeout(*args, **kwargs):
@@ -224,6 +274,131 @@ class TestHTTP(object):
         assert error == m("url", error, allowed_response_codes=["400"])
         assert error == m("url", error, allowed_response_codes=['4xx'])
 
+class TestSessionPool(object):
+
+    def setup_method(self):
+        self.pool = SessionPool()
+
+    def teardown_method(self):
+        self.pool.close()
+
+    def test_host(self):
+        m = SessionPool.host
+        assert "https://vendor.com" == m("https://Vendor.com/a/b?c=d")
+        assert "http://vendor.com:8080" == m("http://vendor.com:8080/")
+        assert "://" == m(None)
+
+    def test_configure(self):
+        default = self.pool.policy("https://vendor.com/")
+        assert SessionPool.DEFAULT_TIMEOUT == default['timeout']
+        assert SessionPool.DEFAULT_POOL_SIZE == default['pool_size']
+        assert SessionPool.DEFAULT_RETRIES == default['retries']
+
+        session = self.pool.session("https://vendor.com/")
+        self.pool.configure(
+            "https://vendor.com/api", timeout=60, pool_size=25, retries=0
+        )
+        policy = self.pool.policy("https://vendor.com/other")
+        assert 60 == policy['timeout']
+        assert 25 == policy['pool_size']
+        assert 0 == policy['retries']
+        assert 60 == self.pool.timeout("https://vendor.com/other")
+
+        # Changing the policy replaces the host's session, and the new
+        # session uses the new pool size and retry policy.
+        new_session = self.pool.session("https://vendor.com/")
+        assert session != new_session
+        adapter = new_session.get_adapter("https://vendor.com/")
+        assert 25 == adapter._pool_maxsize
+        assert 0 == adapter.max_retries.connect
+
+        # Configuring the same policy again keeps the session and its
+        # open connections.
+        self.pool.configure("https://vendor.com/", timeout=60)
+        assert new_session == self.pool.session("https://vendor.com/")
+
+        # Other hosts are unaffected.
+        assert default == self.pool.policy("https://other.com/")
+
+        # A timeout passed in to request() still takes precedence.
+        calls = []
+        new_session.request = lambda *args, **kwargs: calls.append(kwargs)
+        self.pool.request("GET", "https://vendor.com/", timeout=5)
+        assert [dict(timeout=5)] == calls
+
+    def test_session(self):
+        # Requests to the same host share a session.
+        session = self.pool.session("https://vendor.com/a")
+        assert session == self.pool.session("https://vendor.com/b")
+        assert session != self.pool.session("http://vendor.com/a")
+        assert session != self.pool.session("https://other.com/a")
+
+        adapter = session.get_adapter("https://vendor.com/a")
+        assert SessionPool.DEFAULT_POOL_SIZE == adapter._pool_maxsize
+        retry = adapter.max_retries
+        assert SessionPool.DEFAULT_RETRIES == retry.connect
+        assert False == retry.read
+        assert set(SessionPool.RETRY_STATUSES) == set(retry.status_forcelist)
+
+        # Server errors are retried for GET requests but not POST
+        # requests.
+        assert True == retry.is_retry("GET", 503)
+        assert False == retry.is_retry("POST", 503)
+        assert False == retry.is_retry("GET", 500)
+
+        # Cookies set by one response are not kept for later
+        # requests, which may be made on behalf of someone else.
+        prepared = session.prepare_request(
+            requests.Request("GET", "https://vendor.com/a")
+        )
+        request = requests.cookies.MockRequest(prepared)
+        headers = HTTPMessage()
+        headers['Set-Cookie'] = "session=patron1; Domain=vendor.com"
+        response = requests.cookies.MockResponse(headers)
+        session.cookies.extract_cookies(response, request)
+        assert 0 == len(session.cookies)
+
+        # But they're kept in the request's own cookie jar, which is
+        # used when following redirects.
+        prepared._cookies.extract_cookies(response, request)
+        assert "patron1" == prepared._cookies.get("session")
+
+    def test_metrics(self):
+        assert {} == self.pool.metrics()
+
+        session = self.pool.session("https://vendor.com/")
+        adapter = session.get_adapter("https://vendor.com/")
+        pool = adapter.poolmanager.connection_from_url("https://vendor.com/")
+
+        # One connection is idle in the pool and one is checked out.
+        idle = pool._get_conn()
+        pool._get_conn()
+        pool._put_conn(idle)
+        pool.num_requests = 5
+        pool.num_connections = 2
+
+        [(host, metrics)] = list(self.pool.metrics().items())
+        assert "https://vendor.com" == host
+        assert 5 == metrics['requests']
+        assert 2 == metrics['connections']
+        assert 3 == metrics['reused']
+        assert 1 == metrics['idle']
+        assert 1 == metrics['in_use']
+        assert SessionPool.DEFAULT_POOL_SIZE == metrics['pool_size']
+        assert 0 == metrics['saturated']
+
+        # Once every connection in the pool is checked out, requests
+        # count towards the host's saturation.
+        while pool.pool.qsize():
+            pool._get_conn()
+        session.request = lambda *args, **kwargs: "response"
+        assert "response" == self.pool.request("GET", "https://vendor.com/")
+        assert 1 == self.pool.metrics()[host]['saturated']
+
+        self.pool.close()
+        assert {} == self.pool.metrics()
+
+
 class TestRemoteIntegrationException(object):
 
     def test_with_service_name(self):
@@ -0,0 +1,113 @@
+import threading
+
+from ...model import Identifier
+from ...testing import DatabaseTest
+from ...util.instrumentation import RequestMetrics
+
+
+class TestRequestMetrics(object):
+
+    def teardown_method(self):
+        RequestMetrics.finish()
+
+    def test_start_and_finish(self):
+        metrics = RequestMetrics.start()
+        assert metrics == RequestMetrics.current()
+
+        finished = RequestMetrics.finish()
+        assert metrics == finished
+        assert None == RequestMetrics.current()
+        assert finished.total >= 0
+
+        # Finishing again does nothing.
+        assert None == RequestMetrics.finish()
+
+    def test_sampling(self):
+        # With a sample rate of zero, nothing is measured.
+        assert None == RequestMetrics.start(0)
+        assert None == RequestMetrics.current()
+
+        # Otherwise a request is measured if the random number is less
+        # than the sample rate.
+        assert None == RequestMetrics.start(0.25, randomizer=lambda: 0.5)
+        assert None != RequestMetrics.start(0.75, randomizer=lambda: 0.5)
+        assert None != RequestMetrics.start(1, randomizer=lambda: 1)
+
+    def test_metrics_are_per_thread(self):
+        metrics = RequestMetrics.start()
+
+        seen = []
+        def other_thread():
+            seen.append(RequestMetrics.current())
+            RequestMetrics.record(RequestMetrics.SEARCH, 1)
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+        assert [None] == seen
+        assert {} == metrics.timings
+
+    def test_record_and_timed(self):
+        # When no request is being measured, these do nothing.
+        RequestMetrics.record(RequestMetrics.SEARCH, 1)
+        with RequestMetrics.timed(RequestMetrics.SEARCH):
+            pass
+
+        metrics = RequestMetrics.start()
+        RequestMetrics.record(RequestMetrics.SEARCH, 0.25)
+        RequestMetrics.record(RequestMetrics.SEARCH, 0.5)
+        with RequestMetrics.timed(RequestMetrics.SERIALIZE):
+            pass
+
+        assert [0.75, 2] == metrics.timings[RequestMetrics.SEARCH]
+        elapsed, count = metrics.timings[RequestMetrics.SERIALIZE]
+        assert 1 == count
+
+        # Time spent in a block that raises an exception is counted.
+        try:
+            with RequestMetrics.timed(RequestMetrics.SERIALIZE):
+                raise ValueError()
+        except ValueError:
+            pass
+        assert 2 == metrics.timings[RequestMetrics.SERIALIZE][1]
+
+    def test_http_metric(self):
+        m = RequestMetrics.http_metric
+        assert "http.vendor.com" == m("https://vendor.com/path?x=y")
+        assert "http.vendor.com_8080" == m("http://user@vendor.com:8080/")
+        assert "http.unknown" == m("")
+
+    def test_reporting(self):
+        metrics = RequestMetrics()
+        metrics.add(RequestMetrics.DATABASE, 0.0125)
+        metrics.add(RequestMetrics.DATABASE, 0.0025)
+        metrics.add("http.vendor.com", 0.1)
+        metrics.end_time = metrics.start_time + 0.5
+
+        assert (
+            'db;dur=15.0;desc="2", http.vendor.com;dur=100.0;desc="1", total;dur=500.0'
+            == metrics.as_server_timing()
+        )
+        assert dict(
+            db=dict(ms=15.0, count=2),
+            total=dict(ms=500.0),
+            **{"http.vendor.com": dict(ms=100.0, count=1)}
+        ) == metrics.as_log_fields()
+
+
+class TestDatabaseQueryTiming(DatabaseTest):
+
+    def teardown_method(self):
+        RequestMetrics.finish()
+        super(TestDatabaseQueryTiming, self).teardown_method()
+
+    def test_queries_are_timed(self):
+        # Queries run while no request is being measured aren't counted.
+        self._db.query(Identifier).count()
+
+        metrics = RequestMetrics.start()
+        self._db.query(Identifier).count()
+        self._db.query(Identifier).count()
+        elapsed, count = metrics.timings[RequestMetrics.DATABASE]
+        assert 2 == count
+        assert elapsed > 0
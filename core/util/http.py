@@ -1,8 +1,13 @@
 import logging
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
 from urllib.parse import urlparse
+from urllib3.util.retry import Retry
 from flask_babel import lazy_gettext as _
+from .instrumentation import RequestMetrics
 from .problem_detail import (
     ProblemDetail as pd,
     JSON_MEDIA_TYPE as PROBLEM_DETAIL_JSON_MEDIA_TYPE,
@@ -170,9 +175,200 @@ class RequestTimedOut(RequestNetworkException, requests.exceptions.Timeout):
     internal_message = "Timeout accessing %s: %s"
 
 
+class RequestOnlyCookieJar(RequestsCookieJar):
+    """A cookie jar for a `requests.Session` that is shared by unrelated
+    requests.
+
+    Cookies set by a response are never kept in this jar, so they
+    can't be sent with later requests, which may be made on behalf of
+    someone else. Cookies still work within a single request: each
+    request gets its own jar, which is used to follow redirects.
+    """
+
+    def extract_cookies(self, response, request):
+        pass
+
+
+class SessionPool(object):
+    """Keeps one `requests.Session` per remote host, so that repeated
+    requests to the same vendor reuse TCP and TLS connections instead of
+    opening new ones every time.
+
+    Each host gets a policy -- a timeout, a connection pool size and a
+    retry policy -- which can be changed with `configure`, typically by
+    an integration that knows how its remote service behaves.
+    """
+
+    DEFAULT_TIMEOUT = 20
+    DEFAULT_POOL_SIZE = 10
+
+    # Connection failures happen before anything is sent, so they are
+    # retried for every HTTP method. Server errors are only retried for
+    # methods that can't have side effects.
+    DEFAULT_RETRIES = 2
+    DEFAULT_BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = (502, 503, 504)
+    RETRY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.policies = {}
+        self.sessions = {}
+        self.saturated = {}
+
+    @classmethod
+    def host(cls, url):
+        """The key used to pool connections for the given URL."""
+        parsed = urlparse(url or '')
+        return "%s://%s" % (parsed.scheme.lower(), parsed.netloc.lower())
+
+    def configure(self, url, timeout=None, pool_size=None, retries=None,
+                  backoff_factor=None):
+        """Change how requests to the host in `url` are made.
+
+        Settings that aren't passed in keep their current values. If
+        the policy changes, the host's session is replaced, so the new
+        pool size and retry policy apply to the next request.
+        """
+        host = self.host(url)
+        session = None
+        with self.lock:
+            old_policy = self.policy(url)
+            policy = dict(old_policy)
+            for key, value in (('timeout', timeout), ('pool_size', pool_size),
+                               ('retries', retries),
+                               ('backoff_factor', backoff_factor)):
+                if value is not None:
+                    policy[key] = value
+            if policy != old_policy:
+                self.policies[host] = policy
+                session = self.sessions.pop(host, None)
+        if session is not None:
+            session.close()
+
+    def policy(self, url):
+        """The policy for requests to the host in `url`."""
+        return self.policies.get(self.host(url), dict(
+            timeout=self.DEFAULT_TIMEOUT, pool_size=self.DEFAULT_POOL_SIZE,
+            retries=self.DEFAULT_RETRIES,
+            backoff_factor=self.DEFAULT_BACKOFF_FACTOR,
+        ))
+
+    def timeout(self, url):
+        """The default timeout for requests to the host in `url`."""
+        return self.policy(url)['timeout']
+
+    def session(self, url):
+        """Find or create the `requests.Session` for the host in `url`."""
+        host = self.host(url)
+        session = self.sessions.get(host)
+        if session is not None:
+            return session
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = self._create_session(self.policy(url))
+                self.sessions[host] = session
+        return session
+
+    def _create_session(self, policy):
+        retries = policy['retries']
+        retry = Retry(
+            total=retries, connect=retries, read=False,
+            status=retries, status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            backoff_factor=policy['backoff_factor'],
+            raise_on_status=False, respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_maxsize=policy['pool_size'], max_retries=retry,
+            pool_block=False,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        # A session is shared by every request to a host, including
+        # requests made on behalf of different patrons, so it must
+        # never keep cookies from one request to the next.
+        session.cookies = RequestOnlyCookieJar()
+        return session
+
+    def request(self, method, url, *args, **kwargs):
+        """Make an HTTP request through the session for `url`'s host.
+
+        This has the same signature as `requests.request`.
+        """
+        session = self.session(url)
+        if self._pools_full(session):
+            host = self.host(url)
+            with self.lock:
+                self.saturated[host] = self.saturated.get(host, 0) + 1
+        return session.request(method, url, *args, **kwargs)
+
+    @classmethod
+    def _connection_pools(cls, session):
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None and pool.pool is not None:
+                    yield pool
+
+    @classmethod
+    def _pools_full(cls, session):
+        """Is every connection in one of this session's pools in use?"""
+        return any(
+            pool.pool.qsize() == 0 for pool in cls._connection_pools(session)
+        )
+
+    def metrics(self):
+        """Describe connection reuse and pool saturation for every host.
+
+        :return: A dictionary mapping each host to a dictionary with
+            the number of requests sent, connections opened, requests
+            that reused an open connection, idle and in-use
+            connections, the pool size, and the number of requests made
+            while every pooled connection was in use.
+        """
+        with self.lock:
+            sessions = list(self.sessions.items())
+        metrics = {}
+        for host, session in sessions:
+            host_metrics = dict(
+                requests=0, connections=0, idle=0, in_use=0,
+                pool_size=self.policy(host)['pool_size'],
+                saturated=self.saturated.get(host, 0),
+            )
+            for pool in self._connection_pools(session):
+                host_metrics['requests'] += pool.num_requests
+                host_metrics['connections'] += pool.num_connections
+                idle = [x for x in list(pool.pool.queue) if x is not None]
+                host_metrics['idle'] += len(idle)
+                host_metrics['in_use'] += pool.pool.maxsize - pool.pool.qsize()
+            host_metrics['reused'] = max(
+                host_metrics['requests'] - host_metrics['connections'], 0
+            )
+            metrics[host] = host_metrics
+        return metrics
+
+    def close(self):
+        """Close every pooled connection."""
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+            self.saturated = {}
+        for session in sessions:
+            session.close()
+
+
 class HTTP(object):
     """A helper for the `requests` module."""
 
+    # Requests made through request_with_timeout and debuggable_request
+    # reuse connections from this pool.
+    SESSIONS = SessionPool()
+
     @classmethod
     def get_with_timeout(cls, url, *args, **kwargs):
         """Make a GET request with timeout handling."""
@@ -192,11 +388,11 @@ class HTTP(object):
 
     @classmethod
     def request_with_timeout(cls, http_method, url, *args, **kwargs):
-        """Call requests.request and turn a timeout into a RequestTimedOut
-        exception.
+        """Make a request through the session pool and turn a timeout
+        into a RequestTimedOut exception.
         """
         return cls._request_with_timeout(
-            url, requests.request, http_method, *args, **kwargs
+            url, cls.SESSIONS.request, http_method, *args, **kwargs
         )
 
     @classmethod
@@ -221,7 +417,7 @@ class HTTP(object):
         expected_encoding = kwargs.pop('expected_encoding', 'utf-8')
 
         if not 'timeout' in kwargs:
-            kwargs['timeout'] = 20
+            kwargs['timeout'] = cls.SESSIONS.timeout(url)
 
         # Unicode data can't be sent over the wire. Convert it
         # to UTF-8.
@@ -248,7 +444,8 @@ class HTTP(object):
                 # gets added on here. But if you do pass in both
                 # arguments, it will still work.
                 args = args + (url,)
-            response = make_request_with(*args, **kwargs)
+            with RequestMetrics.timed(RequestMetrics.http_metric(url)):
+                response = make_request_with(*args, **kwargs)
             if verbose:
                 logging.info(
                     "Response from %s: %s %r %r",
@@ -369,7 +566,7 @@ class HTTP(object):
         """
         logging.info("Making debuggable %s request to %s: kwargs %r",
                      http_method, url, kwargs)
-        make_request_with = make_request_with or requests.request
+        make_request_with = make_request_with or cls.SESSIONS.request
         return cls._request_with_timeout(
             url, make_request_with, http_method,
             process_response_with=cls.process_debuggable_response,
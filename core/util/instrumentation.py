@@ -0,0 +1,135 @@
+"""Request-scoped timing of database queries, search requests,
+outbound HTTP calls and feed serialization.
+
+Instrumentation is off unless `RequestMetrics.start()` was called in the
+current thread, so code paths that aren't part of a sampled request pay
+only for a thread-local lookup.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestMetrics(object):
+    """Timings collected while handling a single request."""
+
+    DATABASE = "db"
+    SEARCH = "search"
+    HTTP = "http"
+    SERIALIZE = "serialize"
+    TOTAL = "total"
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+        # Maps each metric name to [total seconds, count].
+        self.timings = OrderedDict()
+
+    @classmethod
+    def start(cls, sample_rate=1.0, randomizer=random.random):
+        """Start collecting metrics for the request handled by this thread.
+
+        :param sample_rate: The fraction of requests that are instrumented.
+        :return: A RequestMetrics, or None if this request wasn't sampled.
+        """
+        metrics = None
+        if sample_rate and (sample_rate >= 1 or randomizer() < sample_rate):
+            metrics = cls()
+        cls._local.metrics = metrics
+        return metrics
+
+    @classmethod
+    def current(cls):
+        """The RequestMetrics for the request handled by this thread, if any."""
+        return getattr(cls._local, 'metrics', None)
+
+    @classmethod
+    def finish(cls):
+        """Stop collecting metrics for this thread's request.
+
+        :return: The RequestMetrics that were being collected, if any.
+        """
+        metrics = cls.current()
+        cls._local.metrics = None
+        if metrics is not None:
+            metrics.end_time = time.perf_counter()
+        return metrics
+
+    @classmethod
+    def record(cls, name, elapsed):
+        """Add a timing to this thread's request, if it's being instrumented."""
+        metrics = cls.current()
+        if metrics is not None:
+            metrics.add(name, elapsed)
+
+    @classmethod
+    @contextmanager
+    def timed(cls, name):
+        """Time the body of a `with` statement as part of metric `name`."""
+        metrics = cls.current()
+        if metrics is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.add(name, time.perf_counter() - start)
+
+    @classmethod
+    def http_metric(cls, url):
+        """The name of the metric for HTTP requests to the host in `url`."""
+        host = url.split("://", 1)[-1].split("/", 1)[0]
+        # Server-Timing metric names are HTTP tokens, which can't
+        # contain colons.
+        host = host.rsplit("@", 1)[-1].replace(":", "_")
+        return "%s.%s" % (cls.HTTP, host or "unknown")
+
+    def add(self, name, elapsed):
+        timing = self.timings.setdefault(name, [0.0, 0])
+        timing[0] += elapsed
+        timing[1] += 1
+
+    @property
+    def total(self):
+        end = self.end_time or time.perf_counter()
+        return end - self.start_time
+
+    def as_server_timing(self):
+        """Represent the metrics as the value of a Server-Timing header."""
+        entries = []
+        for name, (elapsed, count) in self.timings.items():
+            entries.append('%s;dur=%.1f;desc="%d"' % (name, elapsed * 1000, count))
+        entries.append('%s;dur=%.1f' % (self.TOTAL, self.total * 1000))
+        return ", ".join(entries)
+
+    def as_log_fields(self):
+        """Represent the metrics as a dictionary suitable for a JSON log."""
+        fields = OrderedDict()
+        for name, (elapsed, count) in self.timings.items():
+            fields[name] = dict(ms=round(elapsed * 1000, 1), count=count)
+        fields[self.TOTAL] = dict(ms=round(self.total * 1000, 1))
+        return fields
+
+
+_query_start = threading.local()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if RequestMetrics.current() is not None:
+        _query_start.time = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(_query_start, 'time', None)
+    if start is not None:
+        _query_start.time = None
+        RequestMetrics.record(RequestMetrics.DATABASE, time.perf_counter() - start)
@@ -5,6 +5,7 @@ from lxml import builder, etree
 import pytz
 
 from .datetime_helpers import utc_now
+from .instrumentation import RequestMetrics
 
 class ElementMaker(builder.ElementMaker):
     """A helper object for creating etree elements."""
@@ -181,7 +182,10 @@ class AtomFeed(object):
     def __str__(self):
         if self.feed is None:
             return None
-        return etree.tostring(self.feed, encoding="unicode", pretty_print=True)
+        with RequestMetrics.timed(RequestMetrics.SERIALIZE):
+            return etree.tostring(
+                self.feed, encoding="unicode", pretty_print=True
+            )
 
 
 class OPDSFeed(AtomFeed):
@@ -0,0 +1,19 @@
+DO $$
+    BEGIN
+        BEGIN
+            CREATE TABLE proquestpublicationfingerprints (
+                id SERIAL PRIMARY KEY,
+                collection_id INTEGER NOT NULL REFERENCES collections(id) ON DELETE CASCADE,
+                identifier_id INTEGER NOT NULL REFERENCES identifiers(id),
+                fingerprint VARCHAR(64) NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                UNIQUE (collection_id, identifier_id)
+            );
+
+            CREATE INDEX ix_proquestpublicationfingerprints_collection_id ON proquestpublicationfingerprints USING btree (collection_id);
+            CREATE INDEX ix_proquestpublicationfingerprints_identifier_id ON proquestpublicationfingerprints USING btree (identifier_id);
+        EXCEPTION
+            WHEN duplicate_table THEN RAISE NOTICE 'Warning: proquestpublicationfingerprints already exists.';
+        END;
+    END;
+$$;
@@ -4,6 +4,7 @@ import csv
 import logging
 import os
 import sys
+import threading
 import time
 from io import StringIO
 from datetime import (
@@ -49,7 +50,11 @@ from api.overdrive import (
 )
 from core.entrypoint import EntryPoint
 from core.external_list import CustomListFromCSV
-from core.external_search import ExternalSearchIndex
+from core.external_search import (
+    ExternalSearchIndex,
+    Filter,
+    SharedSearchResults,
+)
 from core.lane import Lane
 from core.lane import (
     Pagination,
@@ -71,6 +76,7 @@ from core.model import (
     Collection,
     ConfigurationSetting,
     Contribution,
+    ContributorResolver,
     CustomList,
     DataSource,
     DeliveryMechanism,
@@ -112,6 +118,10 @@ from core.util.opds_writer import (
     OPDSFeed,
 )
 from core.util.datetime_helpers import utc_now
+from core.util.worker_pools import (
+    DatabaseJob,
+    DatabasePool,
+)
 
 
 class Script(CoreScript):
@@ -307,6 +317,9 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
 
     name = "Cache one representation per lane"
 
+    # By default, feeds are generated one at a time in the main thread.
+    DEFAULT_WORKER_SIZE = 1
+
     @classmethod
     def arg_parser(cls, _db):
         parser = LaneSweeperScript.arg_parser(_db)
@@ -327,6 +340,12 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
             type=int,
             default=1
         )
+        parser.add_argument(
+            '--workers',
+            help='Generate feeds in this many threads. Default: %d' % cls.DEFAULT_WORKER_SIZE,
+            type=int,
+            default=cls.DEFAULT_WORKER_SIZE
+        )
         return parser
 
     def __init__(self, _db=None, cmd_args=None, testing=False, manager=None,
@@ -345,6 +364,12 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
         :param **kwargs: Keyword arguments to pass to the superconstructor.
         """
 
+        # Worker threads each use their own database session.
+        self._worker = threading.local()
+        self._timings_lock = threading.RLock()
+        self.feed_timings = []
+        self.search_engine = None
+
         super(CacheRepresentationPerLane, self).__init__(_db, *args, **kwargs)
         self.parse_args(cmd_args)
         if not manager:
@@ -367,11 +392,22 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
                     self.log.warning("Ignored unrecognized language code %s", alpha)
         self.max_depth = parsed.max_depth
         self.min_depth = parsed.min_depth
+        self.workers = max(parsed.workers, 1)
 
         # Return the parsed arguments in case a subclass needs to
         # process more args.
         return parsed
 
+    @property
+    def _db(self):
+        # In a worker thread, use that thread's database session
+        # rather than the script's own session.
+        worker = getattr(self, '_worker', None)
+        session = getattr(worker, 'session', None)
+        if session is not None:
+            return session
+        return CoreScript._db.fget(self)
+
     def should_process_lane(self, lane):
         if not isinstance(lane, Lane):
             return False
@@ -412,17 +448,150 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
     cache_url_method = None
 
     def process_library(self, library):
+        """Generate every feed this script is responsible for in the
+        given library.
+
+        First, the feeds are planned and the searches they will need
+        are run in bulk, with duplicate searches only run once. Then
+        the feeds are generated, either in the main thread or in a pool
+        of worker threads.
+        """
         begin = time.time()
         client = self.app.test_client()
         ctx = self.app.test_request_context(base_url=self.base_url)
         ctx.push()
-        super(CacheRepresentationPerLane, self).process_library(library)
-        ctx.pop()
+        self.feed_timings = []
+        self.search_engine = self.shared_search_engine()
+        try:
+            lanes = [
+                lane for lane in self.lanes(library)
+                if self.should_process_lane(lane)
+            ]
+            self.prefetch(lanes)
+            if self.workers > 1:
+                # WorkLists that aren't Lanes can't be looked up in a
+                # worker's session, so they're handled here.
+                for lane in lanes:
+                    if not isinstance(lane, Lane):
+                        self.process_lane(lane)
+                        self._db.commit()
+                self.process_lanes_in_pool(
+                    [lane.id for lane in lanes if isinstance(lane, Lane)]
+                )
+            else:
+                for lane in lanes:
+                    self.process_lane(lane)
+                    self._db.commit()
+        finally:
+            ctx.pop()
         end = time.time()
+        self.log_timings(library, end-begin)
+        self.search_engine = None
+
+    def shared_search_engine(self):
+        """Create a SharedSearchResults to be used by every feed
+        generated for a library, or None if the search index is not
+        configured.
+        """
+        try:
+            return SharedSearchResults(ExternalSearchIndex.load(self._db))
+        except CannotLoadConfiguration as e:
+            self.log.warning("Not sharing search results: %s", e)
+            return None
+
+    def search_queries(self, lane, facets, pagination):
+        """Find the searches that will be run to generate a feed.
+
+        :return: A list of (query string, Filter, Pagination) 3-tuples,
+            as for ExternalSearchIndex.query_works_multi. The
+            default implementation doesn't know about any searches.
+        """
+        return []
+
+    def prefetch(self, lanes):
+        """Run, in bulk, the searches needed for the first page of every
+        feed that will be generated for the given lanes.
+        """
+        if not self.search_engine:
+            return
+        queries = []
+        for lane in lanes:
+            for facets in self.facets(lane):
+                # Later pages can't be planned, since whether there is
+                # a next page depends on the results of this one.
+                pagination = next(iter(self.pagination(lane)), None)
+                queries.extend(self.search_queries(lane, facets, pagination))
+        if not queries:
+            return
+        a = time.time()
+        run = self.search_engine.prefetch(queries)
+        b = time.time()
         self.log.info(
-            "Processed library %s in %.2fsec", library.short_name, end-begin
+            "Ran %d distinct searches for %d planned searches in %.2fsec.",
+            run, len(queries), (b-a)
         )
 
+    def process_lanes_in_pool(self, lane_ids):
+        """Generate the feeds for the given lanes in a pool of worker
+        threads, each with its own database session.
+        """
+        # Make sure the worker sessions can see everything done so far.
+        self._db.commit()
+        session_factory = SessionManager.sessionmaker(session=self._db)
+        with DatabasePool(self.workers, session_factory) as pool:
+            for lane_id in lane_ids:
+                pool.put(CacheLaneFeedsJob(self, lane_id))
+
+    def process_lane_in_session(self, _db, lane_id):
+        """Generate the feeds for a lane using the given database
+        session. This is called from a worker thread.
+        """
+        self._worker.session = _db
+        ctx = self.app.test_request_context(base_url=self.base_url)
+        ctx.push()
+        try:
+            lane = _db.query(Lane).get(lane_id)
+            if lane:
+                self.process_lane(lane)
+        finally:
+            ctx.pop()
+            self._worker.session = None
+
+    def annotator(self, lane, facets):
+        """Create the annotator for one of a lane's feeds.
+
+        The CirculationAPIs the circulation manager creates at startup
+        use the script's own database session, so a worker thread's
+        annotator is given a CirculationAPI that uses the worker's
+        session instead.
+        """
+        circulation = None
+        in_worker = getattr(self._worker, 'session', None) is not None
+        if in_worker and isinstance(lane, Lane):
+            circulation = self.worker_circulation(lane.library)
+        return self.app.manager.annotator(
+            lane, facets=facets, circulation=circulation
+        )
+
+    def worker_circulation(self, library):
+        """Find or create a CirculationAPI for the given library that
+        uses the current worker thread's database session.
+
+        Creating a CirculationAPI can be expensive, so each worker
+        creates one per library and reuses it for as long as it's
+        using the same session.
+        """
+        session, apis = getattr(self._worker, 'circulation_apis', (None, None))
+        if session is not self._db:
+            apis = {}
+            self._worker.circulation_apis = (self._db, apis)
+        if library.id not in apis:
+            manager = self.app.manager
+            apis[library.id] = manager.setup_circulation(
+                library, manager.analytics, _db=self._db
+            )
+        return apis[library.id]
+
     def process_lane(self, lane):
         """Generate a number of feeds for this lane.
         One feed will be generated for each combination of Facets and
@@ -449,9 +618,38 @@ class CacheRepresentationPerLane(TimestampScript, LaneSweeperScript):
                         "Took %.2f sec to make %d bytes.", (b-a),
                         len(feed.data)
                     )
+                    self.record_timing(
+                        lane.full_identifier + extra_description, b-a,
+                        len(feed.data)
+                    )
         total_size = sum(len(x.data) for x in cached_feeds)
         return cached_feeds
 
+    def record_timing(self, description, duration, size):
+        """Keep track of how long it took to generate a feed."""
+        with self._timings_lock:
+            self.feed_timings.append((duration, size, description))
+
+    def log_timings(self, library, duration):
+        """Summarize the work done for a library."""
+        timings = sorted(self.feed_timings, reverse=True)
+        self.log.info(
+            "Processed library %s in %.2fsec: generated %d feeds (%d bytes) "
+            "in %.2fsec of feed generation time.", library.short_name,
+            duration, len(timings), sum(x[1] for x in timings),
+            sum(x[0] for x in timings)
+        )
+        if timings:
+            slowest_duration, size, description = timings[0]
+            self.log.info(
+                "Slowest feed: %s (%.2fsec)", description, slowest_duration
+            )
+        if self.search_engine:
+            self.log.info(
+                "Searches: %d run, %d answered with earlier results.",
+                self.search_engine.misses, self.search_engine.hits
+            )
+
     def facets(self, lane):
         """Yield a Facets object for each set of facets this
         script is expected to handle.
@@ -625,17 +823,22 @@ class CacheFacetListsPerLane(CacheRepresentationPerLane):
                 # pages. Stop working.
                 break
 
+    def search_queries(self, lane, facets, pagination):
+        """A page of a feed is generated with a single search."""
+        filter = lane.filter(self._db, facets)
+        return [(None, filter, pagination or Pagination.default())]
+
     def do_generate(self, lane, facets, pagination, feed_class=None):
         feeds = []
         title = lane.display_name
         library = lane.get_library(self._db)
-        annotator = self.app.manager.annotator(lane, facets=facets)
+        annotator = self.annotator(lane, facets)
         url = annotator.feed_url(lane, facets=facets, pagination=pagination)
         feed_class = feed_class or AcquisitionFeed
         return feed_class.page(
             _db=self._db, title=title, url=url, worklist=lane,
             annotator=annotator, facets=facets, pagination=pagination,
-            max_age=0
+            max_age=0, search_engine=self.search_engine
         )
 
 
@@ -643,6 +846,15 @@ class CacheOPDSGroupFeedPerLane(CacheRepresentationPerLane):
 
     name = "Cache OPDS grouped feed for each lane"
 
+    # The seed used to shuffle featured works. This is set once per
+    # library, so that every feed shuffles the same way and the
+    # searches for a lane's featured works can be shared between feeds.
+    random_seed = None
+
+    def process_library(self, library):
+        self.random_seed = int(time.time())
+        super(CacheOPDSGroupFeedPerLane, self).process_library(library)
+
     def should_process_lane(self, lane):
         # OPDS grouped feeds are only generated for lanes that have sublanes.
         if not lane.children:
@@ -653,7 +865,7 @@ class CacheOPDSGroupFeedPerLane(CacheRepresentationPerLane):
 
     def do_generate(self, lane, facets, pagination, feed_class=None):
         title = lane.display_name
-        annotator = self.app.manager.annotator(lane, facets=facets)
+        annotator = self.annotator(lane, facets)
         url = annotator.groups_url(lane, facets)
         feed_class = feed_class or AcquisitionFeed
 
@@ -662,9 +874,49 @@ class CacheOPDSGroupFeedPerLane(CacheRepresentationPerLane):
         # unlike the corresponding code in OPDSFeedController.groups()
         return feed_class.groups(
             _db=self._db, title=title, url=url, worklist=lane,
-            annotator=annotator, max_age=0, facets=facets
+            annotator=annotator, max_age=0, facets=facets,
+            search_engine=self.search_engine
         )
 
+    def search_queries(self, lane, facets, pagination):
+        """Find the searches Lane.groups() will run to get featured works
+        for the lane and its sublanes.
+        """
+        library = lane.get_library(self._db)
+        if pagination is None:
+            # This is how WorkList._groups_for_lanes sizes the search
+            # for each lane.
+            target_size = library.featured_lane_size
+            pagination = Pagination(
+                size=max(target_size+1, int(target_size * 1.10))
+            )
+
+        # Only some of the lanes in a grouped feed get their featured
+        # works from the main search. The others make a separate call
+        # to groups(), which isn't planned here.
+        if isinstance(lane, Lane):
+            relevant_lanes = list(lane.visible_children)
+            if lane.include_self_in_grouped_feed:
+                relevant_lanes.append(lane)
+            queryable_lanes = [
+                x for x in relevant_lanes
+                if x == lane or x.inherit_parent_restrictions
+            ]
+        else:
+            queryable_lanes = []
+            for child in lane.children:
+                if isinstance(child, Lane):
+                    child = self._db.merge(child)
+                    if child.visible:
+                        queryable_lanes.append(child)
+
+        queries = []
+        for relevant in queryable_lanes:
+            overview_facets = relevant.overview_facets(self._db, facets)
+            filter = Filter.from_worklist(self._db, relevant, overview_facets)
+            queries.append((None, filter, pagination))
+        return queries
+
     def facets(self, lane):
         """Generate a Facets object for each of the library's enabled
         entrypoints.
@@ -692,10 +944,22 @@ class CacheOPDSGroupFeedPerLane(CacheRepresentationPerLane):
                 entrypoint=entrypoint,
                 entrypoint_is_default=(
                     top_level and entrypoint is default_entrypoint
-                )
+                ),
+                random_seed=self.random_seed
             )
             yield facets
 
+
+class CacheLaneFeedsJob(DatabaseJob):
+    """Generate the cached feeds for one lane in a worker thread."""
+
+    def __init__(self, script, lane_id):
+        self.script = script
+        self.lane_id = lane_id
+
+    def do_run(self, _db):
+        self.script.process_lane_in_session(_db, self.lane_id)
+
 class CacheMARCFiles(LaneSweeperScript):
     """Generate and cache MARC files for each input library."""
 
@@ -720,6 +984,9 @@ class CacheMARCFiles(LaneSweeperScript):
     def __init__(self, _db=None, cmd_args=None, *args, **kwargs):
         super(CacheMARCFiles, self).__init__(_db, *args, **kwargs)
         self.parse_args(cmd_args)
+        # One MARCExporter per library, so that every lane's delta
+        # file can share the work of finding and exporting changes.
+        self.exporters = {}
 
     def parse_args(self, cmd_args=None):
         parser = self.arg_parser(self._db)
@@ -755,7 +1022,11 @@ class CacheMARCFiles(LaneSweeperScript):
             library = lane.get_library(self._db)
 
         annotator = MARCLibraryAnnotator(library)
-        exporter = exporter or MARCExporter.from_config(library)
+        if not exporter:
+            exporter = self.exporters.get(library.id)
+        if not exporter:
+            exporter = MARCExporter.from_config(library)
+            self.exporters[library.id] = exporter
 
         update_frequency = ConfigurationSetting.for_library_and_externalintegration(
             self._db, MARCExporter.UPDATE_FREQUENCY, library, exporter.integration
@@ -1385,21 +1656,32 @@ class DirectoryImportScript(TimestampScript):
         replacement_policy = ReplacementPolicy.from_license_source(self._db)
         replacement_policy.mirrors = mirrors
         metadata_records = self.load_metadata(metadata_file, metadata_format, data_source_name, default_medium_type)
-        for metadata in metadata_records:
-            _, licensepool = self.work_from_metadata(
-                collection,
-                collection_type,
-                metadata,
-                replacement_policy,
-                cover_directory,
-                ebook_directory,
-                rights_uri
-            )
 
-            licensepool.self_hosted = True if self_hosted_collection else False
+        # Look up the contributors to every book in the file at once,
+        # and create the missing ones with a single INSERT.
+        contributors = [
+            contributor for metadata in metadata_records
+            for contributor in metadata.contributors
+        ]
+        resolver = ContributorResolver.from_contributors(self._db, contributors)
+        resolver.create_missing(contributors)
+
+        with resolver:
+            for metadata in metadata_records:
+                _, licensepool = self.work_from_metadata(
+                    collection,
+                    collection_type,
+                    metadata,
+                    replacement_policy,
+                    cover_directory,
+                    ebook_directory,
+                    rights_uri
+                )
 
-            if not dry_run:
-                self._db.commit()
+                licensepool.self_hosted = True if self_hosted_collection else False
+
+                if not dry_run:
+                    self._db.commit()
 
     def load_collection(self, collection_name, collection_type, data_source_name):
         """Locate a Collection with the given name.
@@ -1830,6 +2112,21 @@ You'll get another chance to back out before the database session is committed."
 
 class NovelistSnapshotScript(TimestampScript, LibraryInputScript):
 
+    @classmethod
+    def arg_parser(cls, _db):
+        parser = LibraryInputScript.arg_parser(_db)
+        parser.add_argument(
+            '--chunk-size',
+            help="Stream the snapshot to NoveList in requests of this many records, rather than sending it all at once.",
+            type=int,
+        )
+        parser.add_argument(
+            '--delta',
+            help="Only send items that changed since the last successful snapshot. Implies a chunked upload.",
+            action='store_true'
+        )
+        return parser
+
     def do_run(self, output=sys.stdout, *args, **kwargs):
         parsed = self.parse_command_line(self._db, *args, **kwargs)
         for library in parsed.libraries:
@@ -1839,9 +2136,25 @@ class NovelistSnapshotScript(TimestampScript, LibraryInputScript):
                 self.log.info(str(e))
                 continue
             if (api):
-                response = api.put_items_novelist(library)
+                start = utc_now()
+                if parsed.chunk_size or parsed.delta:
+                    since = None
+                    if parsed.delta:
+                        since = api.last_snapshot_time(library)
+                    responses = api.put_items_novelist_in_chunks(
+                        library, since=since, chunk_size=parsed.chunk_size
+                    )
+                else:
+                    response = api.put_items_novelist(library)
+                    responses = [response] if response else None
+
+                if responses is not None:
+                    # Only a snapshot that went through completely can
+                    # serve as the starting point for the next delta.
+                    api.set_last_snapshot_time(library, start)
+                    self._db.commit()
 
-                if (response):
+                for response in (responses or []):
                     result = "NoveList API Response\n"
                     result += str(response)
 
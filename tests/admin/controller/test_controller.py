@@ -63,6 +63,7 @@ from core.model import (
     Admin,
     AdminRole,
     CirculationEvent,
+    CollectionStatistics,
     Complaint,
     ConfigurationSetting,
     CustomList,
@@ -2166,6 +2167,39 @@ class TestDashboardController(AdminControllerTest):
                 assert 0 == c3_data.get('licenses')
                 assert 0 == c3_data.get('available_licenses')
 
+    def test_stats_uses_refreshed_summary(self):
+        with self.request_context_with_admin("/"):
+            self.admin.add_role(AdminRole.SYSTEM_ADMIN)
+
+            # Once the collection statistics have been refreshed, the
+            # dashboard reads them instead of counting LicensePools.
+            CollectionStatistics.refresh(self._db)
+
+            edition, pool = self._edition(with_license_pool=True,
+                                          with_open_access_download=False,
+                                          data_source_name=DataSource.OVERDRIVE)
+            pool.open_access = False
+            pool.licenses_owned = 10
+            pool.licenses_available = 5
+
+            def collection_data():
+                response = self.manager.admin_dashboard_controller.stats()
+                return response.get("total").get("collections").get(
+                    self._default_collection.name)
+
+            assert 0 == collection_data().get('licenses')
+
+            # Once the summary is stale, the dashboard counts on the spot.
+            timestamp = Timestamp.lookup(
+                self._db, CollectionStatistics.SERVICE_NAME,
+                Timestamp.SCRIPT_TYPE, None
+            )
+            timestamp.finish = utc_now() - (
+                self.manager.admin_dashboard_controller.STATS_MAX_AGE * 2
+            )
+            assert 10 == collection_data().get('licenses')
+            assert 5 == collection_data().get('available_licenses')
+
 
 class SettingsControllerTest(AdminControllerTest):
     """Test some part of the settings controller."""
@@ -22,6 +22,7 @@ from api.proquest.client import (
 )
 from api.proquest.credential import ProQuestCredentialManager
 from api.proquest.identifier import ProQuestIdentifierParser
+from api.proquest.model import ProQuestPublicationFingerprint
 from api.proquest.importer import (
     ProQuestOPDS2Importer,
     ProQuestOPDS2ImporterConfiguration,
@@ -53,6 +54,12 @@ from core.model.configuration import (
     HasExternalIntegration,
 )
 from core.testing import DatabaseTest
+from core.util.webpub_manifest_parser.core.ast import CollectionList, PresentationMetadata
+from core.util.webpub_manifest_parser.opds2.ast import (
+    OPDS2Feed,
+    OPDS2Group,
+    OPDS2Publication,
+)
 from tests.proquest import fixtures
 
 
@@ -1379,3 +1386,154 @@ class TestProQuestOPDS2ImportMonitor(DatabaseTest):
         # Assert
         # Make sure that ProQuestOPDS2ImportMonitor.import_one_feed was called only for the page # 1
         monitor.import_one_feed.assert_has_calls(expected_calls)
+
+    def test_monitor_skips_unchanged_publications(self):
+        """This test makes sure that the monitor imports only new and changed publications
+        using fingerprints of the previously imported publications.
+        """
+        # Arrange
+        client = create_autospec(spec=ProQuestAPIClient)
+        client_factory = create_autospec(spec=ProQuestAPIClientFactory)
+        client_factory.create = MagicMock(return_value=client)
+
+        monitor = ProQuestOPDS2ImportMonitor(
+            client_factory, self._db, self._proquest_collection, ProQuestOPDS2Importer
+        )
+        feeds = [fixtures.PROQUEST_FEED_PAGE_1, fixtures.PROQUEST_FEED_PAGE_2]
+        monitor._get_feeds = MagicMock(return_value=list(zip([None] * len(feeds), feeds)))
+        monitor.import_one_feed = MagicMock(return_value=([], []))
+
+        # The first run imports everything and saves fingerprints of all four publications.
+        monitor.run_once(False)
+
+        assert 2 == monitor.import_one_feed.call_count
+        assert 4 == self._db.query(ProQuestPublicationFingerprint).count()
+
+        # Publication # 3 changes, everything else stays the same.
+        changed_publication_3 = OPDS2Publication(
+            metadata=PresentationMetadata(
+                identifier=fixtures.PROQUEST_PUBLICATION_3.metadata.identifier,
+                title="Publication # 3 (revised)",
+                modified=fixtures.PROQUEST_PUBLICATION_3.metadata.modified,
+            ),
+            links=fixtures.PROQUEST_PUBLICATION_3.links,
+        )
+        changed_feed_page_2 = OPDS2Feed(
+            metadata=fixtures.PROQUEST_FEED_PAGE_2.metadata,
+            groups=CollectionList(
+                [
+                    OPDS2Group(
+                        publications=CollectionList(
+                            [changed_publication_3, fixtures.PROQUEST_PUBLICATION_4]
+                        )
+                    )
+                ]
+            ),
+            links=fixtures.PROQUEST_FEED_PAGE_2.links,
+        )
+        feeds = [fixtures.PROQUEST_FEED_PAGE_1, changed_feed_page_2]
+        monitor._get_feeds = MagicMock(return_value=list(zip([None] * len(feeds), feeds)))
+        monitor.import_one_feed = MagicMock(return_value=([], []))
+
+        # Act
+        result = monitor.run_once(False)
+
+        # Assert
+        # Page # 1 was skipped entirely, page # 2 was imported with only publication # 3 in it.
+        monitor.import_one_feed.assert_called_once()
+        [imported_feed] = monitor.import_one_feed.call_args[0]
+        assert [changed_publication_3] == list(imported_feed.publications)
+        assert "Items unchanged: 3." in result.achievements
+
+        # Forcing a reimport ignores the fingerprints.
+        monitor.force_reimport = True
+        monitor._get_feeds = MagicMock(return_value=list(zip([None] * len(feeds), feeds)))
+        monitor.import_one_feed = MagicMock(return_value=([], []))
+
+        monitor.run_once(False)
+
+        monitor.import_one_feed.assert_has_calls(
+            [call(fixtures.PROQUEST_FEED_PAGE_1), call(changed_feed_page_2)]
+        )
+
+    def test_monitor_does_not_save_fingerprints_of_failed_publications(self):
+        # Arrange
+        client = create_autospec(spec=ProQuestAPIClient)
+        client_factory = create_autospec(spec=ProQuestAPIClientFactory)
+        client_factory.create = MagicMock(return_value=client)
+
+        monitor = ProQuestOPDS2ImportMonitor(
+            client_factory, self._db, self._proquest_collection, ProQuestOPDS2Importer
+        )
+        feeds = [fixtures.PROQUEST_FEED_PAGE_1]
+        monitor._get_feeds = MagicMock(return_value=list(zip([None] * len(feeds), feeds)))
+
+        # Publication # 1 fails to import.
+        monitor.import_one_feed = MagicMock(return_value=([], {"1": MagicMock()}))
+
+        # Act
+        monitor.run_once(False)
+
+        # Assert
+        [fingerprint] = self._db.query(ProQuestPublicationFingerprint).all()
+        assert "2" == self._db.query(Identifier).get(fingerprint.identifier_id).identifier
+
+    def test_monitor_removes_items_missing_from_the_feed(self):
+        # Arrange
+        # Publication # 5 was imported earlier but is no longer in the feed.
+        edition, removed_pool = self._edition(
+            data_source_name=DataSource.PROQUEST,
+            identifier_type=Identifier.PROQUEST_ID,
+            identifier_id="5",
+            with_license_pool=True,
+            collection=self._proquest_collection,
+        )
+        removed_pool.unlimited_access = True
+        self._db.add(
+            ProQuestPublicationFingerprint(
+                self._proquest_collection.id, edition.primary_identifier.id, "fingerprint"
+            )
+        )
+
+        # Publication # 1 is still in the feed.
+        edition, remaining_pool = self._edition(
+            data_source_name=DataSource.PROQUEST,
+            identifier_type=Identifier.PROQUEST_ID,
+            identifier_id="1",
+            with_license_pool=True,
+            collection=self._proquest_collection,
+        )
+        remaining_pool.unlimited_access = True
+
+        client = create_autospec(spec=ProQuestAPIClient)
+        client_factory = create_autospec(spec=ProQuestAPIClientFactory)
+        client_factory.create = MagicMock(return_value=client)
+
+        monitor = ProQuestOPDS2ImportMonitor(
+            client_factory,
+            self._db,
+            self._proquest_collection,
+            ProQuestOPDS2Importer,
+            process_removals=True,
+        )
+        feeds = [fixtures.PROQUEST_FEED_PAGE_1]
+        monitor._get_feeds = MagicMock(return_value=list(zip([None] * len(feeds), feeds)))
+        monitor.import_one_feed = MagicMock(return_value=([], []))
+
+        # Act
+        monitor.run_once(False)
+
+        # Assert
+        assert False == removed_pool.unlimited_access
+        assert True == remaining_pool.unlimited_access
+
+        # The fingerprint of the removed publication is gone
+        # so that it gets re-imported if it appears in the feed again.
+        fingerprint_identifiers = set(
+            identifier
+            for (identifier,) in self._db.query(Identifier.identifier).join(
+                ProQuestPublicationFingerprint,
+                ProQuestPublicationFingerprint.identifier_id == Identifier.id,
+            )
+        )
+        assert {"1", "2"} == fingerprint_identifiers
@@ -24,7 +24,7 @@ from api.saml.metadata.model import (
     SAMLServiceProviderMetadata,
     SAMLUIInfo,
 )
-from api.saml.metadata.parser import SAMLMetadataParser
+from api.saml.metadata.parser import SAMLMetadataCache, SAMLMetadataParser
 from core.model.configuration import (
     ConfigurationStorage,
     ExternalIntegration,
@@ -160,6 +160,52 @@ class TestSAMLConfiguration(DatabaseTest):
             )
             metadata_parser.parse.assert_called_once_with(identity_providers_metadata)
 
+    def test_get_identity_providers_shares_parsed_metadata(self):
+        # Arrange
+        metadata_parser = SAMLMetadataParser()
+        metadata_parser.parse = MagicMock(side_effect=metadata_parser.parse)
+
+        configuration_storage = ConfigurationStorage(self._saml_integration_association)
+        saml_configuration_factory = SAMLConfigurationFactory(metadata_parser)
+
+        def get_identity_providers(identity_providers_metadata):
+            with saml_configuration_factory.create(
+                configuration_storage, self._db, SAMLConfiguration
+            ) as configuration:
+                configuration.non_federated_identity_provider_xml_metadata = (
+                    identity_providers_metadata
+                )
+
+                return configuration.get_identity_providers(self._db)
+
+        # Act
+        first_identity_providers = get_identity_providers(
+            fixtures.CORRECT_XML_WITH_MULTIPLE_IDPS
+        )
+        second_identity_providers = get_identity_providers(
+            fixtures.CORRECT_XML_WITH_MULTIPLE_IDPS
+        )
+
+        # Assert
+        # The second configuration reused the metadata parsed for the first one.
+        assert first_identity_providers == second_identity_providers
+        assert 2 == len(second_identity_providers)
+        metadata_parser.parse.assert_called_once_with(
+            fixtures.CORRECT_XML_WITH_MULTIPLE_IDPS
+        )
+
+        # Changed metadata has a different digest and is parsed again.
+        changed_identity_providers = get_identity_providers(
+            fixtures.CORRECT_XML_WITH_IDP_1
+        )
+        assert 1 == len(changed_identity_providers)
+        assert 2 == metadata_parser.parse.call_count
+
+        # Once the cache is reset the metadata is parsed again.
+        SAMLMetadataCache.reset_cache()
+        get_identity_providers(fixtures.CORRECT_XML_WITH_MULTIPLE_IDPS)
+        assert 3 == metadata_parser.parse.call_count
+
     def test_get_identity_providers_returns_federated_idps(self):
         # Arrange
         federated_identity_provider_entity_ids = json.dumps(
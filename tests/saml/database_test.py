@@ -1,3 +1,4 @@
+from api.saml.metadata.parser import SAMLMetadataCache
 from api.saml.provider import SAMLWebSSOAuthenticationProvider
 from core.model import ExternalIntegration
 from core.testing import DatabaseTest as BaseDatabaseTest
@@ -7,6 +8,8 @@ class DatabaseTest(BaseDatabaseTest):
     def setup_method(self):
         super(DatabaseTest, self).setup_method()
 
+        SAMLMetadataCache.reset_cache()
+
         self._integration = self._external_integration(
             protocol=SAMLWebSSOAuthenticationProvider.NAME,
             goal=ExternalIntegration.PATRON_AUTH_GOAL,
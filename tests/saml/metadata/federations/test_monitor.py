@@ -6,6 +6,7 @@ from api.saml.metadata.federations.model import (
     SAMLFederation,
 )
 from api.saml.metadata.monitor import SAMLMetadataMonitor
+from api.saml.metadata.parser import SAMLMetadataCache, SAMLMetadataParser
 from tests.saml import fixtures
 from tests.saml.database_test import DatabaseTest
 
@@ -45,3 +46,21 @@ class TestSAMLMetadataMonitor(DatabaseTest):
         # Assert
         identity_providers = self._db.query(SAMLFederatedIdentityProvider).all()
         assert expected_federated_identity_providers == identity_providers
+
+    def test_run_once_resets_parsed_metadata_cache(self):
+        # Arrange
+        SAMLMetadataCache.get_providers(
+            SAMLMetadataParser(), fixtures.CORRECT_XML_WITH_IDP_1
+        )
+        assert 1 == len(SAMLMetadataCache._entries)
+
+        loader = create_autospec(spec=SAMLFederatedIdentityProviderLoader)
+        loader.load = MagicMock(return_value=[])
+
+        monitor = SAMLMetadataMonitor(self._db, loader)
+
+        # Act
+        monitor.run_once(None)
+
+        # Assert
+        assert 0 == len(SAMLMetadataCache._entries)
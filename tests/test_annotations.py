@@ -11,10 +11,12 @@ from core.model import (
     create,
 )
 
+from api import annotations
 from api.annotations import (
     AnnotationWriter,
     AnnotationParser,
 )
+from core.lane import Pagination
 from api.problem_details import *
 
 class AnnotationTest(DatabaseTest):
@@ -269,6 +271,97 @@ class TestAnnotationWriter(AnnotationTest, ControllerTest):
             page = AnnotationWriter.annotation_page_for(patron, identifier)
             assert 0 == len(page['items'])
 
+    def test_annotation_page_for_pagination(self):
+        patron = self._patron()
+        now = utc_now()
+        created = []
+        for i in range(5):
+            annotation, ignore = create(
+                self._db, Annotation,
+                patron=patron,
+                identifier=self._identifier(),
+                motivation=Annotation.IDLING,
+            )
+            annotation.timestamp = now - datetime.timedelta(minutes=i)
+            created.append(annotation)
+
+        def item_ids(page):
+            return [item['id'] for item in page['items']]
+
+        def detail_ids(annotations):
+            return [AnnotationWriter.detail(x)['id'] for x in annotations]
+
+        with self.app.test_request_context("/"):
+            # The most recent annotations come first.
+            page = AnnotationWriter.annotation_page_for(
+                patron, pagination=Pagination(0, 2)
+            )
+            assert detail_ids(created[:2]) == item_ids(page)
+            assert 0 == page['startIndex']
+            assert 'annotations' in page['partOf']
+            assert 'after=2' in page['next']
+            assert 'size=2' in page['next']
+            assert 'prev' not in page
+
+            page = AnnotationWriter.annotation_page_for(
+                patron, pagination=Pagination(2, 2)
+            )
+            assert detail_ids(created[2:4]) == item_ids(page)
+            assert 'after=4' in page['next']
+            assert 'after=0' in page['prev']
+
+            # The last page has no next link.
+            page = AnnotationWriter.annotation_page_for(
+                patron, pagination=Pagination(4, 2)
+            )
+            assert detail_ids(created[4:]) == item_ids(page)
+            assert 'next' not in page
+
+            # The container counts every annotation but only embeds
+            # the first page.
+            container, timestamp = AnnotationWriter.annotation_container_for(
+                patron, pagination=Pagination(4, 2)
+            )
+            assert 5 == container['total']
+            assert now == timestamp
+            assert detail_ids(created[:2]) == item_ids(container['first'])
+            assert 'after=4' in container['last']
+
+    def test_detail_uses_stored_compacted_form(self):
+        patron = self._patron()
+        annotation, ignore = create(
+            self._db, Annotation,
+            patron=patron,
+            identifier=self._identifier(),
+            motivation=Annotation.IDLING,
+            content=json.dumps({"http://www.w3.org/ns/oa#bodyValue": "text"}),
+        )
+
+        with self.app.test_request_context("/"):
+            # An annotation written before compacted forms were stored
+            # gets its compacted form the first time it's served.
+            assert None == annotation.compacted_content
+            detail = AnnotationWriter.detail(annotation)
+            assert dict(bodyValue="text") == detail["body"]
+            assert detail["body"] == json.loads(annotation.compacted_content)
+
+            # From then on the stored form is used.
+            annotation.compacted_content = json.dumps(dict(stored=True))
+            detail = AnnotationWriter.detail(annotation)
+            assert dict(stored=True) == detail["body"]
+
+    def test_load_document_serves_bundled_contexts_from_memory(self):
+        annotations._local_documents.clear()
+        doc = annotations.load_document(AnnotationWriter.JSONLD_CONTEXT)
+        assert AnnotationWriter.JSONLD_CONTEXT == doc['documentUrl']
+        assert '@context' in json.loads(doc['document'])
+
+        # The second time, the file isn't read again.
+        annotations._local_documents[AnnotationWriter.JSONLD_CONTEXT] = "cached"
+        doc = annotations.load_document(AnnotationWriter.JSONLD_CONTEXT)
+        assert "cached" == doc['document']
+        annotations._local_documents.clear()
+
     def test_detail_target(self):
         patron = self._patron()
         identifier = self._identifier()
@@ -535,6 +628,23 @@ class TestAnnotationParser(AnnotationTest):
 
         assert INVALID_ANNOTATION_TARGET == annotation
 
+    def test_parse_stores_compacted_forms(self):
+        self.pool.loan_to(self.patron)
+        data = self._sample_jsonld()
+
+        annotation = AnnotationParser.parse(self._db, json.dumps(data), self.patron)
+
+        # The compacted target and body are stored so they don't have
+        # to be compacted again when the annotation is served.
+        assert data['target']['source'] == json.loads(
+            annotation.compacted_target)['source']
+        assert data['body'] == json.loads(annotation.compacted_content)
+
+        # Deleting the annotation removes its body.
+        annotation.set_inactive()
+        assert None == annotation.content
+        assert None == annotation.compacted_content
+
     def test_parse_updates_existing_annotation(self):
         self.pool.loan_to(self.patron)
 
@@ -1,3 +1,4 @@
+import datetime
 import json
 
 from api.testing import AnnouncementTest
@@ -47,6 +48,28 @@ class TestAnnouncements(AnnouncementTest, DatabaseTest):
         assert 3 == len(announcements.announcements)
         assert ["active"] == [x.id for x in announcements.active]
 
+    def test_next_change(self):
+        # next_change() finds the next date on which the set of active
+        # announcements will be different.
+        today = datetime.date.today()
+        tomorrow = today + datetime.timedelta(days=1)
+
+        # The active announcement finishes tomorrow, so it disappears
+        # the day after. The forthcoming announcement appears tomorrow.
+        # The expired announcement will never change again.
+        m = lambda *x: Announcements(list(x)).next_change()
+        assert tomorrow + datetime.timedelta(days=1) == m(self.active)
+        assert tomorrow == m(self.forthcoming)
+        assert tomorrow == m(self.active, self.forthcoming)
+        assert None == m(self.expired)
+        assert None == m()
+
+        # The current date can be specified.
+        announcements = Announcements([self.active, self.forthcoming])
+        assert today + datetime.timedelta(days=8) == announcements.next_change(
+            today + datetime.timedelta(days=3)
+        )
+
     # Throw in a few minor tests of Announcement while we're here.
 
     def test_is_active(self):
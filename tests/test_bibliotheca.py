@@ -53,6 +53,7 @@ from core.util.datetime_helpers import (
 )
 from core.util.http import (
     BadResponseException,
+    HTTP,
 )
 from core.util.web_publication_manifest import AudiobookManifest
 from core.scripts import RunCollectionCoverageProviderScript
@@ -109,6 +110,10 @@ class TestBibliothecaAPI(BibliothecaAPITest):
             self.collection.external_integration ==
             self.api.external_integration(object()))
 
+    def test_constructor_configures_session_pool(self):
+        # Requests to Bibliotheca are given extra time to complete.
+        assert 60 == HTTP.SESSIONS.timeout(self.api.base_url)
+
     def test__run_self_tests(self):
         # Verify that BibliothecaAPI._run_self_tests() calls the right
         # methods.
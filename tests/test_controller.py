@@ -24,6 +24,7 @@ from werkzeug.exceptions import NotFound
 
 from api.util.short_client_token import ShortClientTokenUtility
 from api.annotations import AnnotationWriter
+from api.announcements import Announcements
 from api.app import app, initialize_database
 from api.authenticator import (
     BasicAuthTempTokenController,
@@ -393,9 +394,9 @@ class TestCirculationManager(CirculationControllerTest):
         assert 1 == len(manager.top_level_lanes)
         assert 1 == len(manager.circulation_apis)
 
-        # The authentication document cache has a default value for
-        # max_age.
-        assert 0 == manager.authentication_for_opds_documents.max_age
+        # No authentication documents have been built, since there
+        # was no request to build them for.
+        assert {} == manager.authentication_for_opds_documents
 
         # WSGI debug is off by default.
         assert False == manager.wsgi_debug
@@ -434,10 +435,6 @@ class TestCirculationManager(CirculationControllerTest):
         ConfigurationSetting.sitewide(
             self._db, Configuration.ADMIN_WEB_HOSTNAMES).value = "http://admin/1234"
 
-        ConfigurationSetting.sitewide(
-            self._db, Configuration.AUTHENTICATION_DOCUMENT_CACHE_TIME
-        ).value = "60"
-
         ConfigurationSetting.sitewide(
             self._db, Configuration.WSGI_DEBUG_KEY
         ).value = "true"
@@ -483,9 +480,8 @@ class TestCirculationManager(CirculationControllerTest):
 
         assert set(["http://admin"]) == manager.admin_web_domains
 
-        # The authentication document cache has been rebuilt with a
-        # new max_age.
-        assert 60 == manager.authentication_for_opds_documents.max_age
+        # The authentication document cache has been cleared.
+        assert {} == manager.authentication_for_opds_documents
 
         # The WSGI debug setting has been changed.
         assert True == manager.wsgi_debug
@@ -1552,17 +1548,16 @@ class TestIndexController(CirculationControllerTest):
             doc = json.loads(data)
             assert library_name == doc['title']
 
-        # Currently, the authentication document cache is disabled by default.
-        self.manager.authentication_for_opds_documents[library_name] = "Cached value"
-        with self.request_context_with_library(
-                "/", headers=dict(Authorization=self.invalid_auth)):
-            response = self.manager.index_controller.authentication_document()
-            assert "Cached value" != response.get_data(as_text=True)
+            # The document has a strong ETag.
+            etag = response.headers['ETag']
+            cached = self.manager.cached_authentication_document()
+            assert '"%s"' % cached.etag == etag
 
-        # Enable the A4OPDS document cache and verify that it's working.
-        self.manager.authentication_for_opds_documents.max_age = 3600
+        # The document is cached and reused.
+        key = (library_name, "http://localhost/")
+        assert cached == self.manager.authentication_for_opds_documents[key]
         cached_value = json.dumps(dict(key="Cached document"))
-        self.manager.authentication_for_opds_documents[library_name] = cached_value
+        cached.document = cached_value
         with self.request_context_with_library(
                 "/?debug", headers=dict(Authorization=self.invalid_auth)):
             response = self.manager.index_controller.authentication_document()
@@ -1573,6 +1568,22 @@ class TestIndexController(CirculationControllerTest):
             # disabled.
             assert '_debug' not in response.get_data(as_text=True)
 
+        # A client that already has the current document gets a 304
+        # response.
+        with self.request_context_with_library(
+                "/", headers={"If-None-Match": etag}):
+            response = self.manager.index_controller.authentication_document()
+            assert 304 == response.status_code
+            assert b'' == response.data
+            assert etag == response.headers['ETag']
+
+        # A client with an outdated document gets the new one.
+        with self.request_context_with_library(
+                "/", headers={"If-None-Match": '"outdated"'}):
+            response = self.manager.index_controller.authentication_document()
+            assert 200 == response.status_code
+            assert cached_value == response.get_data(as_text=True)
+
         # When WSGI debugging is enabled and requested, an
         # authentication document includes some extra information in a
         # special '_debug' section.
@@ -1591,6 +1602,53 @@ class TestIndexController(CirculationControllerTest):
             response = self.manager.index_controller.authentication_document()
             assert '_debug' not in response.get_data(as_text=True)
 
+    def test_authentication_document_invalidation(self):
+        library_name = self.library.short_name
+        key = (library_name, "http://localhost/")
+
+        def document():
+            with self.request_context_with_library("/"):
+                response = self.manager.index_controller.authentication_document()
+                return response.headers['ETag'], json.loads(response.data)
+
+        etag, doc = document()
+        assert [] == doc.get('announcements', [])
+        assert None == self.manager.authentication_for_opds_documents[key].valid_until
+
+        # Adding an announcement changes the site configuration, so the
+        # CirculationManager reloads its settings and rebuilds the
+        # document as part of the next request.
+        today = datetime.date.today()
+        announcement = dict(
+            id="notice", content="A notice that will appear tomorrow.",
+            start=(today + datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
+            finish=(today + datetime.timedelta(days=10)).strftime("%Y-%m-%d"),
+        )
+        ConfigurationSetting.for_library(
+            Announcements.SETTING_NAME, self.library
+        ).value = json.dumps([announcement])
+        self.manager.load_settings()
+        assert {} == self.manager.authentication_for_opds_documents
+
+        # The announcement isn't active yet, so the document looks the
+        # same, but it will need to be rebuilt once the announcement
+        # starts.
+        new_etag, doc = document()
+        assert etag == new_etag
+        cached = self.manager.authentication_for_opds_documents[key]
+        assert today + datetime.timedelta(days=1) == cached.valid_until
+
+        # Once the announcement starts, the cached document is no longer
+        # served.
+        cached.valid_until = today
+        announcement['start'] = today.strftime("%Y-%m-%d")
+        ConfigurationSetting.for_library(
+            Announcements.SETTING_NAME, self.library
+        ).value = json.dumps([announcement])
+        new_etag, doc = document()
+        assert etag != new_etag
+        assert ["notice"] == [x['id'] for x in doc['announcements']]
+
     def test_public_key_integration_document(self):
         base_url = ConfigurationSetting.sitewide(
             self._db, Configuration.BASE_URL_KEY).value
@@ -2687,6 +2745,41 @@ class TestAnnotationController(CirculationControllerTest):
                 mktime(annotation.timestamp.timetuple()))
             assert expected_time == response.headers['Last-Modified']
 
+    def test_get_container_page(self):
+        self.pool.loan_to(self.default_patron)
+
+        annotation, ignore = create(
+            self._db, Annotation,
+            patron=self.default_patron,
+            identifier=self.identifier,
+            motivation=Annotation.IDLING,
+        )
+        annotation.active = True
+        annotation.timestamp = utc_now()
+
+        with self.request_context_with_library(
+                "/?after=0&size=1", headers=dict(Authorization=self.valid_auth)):
+            self.manager.annotations.authenticated_patron_from_request()
+            response = self.manager.annotations.container()
+            assert 200 == response.status_code
+
+            # We've been given a single page of the container rather
+            # than the container itself.
+            page = json.loads(response.get_data(as_text=True))
+            assert "AnnotationPage" == page['type']
+            assert 0 == page['startIndex']
+            assert 1 == len(page['items'])
+            assert 'next' not in page
+            assert AnnotationWriter.CONTENT_TYPE == response.headers['Content-Type']
+            expected_etag = 'W/"%s"' % annotation.timestamp
+            assert expected_etag == response.headers['ETag']
+
+        with self.request_context_with_library(
+                "/?after=0&size=nonsense", headers=dict(Authorization=self.valid_auth)):
+            self.manager.annotations.authenticated_patron_from_request()
+            response = self.manager.annotations.container()
+            assert INVALID_INPUT.uri == response.uri
+
     def test_get_container_for_work(self):
         self.pool.loan_to(self.default_patron)
 
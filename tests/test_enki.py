@@ -47,6 +47,7 @@ from core.util.datetime_helpers import (
 )
 from core.util.http import (
     BadResponseException,
+    HTTP,
     RemoteIntegrationException,
     RequestTimedOut,
 )
@@ -80,7 +81,10 @@ class TestEnkiAPI(BaseEnkiTest):
         assert "Collection protocol is Overdrive, but passed into EnkiAPI!" in str(excinfo.value)
 
         collection.protocol = ExternalIntegration.ENKI
-        EnkiAPI(self._db, collection)
+        api = EnkiAPI(self._db, collection)
+
+        # Requests to Enki are given extra time to complete.
+        assert 90 == HTTP.SESSIONS.timeout(api.base_url)
 
     def test_external_integration(self):
         integration = self.api.external_integration(self._db)
@@ -103,6 +103,30 @@ class TestLibraryAnnotator(DatabaseTest):
         assert [record, pool] == annotator.called_with.get('add_distributor')
         assert [record, pool] == annotator.called_with.get('add_formats')
 
+    def test_value(self):
+        integration = self._external_integration(
+            ExternalIntegration.MARC_EXPORT, ExternalIntegration.CATALOG_GOAL,
+            libraries=[self._default_library])
+        setting = ConfigurationSetting.for_library_and_externalintegration(
+            self._db, MARCExporter.MARC_ORGANIZATION_CODE,
+            self._default_library, integration)
+        setting.value = "marc org"
+
+        annotator = LibraryAnnotator(self._default_library)
+        assert "marc org" == annotator.value(
+            MARCExporter.MARC_ORGANIZATION_CODE, integration
+        )
+
+        # The value is looked up once per annotator, since an annotator
+        # is only used to create one MARC file.
+        setting.value = "new marc org"
+        assert "marc org" == annotator.value(
+            MARCExporter.MARC_ORGANIZATION_CODE, integration
+        )
+        assert "new marc org" == LibraryAnnotator(self._default_library).value(
+            MARCExporter.MARC_ORGANIZATION_CODE, integration
+        )
+
     def test_add_web_client_urls(self):
         # Web client URLs can come from either the MARC export integration or
         # a library registry integration.
@@ -24,6 +24,7 @@ from api.novelist import (
 from core.util.http import (
     HTTP
 )
+from core.util.datetime_helpers import utc_now
 from core.testing import MockRequestsResponse
 
 
@@ -463,6 +464,70 @@ class TestNoveListAPI(DatabaseTest):
 
         assert items == [item]
 
+    def test_get_items_from_query_since(self):
+        edition = self._edition(identifier_type=Identifier.ISBN)
+        pool = self._licensepool(edition, collection=self._default_collection)
+        self._contributor(sort_name=edition.sort_author, name=edition.author)
+
+        now = utc_now()
+        an_hour_ago = now - datetime.timedelta(hours=1)
+        pool.last_checked = an_hour_ago
+        pool.availability_time = an_hour_ago
+
+        # Nothing has changed in the past half hour.
+        since = now - datetime.timedelta(minutes=30)
+        assert [] == self.novelist.get_items_from_query(
+            self._default_library, since=since
+        )
+
+        # Once the license pool is checked again, the item is included.
+        pool.last_checked = now
+        [item] = self.novelist.get_items_from_query(
+            self._default_library, since=since
+        )
+        assert edition.primary_identifier.identifier == item['isbn']
+
+    def test_put_items_novelist_in_chunks(self):
+        # Without any items, nothing is sent.
+        assert [] == self.novelist.put_items_novelist_in_chunks(
+            self._default_library
+        )
+
+        for i in range(3):
+            edition = self._edition(identifier_type=Identifier.ISBN)
+            self._licensepool(edition, collection=self._default_collection)
+            self._contributor(sort_name=edition.sort_author, name=edition.author)
+
+        sent = []
+        def mock_put_records(items):
+            sent.append([item['isbn'] for item in items])
+            return {'RecordsReceived': len(items)}
+        self.novelist.put_records = mock_put_records
+
+        responses = self.novelist.put_items_novelist_in_chunks(
+            self._default_library, chunk_size=2
+        )
+        assert [{'RecordsReceived': 2}, {'RecordsReceived': 1}] == responses
+        assert [2, 1] == [len(chunk) for chunk in sent]
+
+        # If any chunk is rejected, the snapshot as a whole failed.
+        self.novelist.put_records = lambda items: None
+        assert None == self.novelist.put_items_novelist_in_chunks(
+            self._default_library, chunk_size=2
+        )
+
+    def test_last_snapshot_time(self):
+        assert None == NoveListAPI.last_snapshot_time(self._default_library)
+
+        now = utc_now()
+        NoveListAPI.set_last_snapshot_time(self._default_library, now)
+        assert now == NoveListAPI.last_snapshot_time(self._default_library)
+
+        # A library without a NoveList integration has no snapshot time.
+        other_library = self._library()
+        NoveListAPI.set_last_snapshot_time(other_library, now)
+        assert None == NoveListAPI.last_snapshot_time(other_library)
+
     def test_create_item_object(self):
         # We pass no identifier or item to process so we get nothing back.
         (currentIdentifier, existingItem, newItem,
@@ -23,6 +23,7 @@ from core.entrypoint import (
 )
 
 from core.external_search import (
+    Filter,
     MockExternalSearchIndex,
     mock_search_index,
 )
@@ -58,6 +59,7 @@ from core.model import (
     LicensePool,
     Representation,
     RightsStatus,
+    SessionManager,
     Timestamp,
     EditionConstants)
 from core.model.configuration import ExternalIntegrationLink
@@ -248,6 +250,41 @@ class TestCacheRepresentationPerLane(TestLaneScript):
         assert (lane, facets2, page1) == c3
         assert (lane, facets2, page2) == c4
 
+    def test_process_library(self):
+        # process_library() runs the searches needed by every feed in
+        # bulk, then generates the feeds, which reuse the search
+        # results.
+        lane = self._lane()
+        search = MockExternalSearchIndex()
+
+        class Mock(CacheRepresentationPerLane):
+            def search_queries(self, lane, facets, pagination):
+                return [(None, Filter(), Pagination.default())]
+
+            def do_generate(self, lane, facets, pagination):
+                self.searches_before_generate = len(search.queries)
+                self.search_engine.query_works(
+                    None, Filter(), Pagination.default()
+                )
+                return Response("mock response")
+
+        with mock_search_index(search):
+            script = Mock(self._db, manager=object(), cmd_args=["--min-depth=0"])
+            script.process_library(self._default_library)
+
+        # The search was run before the feed was generated, and it
+        # wasn't run again when the feed was generated.
+        assert 1 == script.searches_before_generate
+        assert 1 == len(search.queries)
+
+        # The time taken to generate the feed was recorded.
+        [(duration, size, description)] = script.feed_timings
+        assert lane.full_identifier == description
+        assert len("mock response") == size
+
+        # The shared search results don't outlive the library.
+        assert None == script.search_engine
+
     def test_default_facets(self):
         # By default, do_generate will only be called once, with facets=None.
         script = CacheRepresentationPerLane(
@@ -351,6 +388,39 @@ class TestCacheFacetListsPerLane(TestLaneScript):
         assert pagination.next_page.query_string == p2.query_string
         assert pagination.next_page.next_page.query_string == p3.query_string
 
+    def test_annotator(self):
+        # In the main thread, feeds are annotated using the
+        # circulation manager's CirculationAPI for the library.
+        script = CacheFacetListsPerLane(self._db, testing=True, cmd_args=[])
+        facets = Facets.default(self._default_library)
+        lane = self._lane()
+        self._db.flush()
+        manager_circulation = script.app.manager.circulation_apis[
+            self._default_library.id
+        ]
+
+        with script.app.test_request_context("/"):
+            annotator = script.annotator(lane, facets)
+            assert manager_circulation == annotator.circulation
+
+            # In a worker thread, they're annotated using a
+            # CirculationAPI that uses the worker's session.
+            worker_db = SessionManager.sessionmaker(session=self._db)()
+            script._worker.session = worker_db
+            try:
+                worker_lane = worker_db.query(Lane).get(lane.id)
+                annotator = script.annotator(worker_lane, facets)
+                circulation = annotator.circulation
+                assert manager_circulation != circulation
+                assert worker_db == circulation._db
+
+                # The worker's CirculationAPI is reused.
+                annotator = script.annotator(worker_lane, facets)
+                assert circulation == annotator.circulation
+            finally:
+                script._worker.session = None
+                worker_db.close()
+
     def test_do_generate(self):
         # When it's time to generate a feed, AcquisitionFeed.page
         # is called with the right arguments.
@@ -468,6 +538,36 @@ class TestCacheOPDSGroupFeedPerLane(TestLaneScript):
             assert AcquisitionFeed.ACQUISITION_FEED_TYPE == response.content_type
             assert response.get_data(as_text=True).startswith('<feed')
 
+    def test_search_queries(self):
+        # search_queries() finds the search that Lane.groups() will
+        # run to find featured works for a lane and its sublanes.
+        lane = self._lane()
+        inherits = self._lane(parent=lane)
+        independent = self._lane(parent=lane)
+        independent.inherit_parent_restrictions = False
+        invisible = self._lane(parent=lane)
+        invisible.visible = False
+
+        script = CacheOPDSGroupFeedPerLane(
+            self._db, manager=object(), cmd_args=[]
+        )
+        facets = FeaturedFacets(0.1, random_seed=Filter.DETERMINISTIC)
+        [(query_string, filter, pagination)] = script.search_queries(
+            lane, facets, None
+        )
+
+        # Only the sublane that inherits the lane's restrictions is
+        # found by the main search.
+        assert None == query_string
+        expect = Filter.from_worklist(
+            self._db, inherits, inherits.overview_facets(self._db, facets)
+        )
+        assert expect.build()[0].to_dict() == filter.build()[0].to_dict()
+
+        # The search asks for a few more works than will be featured.
+        target_size = self._default_library.featured_lane_size
+        assert max(target_size+1, int(target_size * 1.10)) == pagination.size
+
     def test_facets(self):
         # Normally we yield one FeaturedFacets object for each of the
         # library's enabled entry points.